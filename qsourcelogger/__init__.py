@@ -1,6 +1,7 @@
 import platform
 import sys
 
+from .lib import startup  # first, it times the startup from here
 from . import fsutils
 from .__main__ import run
 
@@ -35,10 +36,15 @@ pref_ref = {
     "lookup_source_qrz": False,
     "lookup_source_hamdb": False,
     "lookup_source_hamqth": False,
+    "lookup_source_offline": False,
     "lookup_username": "",
     "lookup_password": "",
     "lookup_firstname": False,
     "lookup_others": True,
+    "lookup_cache_ttl_days": 30,
+    "lookup_cache_max_entries": 20000,
+    "lookup_max_concurrent": 4,
+    "lookup_url_override": "",
     "cat_enable_flrig": False,
     "cat_flrig_ip": "localhost",
     "cat_flrig_port": 12345,
@@ -48,5 +54,13 @@ pref_ref = {
     "cat_rigctld_port": 4532,
     "cat_enable_manual": True,
     "cat_manual_mode": "SSB",
-    "cat_manual_vfo": 14250000
+    "cat_manual_vfo": 14250000,
+    "iaru_region": 2,
+    "worldmap_heatmap": "off",
+    "event_slow_handler_ms": 0,
+    "score_audit": False,
+    "replication_enabled": False,
+    "replication_group": "239.1.1.1",
+    "replication_port": 2239,
+    "replication_interface": "0.0.0.0"
 }
@@ -21,27 +21,19 @@ from shutil import copyfile
 from typing import Optional
 
 import qdarktheme
-from PyQt6 import QtCore, QtGui, QtWidgets, uic
+from PyQt6 import QtCore, QtGui, QtWidgets
 from PyQt6.QtCore import QDir, Qt, QByteArray, QEvent, QTimer, QUrl
 from PyQt6.QtGui import QFontDatabase, QKeyEvent, QCursor, QMouseEvent, QDesktopServices
 from PyQt6.QtWidgets import QFileDialog, QLineEdit, QLabel, QHBoxLayout, QMessageBox, QMenu, QPushButton
 
 import qsourcelogger.fsutils as fsutils
-from qsourcelogger.cat.hamlib import CatHamlib
 from . import model, contest
-from .bandmap import BandMapWindow
-from .callprofile import ExternalCallProfileWindow
 from .cat import AbstractCat
 from .cat.RigState import RigState
-from .cat.flrig import CatFlrig
-from .cat.manual import CatManual
-from .cat.omnirig import CatOmnirig
-from .cat.rigctld import CatRigctld
-from .checkwindow import CheckWindow
 from .contest.AbstractContest import ContestFieldNextLine, ContestField, AbstractContest, DupeType
-from .lib import event as appevent, flags, hamutils
+from .contest.RateEngine import RateEngine
+from .lib import bandplan, event as appevent, flags, rescore, startup, uicache
 from .lib.about import About
-from .lib.bigcty import BigCty
 from .lib.cwinterface import CW
 from .lib.edit_macro import EditMacro
 from .lib.edit_opon import OpOn
@@ -55,28 +47,30 @@ from .lib.ham_utility import (
     reciprocol,
     fakefreq, gridtolatlon, calculate_wpx_prefix, get_call_base,
 )
-from .lib.lookup import HamQTH, QRZlookup, ExternalCallLookupService
+from .lib.lookup import HamQTH, QRZlookup, HamDBlookup, OfflineLookup, ExternalCallLookupService, \
+    LookupScheduler, get_lookup_cache, get_callsign_database
 from .lib.n1mm import N1MM
-from .lib.super_check_partial import SCP
+from .lib.qso_journal import qso_committer
+from .lib.reconcile import ReconcileServer
+from .lib.replication import Replicator
 from .lib.version import __version__
-from .lib.versiontest import VersionTest
-from .logwindow import LogWindow
-from .mapwindow import WorldMap
-from .model import Contest, Station, QsoLog
-from .qsoeditwindow import QsoEditWindow
-from .qtcomponents.AdifExport import AdifExport
-from .qtcomponents.AdifImport import AdifImport
-from .qtcomponents.CabrilloExport import CabrilloExport
+from .model import Contest, Station, QsoLog, contest_settings_writer
+from .model.inmemory import Spot
+from .qtcomponents.RescoreWorker import RescoreWorker
 from .qtcomponents.ContestEdit import ContestEdit
 from .qtcomponents.ContestFieldEventFilter import ContestFieldEventFilter
 from .qtcomponents.DockWidget import DockWidget
 from .qtcomponents.EmacsCursorEventFilter import EmacsCursorEventFilter
 from .qtcomponents.QsoEntryField import QsoEntryField
 from .qtcomponents.StationSettings import StationSettings
-from .qtcomponents.VoiceAudio import VoiceAudio
-from .qtcomponents.settings import Settings
 from .qtcomponents.spotsend import Spotsend
-from .vfo import VfoWindow
+
+# dock windows, cat backends, audio, the map and the settings dialog (sounddevice, serial) are imported when first
+# used, see lib/startup.py
+if typing.TYPE_CHECKING:
+    from .qtcomponents.VoiceAudio import VoiceAudio
+
+startup.mark("imported")
 
 def getQss():
     small_font_pt = max(9, QtWidgets.QApplication.instance().font('QLabel').pointSize() - 2)
@@ -112,7 +106,8 @@ QDockWidget#CheckWindow #dxcScrollWidget QLabel {{
     font-family: 'Roboto Mono';
 }}
 
-#MainWindow QLabel#dupe_indicator {{
+#MainWindow QLabel#dupe_indicator,
+#MainWindow QLabel#mult_indicator {{
     font-size: {entry_font_pt - 5}pt;
     font-weight: bold;
 }}
@@ -178,20 +173,44 @@ class MainWindow(QtWidgets.QMainWindow):
     bandmap_window: DockWidget = None
     vfo_window: DockWidget = None
     profile_window: DockWidget = None
-    qso_edit_window: QsoEditWindow = None
-    map_window: WorldMap = None
+    qso_edit_window: DockWidget = None
+    map_window: DockWidget = None
+    event_stats_window: DockWidget = None
+    rate_window: DockWidget = None
+    rate_engine: RateEngine = None
+    replicator: Replicator = None
+    reconcile_server: ReconcileServer = None
 
     n1mm: N1MM = None
 
     call_change_debounce_timer = False
+
+    # lookup prefetch of likely calls
+    scp_prefetch_threads: set = None
+    scp_prefetch_min_length = 3
+    scp_prefetch_count = 5
+    last_spot_prefetch_hz: int = None
+    spot_prefetch_debounce_timer = False
+
+    callsign_import_worker = None
+    rescore_worker = None
     dx_entity: QLabel
     flag_label: QLabel
 
-    audio_thread: VoiceAudio = None
+    audio_thread: 'VoiceAudio' = None
+
+    prefetcher: startup.Prefetcher = None
 
     last_escape_datetime: datetime.datetime = None
 
-    bigcty = BigCty(fsutils.APP_DATA_PATH / 'cty.json')
+    @property
+    def bigcty(self):
+        """the cty dataset, normally loaded by the startup prefetch by the time it is needed"""
+        return startup.cty.get()
+
+    @property
+    def mscp(self):
+        return startup.master_scp.get()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -203,17 +222,24 @@ class MainWindow(QtWidgets.QMainWindow):
         appevent.register(appevent.ContestActivated, self.activate_contest)
         appevent.register(appevent.StationActivated, self.activate_station)
         appevent.register(appevent.RadioState, self.event_radio_state)
+        appevent.register(appevent.ScoreUpdated, self.event_score_updated)
+        appevent.register(appevent.NewVersionAvailable, self.event_new_version_available)
+        appevent.register(appevent.QsoSaveFailed, self.event_qso_save_failed)
+        # settings changes reach the windows on the gui thread whichever thread made them
+        fsutils.settings.subscribe(lambda change: appevent.emit(appevent.SettingsChanged(change.changed,
+                                                                                          change.previous)))
 
         self.setCorner(Qt.Corner.TopRightCorner, Qt.DockWidgetArea.RightDockWidgetArea)
         self.setCorner(Qt.Corner.BottomRightCorner, Qt.DockWidgetArea.RightDockWidgetArea)
 
         data_path = fsutils.APP_DATA_PATH / "main.ui"
-        uic.loadUi(data_path, self)
+        uicache.load_ui(data_path, self)
 
         self.cw_entry.hide()
-        self.mscp = SCP(fsutils.APP_DATA_PATH)
+        self.scp_prefetch_threads = set()
 
         self.dupe_indicator.hide()
+        self.mult_indicator.hide()
         self.cw_speed.valueChanged.connect(self.cwspeed_spinbox_changed)
 
         self.cw_entry.textChanged.connect(self.handle_cw_text_change)
@@ -228,8 +254,11 @@ class MainWindow(QtWidgets.QMainWindow):
         self.actionExternalProfile_Window.triggered.connect(self.launch_profile_image_window)
         self.actionQsoedit_Window.triggered.connect(self.launch_qso_edit_window)
         self.actionMap_Window.triggered.connect(self.launch_map_window)
+        self.actionRate_Window.triggered.connect(self.launch_rate_window)
         self.actionVFO.triggered.connect(self.launch_vfo)
+        self.actionEvent_Stats.triggered.connect(self.launch_event_stats_window)
         self.actionRecalculate_Mults.triggered.connect(self.recalculate_mults)
+        self.actionRescore_Contest.triggered.connect(self.rescore_contest)
 
         self.actionGenerate_Cabrillo.triggered.connect(self.generate_cabrillo)
         self.actionGenerate_ADIF.triggered.connect(self.generate_adif)
@@ -252,6 +281,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.actionHelp.triggered.connect(self.show_help_dialog)
         self.actionUpdate_CTY.triggered.connect(self.check_for_new_cty)
         self.actionUpdate_MASTER_SCP.triggered.connect(self.update_masterscp)
+        self.actionImport_Callsign_Database.triggered.connect(self.import_callsign_database)
         self.actionQuit.triggered.connect(self.quit_app)
 
         self.pushButton_run.clicked.connect(self.run_button_clicked)
@@ -412,14 +442,7 @@ class MainWindow(QtWidgets.QMainWindow):
         if not self.pref.get("current_database", None):
             self.pref["current_database"] = db_path
             fsutils.write_settings({"current_database": str(db_path)})
-        model.persistent.loadPersistantDb(db_path)
-
-        if not DEBUG_ENABLED:
-            if VersionTest(__version__).test():
-                self.show_message_box(
-                    "There is a newer version of qsourcelogger available.\n"
-                    "You can udate to the current version by using:\npip install -U qsourcelogger"
-                )
+        self.load_database(db_path)
 
         self.callsign_entry = QsoEntryField('callsign', 'Callsign', self.centralwidget)
         self.callsign_entry.input_field.setProperty('field_config', ContestField(name="call", display_label="Callsign"))
@@ -452,6 +475,12 @@ class MainWindow(QtWidgets.QMainWindow):
         self.centralwidget.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.centralwidget.customContextMenuRequested.connect(self.context_menu)
 
+    def load_database(self, db_path) -> None:
+        # qsos still being written belong to the database being closed
+        qso_committer.close()
+        model.loadPersistantDb(db_path)
+        qso_committer.open(db_path)
+
     def open_database(self):
         station_id = self.pref.get('active_station_id', None)
         if station_id:
@@ -521,7 +550,7 @@ class MainWindow(QtWidgets.QMainWindow):
             del pinned_fields['mode']
         if 'submode' in pinned_fields:
             del pinned_fields['submode']
-        self.contest.merge_settings({'pinned_fields': pinned_fields})
+        self.contest.defer_settings({'pinned_fields': pinned_fields})
         self.setup_rig_control()
 
     def activate_station(self, event: StationActivated):
@@ -673,11 +702,40 @@ class MainWindow(QtWidgets.QMainWindow):
             return
         self.show_message_box("MASTER.SCP could not be updated.")
 
+    def import_callsign_database(self) -> None:
+        """
+        Import a bulk callsign file (FCC ULS EN.dat from l_amat.zip, or a csv with call,name,grid,... columns)
+        for offline lookups.
+        """
+        file, _ = QFileDialog.getOpenFileName(self, "Import Callsign Database", str(Path.home()),
+                                              "Callsign files (*.dat *.csv *.txt);;All files (*)")
+        if not file:
+            return
+        from .qtcomponents.CallsignDbImport import CallsignDbImportWorker
+        self.callsign_import_worker = CallsignDbImportWorker(file, get_callsign_database())
+        self.callsign_import_worker.progress.connect(self.handle_callsign_import_progress)
+        self.callsign_import_worker.finished.connect(self.handle_callsign_import_finished)
+        self.callsign_import_worker.start()
+
+    def handle_callsign_import_progress(self, count: int) -> None:
+        self.statusBar().showMessage(f"Importing callsigns... {count:,}")
+
+    def handle_callsign_import_finished(self) -> None:
+        worker = self.callsign_import_worker
+        self.callsign_import_worker = None
+        self.statusBar().clearMessage()
+        if worker.error:
+            self.show_message_box(f"Callsign database import failed.\n{worker.error}")
+        else:
+            self.show_message_box(f"Imported {worker.imported:,} callsigns.\n"
+                                  "Select 'Use Offline Database' in the lookup settings to use them.")
+
     def edit_configuration_settings(self, show_tab:str = None) -> None:
         """
         Configuration Settings was clicked
         """
         self.callsign_entry.input_field.setFocus()
+        from .qtcomponents.settings import Settings
         self.configuration_dialog = Settings(fsutils.APP_DATA_PATH, self.pref)
         self.configuration_dialog.show()
         if show_tab:
@@ -696,7 +754,7 @@ class MainWindow(QtWidgets.QMainWindow):
         if filename:
             self.pref["current_database"] = filename
             fsutils.write_settings({"current_database": filename})
-            model.loadPersistantDb(filename)
+            self.load_database(filename)
             self.open_database()
 
     def prompt_new_database_file(self) -> None:
@@ -723,7 +781,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
             self.pref["current_database"] = filename
             fsutils.write_settings({"current_database": filename})
-            model.loadPersistantDb(filename)
+            self.load_database(filename)
             self.open_database()
 
     def edit_contest(self) -> None:
@@ -733,9 +791,46 @@ class MainWindow(QtWidgets.QMainWindow):
     def activate_contest(self, event: appevent.ContestActivated) -> None:
         self.pref['active_contest_id'] = event.contest.id
         self.contest = event.contest
+        if self.contest_plugin:
+            self.contest_plugin.stop_scoring()
         self.contest_plugin = contest.contests_by_cabrillo_id[self.contest.fk_contest_meta.cabrillo_name](self.contest)
+        self.contest_plugin.start_scoring(audit_mode=self.pref.get("score_audit", False))
+        if self.rate_engine:
+            self.rate_engine.stop()
+        self.rate_engine = RateEngine(self.contest_plugin)
+        self.rate_engine.start()
+        self.setup_replication()
         self.load_contest()
 
+    def setup_replication(self):
+        if self.replicator:
+            self.replicator.stop()
+        if self.reconcile_server:
+            self.reconcile_server.stop()
+        self.replicator = None
+        self.reconcile_server = None
+        if self.pref.get("replication_enabled", False) and self.contest:
+            port = int(self.pref.get("replication_port", 2239))
+            try:
+                # stations that drifted apart are reconciled over tcp on the same port
+                self.reconcile_server = ReconcileServer(self.contest, port)
+                self.reconcile_server.start()
+            except OSError:
+                logger.exception("unable to listen for log reconciliation")
+                self.reconcile_server = None
+            try:
+                self.replicator = Replicator(
+                    self.contest,
+                    self.pref.get("replication_group", "239.1.1.1"),
+                    port,
+                    self.pref.get("replication_interface", "0.0.0.0"),
+                    on_peer=self.reconcile_server.reconcile_with if self.reconcile_server else None,
+                )
+                self.replicator.start()
+            except OSError:
+                logger.exception("unable to join the replication multicast group")
+                self.replicator = None
+
     def set_blank_qso(self):
         self.contact = QsoLog()
         self.contact.fk_contest = self.contest
@@ -868,7 +963,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.hide_band_mode(self.contest.mode_category)
         if self.contest.mode_category == "CW":
             self.setmode("CW")
-            band = getband(str(self.radio_state.vfotx_hz or 0))
+            band = getband(self.radio_state.vfotx_hz)
             self.set_band_indicator(band)
         elif self.contest.mode_category == "SSB":
             self.setmode("SSB")
@@ -876,7 +971,7 @@ class MainWindow(QtWidgets.QMainWindow):
                 self.radio_state.mode = "USB"
             else:
                 self.radio_state.mode = "LSB"
-            band = getband(str(self.radio_state.vfotx_hz or 0))
+            band = getband(self.radio_state.vfotx_hz)
             self.set_band_indicator(band)
 
         self.set_window_title()
@@ -901,10 +996,12 @@ class MainWindow(QtWidgets.QMainWindow):
         """
 
         try:
+            from .lib.bigcty import BigCty
             cty = BigCty(fsutils.APP_DATA_PATH / "cty.json")
             updated = cty.update()
             if updated:
                 cty.dump(fsutils.APP_DATA_PATH / "cty.json")
+                startup.cty.reset()
                 self.show_message_box("cty file updated.")
                 with open(
                         fsutils.APP_DATA_PATH / "cty.json", "rt", encoding="utf-8"
@@ -981,11 +1078,43 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def recalculate_mults(self) -> None:
         """Recalculate Multipliers"""
-        self.contest.recalculate_mults(self)
+        if self.contest_plugin and self.contest_plugin.score_engine:
+            self.contest_plugin.score_engine.recompute()
         self.clearinputs()
 
+    def rescore_contest(self) -> None:
+        """Recompute the cty details, points and multipliers of every qso in the active contest"""
+        if not self.contest or self.rescore_worker:
+            return
+        answer = QMessageBox.question(self, "Rescore Contest",
+                                      f"Recompute the country, zones, points and multipliers of every qso in "
+                                      f"{self.contest.get_display_name()} from the current cty file and scoring "
+                                      f"rules?")
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        self.rescore_worker = RescoreWorker(self.contest.id, self.bigcty)
+        self.rescore_worker.progress.connect(self.handle_rescore_progress)
+        self.rescore_worker.finished.connect(self.handle_rescore_finished)
+        self.rescore_worker.start()
+
+    def handle_rescore_progress(self, done: int, total: int) -> None:
+        self.statusBar().showMessage(f"Rescoring... {done:,} / {total:,}")
+
+    def handle_rescore_finished(self) -> None:
+        worker = self.rescore_worker
+        self.rescore_worker = None
+        self.statusBar().clearMessage()
+        if worker.error:
+            self.show_message_box(f"Rescore failed.\n{worker.error}")
+            return
+        if worker.result.changed_qsos and self.contest and self.contest.id == worker.contest_id:
+            # reload the log window, score and rates from the rewritten qsos
+            appevent.emit(appevent.ContestActivated(self.contest))
+        self.show_message_box(worker.result.summary())
+
     def launch_log_window(self) -> None:
         if not self.log_window:
+            from .logwindow import LogWindow
             self.log_window = LogWindow()
             self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.log_window)
         self.log_window.show()
@@ -993,6 +1122,7 @@ class MainWindow(QtWidgets.QMainWindow):
     def launch_bandmap_window(self) -> None:
         """Launch the bandmap window"""
         if not self.bandmap_window:
+            from .bandmap import BandMapWindow
             self.bandmap_window = BandMapWindow()
             self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.bandmap_window)
 
@@ -1001,12 +1131,14 @@ class MainWindow(QtWidgets.QMainWindow):
     def launch_check_window(self) -> None:
         """Launch the check window"""
         if not self.check_window:
+            from .checkwindow import CheckWindow
             self.check_window = CheckWindow()
             self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.check_window)
         self.check_window.show()
 
     def launch_profile_image_window(self) -> None:
         if not self.profile_window:
+            from .callprofile import ExternalCallProfileWindow
             self.profile_window = ExternalCallProfileWindow()
             self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.profile_window)
             self.profile_window.closed.connect(self.handle_dock_closed)
@@ -1014,6 +1146,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def launch_map_window(self) -> None:
         if not self.map_window:
+            from .mapwindow import WorldMap
             self.map_window = WorldMap()
             self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.map_window)
             self.map_window.setFloating(True)
@@ -1022,6 +1155,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def launch_qso_edit_window(self) -> None:
         if not self.qso_edit_window:
+            from .qsoeditwindow import QsoEditWindow
             self.qso_edit_window = QsoEditWindow(None, contest=self.contest)
             self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, self.qso_edit_window)
             self.qso_edit_window.setFloating(True)
@@ -1035,10 +1169,28 @@ class MainWindow(QtWidgets.QMainWindow):
     def launch_vfo(self) -> None:
         """Launch the VFO window"""
         if not self.vfo_window:
+            from .vfo import VfoWindow
             self.vfo_window = VfoWindow()
             self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.vfo_window)
         self.vfo_window.show()
 
+    def launch_event_stats_window(self) -> None:
+        if not self.event_stats_window:
+            from .eventstats import EventStatsWindow
+            self.event_stats_window = EventStatsWindow()
+            self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.event_stats_window)
+            self.event_stats_window.setFloating(True)
+            self.event_stats_window.closed.connect(self.handle_dock_closed)
+        self.event_stats_window.show()
+
+    def launch_rate_window(self) -> None:
+        if not self.rate_window:
+            from .ratewindow import RateWindow
+            self.rate_window = RateWindow()
+            self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.rate_window)
+            self.rate_window.closed.connect(self.handle_dock_closed)
+        self.rate_window.show()
+
     def handle_dock_closed(self, event: typing.Optional[QtGui.QCloseEvent]):
         if event and event.source and event.source == self.profile_window:
             self.removeDockWidget(self.profile_window)
@@ -1049,6 +1201,12 @@ class MainWindow(QtWidgets.QMainWindow):
         if event and event.source and event.source == self.map_window:
             self.removeDockWidget(self.map_window)
             self.map_window = None
+        if event and event.source and event.source == self.event_stats_window:
+            self.removeDockWidget(self.event_stats_window)
+            self.event_stats_window = None
+        if event and event.source and event.source == self.rate_window:
+            self.removeDockWidget(self.rate_window)
+            self.rate_window = None
 
     def clear_band_indicators(self) -> None:
         """
@@ -1079,6 +1237,12 @@ class MainWindow(QtWidgets.QMainWindow):
     def closeEvent(self, event) -> None:
         if self.rig_control:
             self.rig_control.close()
+        if self.replicator:
+            self.replicator.stop()
+        if self.reconcile_server:
+            self.reconcile_server.stop()
+        if self.n1mm:
+            self.n1mm.close()
         window_state = {
             "window_state": bytes(self.saveState(1).toHex()).decode('ascii'),
             "window_geo": bytes(self.saveGeometry().toHex()).decode('ascii'),
@@ -1092,6 +1256,14 @@ class MainWindow(QtWidgets.QMainWindow):
         }
 
         fsutils.write_settings(window_state)
+        fsutils.settings.flush()
+        contest_settings_writer.flush()
+        logger.info(f"contest settings writes {contest_settings_writer.stats}")
+        qso_committer.close()
+        logger.info(f"qso write behind {qso_committer.stats}")
+        model.closePersistantDb()
+        appevent.log_stats()
+        appevent.dump_stats(fsutils.USER_DATA_PATH / "event_stats.json")
         event.accept()
 
     def cwspeed_spinbox_changed(self) -> None:
@@ -1253,18 +1425,15 @@ class MainWindow(QtWidgets.QMainWindow):
         """
 
         self.dupe_indicator.hide()
+        self.mult_indicator.hide()
         self.set_blank_qso()
         self.heading_distance.setText("")
         self.dx_entity.setText("")
         self.flag_label.clear()
-        if self.contest:
-            # TODO multiplier logic unknown
-            mults = 0 #self.contest.show_mults(self)
-            qsos = QsoLog.select().where(QsoLog.fk_contest == self.contest).count()
-            multstring = f"{qsos}/{mults}"
-            self.mults.setText(multstring)
-            score = self.contest_plugin.calculate_total_points()
-            self.score.setText(str(score or '0'))
+        if self.contest_plugin and self.contest_plugin.score_engine:
+            self.show_score(self.contest_plugin.score_engine.qso_count,
+                            self.contest_plugin.score_engine.multiplier_count,
+                            self.contest_plugin.score_engine.total)
 
         for name, field in self.contest_fields.items():
             if name not in ['call', 'rst_sent', 'rst_rcvd']:
@@ -1287,6 +1456,82 @@ class MainWindow(QtWidgets.QMainWindow):
         if self.qso_edit_window:
             self.qso_edit_window.set_qso(self.contact)
 
+    def show_score(self, qsos: int, mults: int, score) -> None:
+        self.mults.setText(f"{qsos}/{mults}")
+        self.score.setText(str(score or '0'))
+
+    def event_qso_save_failed(self, event: appevent.QsoSaveFailed) -> None:
+        dlg = QMessageBox(self)
+        dlg.setWindowTitle("Error saving QSO log")
+        dlg.setText(f"{event.qso.call}: {event.error}\nThe QSO was not logged, it is set aside in "
+                    f"{event.rejected_path}.")
+        dlg.exec()
+
+    def event_new_version_available(self, event: appevent.NewVersionAvailable) -> None:
+        self.show_message_box(
+            "There is a newer version of qsourcelogger available.\n"
+            "You can udate to the current version by using:\npip install -U qsourcelogger"
+        )
+
+    def finish_startup(self) -> None:
+        """
+        After the first paint: the dock windows that were open last time, their layout, then the background
+        prefetch of what the operator will need next
+        """
+        # painted now if the platform has not got to it yet
+        self.repaint()
+        startup.mark("first paint")
+        if self.pref.get("window_bandmap_enable", None):
+            self.launch_bandmap_window()
+        if self.pref.get("window_check_enable", None):
+            self.launch_check_window()
+        if self.pref.get("window_log_enable", None):
+            self.launch_log_window()
+        if self.pref.get("window_profile_enable", None):
+            self.launch_profile_image_window()
+        if self.pref.get("window_worldmap_enable", None):
+            self.launch_map_window()
+        if self.pref.get("window_vfo_enable", None):
+            self.launch_vfo()
+        if self.pref.get("window_qsoedit_enable", None):
+            self.launch_qso_edit_window()
+        if 'window_state' in self.pref:
+            self.restoreState(QByteArray.fromHex(bytes(self.pref["window_state"], 'ascii')), 1)
+        startup.mark("docks restored")
+
+        steps = [
+            ("cty", startup.cty.get),
+            ("MASTER.SCP", startup.master_scp.get),
+            ("dock windows", startup.import_modules([
+                "qsourcelogger.logwindow", "qsourcelogger.bandmap", "qsourcelogger.checkwindow",
+                "qsourcelogger.qsoeditwindow", "qsourcelogger.callprofile", "qsourcelogger.ratewindow"])),
+            ("dialogs", startup.import_modules([
+                "qsourcelogger.qtcomponents.settings", "qsourcelogger.qtcomponents.AdifExport",
+                "qsourcelogger.qtcomponents.CabrilloExport"])),
+            ("ui forms", uicache.compile_forms),
+            ("icons", install_icons),
+        ]
+        if not DEBUG_ENABLED:
+            steps.append(("version check", check_version))
+        # the map (matplotlib, cartopy) is left until it is opened, it would hold the interpreter for seconds
+        self.prefetcher = startup.Prefetcher(steps)
+        self.prefetcher.start()
+
+        report = startup.report()
+        logger.info(report)
+        if startup.REPORT_ENABLED:
+            print(report, file=sys.stderr)
+            with open(fsutils.USER_DATA_PATH / "startup_report.txt", "wt", encoding="utf-8") as report_file:
+                report_file.write(report)
+        if os.environ.get("QSOURCE_STARTUP_EXIT"):
+            # the startup benchmark stops at the interactive entry window
+            self.prefetcher.done.wait(30)
+            print(startup.report(self.prefetcher), file=sys.stderr)
+            self.close()
+
+    def event_score_updated(self, event: appevent.ScoreUpdated) -> None:
+        self.show_score(event.qso_count, event.multipliers, event.total)
+
     def callsign_editing_finished(self) -> None:
         """
         This signal is invoked after the enter button is pressed so it doesn't conflict with saving a qso.
@@ -1319,12 +1564,12 @@ class MainWindow(QtWidgets.QMainWindow):
         self.contact.station_callsign = self.contact.fk_station.callsign
         self.contact.call = self.callsign_entry.input_field.text().strip().upper()
         self.contact.freq = self.radio_state.vfotx_hz
-        self.contact.band = hamutils.adif.common.convert_freq_to_band((self.contact.freq or 0) / 1000_000)
+        self.contact.band = bandplan.adif_band(self.contact.freq)
 
         # important for dexpediation - split mode - set when radio state indicates split
         if self.radio_state.is_split:
             self.contact.freq_rx = self.radio_state.vforx_hz
-            self.contact.band_rx = hamutils.adif.common.convert_freq_to_band((self.contact.freq_rx or 0) / 1000_000)
+            self.contact.band_rx = bandplan.adif_band(self.contact.freq_rx)
 
 
         self.contact.mode = (self.radio_state.mode or "").upper()
@@ -1413,16 +1658,18 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # contest may need to do re calculation or normalization or something
         self.contest_plugin.pre_process_qso_log(self.contact)
+        self.contest_plugin.qso_logged(self.contact)
+        self.contest_plugin.derive_multipliers(self.contact)
         self.contact.points = self.contest_plugin.points_for_qso(self.contact)
 
         self.contact.id = uuid.uuid4()
         try:
-            self.contact.save(force_insert=True)
+            # journaled, the insert and QsoAdded follow on the commit thread
+            qso_committer.submit(self.contact)
             self.save_pinned_field_values(self.contact)
-            appevent.emit(appevent.QsoAdded(self.contact))
             self.clearinputs()
         except Exception as e:
-            logger.exception("error saving qso record")
+            logger.exception("error journaling qso record")
             dlg = QMessageBox(self)
             dlg.setWindowTitle("Error saving QSO log")
             dlg.setText(str(e))
@@ -1439,7 +1686,7 @@ class MainWindow(QtWidgets.QMainWindow):
         pinned_fields: dict = self.contest.get_setting("pinned_fields", {})
         for field_name in pinned_fields.keys():
             pinned_fields[field_name] = getattr(qso, field_name)
-        self.contest.merge_settings({'pinned_fields': pinned_fields})
+        self.contest.defer_settings({'pinned_fields': pinned_fields})
 
     def set_dark_mode(self, enabled):
         qdarktheme.setup_theme(theme="dark" if enabled else "light", corner_shape="sharp",
@@ -1520,6 +1767,7 @@ class MainWindow(QtWidgets.QMainWindow):
         return macro
 
     def voice_string(self, the_string: str) -> None:
+        from .qtcomponents.VoiceAudio import VoiceAudio
         self.audio_thread = VoiceAudio(the_string, self.current_op, self.rig_control)
         self.audio_thread.finished.connect(self.audio_finished)
         self.audio_thread.start()
@@ -1572,6 +1820,8 @@ class MainWindow(QtWidgets.QMainWindow):
         logger.debug("readpreferences")
 
         self.pref = fsutils.read_settings()
+        appevent.set_slow_handler_threshold(self.pref.get("event_slow_handler_ms", 0))
+        bandplan.set_region(self.pref.get("iaru_region", bandplan.DEFAULT_REGION))
 
         if updated_fields is not None and 'contest_fields' in updated_fields:
             self.contest = Contest.get_by_id(self.contest._pk)
@@ -1580,9 +1830,17 @@ class MainWindow(QtWidgets.QMainWindow):
         self.look_up = None
         try:
             if self.pref.get("lookup_source_qrz"):
-                self.look_up = QRZlookup(self.pref.get("lookup_username"), self.pref.get("lookup_password"))
+                self.look_up = QRZlookup(self.pref.get("lookup_username"), self.pref.get("lookup_password"),
+                                         url=self.pref.get("lookup_url_override") or None)
+            elif self.pref.get("lookup_source_hamdb"):
+                self.look_up = HamDBlookup(url=self.pref.get("lookup_url_override") or None)
             elif self.pref.get("lookup_source_hamqth"):
                 self.look_up = HamQTH(self.pref.get("lookup_username"), self.pref.get("lookup_password"))
+            elif self.pref.get("lookup_source_offline"):
+                self.look_up = OfflineLookup(get_callsign_database())
+            if self.look_up and not isinstance(self.look_up, OfflineLookup):
+                self.look_up = LookupScheduler(self.look_up, get_lookup_cache(),
+                                               max_concurrent=self.pref.get("lookup_max_concurrent", 4))
         except Exception:
             logger.exception("Could not initialize external lookup service")
 
@@ -1626,6 +1884,8 @@ class MainWindow(QtWidgets.QMainWindow):
             if self.cw.servertype == 2:
                 self.cw.set_winkeyer_speed(20)
 
+        if self.n1mm:
+            self.n1mm.close()
         self.n1mm = None
         if self.pref.get("send_n1mm_packets", False):
             try:
@@ -1667,19 +1927,25 @@ class MainWindow(QtWidgets.QMainWindow):
             self.rig_control.close()
         self.rig_control = None
 
+        # only the backend in use is imported, the hamlib bindings are large
         if self.pref.get('cat_enable_manual', False):
+            from .cat.manual import CatManual
             self.rig_control = CatManual()
         elif self.pref.get("cat_enable_flrig", False):
             logger.debug(f"Using flrig: {self.pref.get('cat_flrig_ip')} {self.pref.get('cat_flrig_port')}")
+            from .cat.flrig import CatFlrig
             self.rig_control = CatFlrig(self.pref.get("cat_flrig_ip", "127.0.0.1"), int(self.pref.get("cat_flrig_port", 12345)))
         elif self.pref.get("cat_enable_rigctld", False):
             logger.debug(f"Using rigctld: {self.pref.get('cat_rigctld_ip')} {self.pref.get('cat_rigctld_port')}")
+            from .cat.rigctld import CatRigctld
             self.rig_control = CatRigctld(self.pref.get("cat_rigctld_ip", "127.0.0.1"), int(self.pref.get("cat_rigctld_port", 4532)))
         elif self.pref.get("cat_enable_omnirig", False):
             logger.debug(f"Using omni rig: {self.pref.get('cat_rigctld_ip')} {self.pref.get('cat_rigctld_port')}")
+            from .cat.omnirig import CatOmnirig
             self.rig_control = CatOmnirig(self.pref.get("cat_omnirig_index", 1))
         elif(self.pref.get("cat_enable_hamlib", False)):
             logger.debug(f"Using hamlib: {self.pref.get('cat_hamlib_rig')} {self.pref.get('cat_hamlib_dev')}")
+            from .cat.hamlib import CatHamlib
             self.rig_control = CatHamlib(self.pref.get('cat_hamlib_rig'), self.pref.get('cat_hamlib_dev'), self.pref.get('cat_hamlib_baud'))
 
         if self.rig_control:
@@ -1704,8 +1970,8 @@ class MainWindow(QtWidgets.QMainWindow):
         current_call = self.callsign_entry.input_field.text().strip().upper()
         if event.result.call == current_call:
             # Get the grid square and calculate the distance and heading.
-            self.contact.gridsquare = event.result.grid
-            if self.contact.gridsquare:
+            if event.result.grid:
+                self.contact.gridsquare = event.result.grid
                 self.contact.lat, self.contact.lon = gridtolatlon(self.contact.gridsquare)
 
             # auto-fill name from external source
@@ -1713,9 +1979,9 @@ class MainWindow(QtWidgets.QMainWindow):
                 and self.pref.get('lookup_populate_name', None):
                 name_field = self.contest_fields.get('name', None)
                 if self.pref.get('lookup_populate_name', None):
-                    if self.pref.get('lookup_firstname', None):
+                    if self.pref.get('lookup_firstname', None) and event.result.first_name:
                         self.contact.name = event.result.first_name.title()
-                    else:
+                    elif event.result.name:
                         self.contact.name = event.result.name.title()
 
             if self.pref.get('lookup_others', None):
@@ -1739,7 +2005,7 @@ class MainWindow(QtWidgets.QMainWindow):
                     else:
                         self.contact.address = event.result.source_result.get('addr2')
 
-            if self.station.gridsquare:
+            if self.station.gridsquare and event.result.grid:
                 heading = bearing(self.station.gridsquare, event.result.grid)
                 kilometers = distance(self.station.gridsquare, event.result.grid)
                 self.heading_distance.setText(
@@ -1854,6 +2120,7 @@ class MainWindow(QtWidgets.QMainWindow):
             else:
                 self.dupe_indicator.hide()
             self.pre_populate_contact()
+            self.update_mult_indicator(stripped_text)
             self.check_callsign_external(text)
             # space-to-tab
             self.handle_space_tab('call', self.callsign_entry.input_field)
@@ -1904,6 +2171,80 @@ class MainWindow(QtWidgets.QMainWindow):
             appevent.emit(appevent.CallChanged(self.callsign_entry.input_field.text().upper()))
             self.dupe_indicator.hide()
             self.check_callsign(self.callsign_entry.input_field.text().upper())
+            self.update_mult_indicator(self.callsign_entry.input_field.text().upper())
+            self.prefetch_scp_candidates(self.callsign_entry.input_field.text().upper())
+
+    def update_mult_indicator(self, call: str) -> None:
+        """Show whether the call being entered would be a new multiplier, from the score engine's worked sets"""
+        engine = self.contest_plugin.score_engine if self.contest_plugin else None
+        call = call.strip()
+        if not engine or not engine.dimensions or len(call) < 3:
+            self.mult_indicator.hide()
+            return
+        if not self.contact.call:
+            # the contact is filled in from the call field once the operator moves on, predict from what is typed
+            self.contact.call = call
+            self.contact.wpx_prefix = calculate_wpx_prefix(call)
+            new, points, score_delta = engine.predict(self.contact, *self.current_band_mode())
+            self.contact.call = None
+            self.contact.wpx_prefix = None
+        else:
+            new, points, score_delta = engine.predict(self.contact, *self.current_band_mode())
+        if new:
+            self.mult_indicator.setToolTip(f"New {', '.join(new)} - {points or 0} points, "
+                                           f"score +{score_delta or 0:g}")
+            self.mult_indicator.show()
+        else:
+            self.mult_indicator.hide()
+
+    def current_band_mode(self) -> tuple[Optional[str], Optional[str]]:
+        """band and mode a qso would be logged with at the current radio state"""
+        band = bandplan.adif_band(self.radio_state.vfotx_hz)
+        mode = (self.radio_state.mode or "").upper()
+        if mode in ['USB', 'LSB']:
+            mode = 'SSB'
+        return band, mode or None
+
+    def prefetch_scp_candidates(self, call: str) -> None:
+        """Look up the likely completions of a partially typed call ahead of the operator"""
+        if not isinstance(self.look_up, LookupScheduler) or len(call) < self.scp_prefetch_min_length:
+            return
+        from .checkwindow import ScpWorker
+        worker = ScpWorker(call.strip(), self.mscp)
+        # hold a reference until the thread finishes, a newer keystroke must not destroy a running thread
+        self.scp_prefetch_threads.add(worker)
+        worker.finished.connect(self.handle_scp_prefetch)
+        worker.start()
+
+    def handle_scp_prefetch(self) -> None:
+        worker = self.sender()
+        self.scp_prefetch_threads.discard(worker)
+        current = self.callsign_entry.input_field.text().strip().upper()
+        if worker.call != current or not isinstance(self.look_up, LookupScheduler):
+            return
+        candidates = [x for x in list(worker.result or [])[:self.scp_prefetch_count] if x != current]
+        self.look_up.prefetch(candidates)
+
+    def prefetch_spots_near_vfo(self, vfo_hz: int) -> None:
+        """Look up the stations spotted around the vfo, they are likely to be worked next"""
+        if not vfo_hz or not isinstance(self.look_up, LookupScheduler):
+            return
+        if self.last_spot_prefetch_hz and abs(vfo_hz - self.last_spot_prefetch_hz) < 1000:
+            return
+        self.last_spot_prefetch_hz = vfo_hz
+        self.look_up.prefetch(Spot.get_near(vfo_hz, 5000, 10))
+
+    def schedule_spot_prefetch(self):
+        """prefetch the spots near the vfo once the radio settles, its state and mode changes come in bursts"""
+        if not isinstance(self.look_up, LookupScheduler) or self.spot_prefetch_debounce_timer:
+            return
+        self.spot_prefetch_debounce_timer = True
+        QTimer.singleShot(500, self.handle_spot_prefetch_debounce)
+
+    def handle_spot_prefetch_debounce(self):
+        # the vfo the operator settled on, not every step of turning the dial
+        self.spot_prefetch_debounce_timer = False
+        self.prefetch_spots_near_vfo(self.radio_state.vfotx_hz)
 
     def handle_space_tab(self, field_name, field_input):
         if field_name == 'call':
@@ -1934,7 +2275,7 @@ class MainWindow(QtWidgets.QMainWindow):
 
         vfo = float(stripped_text)
         vfo = int(vfo * 1000)
-        band = getband(str(vfo))
+        band = getband(vfo)
         self.set_band_indicator(band)
         self.radio_state.vfotx_hz = vfo
         self.set_window_title()
@@ -1963,12 +2304,13 @@ class MainWindow(QtWidgets.QMainWindow):
         None
         """
 
+        self.schedule_spot_prefetch()
         if mode == "CW":
             self.setmode("CW")
             self.radio_state.mode = "CW"
             if self.rig_control:
                 self.rig_control.set_mode("CW")
-            band = getband(str(self.radio_state.vfotx_hz))
+            band = getband(self.radio_state.vfotx_hz)
             self.set_band_indicator(band)
             self.set_window_title()
             self.clearinputs()
@@ -1979,7 +2321,7 @@ class MainWindow(QtWidgets.QMainWindow):
             self.radio_state.mode = "RTTY"
             if self.rig_control:
                 self.rig_control.set_mode("RTTY")
-            band = getband(str(self.radio_state.vfotx_hz))
+            band = getband(self.radio_state.vfotx_hz)
             self.set_band_indicator(band)
             self.set_window_title()
             self.clearinputs()
@@ -1992,7 +2334,7 @@ class MainWindow(QtWidgets.QMainWindow):
                 self.radio_state.mode = "USB"
             else:
                 self.radio_state.mode = "LSB"
-            band = getband(str(self.radio_state.vfotx_hz))
+            band = getband(self.radio_state.vfotx_hz)
             self.set_band_indicator(band)
             self.set_window_title()
             if self.rig_control:
@@ -2076,12 +2418,18 @@ class MainWindow(QtWidgets.QMainWindow):
         if not dupe_type:
             return False
 
-        band = hamutils.adif.common.convert_freq_to_band((self.radio_state.vfotx_hz or 0) / 1000_000)
+        band = bandplan.adif_band(self.radio_state.vfotx_hz)
         mode = self.radio_state.mode
         if mode == 'USB' or mode == 'LSB':
             mode = 'SSB'
         logger.debug(f"Call: {call} Band: {band} Mode: {mode} Dupetype: {dupe_type}")
 
+        # logged a moment ago and not in the database yet
+        for qso in qso_committer.pending(self.contest.id):
+            if qso.call == call and (dupe_type == DupeType.ONCE or qso.band == band and (
+                    dupe_type == DupeType.EACH_BAND or qso.mode == mode)):
+                return True
+
         if dupe_type == DupeType.ONCE:
             return self.contest_plugin.contest_qso_select() \
                 .where(QsoLog.call == call).limit(1).get_or_none() is not None
@@ -2288,12 +2636,15 @@ class MainWindow(QtWidgets.QMainWindow):
             self.F12.setToolTip(self.fkeys["F12"][1])
 
     def generate_adif(self) -> None:
+        from .qtcomponents.AdifExport import AdifExport
         AdifExport(self.contest, parent=self).open()
 
     def generate_cabrillo(self) -> None:
+        from .qtcomponents.CabrilloExport import CabrilloExport
         CabrilloExport(self.contest, self.contest_plugin, self.station, parent=self).open()
 
     def action_import_adif(self):
+        from .qtcomponents.AdifImport import AdifImport
         AdifImport(self.contest, parent=self).show()
 
     def event_radio_state(self, event: appevent.RadioState):
@@ -2308,11 +2659,15 @@ class MainWindow(QtWidgets.QMainWindow):
                 self.setmode(self.radio_state.mode)
             if self.radio_state.mode == "LSB" or self.radio_state.mode == "USB" or self.radio_state.mode == 'SSB':
                 self.setmode("SSB")
-            band = getband(str(self.radio_state.vfotx_hz))
+            band = getband(self.radio_state.vfotx_hz)
             self.set_band_indicator(band)
             self.set_window_title()
             if self.radio_state.is_ptt:
                 self.set_radio_icon(3)
+            # the dial moved away from where the spots were last prefetched
+            vfo_hz = self.radio_state.vfotx_hz
+            if vfo_hz and (self.last_spot_prefetch_hz is None or abs(vfo_hz - self.last_spot_prefetch_hz) >= 1000):
+                self.schedule_spot_prefetch()
 
     def set_radio_icon_tooltip(self):
         if self.radio_state.error:
@@ -2376,6 +2731,12 @@ def install_icons() -> None:
         )
 
 
+def check_version() -> None:
+    from .lib.versiontest import VersionTest
+    if VersionTest(__version__).test():
+        appevent.emit(appevent.NewVersionAvailable())
+
+
 def doimp(modname) -> object:
     """
     Imports a module.
@@ -2403,31 +2764,20 @@ def run() -> None:
     logger.debug(
         f"Resolved OS file system paths: MODULE_PATH {fsutils.MODULE_PATH}, USER_DATA_PATH {fsutils.USER_DATA_PATH}, CONFIG_PATH {fsutils.CONFIG_PATH}")
 
+    if len(sys.argv) > 1 and sys.argv[1] == "rescore":
+        sys.exit(rescore.main(sys.argv[2:]))
+
     window = MainWindow()
+    startup.mark("main window built")
 
-    if window.pref.get("window_bandmap_enable", None):
-        window.launch_bandmap_window()
-    if window.pref.get("window_check_enable", None):
-        window.launch_check_window()
-    if window.pref.get("window_log_enable", None):
-        window.launch_log_window()
-    if window.pref.get("window_profile_enable", None):
-        window.launch_profile_image_window()
-    if window.pref.get("window_worldmap_enable", None):
-        window.launch_map_window()
-    if window.pref.get("window_vfo_enable", None):
-        window.launch_vfo()
-    if window.pref.get("window_qsoedit_enable", None):
-        window.launch_qso_edit_window()
-
-    if 'window_state' in window.pref:
-        window.restoreState(QByteArray.fromHex(bytes(window.pref["window_state"], 'ascii')), 1)
     if 'window_geo' in window.pref:
         window.restoreGeometry(QByteArray.fromHex(bytes(window.pref["window_geo"], 'ascii')))
 
     signal.signal(signal.SIGINT, lambda sig, frame: window.close())
 
     window.show()
+    # the dock windows are opened once the entry window has been painted
+    QTimer.singleShot(0, window.finish_startup)
 
     sys.exit(app.exec())
 
@@ -2452,9 +2802,10 @@ logging.getLogger('matplotlib.font_manager').setLevel('INFO')
 logging.getLogger('peewee').setLevel('INFO')
 #os.environ["QT_QPA_PLATFORMTHEME"] = "gnome"
 app = QtWidgets.QApplication(sys.argv)
-install_icons()
+# the desktop icons are installed by the startup prefetch
 families = load_fonts_from_dir(os.fspath(fsutils.APP_DATA_PATH))
 logger.info(f"font families {families}")
+startup.mark("application and fonts")
 
 if __name__ == "__main__":
     run()
@@ -9,18 +9,19 @@ GPL V3
 # pylint: disable=logging-fstring-interpolation, line-too-long, no-name-in-module
 
 import logging
-import os
+from collections import defaultdict
 from datetime import timezone
 from decimal import Decimal
-from json import loads
 
-from PyQt6 import QtCore, QtGui, QtWidgets, uic, QtNetwork
+from PyQt6 import QtCore, QtGui, QtWidgets, QtNetwork
 from PyQt6.QtCore import Qt, QRectF
 from PyQt6.QtWidgets import QGraphicsView
 
 import qsourcelogger.fsutils as fsutils
 import qsourcelogger.lib.event as appevent
-from qsourcelogger.lib import timeutils, ham_utility
+from qsourcelogger.contest.ScoreEngine import ScoreEngine
+from qsourcelogger.lib import bandplan, timeutils, ham_utility, startup, uicache
+from qsourcelogger.model import QsoLog
 from qsourcelogger.model.inmemory import *
 from qsourcelogger.qtcomponents.DockWidget import DockWidget
 
@@ -32,50 +33,11 @@ UPDATE_INTERVAL = 2000
 class Band:
     """the band"""
 
-    bands = {
-        "160m": (1.8, 2),
-        "80m": (3.5, 4),
-        "60m": (5.102, 5.4065),
-        "40m": (7.0, 7.3),
-        "30m": (10.1, 10.15),
-        "20m": (14.0, 14.35),
-        "17m": (18.069, 18.168),
-        "15m": (21.0, 21.45),
-        "12m": (24.89, 25.0),
-        "10m": (28.0, 29.7),
-        "6m": (50.0, 54.0),
-        "4m": (70.0, 71.0),
-        "2m": (144.0, 148.0),
-    }
-
-    othername = {
-        "160m": 1.8,
-        "80m": 3.5,
-        "60m": 5.1,
-        "40m": 7.0,
-        "30m": 10.0,
-        "20m": 14.0,
-        "17m": 18.0,
-        "15m": 21.0,
-        "12m": 24.0,
-        "10m": 28.0,
-        "6m": 50.0,
-        "4m": 70.0,
-        "2m": 144.0,
-    }
-
     def __init__(self, band: str) -> None:
-        self.start, self.end = self.bands.get(band, (0.0, 1.0))
+        info = bandplan.plan().band(band)
+        self.start, self.end = (info.low_mhz, info.high_mhz) if info else (0.0, 1.0)
         self.name = band
-        self.altname = self.othername.get(band, 0.0)
-
-    @classmethod
-    def getBandFreqLimits(cls, freq_hz):
-        freq_mz = freq_hz / 1_000_000
-        for band_limits in cls.bands.values():
-            if band_limits[0] <= freq_mz <= band_limits[1]:
-                return band_limits
-        return None
+        self.altname = float(info.n1mm.rstrip('+')) if info else 0.0
 
 class BandMapWindow(DockWidget):
     """The BandMapWindow class."""
@@ -93,6 +55,9 @@ class BandMapWindow(DockWidget):
     bandwidth_mark = []
     # TODO pull worked calls from db, maintain list with app events
     worked_list = {}
+    # spot callsign -> qso carrying the cty details the multiplier dimensions are read from
+    mult_candidates: dict[str, QsoLog] = {}
+    mode: str = None
     text_color = QtGui.QColor(45, 45, 45)
     graphicsView: QGraphicsView = None
 
@@ -106,8 +71,9 @@ class BandMapWindow(DockWidget):
         appevent.register(appevent.RadioState, self.event_radio_state)
         appevent.register(appevent.BandmapSpotNext, self.event_tune_next_spot)
         appevent.register(appevent.BandmapSpotPrev, self.event_tune_prev_spot)
+        appevent.register(appevent.SettingsChanged, self.event_settings_changed)
 
-        uic.loadUi(fsutils.APP_DATA_PATH / "bandmap.ui", self)
+        uicache.load_ui(fsutils.APP_DATA_PATH / "bandmap.ui", self)
         self.settings = self.get_settings()
         self.clear_spot_olderSpinBox.setValue(self.settings.get("bandmap_spot_age_minutes", 2))
         self.agetime = self.clear_spot_olderSpinBox.value()
@@ -141,14 +107,17 @@ class BandMapWindow(DockWidget):
 
     def get_settings(self) -> dict:
         """Get the settings."""
-        if os.path.exists(fsutils.CONFIG_FILE):
-            with open(fsutils.CONFIG_FILE, "rt", encoding="utf-8") as file_descriptor:
-                self.settings = loads(file_descriptor.read())
-                if self.settings.get("darkmode"):
-                    self.text_color = QtGui.QColor(228, 231, 235)
-                else:
-                    self.text_color = QtGui.QColor(20, 20, 20)
-                return self.settings
+        self.settings = fsutils.read_settings()
+        if self.settings.get("darkmode"):
+            self.text_color = QtGui.QColor(228, 231, 235)
+        else:
+            self.text_color = QtGui.QColor(20, 20, 20)
+        return self.settings
+
+    def event_settings_changed(self, event: appevent.SettingsChanged):
+        self.settings.update(event.changed)
+        if "darkmode" in event.changed:
+            self.get_settings()
 
     def connect(self):
         """Connect to the cluster."""
@@ -172,7 +141,8 @@ class BandMapWindow(DockWidget):
     def event_radio_state(self, event: appevent.RadioState):
         # TODO when/if multiple band maps, check to make sure this bandmap window is the one tracking the vfo
 
-        self.set_band(ham_utility.getband(str(event.state.vfotx_hz or 0)) + "m", False)
+        band = bandplan.operating_band(event.state.vfotx_hz)
+        self.set_band(band.adif if band else "0m", False)
         try:
             if self.rx_freq != float(event.state.vfotx_hz or 0) / 1_000_000:
                 self.rx_freq = float(event.state.vfotx_hz or 0) / 1_000_000
@@ -181,6 +151,9 @@ class BandMapWindow(DockWidget):
         except ValueError:
             logger.debug(f"vfo value error {event.state.vfotx_hz}")
 
+        self.mode = (event.state.mode or "").upper()
+        if self.mode in ['USB', 'LSB']:
+            self.mode = 'SSB'
         self.bandwidth = event.state.bandwidth_hz if event.state.bandwidth_hz is not None else 0
         step, _ = self.determine_step_digits()
         self.drawTXRXMarks(step)
@@ -394,6 +367,8 @@ class BandMapWindow(DockWidget):
                 if spot.comment == "MARKED":
                     pen_color = QtGui.QColor(47, 47, 255)
                 # TODO there should be a better way to properly work the contest dupe settings into the colors here
+                if self.is_new_multiplier(spot.callsign):
+                    pen_color = QtGui.QColor(20, 170, 60)
                 if spot.callsign in self.worked_list:
                     call_bandlist = self.worked_list.get(spot.callsign)
                     if self.currentBand.altname in call_bandlist:
@@ -429,6 +404,28 @@ class BandMapWindow(DockWidget):
                 min_y = text_y + text.boundingRect().height() / 2
                 self.textItemList.append(text)
 
+    def is_new_multiplier(self, callsign: str) -> bool:
+        """whether working the spotted call on the displayed band would add a multiplier, no database access"""
+        engine = ScoreEngine.active
+        if not engine or not engine.dimensions:
+            return False
+        candidate = self.mult_candidates.get(callsign)
+        if not candidate:
+            if len(self.mult_candidates) > 5000:
+                self.mult_candidates.clear()
+            candidate = QsoLog(call=callsign, wpx_prefix=ham_utility.calculate_wpx_prefix(callsign))
+            result = startup.cty.get().find_call_match(callsign)
+            if result:
+                candidate.country = result.get("entity")
+                candidate.prefix = result.get("primary_pfx")
+                candidate.continent = result.get("continent")
+                candidate.cqz = int(result.get("cq")) if result.get("cq") else None
+                candidate.ituz = result.get("itu")
+                candidate.dxcc = result.get("dxcc")
+            self.mult_candidates[callsign] = candidate
+        new, _, _ = engine.predict(candidate, self.currentBand.name, self.mode or None)
+        return bool(new)
+
     def determine_step_digits(self):
         """doc"""
         return_zoom = {
@@ -483,6 +480,8 @@ class BandMapWindow(DockWidget):
 
     def receive(self) -> None:
         """Process waiting bytes"""
+        # a cluster sends its backlog, and busy periods, as many lines at once
+        spots = []
         while self.socket.bytesAvailable():
             data = self.socket.readLine(1000)
             data = str(data, "utf-8").strip()
@@ -494,7 +493,7 @@ class BandMapWindow(DockWidget):
                 self.send_command(
                     "set dx mode " + self.settings.get("cluster_mode", "OPEN")
                 )
-                return
+                break
             if "DX de" in data:
                 parts = data.split()
                 spotter = parts[2]
@@ -511,25 +510,37 @@ class BandMapWindow(DockWidget):
                          spotter=spotter,
                          comment=comment
                          )
-                    self.save_spot(spot)
+                    spots.append(spot)
                     logger.debug(spot)
                 except ValueError:
                     logger.debug(f"couldn't parse freq from datablock {data}")
-                return
+                continue
             if self.callsignField.text().upper() in data:
                 self.connectButton.setStyleSheet("color: green;")
                 self.connectButton.setText("Connected")
                 logger.debug(f"callsign login acknowledged {data}")
-
-    def save_spot(self, spot: Spot):
-        band_limits = Band.getBandFreqLimits(spot.freq_hz)
-        if band_limits:
-            # remove existing spots for same call on same band
-            Spot.delete().where(
-                (Spot.callsign == spot.callsign)
-                & (Spot.freq_hz.between(band_limits[0] * 1_000_000, band_limits[1] * 1_000_000))
-            ).execute()
-        spot.save()
+        if spots:
+            self.save_spots(spots)
+
+    @staticmethod
+    def save_spots(spots: list[Spot]):
+        """saves spots received together, each replacing the earlier spots of its call on the same band"""
+        plan = bandplan.plan()
+        latest = {}
+        # one band lookup for the batch
+        for spot, index in zip(spots, plan.indexes([spot.freq_hz for spot in spots]).tolist()):
+            # out of band spots are kept as they are
+            latest[(spot.callsign, index) if index >= 0 else id(spot)] = (spot, index)
+        calls_by_band = defaultdict(set)
+        for spot, index in latest.values():
+            if index >= 0:
+                calls_by_band[index].add(spot.callsign)
+        with Spot._meta.database.atomic():
+            for index, calls in calls_by_band.items():
+                band = plan.bands[index]
+                Spot.delete().where(
+                    Spot.callsign.in_(list(calls)) & Spot.freq_hz.between(band.low_hz, band.high_hz)).execute()
+            Spot.bulk_create([spot for spot, _ in latest.values()], batch_size=100)
 
     def maybeconnected(self) -> None:
         """Update visual state of the connect button."""
@@ -5,15 +5,16 @@
 import logging
 import typing
 
-from PyQt6 import uic, QtNetwork, QtGui
-from PyQt6.QtCore import QUrl, Qt, QSize, QBuffer
+from PyQt6 import QtNetwork, QtGui
+from PyQt6.QtCore import QUrl, Qt, QSize, QBuffer, QByteArray
 from PyQt6.QtGui import QImage, QPixmap, QDesktopServices, QIcon
-from PyQt6.QtNetwork import QNetworkReply, QNetworkRequest, QNetworkDiskCache
+from PyQt6.QtNetwork import QNetworkReply, QNetworkRequest
 from PyQt6.QtWidgets import QDockWidget, QLabel, QStyle
 
 import qsourcelogger.fsutils as fsutils
-from qsourcelogger.lib import event
+from qsourcelogger.lib import event, uicache
 from qsourcelogger.lib.ham_utility import get_call_base
+from qsourcelogger.lib.lookup import get_lookup_cache
 from qsourcelogger.qtcomponents.DockWidget import DockWidget
 from qsourcelogger.qtcomponents.SvgIcon import SvgIcon
 
@@ -71,7 +72,7 @@ class ExternalCallProfileWindow(DockWidget):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(fsutils.APP_DATA_PATH / "call_external_profile.ui", self)
+        uicache.load_ui(fsutils.APP_DATA_PATH / "call_external_profile.ui", self)
 
         event.register(event.ExternalLookupResult, self.event_external_lookup)
         event.register(event.CallChanged, self.event_call_changed)
@@ -79,11 +80,9 @@ class ExternalCallProfileWindow(DockWidget):
         self.imageLabel = ScaledLabel()
         self.setWidget(self.imageLabel)
         self.reset_image()
-
-        disk_cache = QNetworkDiskCache(self)
-        disk_cache.setCacheDirectory(str(fsutils.USER_DATA_PATH / 'profile_image_cache'))
-        disk_cache.setMaximumCacheSize(10 * 1024 * 1024)
-        self.network_access_manager.setCache(disk_cache)
+        self.call = ""
+        # the call and url (as the lookup gave it, the image cache key) of each image download in flight
+        self.image_requests: dict[QNetworkReply, tuple[str, str]] = {}
 
     def reset_image(self):
         self.imageLabel.clear()
@@ -97,9 +96,14 @@ class ExternalCallProfileWindow(DockWidget):
             # make sure the station in the external data is still the active qso callsign
             return
         if e.result.profile_image:
-            logger.debug(f"fetching {e.result.call} image url {e.result.profile_image}")
             self.imageLabel.clear()
-            self.network_access_manager.get(QNetworkRequest(QUrl(e.result.profile_image)))
+            cached = get_lookup_cache().get_image(e.result.call, e.result.profile_image)
+            if cached:
+                self.show_image(QByteArray(cached[0]), cached[1])
+            else:
+                logger.debug(f"fetching {e.result.call} image url {e.result.profile_image}")
+                reply = self.network_access_manager.get(QNetworkRequest(QUrl(e.result.profile_image)))
+                self.image_requests[reply] = (e.result.call, e.result.profile_image)
             self.setWindowTitle(f"{e.result.call} Profile")
             if 'qrz' in e.result.profile_image:
                 self.setWindowTitle(f"{e.result.call} QRZ Profile")
@@ -115,16 +119,29 @@ class ExternalCallProfileWindow(DockWidget):
 
     def handle_image(self, reply: QNetworkReply):
         """handle image data download (display it)"""
+        request = self.image_requests.pop(reply, None)
+        if request is None:
+            # the manager is shared, another window requested this one
+            return
         er = reply.error()
         reply.deleteLater()
         if er != QtNetwork.QNetworkReply.NetworkError.NoError:
             logger.error(reply.errorString())
         else:
             raw_image = reply.readAll()
-            image = QImage()
-            image.loadFromData(raw_image)
-            self.imageLabel.setPixmap(QPixmap(image), self.frameSize())
-            self.imageLabel.setToolTip(
-                f"<img src='data:{reply.header(QNetworkRequest.KnownHeaders.ContentTypeHeader)};base64,{bytes(raw_image.toBase64()).decode()}'"
-                f"{' width=1000' if image.width() > 1000 else ''}/>")
+            content_type = reply.header(QNetworkRequest.KnownHeaders.ContentTypeHeader)
+            image_call, image_url = request
+            get_lookup_cache().put_image(image_call, image_url, bytes(raw_image), content_type)
+            if get_call_base(image_call) != get_call_base(self.call):
+                # the operator moved on to another call while the image was downloading
+                return
+            self.show_image(raw_image, content_type)
+
+    def show_image(self, raw_image: QByteArray, content_type: str):
+        image = QImage()
+        image.loadFromData(raw_image)
+        self.imageLabel.setPixmap(QPixmap(image), self.frameSize())
+        self.imageLabel.setToolTip(
+            f"<img src='data:{content_type};base64,{bytes(raw_image.toBase64()).decode()}'"
+            f"{' width=1000' if image.width() > 1000 else ''}/>")
 
@@ -6,9 +6,7 @@ Check Window
 # pylint: disable=logging-fstring-interpolation, line-too-long
 
 import logging
-import os
 from datetime import datetime, timedelta
-from json import loads
 
 import Levenshtein
 from PyQt6 import uic
@@ -19,7 +17,7 @@ from PyQt6.QtWidgets import QLabel, QVBoxLayout, QWidget, QGraphicsOpacityEffect
 import qsourcelogger.fsutils as fsutils
 import qsourcelogger.lib.event as appevent
 
-from qsourcelogger.lib.super_check_partial import SCP
+from qsourcelogger.lib import startup, uicache
 from qsourcelogger.model import QsoLog
 from qsourcelogger.model.inmemory import Spot
 from qsourcelogger.qtcomponents.DockWidget import DockWidget
@@ -65,40 +63,35 @@ class CheckWindow(DockWidget):
         super().__init__(*args, **kwargs)
 
         appevent.register(appevent.CallChanged, self.event_call_change)
+        appevent.register(appevent.SettingsChanged, self.event_settings_changed)
 
         self.load_pref()
 
         logger.debug(uic.widgetPluginPath)
-        uic.loadUi(fsutils.APP_DATA_PATH / "checkwindow.ui", self)
+        uicache.load_ui(fsutils.APP_DATA_PATH / "checkwindow.ui", self)
 
-        self.scp = SCP(fsutils.APP_DATA_PATH)
+        # shared with the main window, normally loaded already by the startup prefetch
+        self.scp = startup.master_scp.get()
 
     def load_pref(self) -> None:
         """
         Load preference file to get current db filename and sets the initial darkmode state.
         """
-        try:
-            if os.path.exists(fsutils.CONFIG_FILE):
-                with open(
-                    fsutils.CONFIG_FILE, "rt", encoding="utf-8"
-                ) as file_descriptor:
-                    self.pref = loads(file_descriptor.read())
-                    logger.info(f"loaded config file from {fsutils.CONFIG_FILE}")
-                if self.pref.get("darkmode", None):
-                    # red darkmode
-                    self.character_remove_color = '#990000'
-                    # blue darkmode
-                    self.character_add_color = '#000099'
-                else:
-                    # red light mode
-                    self.character_remove_color = '#ff6666'
-                    # blue light mode
-                    self.character_add_color = '#66ccff'
-            else:
-                self.pref["current_database"] = "ham.db"
-
-        except IOError as exception:
-            logger.critical("Error: %s", exception)
+        self.pref = fsutils.read_settings()
+        if self.pref.get("darkmode", None):
+            # red darkmode
+            self.character_remove_color = '#990000'
+            # blue darkmode
+            self.character_add_color = '#000099'
+        else:
+            # red light mode
+            self.character_remove_color = '#ff6666'
+            # blue light mode
+            self.character_add_color = '#66ccff'
+
+    def event_settings_changed(self, event: appevent.SettingsChanged):
+        if "darkmode" in event.changed:
+            self.load_pref()
 
     def event_call_change(self, event: appevent.CallChanged):
         self.call = event.call
@@ -1,12 +1,14 @@
 import re
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional
+from typing import Optional, Callable, Any
 
+import numpy as np
 from peewee import fn
 
 from qsourcelogger.model import QsoLog, Contest, Station
 from qsourcelogger.model.adapters import CabrilloRecord
+from .ScoreEngine import ScoreEngine
 
 
 class DupeType(Enum):
@@ -27,6 +29,33 @@ class ContestField:
     max_chars: Optional[int] = 255
 
 
+@dataclass(kw_only=True)
+class MultiplierDimension:
+    """
+    One kind of multiplier a contest counts, eg. cq zone per band or wpx prefix once per contest. Values are read
+    from the qso field unless a value function is given.
+    """
+    name: str
+    field: str
+    per_band: Optional[bool] = False
+    per_mode: Optional[bool] = False
+    value: Optional[Callable[[QsoLog], Any]] = None
+
+    def value_of(self, qso: QsoLog):
+        if self.value:
+            value = self.value(qso)
+        else:
+            value = getattr(qso, self.field, None)
+            column = QsoLog._meta.fields.get(self.field)
+            if column is not None and value is not None:
+                # entry fields hold text, compare as the value read back from the log would be
+                value = _db_value(column, value)
+        return None if value == '' else value
+
+    def scope(self, band: Optional[str], mode: Optional[str]) -> tuple:
+        return band if self.per_band else None, mode if self.per_mode else None
+
+
 class ContestFieldNextLine(ContestField):
     def __init__(self):
         pass
@@ -40,6 +69,15 @@ class AbstractContest:
     # is denoted by a 3 digit placeholder. this placeholder is also the starting serial number.
     _exchange_serial_token: str = None
 
+    # whether the same multiplier counts again when worked on another band / mode, for the default dimensions
+    multipliers_per_band: bool = False
+    multipliers_per_mode: bool = False
+
+    score_engine: Optional[ScoreEngine] = None
+
+    # qso columns points_vector reads
+    point_fields: list[str] = []
+
     def __init__(self, contest: Contest):
         self.contest = contest
         self.points_per_contact = self.contest.fk_contest_meta.points_per_contact
@@ -117,6 +155,28 @@ class AbstractContest:
 
     def get_multiplier_fields(self) -> Optional[list[str]]:
         """which combination of fields in the qso whose unique permutations constitute a multiplier."""
+        return [x.field for x in self.get_multiplier_dimensions()] or None
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        """
+        The multipliers this contest counts. By default the multiplier1-3 qso columns named in the contest meta,
+        which the plugin fills in pre_process_qso_log.
+        """
+        meta = self.contest.fk_contest_meta
+        dimensions = []
+        for i, name in enumerate([meta.multiplier1_name, meta.multiplier2_name, meta.multiplier3_name]):
+            if name:
+                dimensions.append(MultiplierDimension(name=name, field=f'multiplier{i + 1}',
+                                                      per_band=self.multipliers_per_band,
+                                                      per_mode=self.multipliers_per_mode))
+        return dimensions
+
+    def derive_multipliers(self, qso: QsoLog):
+        """
+        fill in the multiplier1-3 columns from the rest of the qso, for contests whose multiplier depends on more
+        than one field (eg. the exchange for w/ve stations, the country otherwise). Storing the derived value keeps
+        the multiplier count a single group by over one column.
+        """
         pass
 
     def default_field_value(self, field_name) -> Optional[str]:
@@ -124,26 +184,89 @@ class AbstractContest:
         pass
 
     def pre_process_qso_log(self, qso: QsoLog):
-        """chance to mutate qso before it is persisted to the log database"""
+        """
+        chance to mutate qso before it is persisted to the log database. The score engine also runs this on a copy
+        of the qso being entered to predict its multipliers, so it must only change the qso, bookkeeping of the
+        entry goes in qso_logged.
+        """
+        pass
+
+    def qso_logged(self, qso: QsoLog):
+        """the qso being entered is being logged, eg. to mark its serial number used"""
         pass
 
     def intermediate_qso_update(self, qso: QsoLog, fields: Optional[list[str]]):
         """one or more fields have been modified"""
         pass
 
-    def calculate_total_points(self):
+    def score(self, points: float, multipliers: int) -> Optional[float]:
+        """claimed score from the qso point total and the number of distinct multipliers"""
         if not self.points_per_contact or self.points_per_contact == 0:
             return None
-        points = QsoLog.select(fn.Sum(QsoLog.points)).where(QsoLog.fk_contest == self.contest).scalar()
-        mults = QsoLog.select(QsoLog.multiplier1, QsoLog.multiplier2, QsoLog.multiplier3).distinct().count()
-        if not mults:
-            mults = 1
-        return points * mults
+        return (points or 0) * max(multipliers, 1)
+
+    def calculate_total_points(self):
+        """full recompute of the score from the log. see ScoreEngine for the running total"""
+        _, points, worked = ScoreEngine(self).query_state()
+        if self.point_fields:
+            # rescore rather than trust the logged points
+            points = int(self.points_for_log().sum())
+        return self.score(points, ScoreEngine.count_multipliers(worked))
+
+    def start_scoring(self, audit_mode: bool = False) -> ScoreEngine:
+        """
+        Keep a running score for this contest from the qso events. Only the active contest's plugin instance
+        should be scoring.
+        """
+        if not self.score_engine:
+            self.score_engine = ScoreEngine(self, audit_mode)
+        self.score_engine.audit_mode = audit_mode
+        self.score_engine.start()
+        return self.score_engine
 
+    def stop_scoring(self):
+        if self.score_engine:
+            self.score_engine.stop()
+
+    def rescore_qso(self, qso: QsoLog):
+        """
+        re-derive the scoring fields of an already logged qso, eg. after a cty update or scoring fix. Unlike
+        pre_process_qso_log this can run any number of times on the same qso and must not touch entry state like
+        the serial number.
+        """
+        self.derive_multipliers(qso)
+        qso.points = self.points_for_qso(qso)
 
     def points_for_qso(self, qso: QsoLog) -> Optional[int]:
+        if self.point_fields:
+            return int(self.points_vector(self.qso_columns([qso]), 1)[0])
         if not self.points_per_contact or self.points_per_contact == 0:
             return None
+        return self.points_per_contact
+
+    def points_vector(self, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+        """
+        Points for many qsos at once. columns maps each of point_fields to an array holding that column for size
+        qsos. Plugins with point_fields implement the scoring rules here as array operations, so the whole log is
+        scored without a python loop and points_for_qso scores a single qso through the same rules.
+        """
+        return np.full(size, self.points_per_contact or 0)
+
+    def qso_columns(self, qsos: list[QsoLog]) -> dict[str, np.ndarray]:
+        """point_fields of not yet saved qsos, converted as they would be stored"""
+        fields = QsoLog._meta.fields
+        return {name: np.array([_db_value(fields[name], getattr(qso, name)) for qso in qsos], dtype=object)
+                for name in self.point_fields}
+
+    def points_for_log(self, query=None) -> np.ndarray:
+        """points of every qso in query (by default the whole contest), fetching the point_fields columns once"""
+        query = self.contest_qso_select() if query is None else query
+        if not self.point_fields:
+            return np.array([p or 0 for p, in query.select(QsoLog.points).tuples()], dtype=np.int64)
+        rows = list(query.select(*[getattr(QsoLog, name) for name in self.point_fields]).tuples())
+        table = np.array(rows, dtype=object).reshape(len(rows), len(self.point_fields))
+        columns = {name: table[:, i] for i, name in enumerate(self.point_fields)}
+        return np.asarray(self.points_vector(columns, len(rows)), dtype=np.int64)
 
     def generate_sent_exchange(self, serial_sent: int):
         if self.contest.sent_exchange and '001' in self.contest.sent_exchange:
@@ -203,3 +326,10 @@ class AbstractContest:
     def contest_qso_select(self):
         """helper for plugins to start a select statement which contains all qso's for the contest"""
         return QsoLog.select().where(QsoLog.fk_contest == self.contest)
+
+
+def _db_value(field, value):
+    try:
+        return field.db_value(value)
+    except (TypeError, ValueError):
+        return value
@@ -0,0 +1,65 @@
+from .ScoredContest import *
+
+# worked as states and provinces rather than countries
+W_VE_XE = (DXCC_USA, DXCC_ALASKA, DXCC_HAWAII, DXCC_CANADA, DXCC_MEXICO)
+
+
+class Arrl10m(ScoredContest):
+    """
+    ARRL 10 Meter. 2 points a phone qso, 4 a cw qso. US states, Canadian provinces and Mexican states (from the
+    exchange) and other countries are multipliers, each once per mode.
+    """
+
+    _fields = [
+        ContestField(name='rst_sent', display_label='RST Snd', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='rst_rcvd', display_label='RST Rcv', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='srx_string', display_label='State/Serial', space_tabs=True, stretch_factor=2,
+                     max_chars=5),
+    ]
+
+    _exchange_fields = ['srx_string']
+
+    point_fields = ['mode']
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'ARRL-10'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.EACH_BAND_MODE
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'rst_sent', 'rst_rcvd', 'srx_string', 'country', 'points', 'mode']
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "10M",
+            "mode_category": "MIXED",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+        }
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        return [
+            MultiplierDimension(name='State/Province', field='multiplier1', per_mode=True),
+            MultiplierDimension(name='Country', field='multiplier2', per_mode=True),
+        ]
+
+    def derive_multipliers(self, qso: QsoLog):
+        qso.multiplier1 = None
+        qso.multiplier2 = None
+        if not qso.call or qso.call.upper().endswith('/MM'):
+            return
+        if as_int(qso.dxcc) in W_VE_XE:
+            exchange = upper(qso.srx_string)
+            # the others send a serial number
+            qso.multiplier1 = exchange if exchange and not exchange.isdigit() else None
+        else:
+            qso.multiplier2 = qso.country
+
+    def points_vector(self, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+        modes = columns['mode']
+        return np.select([is_phone(modes), modes == 'CW'], [2, 4], 0)
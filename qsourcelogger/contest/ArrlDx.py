@@ -0,0 +1,87 @@
+from .ScoredContest import *
+
+
+class ArrlDxCw(ScoredContest):
+    """
+    ARRL International DX. W/VE stations work the rest of the world and the rest of the world works W/VE, 3 points
+    a qso. Multipliers are per band: countries for W/VE stations, states and provinces for DX stations.
+    """
+
+    _fields = [
+        ContestField(name='rst_sent', display_label='RST Snd', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='rst_rcvd', display_label='RST Rcv', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='srx_string', display_label='State/Power', space_tabs=True, stretch_factor=2,
+                     max_chars=4),
+    ]
+
+    _exchange_fields = ['srx_string']
+
+    point_fields = ['dxcc']
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'ARRL-DX-CW'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.EACH_BAND
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'rst_sent', 'rst_rcvd', 'srx_string', 'country', 'points', 'mode']
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "CW",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+        }
+
+    def is_w_ve(self) -> bool:
+        return self.station_dxcc() in W_VE
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        name = 'Country' if self.is_w_ve() else 'State/Province'
+        return [MultiplierDimension(name=name, field='multiplier1', per_band=True)]
+
+    def derive_multipliers(self, qso: QsoLog):
+        other_w_ve = as_int(qso.dxcc) in W_VE
+        if self.is_w_ve():
+            qso.multiplier1 = qso.country if qso.dxcc and not other_w_ve else None
+        else:
+            qso.multiplier1 = upper(qso.srx_string) if other_w_ve else None
+
+    def points_vector(self, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+        other_w_ve = is_in(columns['dxcc'], W_VE)
+        if self.is_w_ve():
+            scoring = ~other_w_ve & np.not_equal(columns['dxcc'], None)
+        else:
+            scoring = other_w_ve
+        return np.where(scoring, 3, 0)
+
+
+class ArrlDxSsb(ArrlDxCw):
+
+    _fields = [
+        ContestField(name='rst_sent', display_label='RS Snd', space_tabs=True, stretch_factor=1, max_chars=2),
+        ContestField(name='rst_rcvd', display_label='RS Rcv', space_tabs=True, stretch_factor=1, max_chars=2),
+        ContestField(name='srx_string', display_label='State/Power', space_tabs=True, stretch_factor=2,
+                     max_chars=4),
+    ]
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'ARRL-DX-SSB'
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "SSB",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+        }
+
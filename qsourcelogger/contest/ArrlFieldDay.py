@@ -0,0 +1,46 @@
+from .ScoredContest import *
+
+
+class ArrlFieldDay(ScoredContest):
+    """
+    ARRL Field Day. 1 point a phone qso, 2 a cw or digital qso. Each station can be worked once per band and mode,
+    the score is the points times the band and mode combinations worked.
+    """
+
+    _fields = [
+        ContestField(name='class_contest', display_label='Class', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='arrl_sect', display_label='Section', space_tabs=True, stretch_factor=1, max_chars=4),
+    ]
+
+    _exchange_fields = ['class_contest', 'arrl_sect']
+
+    point_fields = ['mode']
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'ARRL-FIELD-DAY'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.EACH_BAND_MODE
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'class_contest', 'arrl_sect', 'points', 'mode', 'submode']
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "MIXED",
+            "operator_category": "MULTI-OP",
+            "station_category": "PORTABLE",
+            "transmitter_category": "UNLIMITED",
+            "sent_exchange": "1A SECT",
+        }
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        # counts the modes worked on each band
+        return [MultiplierDimension(name='Band/Mode', field='mode', per_band=True)]
+
+    def points_vector(self, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+        return np.where(is_phone(columns['mode']), 1, 2)
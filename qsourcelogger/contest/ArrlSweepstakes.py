@@ -0,0 +1,62 @@
+from .GeneralSerialLogging import GeneralSerialLogging
+from .ScoredContest import *
+
+
+class ArrlSweepstakesCw(ScoredContest, GeneralSerialLogging):
+    """
+    ARRL November Sweepstakes. Each station can be worked once, 2 points a qso, each ARRL/RAC section is a
+    multiplier once. The points per qso come from the contest meta.
+    """
+
+    _fields = [
+        ContestField(name='stx_string', display_label='Exch Snt', space_tabs=False, stretch_factor=3, max_chars=255),
+        ContestField(name='srx', display_label='Serial', space_tabs=True, stretch_factor=1, max_chars=5),
+        ContestField(name='class_contest', display_label='Prec', space_tabs=True, stretch_factor=1, max_chars=1),
+        ContestField(name='check', display_label='Check', space_tabs=True, stretch_factor=1, max_chars=2),
+        ContestField(name='arrl_sect', display_label='Section', space_tabs=True, stretch_factor=1, max_chars=4),
+    ]
+
+    _exchange_fields = ['srx', 'class_contest', 'check', 'arrl_sect']
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'ARRL-SS-CW'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.ONCE
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'stx', 'srx', 'class_contest', 'check', 'arrl_sect', 'points', 'mode']
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "CW",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+            "sent_exchange": "001 A 99 SECT",
+        }
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        return [MultiplierDimension(name='Section', field='arrl_sect')]
+
+
+class ArrlSweepstakesSsb(ArrlSweepstakesCw):
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'ARRL-SS-SSB'
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "SSB",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+            "sent_exchange": "001 A 99 SECT",
+        }
@@ -0,0 +1,86 @@
+from .ScoredContest import *
+from ..lib.ham_utility import distance
+
+BANDS_50_144 = ('6m', '2m')
+BANDS_222_432 = ('1.25m', '70cm')
+BANDS_902_1296 = ('33cm', '23cm')
+BANDS_MICROWAVE = ('13cm', '9cm', '6cm', '3cm', '1.25cm', '6mm', '4mm', '2.5mm', '2mm', '1mm', 'submm')
+
+
+class ArrlVhfJan(ScoredContest):
+    """
+    ARRL January VHF Contest. Points by band: 1 on 50 and 144MHz, 2 on 222 and 432MHz, 4 on 902 and 1296MHz and 8
+    from 2.3GHz up. Each 4 character grid square is a multiplier per band.
+    """
+
+    _fields = [
+        ContestField(name='gridsquare', display_label='Grid', space_tabs=True, stretch_factor=2, max_chars=6),
+    ]
+
+    _exchange_fields = ['gridsquare']
+
+    point_fields = ['band']
+
+    # points on 50/144, 222/432, 902/1296 and 2300MHz and up
+    band_points = (1, 2, 4, 8)
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'ARRL-VHF-JAN'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.EACH_BAND
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'gridsquare', 'distance', 'points', 'mode', 'submode']
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "MIXED",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+        }
+
+    def intermediate_qso_update(self, qso: QsoLog, fields: Optional[list[str]]):
+        super().intermediate_qso_update(qso, fields)
+        # the sent exchange is the station grid
+        if not qso.call and not qso.stx_string and self.station:
+            qso.stx_string = self.station.gridsquare
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        return [MultiplierDimension(name='Grid', field='multiplier1', per_band=True)]
+
+    def derive_multipliers(self, qso: QsoLog):
+        qso.multiplier1 = qso.gridsquare[:4].upper() if qso.gridsquare and len(qso.gridsquare) >= 4 else None
+
+    def rescore_qso(self, qso: QsoLog):
+        if qso.gridsquare and qso.my_gridsquare:
+            qso.distance = distance(qso.my_gridsquare, qso.gridsquare)
+        super().rescore_qso(qso)
+
+    def points_vector(self, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+        bands = columns['band']
+        return np.select([is_in(bands, BANDS_50_144), is_in(bands, BANDS_222_432), is_in(bands, BANDS_902_1296),
+                          is_in(bands, BANDS_MICROWAVE)], self.band_points, 0)
+
+
+class ArrlVhfJun(ArrlVhfJan):
+    """June VHF Contest, 1, 2, 3 and 4 points by band"""
+
+    band_points = (1, 2, 3, 4)
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'ARRL-VHF-JUN'
+
+
+class ArrlVhfSep(ArrlVhfJun):
+    """September VHF Contest, scored as in June"""
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'ARRL-VHF-SEP'
@@ -0,0 +1,85 @@
+from .ScoredContest import *
+
+
+class Cq160Cw(ScoredContest):
+    """
+    CQ World Wide 160 Meter. 2 points for a qso in your own country, 5 for another country on your continent or a
+    maritime mobile, 10 for another continent. US states and Canadian provinces (from the exchange) and other
+    countries are multipliers once each, maritime mobiles are not.
+    """
+
+    _fields = [
+        ContestField(name='rst_sent', display_label='RST Snd', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='rst_rcvd', display_label='RST Rcv', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='srx_string', display_label='State/Prov/Zone', space_tabs=True, stretch_factor=2,
+                     max_chars=4),
+    ]
+
+    _exchange_fields = ['srx_string']
+
+    point_fields = ['call', 'dxcc', 'country', 'continent']
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'CQ-160-CW'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.ONCE
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'rst_sent', 'rst_rcvd', 'srx_string', 'country', 'points', 'mode']
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "160M",
+            "mode_category": "CW",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+        }
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        return [
+            MultiplierDimension(name='State/Province', field='multiplier1'),
+            MultiplierDimension(name='Country', field='multiplier2'),
+        ]
+
+    def derive_multipliers(self, qso: QsoLog):
+        qso.multiplier1 = None
+        qso.multiplier2 = None
+        if not qso.call or qso.call.upper().endswith('/MM'):
+            return
+        if as_int(qso.dxcc) in W_VE:
+            qso.multiplier1 = upper(qso.srx_string) or None
+        else:
+            qso.multiplier2 = qso.country
+
+    def points_vector(self, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+        maritime = np.char.endswith(np.char.upper(columns['call'].astype(str)), '/MM')
+        return np.select([maritime, self.same_country(columns), self.same_continent(columns)], [5, 2, 5], 10)
+
+
+class Cq160Ssb(Cq160Cw):
+
+    _fields = [
+        ContestField(name='rst_sent', display_label='RS Snd', space_tabs=True, stretch_factor=1, max_chars=2),
+        ContestField(name='rst_rcvd', display_label='RS Rcv', space_tabs=True, stretch_factor=1, max_chars=2),
+        ContestField(name='srx_string', display_label='State/Prov/Zone', space_tabs=True, stretch_factor=2,
+                     max_chars=4),
+    ]
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'CQ-160-SSB'
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "160M",
+            "mode_category": "SSB",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+        }
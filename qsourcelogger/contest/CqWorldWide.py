@@ -0,0 +1,73 @@
+from .ScoredContest import *
+
+
+class CqWorldWideCw(ScoredContest):
+    """
+    CQ World Wide DX. 0 points for a qso in your own country, 1 for another country on your continent (2 for north
+    american stations), 3 for another continent. Multipliers are cq zones and countries, each per band.
+    """
+
+    _fields = [
+        ContestField(name='rst_sent', display_label='RST Snd', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='rst_rcvd', display_label='RST Rcv', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='cqz', display_label='CQ Zone', space_tabs=True, stretch_factor=1, max_chars=2),
+    ]
+
+    _exchange_fields = ['cqz']
+
+    point_fields = ['dxcc', 'country', 'continent']
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'CQ-WW-CW'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.EACH_BAND
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'rst_sent', 'rst_rcvd', 'cqz', 'country', 'points', 'mode']
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "CW",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+        }
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        return [
+            MultiplierDimension(name='Zone', field='cqz', per_band=True),
+            MultiplierDimension(name='Country', field='country', per_band=True),
+        ]
+
+    def points_vector(self, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+        same_continent_points = 2 if self.station_continent() == 'NA' else 1
+        return np.select([self.same_country(columns), self.same_continent(columns)],
+                         [0, same_continent_points], 3)
+
+
+class CqWorldWideSsb(CqWorldWideCw):
+
+    _fields = [
+        ContestField(name='rst_sent', display_label='RS Snd', space_tabs=True, stretch_factor=1, max_chars=2),
+        ContestField(name='rst_rcvd', display_label='RS Rcv', space_tabs=True, stretch_factor=1, max_chars=2),
+        ContestField(name='cqz', display_label='CQ Zone', space_tabs=True, stretch_factor=1, max_chars=2),
+    ]
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'CQ-WW-SSB'
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "SSB",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+        }
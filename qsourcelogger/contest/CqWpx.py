@@ -0,0 +1,78 @@
+from .GeneralSerialLogging import GeneralSerialLogging
+from .ScoredContest import *
+
+LOW_BANDS = ('40m', '80m', '160m')
+
+
+class CqWpxCw(ScoredContest, GeneralSerialLogging):
+    """
+    CQ WPX. 1 point for a qso in your own country, 1 for another country on your continent (2 for north american
+    stations), 3 for another continent, doubled on 40m and below. Each wpx prefix is a multiplier once.
+    """
+
+    _fields = [
+        ContestField(name='rst_sent', display_label='RST Snd', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='stx_string', display_label='Exch Snt', space_tabs=False, stretch_factor=2, max_chars=255),
+        ContestField(name='rst_rcvd', display_label='RST Rcv', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='srx', display_label='Serial Rcv', space_tabs=True, stretch_factor=2, max_chars=5),
+    ]
+
+    point_fields = ['dxcc', 'country', 'continent', 'band']
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'CQ-WPX-CW'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.EACH_BAND
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'rst_sent', 'rst_rcvd', 'stx', 'srx', 'wpx_prefix', 'points', 'mode']
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "CW",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+            "sent_exchange": "001",
+        }
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        return [MultiplierDimension(name='Prefix', field='wpx_prefix')]
+
+    def points_vector(self, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+        same_continent_points = 2 if self.station_continent() == 'NA' else 1
+        points = np.select([self.same_country(columns), self.same_continent(columns)],
+                           [1, same_continent_points], 3)
+        # the same country is 1 point on every band
+        low_band = is_in(columns['band'], LOW_BANDS) & ~self.same_country(columns)
+        return np.where(low_band, points * 2, points)
+
+
+class CqWpxSsb(CqWpxCw):
+
+    _fields = [
+        ContestField(name='rst_sent', display_label='RS Snd', space_tabs=True, stretch_factor=1, max_chars=2),
+        ContestField(name='stx_string', display_label='Exch Snt', space_tabs=False, stretch_factor=2, max_chars=255),
+        ContestField(name='rst_rcvd', display_label='RS Rcv', space_tabs=True, stretch_factor=1, max_chars=2),
+        ContestField(name='srx', display_label='Serial Rcv', space_tabs=True, stretch_factor=2, max_chars=5),
+    ]
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'CQ-WPX-SSB'
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "SSB",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+            "sent_exchange": "001",
+        }
@@ -0,0 +1,40 @@
+from .ScoredContest import *
+
+
+class CwOps(ScoredContest):
+    """
+    CWops mini-CWT. 1 point a qso, each station can be worked once per band, each call is a multiplier once.
+    The points per qso come from the contest meta.
+    """
+
+    _fields = [
+        ContestField(name='name', display_label='Name', space_tabs=True, stretch_factor=3, max_chars=10),
+        ContestField(name='srx_string', display_label='Number/State', space_tabs=True, stretch_factor=2,
+                     max_chars=6),
+    ]
+
+    _exchange_fields = ['name', 'srx_string']
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'CW-OPS'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.EACH_BAND
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'name', 'srx_string', 'points', 'mode']
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "CW",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+        }
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        return [MultiplierDimension(name='Callsign', field='call')]
@@ -50,7 +50,5 @@ class GeneralLogging(AbstractContest):
         if not qso.call and not qso.stx_string and self.contest.sent_exchange:
             qso.stx_string = self.contest.sent_exchange
 
-    def calculate_total_points(self):
+    def score(self, points: float, multipliers: int) -> Optional[float]:
         return 0
-
-
@@ -0,0 +1,49 @@
+from .ScoredContest import *
+
+
+class IaruHf(ScoredContest):
+    """
+    IARU HF World Championship. 1 point for a qso in your own ITU zone or with an HQ station, 3 for another zone on
+    your continent, 5 for another continent. ITU zones and HQ stations are multipliers per band and mode.
+    """
+
+    _fields = [
+        ContestField(name='rst_sent', display_label='RST Snd', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='rst_rcvd', display_label='RST Rcv', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='srx_string', display_label='Zone/HQ', space_tabs=True, stretch_factor=2, max_chars=6),
+    ]
+
+    _exchange_fields = ['srx_string']
+
+    point_fields = ['srx_string', 'continent']
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'IARU-HF'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.EACH_BAND_MODE
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'rst_sent', 'rst_rcvd', 'srx_string', 'ituz', 'points', 'mode']
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        return [
+            MultiplierDimension(name='Zone', field='multiplier1', per_band=True, per_mode=True),
+            MultiplierDimension(name='HQ', field='multiplier2', per_band=True, per_mode=True),
+        ]
+
+    def derive_multipliers(self, qso: QsoLog):
+        exchange = upper(qso.srx_string)
+        zone = as_int(exchange)
+        qso.multiplier1 = str(zone) if zone is not None else None
+        qso.multiplier2 = exchange if exchange and zone is None else None
+
+    def points_vector(self, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+        exchange = np.char.strip(columns['srx_string'].astype(str))
+        zone_sent = np.char.isdigit(exchange)
+        my_zone = str(self.station.itu_zone) if self.station and self.station.itu_zone else None
+        same_zone = zone_sent & (np.char.lstrip(exchange, '0') == (my_zone or '').lstrip('0'))
+        headquarters = ~zone_sent & np.not_equal(columns['srx_string'], None) & (exchange != '')
+        return np.select([same_zone | headquarters, self.same_continent(columns)], [1, 3], 5)
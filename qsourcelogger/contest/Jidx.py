@@ -0,0 +1,75 @@
+from .ScoredContest import *
+
+# points by band, the other bands score nothing
+BAND_POINTS = {'160m': 4, '80m': 2, '40m': 1, '20m': 1, '15m': 1, '10m': 2}
+
+
+class JidxCw(ScoredContest):
+    """
+    Japan International DX, as scored by stations outside Japan. Points by band, 4 on 160m, 2 on 80m and 10m, 1
+    on 40m to 15m. Each JA prefecture (the exchange) is a multiplier per band.
+    """
+
+    _fields = [
+        ContestField(name='rst_sent', display_label='RST Snd', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='rst_rcvd', display_label='RST Rcv', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='srx_string', display_label='Prefecture', space_tabs=True, stretch_factor=2, max_chars=3),
+    ]
+
+    _exchange_fields = ['srx_string']
+
+    point_fields = ['band']
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'JIDX-CW'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.EACH_BAND
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'rst_sent', 'rst_rcvd', 'srx_string', 'points', 'mode']
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "CW",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+        }
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        return [MultiplierDimension(name='Prefecture', field='multiplier1', per_band=True)]
+
+    def derive_multipliers(self, qso: QsoLog):
+        qso.multiplier1 = upper(qso.srx_string) or None
+
+    def points_vector(self, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+        bands = columns['band']
+        return np.select([bands == band for band in BAND_POINTS], list(BAND_POINTS.values()), 0)
+
+
+class JidxSsb(JidxCw):
+
+    _fields = [
+        ContestField(name='rst_sent', display_label='RS Snd', space_tabs=True, stretch_factor=1, max_chars=2),
+        ContestField(name='rst_rcvd', display_label='RS Rcv', space_tabs=True, stretch_factor=1, max_chars=2),
+        ContestField(name='srx_string', display_label='Prefecture', space_tabs=True, stretch_factor=2, max_chars=3),
+    ]
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'JIDX-SSB'
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "SSB",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+        }
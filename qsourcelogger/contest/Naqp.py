@@ -0,0 +1,87 @@
+from .ScoredContest import *
+
+
+class NaqpCw(ScoredContest):
+    """
+    North American QSO Party. 1 point a qso where either station is in north america. States, provinces and
+    north american countries (the exchange of north american stations) are multipliers per band.
+    """
+
+    _fields = [
+        ContestField(name='name', display_label='Name', space_tabs=True, stretch_factor=3, max_chars=10),
+        ContestField(name='state', display_label='State/Prov', space_tabs=True, stretch_factor=1, max_chars=4),
+    ]
+
+    _exchange_fields = ['name', 'state']
+
+    point_fields = ['continent']
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'NAQP-CW'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.EACH_BAND
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'name', 'state', 'points', 'mode']
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "CW",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+            "power_category": "LOW",
+        }
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        return [MultiplierDimension(name='Section', field='multiplier1', per_band=True)]
+
+    def derive_multipliers(self, qso: QsoLog):
+        # dx stations are not multipliers
+        qso.multiplier1 = (upper(qso.state) or None) if qso.continent == 'NA' else None
+
+    def points_vector(self, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+        if self.station_continent() == 'NA':
+            return np.ones(size, dtype=int)
+        return np.where(columns['continent'] == 'NA', 1, 0)
+
+
+class NaqpSsb(NaqpCw):
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'NAQP-SSB'
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "SSB",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+            "power_category": "LOW",
+        }
+
+
+class NaqpRtty(NaqpCw):
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'NAQP-RTTY'
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "RTTY",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+            "power_category": "LOW",
+        }
@@ -0,0 +1,47 @@
+from .ScoredContest import *
+
+RAC_OFFICIAL_STATIONS = (
+    "VA2RAC", "VA3RAC", "VE1RAC", "VE4RAC", "VE5RAC", "VE6RAC", "VE7RAC", "VE8RAC", "VE9RAC", "VO1RAC", "VO2RAC",
+    "VY0RAC", "VY1RAC", "VY2RAC",
+)
+
+
+class RacCanadaDay(ScoredContest):
+    """
+    RAC Canada Day and Canada Winter contests. 20 points for a RAC official station, 10 for another Canadian
+    station, 2 otherwise. Canadian provinces and territories (the exchange of Canadian stations, others send a
+    serial number) are multipliers per band and mode.
+    """
+
+    _fields = [
+        ContestField(name='rst_sent', display_label='RST Snd', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='rst_rcvd', display_label='RST Rcv', space_tabs=True, stretch_factor=1, max_chars=3),
+        ContestField(name='srx_string', display_label='Prov/Serial', space_tabs=True, stretch_factor=2,
+                     max_chars=5),
+    ]
+
+    _exchange_fields = ['srx_string']
+
+    point_fields = ['call', 'dxcc']
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'RAC-CANADA-DAY'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.EACH_BAND_MODE
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'rst_sent', 'rst_rcvd', 'srx_string', 'country', 'points', 'mode']
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        return [MultiplierDimension(name='Province', field='multiplier1', per_band=True, per_mode=True)]
+
+    def derive_multipliers(self, qso: QsoLog):
+        exchange = upper(qso.srx_string)
+        qso.multiplier1 = exchange if exchange and not exchange.isdigit() else None
+
+    def points_vector(self, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+        official = is_in(np.char.upper(columns['call'].astype(str)), RAC_OFFICIAL_STATIONS)
+        return np.select([official, columns['dxcc'] == DXCC_CANADA], [20, 10], 2)
@@ -0,0 +1,315 @@
+import bisect
+import csv
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional, TYPE_CHECKING
+
+from ..lib import event
+from ..model import QsoLog
+
+if TYPE_CHECKING:
+    from .AbstractContest import AbstractContest
+
+logger = logging.getLogger(__name__)
+
+ALL = ('all', None)
+_EPOCH = datetime(1970, 1, 1)
+
+
+class RateCounter:
+    """
+    Qso timestamps for one slice of the log (a band, a mode, an operator or everything).
+
+    The sorted timestamp list answers the last n qsos rate, a ring of per minute counts covering the last hour
+    with running totals answers the rolling window rates without scanning, and an hour -> count map keeps the
+    whole contest for the hourly breakdown.
+    """
+
+    ring_minutes = 60
+
+    def __init__(self):
+        self.times: list[float] = []
+        self.ring = [0] * self.ring_minutes
+        self.ring_head = 0  # newest minute (epoch minutes) held in the ring
+        self.ring_total = 0
+        self.hours: dict[int, int] = defaultdict(int)
+
+    @classmethod
+    def from_sorted(cls, times: list[float]) -> 'RateCounter':
+        """bulk build from already sorted timestamps, only the newest hour goes through the ring"""
+        counter = cls()
+        counter.times = times
+        if times:
+            # the times are sorted, so each hour's count is the distance between bisected hour boundaries
+            i = 0
+            for hour in range(int(times[0] // 3600), int(times[-1] // 3600) + 1):
+                j = bisect.bisect_left(times, (hour + 1) * 3600, i)
+                if j > i:
+                    counter.hours[hour] = j - i
+                i = j
+            counter.ring_head = int(times[-1] // 60)
+            for ts in reversed(times):
+                minute = int(ts // 60)
+                if not counter._in_ring(minute):
+                    break
+                counter.ring[minute % cls.ring_minutes] += 1
+                counter.ring_total += 1
+        return counter
+
+    def __len__(self):
+        return len(self.times)
+
+    def _advance(self, minute: int):
+        """move the ring forward to minute, dropping the minutes that fall out of the hour"""
+        if minute <= self.ring_head:
+            return
+        if minute - self.ring_head >= self.ring_minutes:
+            self.ring = [0] * self.ring_minutes
+            self.ring_total = 0
+        else:
+            for m in range(self.ring_head + 1, minute + 1):
+                slot = m % self.ring_minutes
+                self.ring_total -= self.ring[slot]
+                self.ring[slot] = 0
+        self.ring_head = minute
+
+    def _in_ring(self, minute: int) -> bool:
+        return self.ring_head - self.ring_minutes < minute <= self.ring_head
+
+    def add(self, ts: float):
+        if not self.times or ts >= self.times[-1]:
+            self.times.append(ts)
+        else:
+            bisect.insort(self.times, ts)
+        self.hours[int(ts // 3600)] += 1
+        minute = int(ts // 60)
+        self._advance(minute)
+        if self._in_ring(minute):
+            self.ring[minute % self.ring_minutes] += 1
+            self.ring_total += 1
+
+    def remove(self, ts: float):
+        i = bisect.bisect_left(self.times, ts)
+        if i >= len(self.times) or self.times[i] != ts:
+            return
+        del self.times[i]
+        hour = int(ts // 3600)
+        self.hours[hour] -= 1
+        if self.hours[hour] <= 0:
+            del self.hours[hour]
+        minute = int(ts // 60)
+        if self._in_ring(minute):
+            self.ring[minute % self.ring_minutes] -= 1
+            self.ring_total -= 1
+
+    def window_count(self, minutes: int, now: float) -> int:
+        """qsos in the last minutes (at most an hour), counted from the minute ring"""
+        self._advance(int(now // 60))
+        if minutes >= self.ring_minutes:
+            return self.ring_total
+        return sum(self.ring[(self.ring_head - i) % self.ring_minutes] for i in range(minutes))
+
+    def last_n_rate(self, n: int, now: float) -> float:
+        """qsos per hour extrapolated from the time taken to make the last n qsos"""
+        if len(self.times) < n or n <= 0:
+            return 0.0
+        elapsed = now - self.times[-n]
+        if elapsed <= 0:
+            return 0.0
+        return n * 3600 / elapsed
+
+
+class RateEngine:
+    """
+    Running qso rates for the active contest, kept from the QsoAdded, QsoUpdated and QsoDeleted events so the rate
+    display never has to query the log. Rates are tracked for the whole log and per band, mode and operator.
+    """
+
+    # the engine of the active contest, for the rate window
+    active: Optional['RateEngine'] = None
+
+    def __init__(self, plugin: 'AbstractContest'):
+        self.plugin = plugin
+        self.contest = plugin.contest
+        self.counters: dict[tuple, RateCounter] = {}
+        self.started = False
+
+    def start(self):
+        """rebuild from the log and follow qso changes from now on"""
+        self.rebuild()
+        if not self.started:
+            self.started = True
+            RateEngine.active = self
+            event.register(event.QsoAdded, self.event_qso_added)
+            event.register(event.QsoUpdated, self.event_qso_updated)
+            event.register(event.QsoDeleted, self.event_qso_deleted)
+
+    def stop(self):
+        if self.started:
+            self.started = False
+            if RateEngine.active is self:
+                RateEngine.active = None
+            event.unregister(event.QsoAdded, self.event_qso_added)
+            event.unregister(event.QsoUpdated, self.event_qso_updated)
+            event.unregister(event.QsoDeleted, self.event_qso_deleted)
+
+    def rebuild(self):
+        start = time.perf_counter()
+        times = defaultdict(list)
+        rows = self.plugin.contest_qso_select()\
+            .select(QsoLog.time_on, QsoLog.band, QsoLog.mode, QsoLog.operator)\
+            .order_by(QsoLog.time_on).tuples()
+        for time_on, band, mode, operator in rows:
+            ts = self._timestamp(time_on)
+            if ts is not None:
+                for key in self._keys(band, mode, operator):
+                    times[key].append(ts)
+        self.counters = {key: RateCounter.from_sorted(values) for key, values in times.items()}
+        logger.debug(f"rates rebuilt from {len(times[ALL])} qsos in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    @staticmethod
+    def _keys(band, mode, operator) -> tuple:
+        return ALL, ('band', band), ('mode', mode), ('operator', operator)
+
+    @staticmethod
+    def _timestamp(time_on) -> Optional[float]:
+        """
+        seconds since the epoch of the logged wall clock time. qso times are naive so no timezone conversion is
+        done, which is also quicker than datetime.timestamp() when rebuilding
+        """
+        if isinstance(time_on, str):
+            time_on = datetime.fromisoformat(time_on)
+        return (time_on - _EPOCH).total_seconds() if time_on else None
+
+    def _add(self, time_on, band, mode, operator):
+        ts = self._timestamp(time_on)
+        if ts is None:
+            return
+        for key in self._keys(band, mode, operator):
+            counter = self.counters.get(key)
+            if not counter:
+                counter = self.counters[key] = RateCounter()
+            counter.add(ts)
+
+    def _remove(self, time_on, band, mode, operator):
+        ts = self._timestamp(time_on)
+        if ts is None:
+            return
+        for key in self._keys(band, mode, operator):
+            counter = self.counters.get(key)
+            if counter:
+                counter.remove(ts)
+
+    def _belongs(self, qso: QsoLog) -> bool:
+        return qso is not None and qso.fk_contest_id == self.contest.id
+
+    def add(self, qso: QsoLog):
+        if self._belongs(qso):
+            self._add(qso.time_on, qso.band, qso.mode, qso.operator)
+
+    def remove(self, qso: QsoLog):
+        if self._belongs(qso):
+            self._remove(qso.time_on, qso.band, qso.mode, qso.operator)
+
+    def event_qso_added(self, e: event.QsoAdded):
+        self.add(e.qso)
+
+    def event_qso_updated(self, e: event.QsoUpdated):
+        self.remove(e.qso_before)
+        self.add(e.qso_after)
+
+    def event_qso_deleted(self, e: event.QsoDeleted):
+        self.remove(e.qso)
+
+    def counter(self, band: str = None, mode: str = None, operator: str = None) -> Optional[RateCounter]:
+        """the counter for one slice of the log, or everything if no slice is given"""
+        if band:
+            return self.counters.get(('band', band))
+        if mode:
+            return self.counters.get(('mode', mode))
+        if operator:
+            return self.counters.get(('operator', operator))
+        return self.counters.get(ALL)
+
+    def rates(self, now: datetime = None, **kwargs) -> dict:
+        """
+        last 10 and last 100 qso rates (per hour), qsos in the last 10 and 60 minutes. Pass band, mode or operator
+        for that slice of the log.
+        """
+        now = self._timestamp(now or datetime.now())
+        counter = self.counter(**kwargs)
+        if not counter:
+            return {'qsos': 0, 'last_10_rate': 0.0, 'last_100_rate': 0.0, 'last_10_min': 0, 'last_60_min': 0}
+        return {
+            'qsos': len(counter),
+            'last_10_rate': counter.last_n_rate(10, now),
+            'last_100_rate': counter.last_n_rate(100, now),
+            'last_10_min': counter.window_count(10, now),
+            'last_60_min': counter.window_count(60, now),
+        }
+
+    def contest_end(self) -> Optional[datetime]:
+        period = self.contest.fk_contest_meta.period
+        if not period or not self.contest.start_date:
+            return None
+        # the contest meta period is the contest length in days
+        return self.contest.start_date + timedelta(days=period)
+
+    def projected_score(self, now: datetime = None) -> Optional[float]:
+        """the score at the end of the contest if the last hour's rate and the average qso value hold"""
+        engine = self.plugin.score_engine
+        end = self.contest_end()
+        if not engine or not engine.total or not engine.qso_count or not end:
+            return engine.total if engine else None
+        now = now or datetime.now()
+        remaining_hours = max((end - now).total_seconds() / 3600, 0)
+        counter = self.counter()
+        last_hour = counter.window_count(60, self._timestamp(now)) if counter else 0
+        return engine.total + last_hour * remaining_hours * engine.total / engine.qso_count
+
+    def hour_by_band(self) -> tuple[list[datetime], list[str], dict[tuple[datetime, str], int]]:
+        """
+        qso counts per clock hour and band: the hours with qsos, the bands worked and a (hour, band) -> count map.
+        """
+        hours = set()
+        bands = []
+        counts = {}
+        for (kind, band), counter in self.counters.items():
+            if kind != 'band' or not counter:
+                continue
+            bands.append(band)
+            for hour, count in counter.hours.items():
+                start = _EPOCH + timedelta(hours=hour)
+                hours.add(start)
+                counts[(start, band)] = count
+        return sorted(hours), sorted(bands, key=_band_sort_key), counts
+
+    def export_hour_by_band(self, path):
+        """write the hour by band breakdown as csv for post contest analysis"""
+        hours, bands, counts = self.hour_by_band()
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['hour'] + bands + ['total'])
+            for hour in hours:
+                row = [counts.get((hour, band), 0) for band in bands]
+                writer.writerow([hour.strftime('%Y-%m-%d %H:%M')] + row + [sum(row)])
+            totals = [sum(counts.get((hour, band), 0) for hour in hours) for band in bands]
+            writer.writerow(['total'] + totals + [sum(totals)])
+
+
+def _band_sort_key(band: Optional[str]):
+    """longest wavelength first, 160m before 20m before 70cm"""
+    if not band:
+        return 0
+    value = ''.join(c for c in band if c.isdigit() or c == '.')
+    try:
+        meters = float(value)
+    except ValueError:
+        return 0
+    if band.lower().endswith('mm'):
+        meters /= 1000
+    elif band.lower().endswith('cm'):
+        meters /= 100
+    return -meters
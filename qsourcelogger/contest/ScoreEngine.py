@@ -0,0 +1,215 @@
+import copy
+import logging
+from collections import Counter
+from typing import Optional, TYPE_CHECKING
+
+from peewee import fn
+
+from ..lib import event
+from ..model import QsoLog
+
+if TYPE_CHECKING:
+    from .AbstractContest import AbstractContest
+
+logger = logging.getLogger(__name__)
+
+
+class ScoreEngine:
+    """
+    Keeps the running score of the active contest so the score display does not need to query the log.
+
+    The full log is read once when the contest is activated, after that the totals are adjusted from the QsoAdded,
+    QsoUpdated and QsoDeleted events. Worked multipliers are kept per dimension and per band/mode scope as
+    reference counted sets, so deleting one of several qsos carrying the same multiplier does not drop it and
+    predict() can tell whether a call being entered would be a new multiplier without touching the database.
+
+    In audit mode every incremental update is checked against a full recompute and any drift is logged and
+    corrected.
+    """
+
+    # the engine of the active contest, for windows that want to highlight multipliers
+    active: Optional['ScoreEngine'] = None
+
+    qso_count: int = 0
+    points: float = 0
+    audit_mode: bool = False
+    audit_failures: int = 0
+
+    def __init__(self, plugin: 'AbstractContest', audit_mode: bool = False):
+        self.plugin = plugin
+        self.contest = plugin.contest
+        self.audit_mode = audit_mode
+        self.dimensions = plugin.get_multiplier_dimensions()
+        # dimension name -> (band, mode) scope -> multiplier value -> qso count
+        self.worked: dict[str, dict[tuple, Counter]] = {}
+        self.multiplier_count = 0
+        self.started = False
+
+    def start(self):
+        """recompute from the log and follow qso changes from now on"""
+        self.recompute()
+        if not self.started:
+            self.started = True
+            ScoreEngine.active = self
+            event.register(event.QsoAdded, self.event_qso_added)
+            event.register(event.QsoUpdated, self.event_qso_updated)
+            event.register(event.QsoDeleted, self.event_qso_deleted)
+
+    def stop(self):
+        if self.started:
+            self.started = False
+            if ScoreEngine.active is self:
+                ScoreEngine.active = None
+            event.unregister(event.QsoAdded, self.event_qso_added)
+            event.unregister(event.QsoUpdated, self.event_qso_updated)
+            event.unregister(event.QsoDeleted, self.event_qso_deleted)
+
+    def recompute(self):
+        """full recompute from the log database"""
+        self.qso_count, self.points, self.worked = self.query_state()
+        self.multiplier_count = self.count_multipliers(self.worked)
+        self._changed()
+
+    def query_state(self) -> tuple[int, float, dict[str, dict[tuple, Counter]]]:
+        """qso count, points and worked multipliers read from the log"""
+        count, points_sum = self.plugin.contest_qso_select()\
+            .select(fn.Count(QsoLog.id), fn.Sum(QsoLog.points)).tuples().get()
+        worked = {d.name: self._query_dimension(d) for d in self.dimensions if not d.value}
+        row_dimensions = [d for d in self.dimensions if d.value]
+        if row_dimensions:
+            # value functions may read any field of the qso so these are counted row by row
+            for dimension in row_dimensions:
+                worked[dimension.name] = {}
+            for qso in self.plugin.contest_qso_select().objects():
+                for dimension in row_dimensions:
+                    value = dimension.value_of(qso)
+                    if value is not None:
+                        scopes = worked[dimension.name]
+                        scope = dimension.scope(qso.band, qso.mode)
+                        if scope not in scopes:
+                            scopes[scope] = Counter()
+                        scopes[scope][value] += 1
+        return count or 0, points_sum or 0, worked
+
+    def _query_dimension(self, dimension) -> dict[tuple, Counter]:
+        """the worked values of a column dimension, one group by over its scope and column"""
+        column = getattr(QsoLog, dimension.field)
+        group = []
+        if dimension.per_band:
+            group.append(QsoLog.band)
+        if dimension.per_mode:
+            group.append(QsoLog.mode)
+        rows = self.plugin.contest_qso_select()\
+            .select(*group, column, fn.Count(QsoLog.id))\
+            .where(column.is_null(False), column != '')\
+            .group_by(*group, column).tuples()
+        scopes = {}
+        for row in rows:
+            band = row[0] if dimension.per_band else None
+            mode = row[len(group) - 1] if dimension.per_mode else None
+            scope = dimension.scope(band, mode)
+            if scope not in scopes:
+                scopes[scope] = Counter()
+            scopes[scope][row[-2]] += row[-1]
+        return scopes
+
+    @staticmethod
+    def count_multipliers(worked: dict[str, dict[tuple, Counter]]) -> int:
+        return sum(len(values) for scopes in worked.values() for values in scopes.values())
+
+    @property
+    def total(self) -> Optional[float]:
+        return self.plugin.score(self.points, self.multiplier_count)
+
+    def is_new_multiplier(self, dimension, value, band: Optional[str], mode: Optional[str]) -> bool:
+        if value is None:
+            return False
+        values = self.worked.get(dimension.name, {}).get(dimension.scope(band, mode))
+        return not values or value not in values
+
+    def predict(self, qso: QsoLog, band: Optional[str] = None, mode: Optional[str] = None) \
+            -> tuple[list[str], Optional[int], Optional[float]]:
+        """
+        What logging this (not yet saved) qso would add: the names of the dimensions it is a new multiplier
+        for, the qso points and the change in the total score. The qso is left as it is, the multipliers are
+        derived on a copy prepared the way logging prepares it.
+        """
+        qso = copy.deepcopy(qso)
+        qso.band = band or qso.band
+        qso.mode = mode or qso.mode
+        self.plugin.pre_process_qso_log(qso)
+        self.plugin.derive_multipliers(qso)
+        new = [d.name for d in self.dimensions if self.is_new_multiplier(d, d.value_of(qso), qso.band, qso.mode)]
+        points = self.plugin.points_for_qso(qso)
+        total = self.total
+        after = self.plugin.score(self.points + (points or 0), self.multiplier_count + len(new))
+        if total is None or after is None:
+            return new, points, None
+        return new, points, after - total
+
+    def _belongs(self, qso: QsoLog) -> bool:
+        return qso is not None and qso.fk_contest_id == self.contest.id
+
+    def add(self, qso: QsoLog):
+        if not self._belongs(qso):
+            return
+        self.qso_count += 1
+        self.points += qso.points or 0
+        for dimension in self.dimensions:
+            value = dimension.value_of(qso)
+            if value is None:
+                continue
+            scopes = self.worked.setdefault(dimension.name, {})
+            scope = dimension.scope(qso.band, qso.mode)
+            if scope not in scopes:
+                scopes[scope] = Counter()
+            if value not in scopes[scope]:
+                self.multiplier_count += 1
+            scopes[scope][value] += 1
+
+    def remove(self, qso: QsoLog):
+        if not self._belongs(qso):
+            return
+        self.qso_count -= 1
+        self.points -= qso.points or 0
+        for dimension in self.dimensions:
+            value = dimension.value_of(qso)
+            values = self.worked.get(dimension.name, {}).get(dimension.scope(qso.band, qso.mode))
+            if value is None or not values or value not in values:
+                continue
+            values[value] -= 1
+            if values[value] <= 0:
+                del values[value]
+                self.multiplier_count -= 1
+
+    def event_qso_added(self, e: event.QsoAdded):
+        self.add(e.qso)
+        self._changed()
+
+    def event_qso_updated(self, e: event.QsoUpdated):
+        self.remove(e.qso_before)
+        self.add(e.qso_after)
+        self._changed()
+
+    def event_qso_deleted(self, e: event.QsoDeleted):
+        self.remove(e.qso)
+        self._changed()
+
+    def audit(self) -> bool:
+        """compare the running totals with a full recompute, resyncing on a mismatch"""
+        qso_count, points, worked = self.query_state()
+        multiplier_count = self.count_multipliers(worked)
+        if qso_count == self.qso_count and points == self.points and multiplier_count == self.multiplier_count:
+            return True
+        self.audit_failures += 1
+        logger.warning(f"score audit mismatch for contest {self.contest.id}: incremental qsos {self.qso_count} "
+                       f"points {self.points} mults {self.multiplier_count}, recomputed qsos {qso_count} "
+                       f"points {points} mults {multiplier_count}")
+        self.qso_count, self.points, self.worked = qso_count, points, worked
+        self.multiplier_count = multiplier_count
+        return False
+
+    def _changed(self):
+        if self.audit_mode:
+            self.audit()
+        event.emit(event.ScoreUpdated(self.qso_count, self.points, self.multiplier_count, self.total))
@@ -0,0 +1,93 @@
+from .AbstractContest import *
+from .GeneralLogging import GeneralLogging
+
+# dxcc entity numbers the north american contest rules single out
+DXCC_CANADA = 1
+DXCC_ALASKA = 6
+DXCC_MEXICO = 50
+DXCC_HAWAII = 110
+DXCC_USA = 291
+W_VE = (DXCC_USA, DXCC_CANADA)
+
+PHONE_MODES = ('SSB', 'USB', 'LSB', 'FM', 'AM', 'PH', 'PHONE')
+
+
+def is_in(values: np.ndarray, choices) -> np.ndarray:
+    """membership test over an object column, which may hold None"""
+    return np.isin(values.astype(str), [str(c) for c in choices])
+
+
+def is_phone(modes: np.ndarray) -> np.ndarray:
+    return is_in(modes, PHONE_MODES)
+
+
+def upper(value):
+    return value.strip().upper() if isinstance(value, str) else value
+
+
+def as_int(value) -> Optional[int]:
+    """numeric qso fields hold text until the qso is saved"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ScoredContest(GeneralLogging):
+    """
+    Base for contests scored by their published rules. Points are worked out with numpy over the point_fields
+    columns (see points_vector), multipliers are stored qso columns counted by the ScoreEngine with a group by,
+    so neither needs a pass over the log in python. The claimed score is points times multipliers.
+    """
+
+    _optional_fields = [
+        ContestField(name='comment', display_label='Comment', space_tabs=False, stretch_factor=4, max_chars=255),
+    ]
+
+    # received exchange columns, copied into srx_string for the cabrillo log
+    _exchange_fields: list[str] = []
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "MIXED",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+        }
+
+    @property
+    def station(self) -> Optional[Station]:
+        return self.contest.fk_station
+
+    def station_dxcc(self) -> Optional[int]:
+        return self.station.dxcc if self.station else None
+
+    def station_continent(self) -> Optional[str]:
+        return self.station.continent if self.station else None
+
+    def same_country(self, columns: dict[str, np.ndarray]) -> np.ndarray:
+        """needs dxcc and country in point_fields"""
+        if self.station_dxcc():
+            return columns['dxcc'] == self.station_dxcc()
+        country = upper(self.station.country) if self.station else None
+        return np.array([upper(c) == country for c in columns['country']], dtype=bool) if country \
+            else np.zeros(len(columns['country']), dtype=bool)
+
+    def same_continent(self, columns: dict[str, np.ndarray]) -> np.ndarray:
+        """needs continent in point_fields"""
+        return columns['continent'] == self.station_continent()
+
+    def pre_process_qso_log(self, qso: QsoLog):
+        for name in self._exchange_fields:
+            setattr(qso, name, upper(getattr(qso, name)))
+        if self._exchange_fields:
+            qso.srx_string = ' '.join(str(getattr(qso, name)) for name in self._exchange_fields
+                                      if getattr(qso, name) is not None)
+        super().pre_process_qso_log(qso)
+
+    def score(self, points: float, multipliers: int) -> Optional[float]:
+        if not self.get_multiplier_dimensions():
+            return points or 0
+        return (points or 0) * multipliers
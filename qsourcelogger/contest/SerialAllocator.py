@@ -0,0 +1,100 @@
+import logging
+from typing import Optional
+
+from peewee import fn
+
+from ..model import Contest, QsoLog
+
+logger = logging.getLogger(__name__)
+
+
+class SerialAllocator:
+    """
+    Hands out the sent serial numbers of a serial exchange contest.
+
+    The next serial is held in memory and a high-water mark (the highest serial ever handed out) is persisted in
+    the contest settings. A serial is reserved when it is first shown to the operator, inside an immediate sqlite
+    transaction that re-reads the persisted mark, so two writers on the same log never hand out the same number.
+    A reservation that is not logged (the entry was cleared) is offered again for the next qso.
+
+    Deleting or editing qsos never lowers the mark, serials are not reused, so neither needs the log to be
+    scanned. Only when a contest has no mark yet (eg. a log from before the mark existed) is the highest logged
+    serial read, once.
+    """
+
+    setting_name = 'serial_high_water'
+
+    def __init__(self, contest: Contest, starting_serial: int = 1):
+        self.contest = contest
+        self.starting_serial = starting_serial
+        self.high_water: Optional[int] = None
+        # reserved and shown to the operator but not logged yet
+        self.held: Optional[int] = None
+
+    def _load(self) -> int:
+        if self.high_water is None:
+            high_water = self.contest.get_setting(self.setting_name)
+            if high_water is None:
+                logged = QsoLog.select(fn.Max(QsoLog.stx)).where(QsoLog.fk_contest == self.contest).scalar()
+                high_water = logged if logged else self.starting_serial - 1
+            self.high_water = int(high_water)
+        return self.high_water
+
+    def _persisted(self) -> Optional[int]:
+        value = Contest.select(fn.json_extract(Contest.settings, f'$.{self.setting_name}'))\
+            .where(Contest.id == self.contest.id).scalar()
+        return int(value) if value is not None else None
+
+    def _persist(self, high_water: int):
+        # json_set of a null settings column is null, which would drop the mark
+        Contest.update(settings=fn.json_set(fn.coalesce(Contest.settings, '{}'), f'$.{self.setting_name}',
+                                            high_water))\
+            .where(Contest.id == self.contest.id).execute()
+        # keep this instance's copy current so a later merge_settings does not write back an older mark
+        if self.contest.settings is None:
+            self.contest.settings = {}
+        self.contest.settings[self.setting_name] = high_water
+
+    def peek(self) -> int:
+        """the serial the next qso would be given, without reserving it"""
+        if self.held is not None:
+            return self.held
+        return self._load() + 1
+
+    def reserve(self) -> int:
+        """the serial for the qso being entered, reserved so no other writer can hand it out"""
+        if self.held is not None:
+            return self.held
+        high_water = self._load()
+        if not self.contest.id:
+            self.held = high_water + 1
+            return self.held
+        with Contest._meta.database.atomic('IMMEDIATE'):
+            # another writer may have reserved serials since this allocator last looked
+            persisted = self._persisted()
+            serial = max(high_water, persisted or 0) + 1
+            self._persist(serial)
+        self.high_water = serial
+        self.held = serial
+        return serial
+
+    def logged(self, serial: Optional[int]):
+        """a qso was logged with this serial"""
+        if serial is None:
+            return
+        if serial == self.held:
+            self.held = None
+        elif serial > self._load():
+            # typed in by hand past the mark
+            self.raise_to(serial)
+
+    def raise_to(self, serial: Optional[int]):
+        """make sure serial is never handed out, eg. a qso edited to a higher serial"""
+        if serial is None or serial <= self._load():
+            return
+        self.high_water = serial
+        if self.held is not None and self.held <= serial:
+            self.held = None
+        if self.contest.id:
+            with Contest._meta.database.atomic('IMMEDIATE'):
+                self._persist(max(serial, self._persisted() or 0))
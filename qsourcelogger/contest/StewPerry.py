@@ -0,0 +1,58 @@
+from .ScoredContest import *
+from ..lib.ham_utility import distance
+
+
+class StewPerry(ScoredContest):
+    """
+    Stew Perry Topband Distance Challenge. 1 point a qso plus 1 per 500km, times 4 for QRP and times 2 for low
+    power entries. There are no multipliers.
+    """
+
+    _fields = [
+        ContestField(name='gridsquare', display_label='Grid', space_tabs=True, stretch_factor=2, max_chars=4),
+    ]
+
+    _exchange_fields = ['gridsquare']
+
+    point_fields = ['distance']
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'STEW-PERRY'
+
+    def get_dupe_type(self) -> DupeType:
+        return DupeType.ONCE
+
+    @staticmethod
+    def get_preferred_column_order() -> list[str]:
+        return ['band', 'gridsquare', 'distance', 'points', 'mode']
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "160M",
+            "mode_category": "CW",
+            "operator_category": "SINGLE-OP",
+            "station_category": "FIXED",
+            "transmitter_category": "ONE",
+            "power_category": "LOW",
+        }
+
+    def intermediate_qso_update(self, qso: QsoLog, fields: Optional[list[str]]):
+        super().intermediate_qso_update(qso, fields)
+        # the sent exchange is the station grid
+        if not qso.call and not qso.stx_string and self.station and self.station.gridsquare:
+            qso.stx_string = self.station.gridsquare[:4]
+
+    def get_multiplier_dimensions(self) -> list[MultiplierDimension]:
+        return []
+
+    def rescore_qso(self, qso: QsoLog):
+        if qso.gridsquare and qso.my_gridsquare:
+            qso.distance = distance(qso.my_gridsquare, qso.gridsquare)
+        super().rescore_qso(qso)
+
+    def points_vector(self, columns: dict[str, np.ndarray], size: int) -> np.ndarray:
+        kilometers = np.where(np.equal(columns['distance'], None), 0, columns['distance']).astype(float)
+        power = {'QRP': 4, 'LOW': 2}.get(self.contest.power_category, 1)
+        return (1 + (kilometers // 500).astype(int)) * power
@@ -1,5 +1,5 @@
 from .AbstractContest import *
-from ..lib.ham_utility import bearing
+from ..lib.ham_utility import bearing, distance
 
 
 class VhfGeneralLogging(AbstractContest):
@@ -49,13 +49,19 @@ class VhfGeneralLogging(AbstractContest):
         if not qso.call and not qso.stx_string and self.contest.sent_exchange:
             qso.stx_string = self.contest.sent_exchange
 
-    def calculate_total_points(self):
+    def score(self, points: float, multipliers: int) -> Optional[float]:
         # No multipliers
-        return QsoLog.select(fn.Sum(QsoLog.points)).where(QsoLog.fk_contest == self.contest).scalar()
+        return points
 
     def points_for_qso(self, qso: QsoLog) -> Optional[int]:
         return qso.distance
 
+    def rescore_qso(self, qso: QsoLog):
+        # points are the distance, which depends on the grids
+        if qso.gridsquare and qso.my_gridsquare:
+            qso.distance = distance(qso.my_gridsquare, qso.gridsquare)
+        super().rescore_qso(qso)
+
     def pre_process_qso_log(self, qso: QsoLog):
         if qso.gridsquare and qso.fk_station and qso.fk_station.gridsquare:
             heading = "Bearing: " + str(bearing(qso.fk_station.gridsquare, qso.gridsquare))
@@ -1,5 +1,6 @@
 from . import VhfGeneralLogging
 from .AbstractContest import *
+from .SerialAllocator import SerialAllocator
 from ..lib import event
 
 
@@ -16,15 +17,14 @@ class VhfGeneralSerialLogging(VhfGeneralLogging):
         ContestField(name='gridsquare', display_label='Gridsquare', space_tabs=True, stretch_factor=3, max_chars=8),
     ]
 
-    _previously_saved_serial: Optional[int] = None
-
     def __init__(self, contest: Contest):
         super().__init__(contest)
-        event.register(event.QsoUpdated, self.clear_serial)
-        event.register(event.QsoDeleted, self.clear_serial)
+        self.serial_allocator = SerialAllocator(contest, self.get_starting_serial())
+        event.register(event.QsoUpdated, self.event_qso_updated)
 
-    def clear_serial(self):
-        self._previously_saved_serial = None
+    def event_qso_updated(self, e: event.QsoUpdated):
+        if e.qso_after and e.qso_after.fk_contest_id == self.contest.id and e.qso_after.stx:
+            self.serial_allocator.raise_to(int(e.qso_after.stx))
 
     @staticmethod
     def get_cabrillo_name() -> str:
@@ -54,15 +54,8 @@ class VhfGeneralSerialLogging(VhfGeneralLogging):
             "sent_exchange": "001",
         }
 
-    def get_serial_to_send(self) -> Optional[str]:
-        if self._previously_saved_serial:
-            return str(self._previously_saved_serial + 1)
-        else:
-            # get serial from DB
-            newest_qso = self.contest_qso_select().order_by(QsoLog.time_on.desc()).get_or_none()
-            if newest_qso and newest_qso.stx:
-                return newest_qso.stx + 1
-        return self.get_starting_serial()
+    def get_serial_to_send(self) -> int:
+        return self.serial_allocator.reserve()
 
     def intermediate_qso_update(self, qso: QsoLog, fields: Optional[list[str]]):
         if not qso.call and not qso.stx:
@@ -71,7 +64,9 @@ class VhfGeneralSerialLogging(VhfGeneralLogging):
 
     def pre_process_qso_log(self, qso: QsoLog):
         if not qso.srx_string:
-            qso.srx_string = str(qso.srx) + ' ' + qso.gridsquare
+            qso.srx_string = f"{qso.srx} {qso.gridsquare or ''}".strip()
         super().pre_process_qso_log(qso)
-        self._previously_saved_serial = int(qso.stx)
+
+    def qso_logged(self, qso: QsoLog):
+        self.serial_allocator.logged(int(qso.stx) if qso.stx else None)
 
@@ -0,0 +1,25 @@
+from .ArrlFieldDay import ArrlFieldDay
+from .ScoredContest import *
+
+
+class WinterFieldDay(ArrlFieldDay):
+    """Winter Field Day, scored as ARRL Field Day with the score doubled for QRP stations"""
+
+    @staticmethod
+    def get_cabrillo_name() -> str:
+        return 'WFD'
+
+    @staticmethod
+    def get_suggested_contest_setup() -> dict[str: str]:
+        return {
+            "band_category": "ALL",
+            "mode_category": "MIXED",
+            "operator_category": "MULTI-OP",
+            "station_category": "PORTABLE",
+            "transmitter_category": "UNLIMITED",
+            "sent_exchange": "1O SECT",
+        }
+
+    def score(self, points: float, multipliers: int) -> Optional[float]:
+        power = 2 if self.contest.power_category == 'QRP' else 1
+        return super().score(points, multipliers) * power
@@ -2,12 +2,52 @@ from .GeneralLogging import GeneralLogging
 from .GeneralSerialLogging import GeneralSerialLogging
 from .VhfGeneralLogging import VhfGeneralLogging
 from .VhfGeneralSerialLogging import VhfGeneralSerialLogging
+from .Arrl10m import Arrl10m
+from .ArrlDx import ArrlDxCw, ArrlDxSsb
+from .ArrlFieldDay import ArrlFieldDay
+from .ArrlSweepstakes import ArrlSweepstakesCw, ArrlSweepstakesSsb
+from .ArrlVhf import ArrlVhfJan, ArrlVhfJun, ArrlVhfSep
+from .Cq160 import Cq160Cw, Cq160Ssb
+from .CqWorldWide import CqWorldWideCw, CqWorldWideSsb
+from .CqWpx import CqWpxCw, CqWpxSsb
+from .CwOps import CwOps
+from .IaruHf import IaruHf
+from .Jidx import JidxCw, JidxSsb
+from .Naqp import NaqpCw, NaqpSsb, NaqpRtty
+from .RacCanadaDay import RacCanadaDay
+from .StewPerry import StewPerry
+from .WinterFieldDay import WinterFieldDay
 
 contest_plugin_list = [
     GeneralLogging,
     GeneralSerialLogging,
     VhfGeneralLogging,
     VhfGeneralSerialLogging,
+    Arrl10m,
+    ArrlDxCw,
+    ArrlDxSsb,
+    ArrlFieldDay,
+    ArrlSweepstakesCw,
+    ArrlSweepstakesSsb,
+    ArrlVhfJan,
+    ArrlVhfJun,
+    ArrlVhfSep,
+    Cq160Cw,
+    Cq160Ssb,
+    CqWorldWideCw,
+    CqWorldWideSsb,
+    CqWpxCw,
+    CqWpxSsb,
+    CwOps,
+    IaruHf,
+    JidxCw,
+    JidxSsb,
+    NaqpCw,
+    NaqpSsb,
+    NaqpRtty,
+    RacCanadaDay,
+    StewPerry,
+    WinterFieldDay,
 ]
 
 contests_by_cabrillo_id = dict([(x.get_cabrillo_name(), x) for x in contest_plugin_list])
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Event bus debug window. Shows delivery counts, latency and per handler timing for every event type
+so a slow subscriber hogging the gui thread can be spotted during a run.
+"""
+# pylint: disable=no-name-in-module, unused-import, no-member, invalid-name, logging-fstring-interpolation, c-extension-no-member
+
+import logging
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QTreeWidget, QTreeWidgetItem, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton
+
+from qsourcelogger.lib import event
+from qsourcelogger.qtcomponents.DockWidget import DockWidget
+
+logger = logging.getLogger(__name__)
+
+
+class EventStatsWindow(DockWidget):
+    """Periodically refreshed view of event.stats()"""
+
+    refresh_interval_ms = 1000
+    columns = ['Event / Handler', 'Count', 'Coalesced', 'Dispatch p95 ms', 'Avg ms', 'p95 ms', 'Max ms', 'Total ms']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.setObjectName("EventStatsWindow")
+        self.setWindowTitle("Event Bus Stats")
+
+        container = QWidget(self)
+        layout = QVBoxLayout(container)
+        header = QHBoxLayout()
+        self.summary = QLabel(container)
+        header.addWidget(self.summary, 1)
+        reset = QPushButton("Reset", container)
+        reset.clicked.connect(self.reset)
+        header.addWidget(reset)
+        layout.addLayout(header)
+
+        self.tree = QTreeWidget(container)
+        self.tree.setHeaderLabels(self.columns)
+        self.tree.setSortingEnabled(False)
+        layout.addWidget(self.tree)
+        self.setWidget(container)
+
+        self.expanded = set()
+        self.tree.itemExpanded.connect(lambda item: self.expanded.add(item.text(0)))
+        self.tree.itemCollapsed.connect(lambda item: self.expanded.discard(item.text(0)))
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(self.refresh_interval_ms)
+        self.refresh()
+
+    def reset(self):
+        event.reset_stats()
+        self.refresh()
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        stats = event.stats()
+        queue = stats['queue_depth']
+        self.summary.setText(f"Queue depth avg {queue['avg']:.1f} max {queue['max']} over {queue['ticks']} ticks, "
+                             f"slow handlers {stats['slow_handlers']}")
+
+        self.tree.clear()
+        # busiest event types first, by total time spent in handlers
+        events = sorted(stats['events'].items(),
+                        key=lambda x: -sum(h['total_ms'] for h in x[1]['handlers'].values()))
+        for name, s in events:
+            if 'emitted' not in s:
+                continue
+            latency = s['latency']
+            item = QTreeWidgetItem([
+                name, str(s['emitted']), str(s['coalesced']), f"{s['dispatch_latency']['p95_ms']:.2f}",
+                f"{latency['avg_ms']:.2f}", f"{latency['p95_ms']:.2f}", f"{latency['max_ms']:.2f}",
+                f"{sum(h['total_ms'] for h in s['handlers'].values()):.1f}"
+            ])
+            for handler, h in sorted(s['handlers'].items(), key=lambda x: -x[1]['total_ms']):
+                item.addChild(QTreeWidgetItem([
+                    handler, str(h['count']), '', '', f"{h['avg_ms']:.2f}", f"{h['p95_ms']:.2f}",
+                    f"{h['max_ms']:.2f}", f"{h['total_ms']:.1f}"
+                ]))
+            self.tree.addTopLevelItem(item)
+            item.setExpanded(name in self.expanded)
+        for i in range(len(self.columns)):
+            self.tree.resizeColumnToContents(i)
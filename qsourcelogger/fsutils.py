@@ -4,12 +4,18 @@
 fsutils.py: Filesystem utilities for qsourcelogger.
 """
 
+import atexit
+import copy
 import json
 import logging
 import os
 import subprocess
 import sys
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Iterable, Optional
 
 from appdata import AppDataPaths
 
@@ -46,26 +52,153 @@ def openFileWithOS(file):
         # os.system(f"xdg-open {fsutils.USER_DATA_PATH / macro_file}")
 
 
+@dataclass(frozen=True)
+class SettingsChange:
+    """settings that changed in one update, the new values and what they were before"""
+    changed: dict
+    previous: dict
+
+    def __contains__(self, key) -> bool:
+        return key in self.changed
+
+
+class SettingsStore:
+    """
+    The settings file loaded once and served from memory. Updates notify the subscribers of the keys that actually
+    changed and are written back flush_delay seconds after the last one, to a temporary file that then replaces the
+    settings file so a crash mid write leaves the previous file intact.
+    """
+
+    flush_delay = 0.5
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._settings: Optional[dict] = None
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._flush_at = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self._subscribers: list[tuple[Callable[[SettingsChange], None], Optional[frozenset]]] = []
+        self.stats = {'loads': 0, 'reads': 0, 'updates': 0, 'unchanged_updates': 0, 'writes': 0, 'write_ms': 0.0}
+
+    def _load(self) -> dict:
+        if self._settings is None:
+            self.stats['loads'] += 1
+            settings = None
+            if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+                try:
+                    with open(self.path, "rt", encoding="utf-8") as file_descriptor:
+                        settings = json.loads(file_descriptor.read())
+                except (IOError, ValueError):
+                    # the file is left as it is until the settings are next changed
+                    logger.exception(f"Error reading preferences {self.path}, using the defaults")
+            else:
+                self._dirty = True
+            if settings is None:
+                from . import pref_ref
+                settings = copy.deepcopy(pref_ref)
+            self._settings = settings
+            if self._dirty:
+                self.flush()
+        return self._settings
+
+    def snapshot(self) -> dict:
+        """a copy of all the settings, the caller may change it freely"""
+        with self._lock:
+            self.stats['reads'] += 1
+            return copy.deepcopy(self._load())
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            self.stats['reads'] += 1
+            return copy.deepcopy(self._load().get(key, default))
+
+    def update(self, to_merge: dict) -> Optional[SettingsChange]:
+        """merges the settings in, returns what changed or None when nothing did"""
+        with self._lock:
+            self.stats['updates'] += 1
+            settings = self._load()
+            changed = {key: copy.deepcopy(value) for key, value in to_merge.items()
+                       if key not in settings or settings[key] != value}
+            if not changed:
+                self.stats['unchanged_updates'] += 1
+                return None
+            change = SettingsChange(changed, {key: settings.get(key) for key in changed})
+            settings.update(changed)
+            self._dirty = True
+            # a burst of updates moves the deadline on rather than starting a timer each
+            self._flush_at = time.monotonic() + self.flush_delay
+            if self._timer is None:
+                self._start_timer(self.flush_delay)
+            subscribers = list(self._subscribers)
+        for callback, keys in subscribers:
+            if keys is None or not keys.isdisjoint(change.changed):
+                try:
+                    callback(change)
+                except Exception:
+                    logger.exception(f"settings subscriber {callback} failed")
+        return change
+
+    def subscribe(self, callback: Callable[[SettingsChange], None], keys: Optional[Iterable[str]] = None) -> None:
+        """calls back, on the updating thread, when any of the keys (by default any setting) changes"""
+        with self._lock:
+            self._subscribers.append((callback, frozenset(keys) if keys is not None else None))
+
+    def unsubscribe(self, callback: Callable[[SettingsChange], None]) -> None:
+        with self._lock:
+            self._subscribers = [(c, keys) for c, keys in self._subscribers if c != callback]
+
+    def _start_timer(self, delay: float):
+        self._timer = threading.Timer(delay, self._timer_expired)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _timer_expired(self):
+        with self._lock:
+            remaining = self._flush_at - time.monotonic()
+            if remaining > 0:
+                self._start_timer(remaining)
+                return
+            self.flush()
+
+    def flush(self) -> None:
+        """writes pending updates now"""
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty or self._settings is None:
+                return
+            start = time.perf_counter()
+            temporary = self.path.with_name(self.path.name + ".tmp")
+            try:
+                with open(temporary, "wt", encoding="utf-8") as file_descriptor:
+                    file_descriptor.write(json.dumps(self._settings, indent=4))
+                    file_descriptor.flush()
+                    os.fsync(file_descriptor.fileno())
+                os.replace(temporary, self.path)
+                self._dirty = False
+                self.stats['writes'] += 1
+                self.stats['write_ms'] = (time.perf_counter() - start) * 1000
+            except (IOError, TypeError, ValueError):
+                logger.exception(f"Error saving preferences document {self.path}")
+
+    def reload(self) -> None:
+        """drops the settings in memory after writing pending updates, the next read loads the file again"""
+        with self._lock:
+            self.flush()
+            self._settings = None
+
+
+settings = SettingsStore(CONFIG_FILE)
+atexit.register(settings.flush)
+
+
 def read_settings() -> dict:
-    if os.path.exists(CONFIG_FILE) and os.path.getsize(CONFIG_FILE) > 0:
-        with open(CONFIG_FILE, "rt", encoding="utf-8") as file_descriptor:
-            return json.loads(file_descriptor.read())
-    else:
-        from . import pref_ref
-        with open(CONFIG_FILE, "wt", encoding="utf-8") as file_descriptor:
-            file_descriptor.write(json.dumps(pref_ref, indent=4))
-        return dict(pref_ref)
+    """a copy of the settings, served from memory"""
+    return settings.snapshot()
+
 
 def write_settings(to_merge: dict) -> None:
-    # TODO compare with existing settings and signal diffs
-    try:
-        settings = None
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, "rt", encoding="utf-8") as file_descriptor:
-                 settings = json.loads(file_descriptor.read())
-        if settings:
-            with open(CONFIG_FILE, "wt", encoding="utf-8") as file_descriptor:
-                settings.update(to_merge)
-                file_descriptor.write(json.dumps(settings, indent=4))
-    except IOError as exception:
-        logger.exception(f"Error saving preferences document", exception)
+    """merges the settings in, the file is written shortly after in the background"""
+    settings.update(to_merge)
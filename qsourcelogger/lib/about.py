@@ -1,8 +1,9 @@
-from PyQt6 import QtWidgets, uic
+from PyQt6 import QtWidgets
 from PyQt6.QtGui import QPixmap
 from PyQt6.QtWidgets import QLabel
 
 from qsourcelogger import fsutils
+from qsourcelogger.lib import uicache
 
 
 class About(QtWidgets.QDialog):
@@ -11,5 +12,5 @@ class About(QtWidgets.QDialog):
     def __init__(self, app_data_path):
         parent = None
         super().__init__(parent)
-        uic.loadUi(app_data_path / "about.ui", self)
+        uicache.load_ui(app_data_path / "about.ui", self)
         self.label_logo.setPixmap(QPixmap(str(fsutils.APP_DATA_PATH / 'qsource-128.png')))
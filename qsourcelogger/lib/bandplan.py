@@ -0,0 +1,213 @@
+"""
+Frequency to band lookup shared by the logger, the bandmap and the log import and export code.
+
+A BandPlan keeps its bands sorted with the band edges in flat lists, a frequency is resolved with a bisect of the
+lower edges and a compare against the upper edge of the band found, and bulk lookups (spots, imported logs) use the
+numpy equivalent. Every band carries the names each consumer wants so one lookup answers all of them.
+
+ADIF_PLAN is the band table of the ADIF specification, used for what is logged, imported and exported. The IARU
+region plans narrow it to the allocations of a region and are used for the operating band shown in the gui.
+"""
+
+import bisect
+import dataclasses
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class BandInfo:
+    adif: str  # ADIF band enumeration, "20m"
+    n1mm: str  # band field of the N1MM packets, "14"
+    cabrillo: str  # CATEGORY-BAND header value, "20M"
+    cabrillo_freq: Optional[str]  # QSO line frequency above 30 MHz, "144"; below it the kHz frequency is used
+    low_hz: int
+    high_hz: int
+
+    @property
+    def short(self) -> str:
+        """the name the gui band indicators and the fake frequencies use, "20", "1.25" or "70cm\""""
+        if self.adif.endswith('m') and self.adif[-2].isdigit():
+            return self.adif[:-1]
+        return self.adif
+
+    @property
+    def low_mhz(self) -> float:
+        return self.low_hz / 1_000_000
+
+    @property
+    def high_mhz(self) -> float:
+        return self.high_hz / 1_000_000
+
+    def __contains__(self, freq_hz) -> bool:
+        return self.low_hz <= freq_hz <= self.high_hz
+
+
+class BandPlan:
+    """bands of a plan with the edges compiled for bisect and numpy lookups"""
+
+    def __init__(self, name: str, bands: Iterable[BandInfo]):
+        self.name = name
+        self.bands = sorted(bands, key=lambda band: band.low_hz)
+        self.lows = [band.low_hz for band in self.bands]
+        self.highs = [band.high_hz for band in self.bands]
+        self.by_name = {band.adif: band for band in self.bands}
+        self._np_lows = np.array(self.lows, dtype=np.float64)
+        self._np_highs = np.array(self.highs, dtype=np.float64)
+        self._np_names: dict[str, np.ndarray] = {}
+
+    def __repr__(self):
+        return f"BandPlan<{self.name},{len(self.bands)} bands>"
+
+    def lookup(self, freq_hz) -> Optional[BandInfo]:
+        """the band a frequency in hz is in, None when it is outside the plan"""
+        if not freq_hz:
+            return None
+        i = bisect.bisect_right(self.lows, freq_hz) - 1
+        if i >= 0 and freq_hz <= self.highs[i]:
+            return self.bands[i]
+        return None
+
+    def band(self, adif_name: str) -> Optional[BandInfo]:
+        return self.by_name.get(adif_name)
+
+    def indexes(self, freqs_hz) -> np.ndarray:
+        """index into self.bands of the band of each frequency, -1 where it is outside the plan or missing"""
+        freqs = np.asarray(freqs_hz, dtype=np.float64)
+        i = np.searchsorted(self._np_lows, freqs, side='right') - 1
+        inside = (i >= 0) & (freqs <= self._np_highs[np.maximum(i, 0)])
+        return np.where(inside, i, -1)
+
+    def names(self, freqs_hz, scheme: str = 'adif', missing=None) -> np.ndarray:
+        """band name in the given scheme (a BandInfo attribute) of each frequency, missing where it is outside"""
+        table = self._np_names.get(scheme)
+        if table is None:
+            # the last slot is what index -1 picks up
+            table = np.array([getattr(band, scheme) for band in self.bands] + [None], dtype=object)
+            self._np_names[scheme] = table
+        result = table[self.indexes(freqs_hz)]
+        if missing is not None:
+            result[result == None] = missing  # pylint: disable=singleton-comparison
+        return result
+
+
+def _band(adif: str, n1mm: str, cabrillo: str, cabrillo_freq: Optional[str], low_khz: float, high_khz: float):
+    return BandInfo(adif, n1mm, cabrillo, cabrillo_freq, round(low_khz * 1000), round(high_khz * 1000))
+
+
+ADIF_PLAN = BandPlan("ADIF", [
+    _band("2190m", "0.136", "2190M", None, 135.7, 137.8),
+    _band("630m", "0.472", "630M", None, 472, 479),
+    _band("560m", "0.501", "560M", None, 501, 504),
+    _band("160m", "1.8", "160M", None, 1_800, 2_000),
+    _band("80m", "3.5", "80M", None, 3_500, 4_000),
+    _band("60m", "5", "60M", None, 5_060, 5_450),
+    _band("40m", "7", "40M", None, 7_000, 7_300),
+    _band("30m", "10", "30M", None, 10_100, 10_150),
+    _band("20m", "14", "20M", None, 14_000, 14_350),
+    _band("17m", "18", "17M", None, 18_068, 18_168),
+    _band("15m", "21", "15M", None, 21_000, 21_450),
+    _band("12m", "24", "12M", None, 24_890, 24_990),
+    _band("10m", "28", "10M", None, 28_000, 29_700),
+    _band("8m", "40", "8M", "40", 40_000, 45_000),
+    _band("6m", "50", "6M", "50", 50_000, 54_000),
+    _band("5m", "54", "5M", "54", 54_000.001, 69_900),
+    _band("4m", "70", "4M", "70", 70_000, 71_000),
+    _band("2m", "144", "2M", "144", 144_000, 148_000),
+    _band("1.25m", "222", "222", "222", 222_000, 225_000),
+    _band("70cm", "432", "432", "432", 420_000, 450_000),
+    _band("33cm", "902", "902", "902", 902_000, 928_000),
+    _band("23cm", "1296", "1.2G", "1.2G", 1_240_000, 1_300_000),
+    _band("13cm", "2300+", "2.3G", "2.3G", 2_300_000, 2_450_000),
+    _band("9cm", "2300+", "3.4G", "3.4G", 3_300_000, 3_500_000),
+    _band("6cm", "2300+", "5.7G", "5.7G", 5_650_000, 5_925_000),
+    _band("3cm", "2300+", "10G", "10G", 10_000_000, 10_500_000),
+    _band("1.25cm", "2300+", "24G", "24G", 24_000_000, 24_250_000),
+    _band("6mm", "2300+", "47G", "47G", 47_000_000, 47_200_000),
+    _band("4mm", "2300+", "75G", "75G", 75_500_000, 81_000_000),
+    _band("2.5mm", "2300+", "122G", "122G", 119_980_000, 123_000_000),
+    _band("2mm", "2300+", "134G", "134G", 134_000_000, 149_000_000),
+    _band("1mm", "2300+", "241G", "241G", 241_000_000, 250_000_000),
+    _band("submm", "2300+", "LIGHT", "LIGHT", 300_000_000, 7_500_000_000),
+])
+
+# where a region allocates less than the ADIF band, in khz; None drops the band from the region
+_REGION_EDGES = {
+    1: {
+        "560m": None, "160m": (1_810, 2_000), "80m": (3_500, 3_800), "60m": (5_351.5, 5_366.5),
+        "40m": (7_000, 7_200), "8m": (40_660, 40_700), "6m": (50_000, 52_000), "5m": None,
+        "4m": (70_000, 70_500), "2m": (144_000, 146_000), "1.25m": None, "70cm": (430_000, 440_000),
+        "33cm": None, "9cm": (3_400_000, 3_475_000), "6cm": (5_650_000, 5_850_000),
+    },
+    2: {
+        "560m": None, "60m": (5_330.5, 5_406.5), "8m": None, "5m": None, "4m": None,
+    },
+    3: {
+        "560m": None, "80m": (3_500, 3_900), "60m": (5_351.5, 5_366.5), "8m": None, "5m": None, "4m": None,
+        "1.25m": None, "70cm": (430_000, 440_000), "33cm": None,
+    },
+}
+
+
+def _region_plan(region: int) -> BandPlan:
+    bands = []
+    edges = _REGION_EDGES[region]
+    for band in ADIF_PLAN.bands:
+        if band.adif not in edges:
+            bands.append(band)
+        elif edges[band.adif]:
+            low_khz, high_khz = edges[band.adif]
+            bands.append(dataclasses.replace(band, low_hz=round(low_khz * 1000), high_hz=round(high_khz * 1000)))
+    return BandPlan(f"IARU region {region}", bands)
+
+
+REGION_PLANS = {region: _region_plan(region) for region in _REGION_EDGES}
+
+DEFAULT_REGION = 2
+_current = REGION_PLANS[DEFAULT_REGION]
+
+
+def set_region(region: int) -> None:
+    """IARU region of the station, the plan the operating band comes from"""
+    global _current  # pylint: disable=global-statement
+    _current = REGION_PLANS.get(region, REGION_PLANS[DEFAULT_REGION])
+
+
+def plan(region: Optional[int] = None) -> BandPlan:
+    """the plan of the given IARU region, by default the one of the station"""
+    if region is None:
+        return _current
+    return REGION_PLANS[region]
+
+
+def operating_band(freq_hz) -> Optional[BandInfo]:
+    """the band the radio is on in the station's region"""
+    return _current.lookup(freq_hz)
+
+
+def logged_band(freq_hz) -> Optional[BandInfo]:
+    """the band a qso at this frequency is logged on"""
+    return ADIF_PLAN.lookup(freq_hz)
+
+
+def adif_band(freq_hz) -> Optional[str]:
+    """the ADIF band a qso at this frequency is logged on, None when it is out of band"""
+    band = ADIF_PLAN.lookup(freq_hz)
+    return band.adif if band else None
+
+
+def fill_bands(qsos: list) -> int:
+    """
+    Sets band, and band_rx of split qsos, from the frequency on the qsos that do not have it, with one lookup for
+    the whole list. Returns the number of qsos left without a band.
+    """
+    # the field values are read straight from the model data, the field descriptors cost more than the lookup
+    for freq_field, band_field in (('freq', 'band'), ('freq_rx', 'band_rx')):
+        missing = [qso for qso in qsos if not qso.__data__.get(band_field) and qso.__data__.get(freq_field)]
+        if missing:
+            names = ADIF_PLAN.names([qso.__data__[freq_field] for qso in missing])
+            for qso, name in zip(missing, names.tolist()):
+                setattr(qso, band_field, name)
+    return sum(1 for qso in qsos if not qso.__data__.get('band'))
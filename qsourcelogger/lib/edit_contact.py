@@ -1,6 +1,8 @@
 """Edit Contact Dialog"""
 
-from PyQt6 import QtWidgets, uic
+from PyQt6 import QtWidgets
+
+from qsourcelogger.lib import uicache
 
 
 class EditContact(QtWidgets.QDialog):
@@ -8,7 +10,7 @@ class EditContact(QtWidgets.QDialog):
 
     def __init__(self, app_data_path):
         super().__init__(None)
-        uic.loadUi(app_data_path / "editcontact.ui", self)
+        uicache.load_ui(app_data_path / "editcontact.ui", self)
         self.buttonBox.clicked.connect(self.store)
 
     def store(self):
@@ -1,6 +1,8 @@
 """edit the macro buttons"""
 
-from PyQt6 import QtWidgets, uic
+from PyQt6 import QtWidgets
+
+from qsourcelogger.lib import uicache
 
 
 class EditMacro(QtWidgets.QDialog):
@@ -9,7 +11,7 @@ class EditMacro(QtWidgets.QDialog):
         self.function_key = function_key
         parent = None
         super().__init__(parent)
-        uic.loadUi(app_data_path / "editmacro.ui", self)
+        uicache.load_ui(app_data_path / "editmacro.ui", self)
         self.buttonBox.clicked.connect(self.store)
         self.macro_label.setText(function_key.text())
         self.the_macro.setText(function_key.toolTip())
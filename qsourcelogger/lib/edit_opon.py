@@ -1,6 +1,8 @@
 """Edit OpOn"""
 
-from PyQt6 import QtWidgets, uic
+from PyQt6 import QtWidgets
+
+from qsourcelogger.lib import uicache
 
 
 class OpOn(QtWidgets.QDialog):
@@ -8,7 +10,7 @@ class OpOn(QtWidgets.QDialog):
 
     def __init__(self, app_data_path, parent=None):
         super().__init__(parent)
-        uic.loadUi(app_data_path / "opon.ui", self)
+        uicache.load_ui(app_data_path / "opon.ui", self)
         self.buttonBox.clicked.connect(self.store)
 
     def store(self):
@@ -1,6 +1,15 @@
+import bisect
+import json
 import logging
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import defaultdict
 from typing import Callable
 
+from PyQt6 import sip
 from PyQt6.QtCore import pyqtSignal, Qt, QObject
 
 from .event_model import *
@@ -9,37 +18,344 @@ from .event_model import *
 Use emit to send an event object to all listeners
 
 Use register to listen for events for the specified event type
+
+Events are queued and delivered on the qt main thread once per event loop tick, in the order they were emitted.
+High frequency events listed in COALESCED_EVENTS only deliver the most recent instance emitted during the tick,
+at the position it was emitted, so that every open window does not redo its work for each intermediate keystroke
+or radio poll. A CallChanged emitted after a QsoAdded still reaches the windows after it.
 """
 
 logger = logging.getLogger(__name__)
 
+COALESCED_EVENTS = {RadioState, CallChanged, IntermediateQsoUpdate}
+
+
+# upper bucket bounds in milliseconds, the last bucket collects everything slower
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+
+class Histogram:
+    """Fixed bucket histogram of durations. Values are recorded in seconds and reported in milliseconds."""
+
+    def __init__(self):
+        self.counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, seconds * 1000)] += 1
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p: float) -> float:
+        """Upper bound in ms of the bucket containing the p'th percentile"""
+        if not self.count:
+            return 0.0
+        target = self.count * p
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return HISTOGRAM_BOUNDS_MS[i] if i < len(HISTOGRAM_BOUNDS_MS) else self.max * 1000
+        return self.max * 1000
+
+    def as_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'last_ms': self.last * 1000,
+            'avg_ms': (self.total / self.count * 1000) if self.count else 0.0,
+            'max_ms': self.max * 1000,
+            'total_ms': self.total * 1000,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'buckets': dict(zip([f'<={b}' for b in HISTOGRAM_BOUNDS_MS] + ['>'], self.counts)),
+        }
+
+
+class EventTypeStats:
+    """Counters for a single event type."""
+
+    def __init__(self):
+        self.emitted = 0
+        self.coalesced = 0
+        self.delivered = 0
+        # emit until the first handler starts
+        self.dispatch_latency = Histogram()
+        # emit until the last handler has returned
+        self.latency = Histogram()
+
+    def as_dict(self) -> dict:
+        return {
+            'emitted': self.emitted,
+            'coalesced': self.coalesced,
+            'delivered': self.delivered,
+            'dispatch_latency': self.dispatch_latency.as_dict(),
+            'latency': self.latency.as_dict(),
+        }
+
+
+class _Watchdog(threading.Thread):
+    """
+    Samples the stack of the thread running a handler once the handler has been running for longer than the
+    slow handler threshold, so the log shows where the time is going rather than only which handler was slow.
+    """
+
+    def __init__(self, bus: 'EventBus'):
+        super().__init__(name='event-watchdog', daemon=True)
+        self.bus = bus
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(max(self.bus.slow_handler_threshold / 2, 0.005)):
+            current = self.bus._current
+            if not current or current[3] is not None:
+                continue
+            name, started, thread_id, _ = current
+            if time.perf_counter() - started < self.bus.slow_handler_threshold:
+                continue
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None and self.bus._current is current:
+                self.bus._current = (name, started, thread_id, ''.join(traceback.format_stack(frame)))
+
+
+class _Subscriber:
+    """
+    Holds a callback without keeping its owner alive. Bound methods of qt objects are dropped once the
+    underlying c++ object is deleted, mirroring what a signal connection would do.
+    """
+
+    def __init__(self, callback: Callable):
+        self.name = getattr(callback, '__qualname__', repr(callback))
+        if hasattr(callback, '__self__') and hasattr(callback, '__func__'):
+            self._ref = weakref.WeakMethod(callback)
+            self._owner = weakref.ref(callback.__self__)
+        else:
+            self._ref = lambda: callback
+            self._owner = None
+
+    def resolve(self) -> Optional[Callable]:
+        fn = self._ref()
+        if fn is None:
+            return None
+        if self._owner is not None:
+            owner = self._owner()
+            if isinstance(owner, sip.simplewrapper) and sip.isdeleted(owner):
+                return None
+        return fn
+
+    def matches(self, callback: Callable) -> bool:
+        return self._ref() == callback
+
+
+class EventBus(QObject):
+    """
+    Collects events from any thread and delivers them to subscribers on the thread owning the bus.
+    """
+    _wake = pyqtSignal()
 
-class SignalWrapper(QObject):
-    signal = pyqtSignal(AppEvent)
+    # seconds, 0 disables slow handler logging
+    slow_handler_threshold: float = 0
 
-_signals: dict[type(AppEvent), SignalWrapper] = {}
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._subscribers: dict[type, list[_Subscriber]] = defaultdict(list)
+        # pending entries are (event type, event, emit time). coalesced types hold a single slot in the queue,
+        # _latest is the index of it, an earlier slot is set to None when the type is emitted again
+        self._pending: list[Optional[tuple[type, AppEvent, float]]] = []
+        self._latest: dict[type, int] = {}
+        self._flush_scheduled = False
+        # (handler name, start time, thread id, sampled stack) of the handler currently running
+        self._current = None
+        self._watchdog: Optional[_Watchdog] = None
+        self.event_stats: dict[type, EventTypeStats] = defaultdict(EventTypeStats)
+        self.handler_stats: dict[tuple[type, str], Histogram] = defaultdict(Histogram)
+        self.ticks = 0
+        self.queue_depth_total = 0
+        self.queue_depth_max = 0
+        self.slow_handlers = 0
+        self._wake.connect(self._flush, Qt.ConnectionType.QueuedConnection)
+
+    def register(self, event_type: type, callback: Callable):
+        self._subscribers[event_type].append(_Subscriber(callback))
+
+    def unregister(self, event_type: type, callback: Callable):
+        self._subscribers[event_type] = [s for s in self._subscribers[event_type] if not s.matches(callback)]
+
+    def set_slow_handler_threshold(self, ms: float):
+        self.slow_handler_threshold = max(ms or 0, 0) / 1000
+        if self.slow_handler_threshold and not self._watchdog:
+            self._watchdog = _Watchdog(self)
+            self._watchdog.start()
+        elif not self.slow_handler_threshold and self._watchdog:
+            self._watchdog.stop_event.set()
+            self._watchdog = None
+
+    def emit(self, event: AppEvent):
+        event_type = type(event)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Emitting event %s', event_type.__name__)
+        now = time.perf_counter()
+        with self._lock:
+            stats = self.event_stats[event_type]
+            stats.emitted += 1
+            if event_type not in self._subscribers:
+                return
+            if event_type in COALESCED_EVENTS:
+                previous = self._latest.get(event_type)
+                if previous is not None:
+                    stats.coalesced += 1
+                    self._pending[previous] = None
+                self._latest[event_type] = len(self._pending)
+            self._pending.append((event_type, event, now))
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._wake.emit()
+
+    def _flush(self):
+        with self._lock:
+            pending, self._pending = [entry for entry in self._pending if entry], []
+            self._latest = {}
+            self._flush_scheduled = False
+
+        # queue depth is sampled per tick, a deep queue means the main thread is falling behind its producers
+        depth = len(pending)
+        self.ticks += 1
+        self.queue_depth_total += depth
+        self.queue_depth_max = max(self.queue_depth_max, depth)
+
+        for event_type, event, emitted_at in pending:
+            self._deliver(event_type, event, emitted_at)
+
+    def _deliver(self, event_type: type, event: AppEvent, emitted_at: float):
+        stats = self.event_stats[event_type]
+        stats.dispatch_latency.record(time.perf_counter() - emitted_at)
+        subscribers = self._subscribers.get(event_type, [])
+        dead = []
+        thread_id = threading.get_ident()
+        for subscriber in list(subscribers):
+            fn = subscriber.resolve()
+            if fn is None:
+                dead.append(subscriber)
+                continue
+            start = time.perf_counter()
+            self._current = (subscriber.name, start, thread_id, None)
+            try:
+                fn(event)
+            except Exception:
+                logger.exception(f'Event handler {subscriber.name} failed for {event_type.__name__}')
+            elapsed = time.perf_counter() - start
+            current, self._current = self._current, None
+            self.handler_stats[(event_type, subscriber.name)].record(elapsed)
+            if self.slow_handler_threshold and elapsed >= self.slow_handler_threshold:
+                self._log_slow_handler(event_type, subscriber.name, elapsed, current[3])
+
+        for subscriber in dead:
+            subscribers.remove(subscriber)
+
+        stats.delivered += 1
+        stats.latency.record(time.perf_counter() - emitted_at)
+
+    def _log_slow_handler(self, event_type: type, name: str, elapsed: float, stack: Optional[str]):
+        self.slow_handlers += 1
+        if not stack:
+            # finished between watchdog samples, the handler's entry point is the best we have
+            stack = ''.join(traceback.format_stack(limit=8))
+        logger.warning(f'Slow event handler {name} took {elapsed * 1000:.1f}ms for {event_type.__name__}, '
+                       f'stack while running:\n{stack}')
+
+    def stats(self) -> dict:
+        """Snapshot of the counters keyed by event type name, handler timings keyed by subscriber name."""
+        events = {}
+        for event_type, s in list(self.event_stats.items()):
+            events[event_type.__name__] = s.as_dict() | {'handlers': {}}
+        for (event_type, name), h in list(self.handler_stats.items()):
+            events.setdefault(event_type.__name__, {'handlers': {}})['handlers'][name] = h.as_dict()
+        return {
+            'events': events,
+            'queue_depth': {
+                'max': self.queue_depth_max,
+                'avg': (self.queue_depth_total / self.ticks) if self.ticks else 0.0,
+                'pending': sum(1 for entry in self._pending if entry),
+                'ticks': self.ticks,
+            },
+            'slow_handlers': self.slow_handlers,
+            'slow_handler_threshold_ms': self.slow_handler_threshold * 1000,
+        }
+
+    def reset_stats(self):
+        self.event_stats.clear()
+        self.handler_stats.clear()
+        self.ticks = 0
+        self.queue_depth_total = 0
+        self.queue_depth_max = 0
+        self.slow_handlers = 0
+
+
+_bus = EventBus()
 
 
 def register(event_type: type(AppEvent), callback: Callable[[type(AppEvent)], None]):
     """
     Slots still process in the main qt loop. Batch work should be done in a qthread.
     """
-    if event_type not in _signals:
-        _signals[event_type] = SignalWrapper()
+    _bus.register(event_type, callback)
+
+
+def unregister(event_type: type(AppEvent), callback: Callable[[type(AppEvent)], None]):
+    _bus.unregister(event_type, callback)
 
-    _signals[event_type].signal.connect(callback, Qt.ConnectionType.QueuedConnection)
 
 def emit(event: AppEvent):
-    logger.debug(f'Emitting event {event}')
-    s = _signals.get(type(event), None)
-    if s:
-        s.signal.emit(event)
+    _bus.emit(event)
+
+
+def set_slow_handler_threshold(ms: float):
+    """Log a warning with a stack sample for any handler running longer than ms. 0 disables."""
+    _bus.set_slow_handler_threshold(ms)
+
+
+def stats() -> dict:
+    return _bus.stats()
+
+
+def reset_stats():
+    _bus.reset_stats()
+
+
+def dump_stats(path):
+    try:
+        with open(path, "wt", encoding="utf-8") as file_descriptor:
+            json.dump(stats(), file_descriptor, indent=2)
+    except OSError:
+        logger.exception(f"Could not write event stats to {path}")
+
+
+def log_stats():
+    for name, s in sorted(stats()['events'].items()):
+        if 'emitted' not in s:
+            continue
+        logger.info(f"{name}: emitted {s['emitted']} coalesced {s['coalesced']} delivered {s['delivered']} "
+                    f"latency avg {s['latency']['avg_ms']:.2f}ms max {s['latency']['max_ms']:.2f}ms")
+        for handler, h in sorted(s['handlers'].items(), key=lambda x: -x[1]['total_ms']):
+            logger.info(f"    {handler}: {h['count']} calls avg {h['avg_ms']:.2f}ms max {h['max_ms']:.2f}ms")
+
 
 def callback(e: CallChanged):
     print(e.call)
 
 if __name__ == '__main__':
-    e = CallChanged('VEEEE')
-
+    from PyQt6.QtCore import QCoreApplication, QTimer
+    app = QCoreApplication([])
     register(CallChanged, callback)
-    emit(e)
+    for c in ['V', 'VE', 'VEE', 'VEEE', 'VEEEE']:
+        emit(CallChanged(c))
+    QTimer.singleShot(0, app.quit)
+    app.exec()
+    print(stats())
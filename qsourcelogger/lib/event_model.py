@@ -57,16 +57,36 @@ class QsoUpdated(AppEvent):
 @dataclass
 class QsoAdded(AppEvent):
     qso: QsoLog
+    # the change was made by another station and applied by log replication
+    remote: bool = False
 
 @dataclass
 class QsoDeleted(AppEvent):
     qso: QsoLog
+    remote: bool = False
 
 
 @dataclass
 class QsoUpdated(AppEvent):
     qso_before: QsoLog
     qso_after: QsoLog
+    remote: bool = False
+
+
+@dataclass
+class QsoSaveFailed(AppEvent):
+    # a qso logged with write behind that could not be inserted, it is set aside in the rejected file
+    qso: QsoLog
+    error: str
+    rejected_path: str
+
+
+@dataclass
+class ScoreUpdated(AppEvent):
+    qso_count: int
+    points: float
+    multipliers: int
+    total: Optional[float]
 
 
 @dataclass
@@ -110,6 +130,18 @@ class ExternalLookupResult(AppEvent):
 class ContestActivated(AppEvent):
     contest: Contest
 
+@dataclass
+class NewVersionAvailable(AppEvent):
+    pass
+
+
+@dataclass
+class SettingsChanged(AppEvent):
+    # the new value of each setting that changed, and the value it had before
+    changed: dict
+    previous: dict
+
+
 @dataclass
 class StationActivated(AppEvent):
     station: Station
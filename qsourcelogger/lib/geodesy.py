@@ -0,0 +1,184 @@
+"""
+Maidenhead locators, great circle distance and bearing and the sun's position over whole arrays.
+
+The array functions take anything numpy can broadcast and return arrays, a locator that cannot be parsed comes
+back as nan. The scalar grid_to_latlon is cached, the station's own locator is parsed once for the whole session
+rather than on every qso.
+"""
+
+import math
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Iterable, Optional
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6372.8
+
+# per character pair of a locator: the first character, how many values the pair takes and the size of the square
+# it selects in degrees of longitude and latitude
+_PAIRS = (
+    (ord('A'), 18, 20.0, 10.0),
+    (ord('0'), 10, 2.0, 1.0),
+    (ord('A'), 24, 2.0 / 24, 1.0 / 24),
+    (ord('0'), 10, 2.0 / 240, 1.0 / 240),
+    (ord('A'), 24, 2.0 / 5760, 1.0 / 5760),
+)
+MAX_GRID_LENGTH = len(_PAIRS) * 2
+
+SUN_NIGHT = 0
+SUN_GRAYLINE = 1
+SUN_DAY = 2
+
+
+@lru_cache(maxsize=4096)
+def grid_to_latlon(grid: str) -> Optional[tuple[float, float]]:
+    """latitude and longitude of the centre of a 2 to 10 character locator, None when it is not a locator"""
+    if not grid:
+        return None
+    grid = grid.strip().upper()
+    if len(grid) % 2 or not 2 <= len(grid) <= MAX_GRID_LENGTH:
+        return None
+    lon, lat = -180.0, -90.0
+    lon_size = lat_size = 0.0
+    for i, (base, values, lon_size, lat_size) in enumerate(_PAIRS[:len(grid) // 2]):
+        lon_value = ord(grid[i * 2]) - base
+        lat_value = ord(grid[i * 2 + 1]) - base
+        if not (0 <= lon_value < values and 0 <= lat_value < values):
+            return None
+        lon += lon_value * lon_size
+        lat += lat_value * lat_size
+    return lat + lat_size / 2, lon + lon_size / 2
+
+
+def grids_to_latlon(grids: Iterable[Optional[str]]) -> tuple[np.ndarray, np.ndarray]:
+    """latitude and longitude arrays of the centres of the locators, nan where one is missing or malformed"""
+    grids = [(grid or "").strip() for grid in grids]
+    # one code point per column, zero padded, wide enough to see a locator that is too long
+    codes = np.array(grids, dtype=f'U{MAX_GRID_LENGTH + 2}').view(np.uint32)\
+        .reshape(len(grids), MAX_GRID_LENGTH + 2).astype(np.int64)
+    codes = np.where((codes >= ord('a')) & (codes <= ord('z')), codes - 32, codes)
+    lengths = np.count_nonzero(codes, axis=1)
+    pairs = lengths // 2
+    valid = (lengths % 2 == 0) & (pairs >= 1) & (pairs <= len(_PAIRS))
+
+    lon = np.full(len(grids), -180.0)
+    lat = np.full(len(grids), -90.0)
+    lon_size = np.zeros(len(grids))
+    lat_size = np.zeros(len(grids))
+    for i, (base, values, pair_lon_size, pair_lat_size) in enumerate(_PAIRS):
+        used = pairs > i
+        lon_value = codes[:, i * 2] - base
+        lat_value = codes[:, i * 2 + 1] - base
+        valid &= ~used | ((lon_value >= 0) & (lon_value < values) & (lat_value >= 0) & (lat_value < values))
+        lon += np.where(used, lon_value * pair_lon_size, 0.0)
+        lat += np.where(used, lat_value * pair_lat_size, 0.0)
+        lon_size = np.where(used, pair_lon_size, lon_size)
+        lat_size = np.where(used, pair_lat_size, lat_size)
+    lon += lon_size / 2
+    lat += lat_size / 2
+    lon[~valid] = np.nan
+    lat[~valid] = np.nan
+    return lat, lon
+
+
+def distance_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """short path great circle distance in kilometers (haversine)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lon1, lat2, lon2))
+    aye = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * np.arcsin(np.sqrt(np.clip(aye, 0.0, 1.0))) * EARTH_RADIUS_KM
+
+
+def long_path_km(short_path_km) -> np.ndarray:
+    return 2 * np.pi * EARTH_RADIUS_KM - np.asarray(short_path_km)
+
+
+def bearing_deg(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """initial short path bearing in degrees from north, 0 to 360"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lon1, lat2, lon2))
+    londelta = lon2 - lon1
+    why = np.sin(londelta) * np.cos(lat2)
+    exs = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(londelta)
+    return np.degrees(np.arctan2(why, exs)) % 360
+
+
+def long_path_bearing(short_path_bearing) -> np.ndarray:
+    return (np.asarray(short_path_bearing) + 180) % 360
+
+
+def subsolar_point(when: datetime) -> tuple[float, float]:
+    """latitude and longitude where the sun is overhead (NOAA approximation, good to a fraction of a degree)"""
+    if when.tzinfo:
+        when = when.astimezone(timezone.utc)
+    hours = when.hour + when.minute / 60 + when.second / 3600
+    gamma = 2 * math.pi / 365 * (when.timetuple().tm_yday - 1 + (hours - 12) / 24)
+    equation_of_time = 229.18 * (0.000075 + 0.001868 * math.cos(gamma) - 0.032077 * math.sin(gamma)
+                                 - 0.014615 * math.cos(2 * gamma) - 0.040849 * math.sin(2 * gamma))
+    declination = (0.006918 - 0.399912 * math.cos(gamma) + 0.070257 * math.sin(gamma)
+                   - 0.006758 * math.cos(2 * gamma) + 0.000907 * math.sin(2 * gamma)
+                   - 0.002697 * math.cos(3 * gamma) + 0.00148 * math.sin(3 * gamma))
+    lon = -15 * (hours - 12 + equation_of_time / 60)
+    return math.degrees(declination), (lon + 180) % 360 - 180
+
+
+def sun_elevation(lat, lon, when: datetime) -> np.ndarray:
+    """elevation of the sun in degrees above the horizon at each point"""
+    sun_lat, sun_lon = (math.radians(value) for value in subsolar_point(when))
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    sine = np.sin(lat) * math.sin(sun_lat) + np.cos(lat) * math.cos(sun_lat) * np.cos(lon - sun_lon)
+    return np.degrees(np.arcsin(np.clip(sine, -1.0, 1.0)))
+
+
+def sun_state(lat, lon, when: datetime, twilight_deg: float = 6.0) -> np.ndarray:
+    """SUN_DAY, SUN_NIGHT or SUN_GRAYLINE (the sun within twilight_deg of the horizon) at each point"""
+    elevation = sun_elevation(lat, lon, when)
+    return np.where(np.abs(elevation) <= twilight_deg, SUN_GRAYLINE,
+                    np.where(elevation > 0, SUN_DAY, SUN_NIGHT)).astype(np.int8)
+
+
+def distances_from(grid: str, grids: Iterable[Optional[str]]) -> np.ndarray:
+    """short path kilometers from one locator, the station's, to each of the others"""
+    origin = grid_to_latlon(grid) or (np.nan, np.nan)
+    lat, lon = grids_to_latlon(grids)
+    return distance_km(origin[0], origin[1], lat, lon)
+
+
+def bearings_from(grid: str, grids: Iterable[Optional[str]]) -> np.ndarray:
+    """short path bearings from one locator, the station's, to each of the others"""
+    origin = grid_to_latlon(grid) or (np.nan, np.nan)
+    lat, lon = grids_to_latlon(grids)
+    return bearing_deg(origin[0], origin[1], lat, lon)
+
+
+def _positions(rows: list[dict], lat_field: str, lon_field: str, grid_field: str) -> tuple[np.ndarray, np.ndarray]:
+    """coordinates logged with the qsos, from the locator (and its extension) where none were logged"""
+    ext_field = f"{grid_field}_ext"
+    lat, lon = grids_to_latlon([(row.get(grid_field) or "") + (row.get(ext_field) or "") for row in rows])
+    logged_lat = np.array([row.get(lat_field) for row in rows], dtype=np.float64)
+    logged_lon = np.array([row.get(lon_field) for row in rows], dtype=np.float64)
+    logged = ~np.isnan(logged_lat) & ~np.isnan(logged_lon)
+    return np.where(logged, logged_lat, lat), np.where(logged, logged_lon, lon)
+
+
+def fill_distance(qsos: list, overwrite: bool = False) -> int:
+    """
+    Sets distance, kilometers along the logged ant_path, on the qsos where both ends are known. Only qsos without
+    a distance unless overwrite. Returns the number of qsos set.
+    """
+    # the field values are read straight from the model data, the field descriptors cost more than the maths
+    qsos = [qso for qso in qsos if overwrite or qso.__data__.get('distance') is None]
+    if not qsos:
+        return 0
+    rows = [qso.__data__ for qso in qsos]
+    my_lat, my_lon = _positions(rows, 'my_lat', 'my_lon', 'my_gridsquare')
+    lat, lon = _positions(rows, 'lat', 'lon', 'gridsquare')
+    kilometers = distance_km(my_lat, my_lon, lat, lon)
+    long_path = np.array([row.get('ant_path') == 'L' for row in rows], dtype=bool)
+    kilometers = np.where(long_path, long_path_km(kilometers), kilometers)
+    filled = 0
+    for qso, value in zip(qsos, kilometers.tolist()):
+        if value == value:  # not nan
+            qso.distance = round(value)
+            filled += 1
+    return filled
@@ -7,6 +7,8 @@ from datetime import datetime
 from math import asin, atan2, cos, pi, radians, sin, sqrt
 from decimal import Decimal
 
+from qsourcelogger.lib import bandplan, geodesy
+
 logger = logging.getLogger("ham_utility")
 
 
@@ -53,196 +55,42 @@ def calculate_wpx_prefix(the_call: str) -> str:
 
 def gridtolatlon(maiden):
     """
-    Converts a maidenhead gridsquare to a latitude longitude pair.
+    Converts a maidenhead gridsquare to the latitude longitude pair of its centre.
+    Returns 0, 0 if it is not a gridsquare.
     """
-    try:
-        maiden = str(maiden).strip().upper()
-
-        chars_in_grid_square = len(maiden)
-        if not 8 >= chars_in_grid_square >= 2 and chars_in_grid_square % 2 == 0:
-            return 0, 0
-
-        lon = (ord(maiden[0]) - 65) * 20 - 180
-        lat = (ord(maiden[1]) - 65) * 10 - 90
-
-        if chars_in_grid_square >= 4:
-            lon += (ord(maiden[2]) - 48) * 2
-            lat += ord(maiden[3]) - 48
-
-        if chars_in_grid_square >= 6:
-            lon += (ord(maiden[4]) - 65) / 12 + 1 / 24
-            lat += (ord(maiden[5]) - 65) / 24 + 1 / 48
-
-        if chars_in_grid_square >= 8:
-            lon += (ord(maiden[6])) * 5.0 / 600
-            lat += (ord(maiden[7])) * 2.5 / 600
-
-        return round(lat, 4), round(lon, 4)
-    except IndexError:
+    latlon = geodesy.grid_to_latlon(str(maiden or ""))
+    if latlon is None:
         return 0, 0
+    return round(latlon[0], 4), round(latlon[1], 4)
 
 
 def getband(freq) -> str:
     """
-    Convert a (string) frequency into a (string) band.
-    Returns a (string) band.
+    Convert a frequency in hz (int or string) into the operating band of the station's IARU region.
+    Returns the band as the gui names it, "20", "1.25" or "70cm".
     Returns a "0" if frequency is out of band.
     """
-    # logger.info("getband: %s %s", type(freq), freq)
-    frequency = int(float(freq))
-
-    if 2000000 > frequency > 1800000:
-        return "160"
-    if 4000000 > frequency > 3500000:
-        return "80"
-    if 5406000 > frequency > 5330000:
-        return "60"
-    if 7300000 > frequency > 7000000:
-        return "40"
-    if 10150000 > frequency > 10100000:
-        return "30"
-    if 14350000 > frequency > 14000000:
-        return "20"
-    if 18168000 > frequency > 18068000:
-        return "17"
-    if 21450000 > frequency > 21000000:
-        return "15"
-    if 24990000 > frequency > 24890000:
-        return "12"
-    if 29700000 > frequency > 28000000:
-        return "10"
-    if 54000000 > frequency > 50000000:
-        return "6"
-    if 148000000 > frequency > 144000000:
-        return "2"
-    if 225000000 > frequency > 222000000:
-        return "1.25"
-    if 450000000 > frequency > 420000000:
-        return "70cm"
-    if 928000000 > frequency > 902000000:
-        return "33cm"
-    if 1300000000 > frequency > 1240000000:
-        return "23cm"
-    return "0"
+    band = bandplan.operating_band(int(float(freq or 0)))
+    return band.short if band else "0"
 
 def get_n1mm_band(freq: str) -> str:
     return get_logged_band(freq)
 
 def get_logged_band(freq: str) -> str:
     """
-    Convert a (string) frequency into a (string) band.
-    Returns a (string) band.
+    Convert a frequency in hz (int or string) into the band N1MM packets use, "14".
     Returns a "0" if frequency is out of band.
     """
-
-    if freq.isnumeric():
-        frequency = int(float(freq))
-        if 2000000 >= frequency >= 1800000:
-            return "1.8"
-        if 4000000 >= frequency >= 3500000:
-            return "3.5"
-        if 5406000 >= frequency >= 5330000:
-            return "5"
-        if 7300000 >= frequency >= 7000000:
-            return "7"
-        if 10150000 >= frequency >= 10100000:
-            return "10"
-        if 14350000 >= frequency >= 14000000:
-            return "14"
-        if 18168000 >= frequency >= 18068000:
-            return "18"
-        if 21450000 >= frequency >= 21000000:
-            return "21"
-        if 24990000 >= frequency >= 24890000:
-            return "24"
-        if 29700000 >= frequency >= 28000000:
-            return "28"
-        if 54000000 >= frequency >= 50000000:
-            return "50"
-        if 148000000 >= frequency >= 144000000:
-            return "144"
-        if 225000000 >= frequency >= 222000000:
-            return "222"
-        if 450000000 >= frequency >= 420000000:
-            return "432"
-        if 928000000 >= frequency >= 902000000:
-            return "902"
-        if 1300000000 >= frequency >= 1240000000:
-            return "1296"
-        if 10500000000 >= frequency >= 2300000000:
-            return "2300+"
-    return "0"
+    if isinstance(freq, str) and not freq.isnumeric():
+        return "0"
+    band = bandplan.logged_band(int(freq))
+    return band.n1mm if band else "0"
 
 
 def get_adif_band(freq: Decimal) -> str:
-    """xxx"""
-    if 7500000 >= freq >= 300000:
-        return "submm"
-    if 250000 >= freq >= 241000:
-        return "1mm"
-    if 149000 >= freq >= 134000:
-        return "2mm"
-    if 123000 >= freq >= 119980:
-        return "2.5mm"
-    if 81000 >= freq >= 75500:
-        return "4mm"
-    if 47200 >= freq >= 47000:
-        return "6mm"
-    if 24250 >= freq >= 24000:
-        return "1.25cm"
-    if 10500 >= freq >= 10000:
-        return "3cm"
-    if 5925 >= freq >= 5650:
-        return "6cm"
-    if 3500 >= freq >= 3300:
-        return "9cm"
-    if 2450 >= freq >= 2300:
-        return "13cm"
-    if 1300 >= freq >= 1240:
-        return "23cm"
-    if 928 >= freq >= 902:
-        return "33cm"
-    if 450 >= freq >= 420:
-        return "70cm"
-    if 225 >= freq >= 222:
-        return "1.25m"
-    if 148 >= freq >= 144:
-        return "2m"
-    if 71 >= freq >= 70:
-        return "4m"
-    if 69.9 >= freq >= 54.000001:
-        return "5m"
-    if 54 >= freq >= 50:
-        return "6m"
-    if 45 >= freq >= 40:
-        return "8m"
-    if 29.7 >= freq >= 28.0:
-        return "10m"
-    if 24.99 >= freq >= 24.890:
-        return "12m"
-    if 21.45 >= freq >= 21.0:
-        return "15m"
-    if 18.168 >= freq >= 18.068:
-        return "17m"
-    if 14.35 >= freq >= 14.0:
-        return "20m"
-    if 10.15 >= freq >= 10.1:
-        return "30m"
-    if 7.3 >= freq >= 7.0:
-        return "40m"
-    if 5.45 >= freq >= 5.06:
-        return "60m"
-    if 4.0 >= freq >= 3.5:
-        return "80m"
-    if 2.0 >= freq >= 1.8:
-        return "160m"
-    if 0.504 >= freq >= 0.501:
-        return "560m"
-    if 0.479 >= freq >= 0.472:
-        return "630m"
-    if 0.1378 >= freq >= 0.1357:
-        return "2190m"
-    return "0m"
+    """Convert a frequency in mhz into the ADIF band, "0m" if it is out of band"""
+    band = bandplan.logged_band(round(freq * 1_000_000))
+    return band.adif if band else "0m"
 
 
 def fakefreq(band: str, mode: str) -> str:
@@ -1,7 +1,7 @@
 import datetime
 
 import qsourcelogger
-from .common import ParseError, WriteError, adif_field, convert_field, convert_freq_to_band
+from .common import ParseError, WriteError, adif_field, convert_field
 from unidecode import unidecode
 
 from ... import version
@@ -44,15 +44,9 @@ class ADIReader:
             raise ParseError(self._line_num, 'missing time_on field')
         if 'call' not in res:
             raise ParseError(self._line_num, 'missing call field')
-        if 'band' not in res:
-            if 'freq' in res:
-                tmpband = convert_freq_to_band(res['freq'])
-                if tmpband:
-                    res['band'] = convert_freq_to_band(res['freq'])
-                else:
-                    raise ParseError(self._line_num, 'error in freq to band conversion')
-            else:
-                raise ParseError(self._line_num, 'missing band field')
+        if 'band' not in res and 'freq' not in res:
+            # a band missing is resolved from freq for the whole log at once by the importer
+            raise ParseError(self._line_num, 'missing band field')
         if 'mode' not in res:
             raise ParseError(self._line_num, 'missing mode field')
 
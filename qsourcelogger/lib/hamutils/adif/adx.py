@@ -47,7 +47,7 @@ class ADXReader:
                 raise ParseError(0, 'missing time_on field')
             if 'call' not in res:
                 raise ParseError(0, 'missing call field')
-            if 'band' not in res:
+            if 'band' not in res and 'freq' not in res:
                 raise ParseError(0, 'missing band field')
             if 'mode' not in res:
                 raise ParseError(0, 'missing mode field')
@@ -6,16 +6,21 @@ HamQTH
 """
 import dataclasses
 import logging
-from typing import Optional
+from collections import deque
+from datetime import timedelta
+from typing import Optional, Iterable
 
 import xmltodict
 from PyQt6 import QtNetwork
 from PyQt6.QtCore import QObject, QUrl, QUrlQuery
 from PyQt6.QtNetwork import QNetworkRequest, QNetworkReply
 
+import qsourcelogger.fsutils as fsutils
 import qsourcelogger.lib.event as appevent
 from qsourcelogger.lib.ham_utility import get_call_base
 from qsourcelogger.model import QsoLog
+from qsourcelogger.model.callsign_db import CallsignDatabase
+from qsourcelogger.model.lookup_cache import LookupCache
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +36,8 @@ class ExternalCallLookupService(QObject):
         nickname: Optional[str] = None
         profile_image: Optional[str] = None
         source_result: dict = None
+        # true when the result was answered from the local lookup cache rather than the network
+        from_cache: bool = False
 
         def __init__(self, call):
             self.call = call
@@ -44,30 +51,57 @@ class ExternalCallLookupService(QObject):
     def did_init(self) -> bool:
         return self.init_flag
 
-    def lookup(self, call: str) -> Optional[Result]:
-        pass
+    def create_request(self, call: str) -> Optional[QNetworkRequest]:
+        """Network request for looking up call, None if the service is not ready to take requests"""
+        return None
+
+    def parse_response(self, call: str, data: bytes) -> Optional[Result]:
+        """Parse the body of a reply to create_request, None if the call was not found"""
+        return None
+
+    def lookup(self, call: str) -> None:
+        """
+        Lookup a call. async result sent in app event. Any number of lookups can be in flight at once, use
+        LookupScheduler to bound and cancel them.
+        """
+        request = self.create_request(call)
+        if request:
+            reply = self.network_access_manager.get(request)
+            reply.finished.connect(lambda: self.handle_reply(call, reply))
+
+    def handle_reply(self, call: str, reply: QNetworkReply) -> Optional[Result]:
+        er = reply.error()
+        reply.deleteLater()
+        if er == QNetworkReply.NetworkError.OperationCanceledError:
+            return None
+        if er != QNetworkReply.NetworkError.NoError:
+            logger.error(reply.errorString())
+            return None
+        try:
+            result = self.parse_response(call, bytes(reply.readAll()))
+        except Exception:
+            logger.exception(f"Error parsing {type(self).__name__} call search response")
+            return None
+        if result:
+            appevent.emit(appevent.ExternalLookupResult(result))
+        return result
 
 
 class HamDBlookup(ExternalCallLookupService):
     """
     Class manages HamDB lookups.
     """
-    call = ''
-    def __init__(self, parent=None) -> None:
+    def __init__(self, url: str = None, parent=None) -> None:
         super().__init__(parent=parent)
         self.init_flag = True
-        self.url = "https://api.hamdb.org/"
-        self.reply = None
+        self.url = url or "https://api.hamdb.org/"
 
-    def lookup(self, call: str) -> ExternalCallLookupService.Result:
-        self.call = call
-        if not self.reply:
-            self.reply = self.network_access_manager.get(QNetworkRequest(QUrl(self.url + call + "/xml/wfd_logger")))
-            self.reply.finished.connect(self.handle_lookup)
+    def create_request(self, call: str) -> Optional[QNetworkRequest]:
+        return QNetworkRequest(QUrl(self.url + call + "/xml/wfd_logger"))
 
-    def handle_lookup(self):
+    def parse_response(self, call: str, data: bytes) -> Optional[ExternalCallLookupService.Result]:
         """
-        Lookup a call on QRZ
+        Lookup a call on HamDB
 
         <?xml version="1.0" encoding="utf-8"?>
         <hamdb version="1.0">
@@ -94,44 +128,39 @@ class HamDBlookup(ExternalCallLookupService):
         </messages>
         </hamdb>
         """
-        er = self.reply.error()
-        self.reply.deleteLater()
-        if er != QtNetwork.QNetworkReply.NetworkError.NoError:
-            logger.error(self.reply.errorString())
-            self.reply = None
-        else:
-            result = ExternalCallLookupService.Result(self.call)
-            rootdict = xmltodict.parse(str(self.reply.readAll(), 'utf-8'))
-            self.reply = None
-            root = rootdict.get("hamdb")
-            if root:
-                messages = root.get("messages")
-                callsign = root.get("callsign")
-            if messages:
-                error_text = messages.get("status")
-                logger.debug("HamDB: %s", error_text)
-            if callsign:
-                result.source_result = callsign
-                logger.debug(f"HamDB: found callsign field, response call = {callsign.get('call', None)}")
-                if self.call != callsign.get("call", None):
-                    logger.warning(f"response callsign {callsign.get('call', None)} doesn't match requested callsign {self.call}. aborting external lookup")
-                    return
-                if callsign.get("grid"):
-                    result.grid = callsign.get("grid")
-                if callsign.get("fname"):
-                    result.name = callsign.get("fname")
-                    result.first_name = callsign.get("fname").split()[0]
-                if callsign.get('image'):
-                    result.profile_image = callsign.get('image')
-                if callsign.get("name"):
-                    if not result.name:
-                        result.name = callsign.get("name")
-                    else:
-                        result.name = f"{result.name} {callsign.get('name')}"
-                if callsign.get("nickname"):
-                    result.nickname = callsign.get("nickname")
-
-            appevent.emit(appevent.ExternalLookupResult(result))
+        result = ExternalCallLookupService.Result(call)
+        rootdict = xmltodict.parse(str(data, 'utf-8'))
+        root = rootdict.get("hamdb")
+        messages = None
+        callsign = None
+        if root:
+            messages = root.get("messages")
+            callsign = root.get("callsign")
+        if messages:
+            error_text = messages.get("status")
+            logger.debug("HamDB: %s", error_text)
+        if not callsign:
+            return None
+        result.source_result = callsign
+        logger.debug(f"HamDB: found callsign field, response call = {callsign.get('call', None)}")
+        if call != callsign.get("call", None):
+            logger.warning(f"response callsign {callsign.get('call', None)} doesn't match requested callsign {call}. aborting external lookup")
+            return None
+        if callsign.get("grid"):
+            result.grid = callsign.get("grid")
+        if callsign.get("fname"):
+            result.name = callsign.get("fname")
+            result.first_name = callsign.get("fname").split()[0]
+        if callsign.get('image'):
+            result.profile_image = callsign.get('image')
+        if callsign.get("name"):
+            if not result.name:
+                result.name = callsign.get("name")
+            else:
+                result.name = f"{result.name} {callsign.get('name')}"
+        if callsign.get("nickname"):
+            result.nickname = callsign.get("nickname")
+        return result
 
 
 class QRZlookup(ExternalCallLookupService):
@@ -140,15 +169,16 @@ class QRZlookup(ExternalCallLookupService):
     """
     init_flag = False
 
-    def __init__(self, username: str, password: str, parent=None) -> None:
+    def __init__(self, username: str, password: str, url: str = None, parent=None) -> None:
         super().__init__(parent=parent)
-        self.call_reply: QNetworkReply = None
         self.session = False
+        self.session_reply: QNetworkReply = None
         self.expiration = False
         self.username = username
         self.password = password
-        self.qrzurl = "https://xmldata.qrz.com/xml/134/"
+        self.qrzurl = url or "https://xmldata.qrz.com/xml/134/"
         self.message = False
+        self.error = False
         self.lastresult = False
         self.getsession()
         if self.session:
@@ -180,6 +210,9 @@ class QRZlookup(ExternalCallLookupService):
         Message	An informational message for the user
         Error	XML system error message
         """
+        if self.session_reply:
+            # a session request is already under way
+            return
         self.session = False
 
         url = QUrl(self.qrzurl)
@@ -192,16 +225,14 @@ class QRZlookup(ExternalCallLookupService):
         self.session_reply.finished.connect(self.handle_session)
         logger.info("attempting to connect to qrz auth")
 
-        #payload = {"username": self.username, "password": self.password}
-        #query_result = requests.get(self.qrzurl, params=payload, timeout=10.0)
-
     def handle_session(self):
         er = self.session_reply.error()
         self.session_reply.deleteLater()
+        reply, self.session_reply = self.session_reply, None
         if er != QtNetwork.QNetworkReply.NetworkError.NoError:
-            logger.error(self.session_reply.errorString())
+            logger.error(reply.errorString())
         else:
-            baseroot = xmltodict.parse(str(self.session_reply.readAll(), 'utf-8'))
+            baseroot = xmltodict.parse(str(reply.readAll(), 'utf-8'))
             root = baseroot.get("QRZDatabase")
             if root:
                 session = root.get("Session")
@@ -222,89 +253,78 @@ class QRZlookup(ExternalCallLookupService):
                         self.error,
                         self.message)
 
-    def lookup(self, call: str, is_retry=False) -> None:
-        """
-        Lookup a call on QRZ. async result sent in app event
-        """
-        if self.session and not self.call_reply:
-            self.call = get_call_base(call)
-            url = QUrl(self.qrzurl)
-            query = QUrlQuery()
-            query.addQueryItem("s", self.session)
-            query.addQueryItem("callsign", self.call)
-            url.setQuery(query.query())
-            logger.debug(f"query {url}")
-            self.call_reply = self.network_access_manager.get(QNetworkRequest(url))
-            self.call_reply.finished.connect(self.handle_lookup)
-
-    def handle_lookup(self):
-        er = self.call_reply.error()
-        self.call_reply.deleteLater()
-        if er != QtNetwork.QNetworkReply.NetworkError.NoError:
-            logger.error(self.call_reply.errorString())
-            self.call_reply = None
-        else:
-            try:
-                baseroot = xmltodict.parse(str(self.call_reply.readAll(), 'utf-8'))
-                self.call_reply = None
-            except:
-                logger.exception("Error parsing qrz call search response")
-                return
-            logger.debug(f"xml lookup {baseroot}\n")
-            root = baseroot.get("QRZDatabase")
-            session = root.get("Session")
-
-            if session.get('Error', None):
-                logger.info(f"Lookup error: {session.get('Error')}")
-
-            if not session.get("Key"):
-                # key expired get a new one
-                logger.info("qrz session key expired or missing, getting new one.")
-                self.getsession()
-
-            result = ExternalCallLookupService.Result(self.call)
-            result.source_result = root.get("Callsign")
-            if not result.source_result:
-                # probably callsign not found
-                return
-            if self.call != result.source_result.get("call", None):
-                logger.warning(
-                    f"response callsign {result.source_result.get('call', None)} doesn't match requested callsign {self.call}. aborting external lookup")
-                return
-
-            result.name = result.source_result.get('name', None)
-            if 'fname' in result.source_result:
-                result.first_name = result.source_result['fname'].split()[0]
-                if result.name:
-                    result.name = result.source_result['fname'] + ' ' + result.name
-                else:
-                    result.name = result.source_result['fname']
-            if result.source_result.get('xref', None):
-                # if the searched call is an alias to another profile, the searched for callsign will appear in xref
-                result.call = result.source_result['xref']
-            result.grid = result.source_result.get('grid', None)
-            result.nickname = result.source_result.get('nickname', None)
-            result.profile_image = result.source_result.get('image', None)
-            appevent.emit(appevent.ExternalLookupResult(result))
+    def create_request(self, call: str) -> Optional[QNetworkRequest]:
+        if not self.session:
+            return None
+        url = QUrl(self.qrzurl)
+        query = QUrlQuery()
+        query.addQueryItem("s", self.session)
+        query.addQueryItem("callsign", get_call_base(call))
+        url.setQuery(query.query())
+        logger.debug(f"query {url}")
+        return QNetworkRequest(url)
+
+    def parse_response(self, call: str, data: bytes) -> Optional[ExternalCallLookupService.Result]:
+        call = get_call_base(call)
+        baseroot = xmltodict.parse(str(data, 'utf-8'))
+        logger.debug(f"xml lookup {baseroot}\n")
+        root = baseroot.get("QRZDatabase")
+        session = root.get("Session")
+
+        if session.get('Error', None):
+            logger.info(f"Lookup error: {session.get('Error')}")
+
+        if not session.get("Key"):
+            # key expired get a new one
+            logger.info("qrz session key expired or missing, getting new one.")
+            self.getsession()
+
+        result = ExternalCallLookupService.Result(call)
+        result.source_result = root.get("Callsign")
+        if not result.source_result:
+            # probably callsign not found
+            return None
+        if call != result.source_result.get("call", None):
+            logger.warning(
+                f"response callsign {result.source_result.get('call', None)} doesn't match requested callsign {call}. aborting external lookup")
+            return None
+
+        result.name = result.source_result.get('name', None)
+        if 'fname' in result.source_result:
+            result.first_name = result.source_result['fname'].split()[0]
+            if result.name:
+                result.name = result.source_result['fname'] + ' ' + result.name
+            else:
+                result.name = result.source_result['fname']
+        if result.source_result.get('xref', None):
+            # if the searched call is an alias to another profile, the searched for callsign will appear in xref
+            result.call = result.source_result['xref']
+        result.grid = result.source_result.get('grid', None)
+        result.nickname = result.source_result.get('nickname', None)
+        result.profile_image = result.source_result.get('image', None)
+        return result
 
 
 class HamQTH(ExternalCallLookupService):
     """HamQTH lookup"""
 
-    def __init__(self, username: str, password: str) -> None:
+    def __init__(self, username: str, password: str, parent=None) -> None:
         """initialize HamQTH lookup"""
+        super().__init__(parent=parent)
         self.username = username
         self.password = password
         self.url = "https://www.hamqth.com/xml.php"
         self.session = False
+        self.session_reply: QNetworkReply = None
         self.error = False
         self.getsession()
         if self.session:
             self.init_flag = True
 
-
     def getsession(self) -> None:
         """get a session key"""
+        if self.session_reply:
+            return
         self.session = False
 
         url = QUrl(self.url)
@@ -317,16 +337,14 @@ class HamQTH(ExternalCallLookupService):
         self.session_reply.finished.connect(self.handle_session)
         logger.info("attempting to connect to auth session")
 
-
     def handle_session(self):
         er = self.session_reply.error()
         self.session_reply.deleteLater()
+        reply, self.session_reply = self.session_reply, None
         if er != QtNetwork.QNetworkReply.NetworkError.NoError:
-            logger.error(self.session_reply.errorString())
+            logger.error(reply.errorString())
         else:
-            baseroot = xmltodict.parse(str(self.session_reply.readAll(), 'utf-8'))
-            self.session_reply.deleteLater()
-            self.session_reply = None
+            baseroot = xmltodict.parse(str(reply.readAll(), 'utf-8'))
             root = baseroot.get("HamQTH")
             session = root.get("session")
             if session:
@@ -337,52 +355,228 @@ class HamQTH(ExternalCallLookupService):
                     logger.error(session.get("error"))
             logger.info("session: %s", self.session)
 
-    def lookup(self, call: str, is_retry=False) -> Optional[ExternalCallLookupService.Result]:
+    def create_request(self, call: str) -> Optional[QNetworkRequest]:
+        if not self.session:
+            return None
+        url = QUrl(self.url)
+        query = QUrlQuery()
+        query.addQueryItem("id", self.session)
+        query.addQueryItem("callsign", call)
+        query.addQueryItem("prg", "wfdlogger")
+        url.setQuery(query.query())
+        logger.debug(f"query {url}")
+        return QNetworkRequest(url)
+
+    def parse_response(self, call: str, data: bytes) -> Optional[ExternalCallLookupService.Result]:
+        baseroot = xmltodict.parse(str(data, 'utf-8'))
+        logger.debug(baseroot)
+        root = baseroot.get("HamQTH")
+        search = root.get("search")
+        session = root.get("session")
+        if not search:
+            if session:
+                if session.get("error"):
+                    if session.get("error") == "Session does not exist or expired":
+                        self.getsession()
+                    logger.error(f"lookup {call}: {session.get('error')}")
+            return None
+        result = ExternalCallLookupService.Result(call)
+        result.source_result = search
+        if search.get("grid"):
+            result.grid = search.get("grid")
+        if search.get("nick"):
+            result.nickname = search.get("nick")
+        if search.get("adr_name"):
+            result.name = search.get("adr_name")
+        return result
+
+
+class OfflineLookup(ExternalCallLookupService):
+    """
+    Looks calls up in the local bulk callsign database (fcc uls or csv import). Needs no network and answers in
+    microseconds, so it is not worth caching or scheduling.
+    """
+
+    def __init__(self, database: CallsignDatabase, parent=None) -> None:
+        super().__init__(parent=parent)
+        self.database = database
+        self.init_flag = True
+
+    def lookup(self, call: str) -> None:
+        call = call.strip().upper()
+        row = self.database.get(get_call_base(call) or '')
+        if not row:
+            return
+        result = ExternalCallLookupService.Result(call)
+        result.source_result = row
+        result.grid = row['grid']
+        result.name = row['name']
+        result.first_name = row['first_name']
+        appevent.emit(appevent.ExternalLookupResult(result))
+
+
+class LookupScheduler(ExternalCallLookupService):
+    """
+    Sits in front of a network lookup service.
+
+    - answers from the local lookup cache, refreshing stale entries in the background
+    - the call being entered always gets a request, superseded requests for earlier calls are aborted
+    - bounded number of requests in flight, prefetch requests only use the free slots
+    - prefetched results are written to the cache without being announced, so they are ready once the operator
+      gets to that call
+
+    Parameters
+    ----------
+    service: network lookup service that builds and parses the requests
+    cache: lookup cache
+    max_concurrent: maximum requests in flight
+    """
+
+    max_prefetch_queue = 20
+
+    def __init__(self, service: ExternalCallLookupService, cache: LookupCache, max_concurrent: int = 4,
+                 parent=None) -> None:
+        super().__init__(parent=parent)
+        self.service = service
+        self.cache = cache
+        self.max_concurrent = max(max_concurrent, 1)
+        self.init_flag = True
+        self.foreground_call: Optional[str] = None
+        # base call -> [reply, requested call, is foreground]
+        self.in_flight: dict[str, list] = {}
+        self.prefetch_queue: deque[str] = deque()
+        self.stats = {'requests': 0, 'cancelled': 0, 'cache_hits': 0, 'prefetched': 0}
+
+    def lookup(self, call: str) -> None:
+        call = call.strip().upper()
+        base = get_call_base(call)
+        if not base:
+            return
+        self.foreground_call = call
+
+        for other, entry in list(self.in_flight.items()):
+            if entry[2] and other != base:
+                logger.debug(f"cancelling superseded lookup of {entry[1]}")
+                self.stats['cancelled'] += 1
+                entry[0].abort()
+
+        cached = self.cache.get(call)
+        if cached:
+            self.stats['cache_hits'] += 1
+            fields, stale = cached
+            appevent.emit(appevent.ExternalLookupResult(self._result_from_cache(call, fields)))
+            if not stale:
+                return
+            logger.debug(f"lookup cache entry for {call} is stale, refreshing")
+
+        if base in self.in_flight:
+            # already being prefetched, announce the result when it arrives
+            self.in_flight[base][2] = True
+            return
+        if base in self.prefetch_queue:
+            self.prefetch_queue.remove(base)
+        if len(self.in_flight) >= self.max_concurrent:
+            self._abort_one_prefetch()
+        self._start(call, True)
+
+    def prefetch(self, calls: Iterable[str]) -> None:
         """
-        Lookup a call on HamQTH
+        Queue likely upcoming calls for lookup. Replaces whatever was still waiting from a previous prefetch
         """
-        if self.session and not self.call_reply:
-            self.call = call
-            url = QUrl(self.self.url)
-            query = QUrlQuery()
-            query.addQueryItem("id", self.session)
-            query.addQueryItem("callsign", call)
-            query.addQueryItem("prg", "wfdlogger")
-            url.setQuery(query.query())
-            logger.debug(f"query {url}")
-            self.call_reply = self.network_access_manager.get(QNetworkRequest(url))
-            self.call_reply.finished.connect(self.handle_lookup)
-
-    def handle_lookup(self):
-        er = self.call_reply.error()
-        self.call_reply.deleteLater()
-        if er != QtNetwork.QNetworkReply.NetworkError.NoError:
-            logger.error(self.call_reply.errorString())
-            self.call_reply = None
+        if not self.service.did_init():
+            return
+        self.prefetch_queue.clear()
+        for call in calls:
+            base = get_call_base((call or '').strip().upper())
+            if not base or base in self.in_flight or base in self.prefetch_queue:
+                continue
+            cached = self.cache.get(base)
+            if cached and not cached[1]:
+                continue
+            self.prefetch_queue.append(base)
+            if len(self.prefetch_queue) >= self.max_prefetch_queue:
+                break
+        self._pump()
+
+    def _result_from_cache(self, call: str, fields: dict) -> ExternalCallLookupService.Result:
+        result = ExternalCallLookupService.Result(call)
+        for f in dataclasses.fields(result):
+            if f.name not in ('call', 'from_cache') and f.name in fields:
+                setattr(result, f.name, fields[f.name])
+        result.from_cache = True
+        return result
+
+    def _abort_one_prefetch(self):
+        for entry in list(self.in_flight.values()):
+            if not entry[2]:
+                self.stats['cancelled'] += 1
+                entry[0].abort()
+                return
+
+    def _pump(self):
+        while self.prefetch_queue and len(self.in_flight) < self.max_concurrent:
+            self._start(self.prefetch_queue.popleft(), False)
+
+    def _start(self, call: str, foreground: bool):
+        request = self.service.create_request(call)
+        if not request:
+            return
+        base = get_call_base(call)
+        reply = self.network_access_manager.get(request)
+        self.in_flight[base] = [reply, call, foreground]
+        self.stats['requests'] += 1
+        reply.finished.connect(lambda: self._finished(base, reply))
+
+    def _finished(self, base: str, reply: QNetworkReply):
+        entry = self.in_flight.get(base)
+        if entry and entry[0] is reply:
+            del self.in_flight[base]
         else:
+            entry = [reply, base, False]
+        _, call, foreground = entry
+
+        er = reply.error()
+        reply.deleteLater()
+        if er == QNetworkReply.NetworkError.NoError:
             try:
-                baseroot = xmltodict.parse(str(self.call_reply.readAll(), 'utf-8'))
-                self.call_reply = None
-            except:
-                logger.exception("Error parsing qrz call search response")
-                return
-            logger.debug(baseroot)
-            root = baseroot.get("HamQTH")
-            search = root.get("search")
-            session = root.get("session")
-            if not search:
-                if session:
-                    if session.get("error"):
-                        if session.get("error") == "Session does not exist or expired":
-                            self.getsession()
-                        logger.error(f"lookup {self.call}: {session.get('error')}")
-                return
-            result = ExternalCallLookupService.Result(self.call)
-            result.source_result = search
-            if search.get("grid"):
-                result.grid = search.get("grid")
-            if search.get("nick"):
-                result.nickname = search.get("nick")
-            if search.get("adr_name"):
-                result.name = search.get("adr_name")
-            appevent.emit(appevent.ExternalLookupResult(result))
+                result = self.service.parse_response(call, bytes(reply.readAll()))
+            except Exception:
+                logger.exception(f"Error parsing {type(self.service).__name__} call search response")
+                result = None
+            if result:
+                try:
+                    self.cache.put(call, dataclasses.asdict(result), source=type(self.service).__name__)
+                except Exception:
+                    logger.exception(f"Could not cache lookup result for {call}")
+                if foreground:
+                    appevent.emit(appevent.ExternalLookupResult(result))
+                else:
+                    self.stats['prefetched'] += 1
+        elif er != QNetworkReply.NetworkError.OperationCanceledError:
+            logger.error(reply.errorString())
+        self._pump()
+
+
+_lookup_cache: Optional[LookupCache] = None
+
+
+def get_lookup_cache() -> LookupCache:
+    """Shared lookup cache in the user data directory"""
+    global _lookup_cache
+    if not _lookup_cache:
+        pref = fsutils.read_settings()
+        _lookup_cache = LookupCache(fsutils.USER_DATA_PATH / 'lookup_cache.db',
+                                    ttl=timedelta(days=pref.get('lookup_cache_ttl_days', 30)),
+                                    max_entries=pref.get('lookup_cache_max_entries', 20000))
+    return _lookup_cache
+
+
+_callsign_database: Optional[CallsignDatabase] = None
+
+
+def get_callsign_database() -> CallsignDatabase:
+    """Shared offline callsign database in the user data directory"""
+    global _callsign_database
+    if not _callsign_database:
+        _callsign_database = CallsignDatabase(fsutils.USER_DATA_PATH / 'callsign_db.sqlite')
+    return _callsign_database
@@ -0,0 +1,364 @@
+"""
+Layered rendering of the world map. The map is drawn in four layers that change at very different rates:
+
+- the basemap (land, ocean and borders) only changes with the projection and the canvas size. It is rasterized
+  once per combination, kept in memory and cached on disk as a png, and drawn as a figure image.
+- the nightshade changes slowly, it is recomputed at most once every nightshade_interval seconds. A full canvas
+  draw (basemap image and nightshade) is only done then, on a resize and on a projection change, and the result is
+  kept as the blit background.
+- the worked station heat map is an image of pre-binned qso counts. It is drawn over the background only when
+  its bins changed and the result is kept as a second background.
+- the station, contact and path overlay is redrawn over the background with matplotlib blitting whenever the
+  station or the contact changes, which costs milliseconds.
+
+Works with any agg based canvas, the gui uses the Qt one.
+"""
+
+import datetime
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import cartopy
+import cartopy.crs as ccrs
+import matplotlib.image
+import numpy as np
+from cartopy.feature.nightshade import Nightshade
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure
+
+from qsourcelogger.lib import geodesy
+from qsourcelogger.model import QsoLog
+
+logger = logging.getLogger(__name__)
+
+# bump when the basemap style changes so stale cached images are not used
+BASEMAP_STYLE = 1
+
+
+def add_basemap_features(ax) -> None:
+    ax.add_feature(cartopy.feature.LAND, facecolor="#f3efe9")
+    ax.add_feature(cartopy.feature.OCEAN, facecolor="#a3d3de")
+    ax.add_feature(cartopy.feature.BORDERS, alpha=0.2)
+
+
+def _map_axes(figure: Figure, central_longitude: float):
+    figure.subplots_adjust(left=0, right=1, bottom=0, top=1)
+    ax = figure.add_subplot(1, 1, 1, projection=ccrs.PlateCarree(central_longitude=central_longitude),
+                            frame_on=False)
+    ax.set_global()
+    # the basemap is a figure image under the axes
+    ax.patch.set_visible(False)
+    return ax
+
+
+class WorkedBins:
+    """
+    Qso counts binned by position, one bin per 4 character grid square (2 degrees of longitude by 1 of latitude).
+    Loaded with one query and a histogram2d, then kept current one qso at a time. version changes with the counts.
+    """
+
+    lon_step = 2
+    lat_step = 1
+
+    def __init__(self):
+        self.counts = np.zeros((180 // self.lat_step, 360 // self.lon_step), dtype=np.int32)
+        self.version = 0
+
+    @staticmethod
+    def positions(rows) -> tuple[np.ndarray, np.ndarray]:
+        """latitude and longitude arrays of (lat, lon, gridsquare) rows, from the locator where no lat/lon"""
+        rows = list(rows)
+        if not rows:
+            return np.empty(0), np.empty(0)
+        lat_column, lon_column, grid_column = zip(*rows)
+        lat = np.array(lat_column, dtype=np.float64)
+        lon = np.array(lon_column, dtype=np.float64)
+        missing = np.flatnonzero(np.isnan(lat) | np.isnan(lon))
+        if len(missing):
+            grid_lat, grid_lon = geodesy.grids_to_latlon([grid_column[i] for i in missing])
+            lat[missing] = grid_lat
+            lon[missing] = grid_lon
+        return lat, lon
+
+    def load(self, contest_id: Optional[int] = None) -> int:
+        """counts of the contest's qsos, or of the whole log, returns the number of qsos located"""
+        query = QsoLog.select(QsoLog.lat, QsoLog.lon, QsoLog.gridsquare)
+        if contest_id is not None:
+            query = query.where(QsoLog.fk_contest == contest_id)
+        lat, lon = self.positions(query.tuples())
+        return self.load_positions(lat, lon)
+
+    def load_positions(self, lat: np.ndarray, lon: np.ndarray) -> int:
+        located = ~np.isnan(lat) & ~np.isnan(lon)
+        counts, _, _ = np.histogram2d(lat[located], lon[located], bins=self.counts.shape,
+                                      range=[[-90, 90], [-180, 180]])
+        self.counts = counts.astype(np.int32)
+        self.version += 1
+        return int(np.count_nonzero(located))
+
+    def _bin(self, lat, lon) -> Optional[tuple[int, int]]:
+        if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return None
+        return (min(int((lat + 90) // self.lat_step), self.counts.shape[0] - 1),
+                min(int((lon + 180) // self.lon_step), self.counts.shape[1] - 1))
+
+    def add(self, lat, lon, count: int = 1) -> bool:
+        """counts a qso at the position in (or out with a negative count), False when it has no position"""
+        cell = self._bin(lat, lon)
+        if cell is None:
+            return False
+        self.counts[cell] = max(self.counts[cell] + count, 0)
+        self.version += 1
+        return True
+
+    def add_qso(self, qso: QsoLog, count: int = 1) -> bool:
+        lat, lon = qso.lat, qso.lon
+        if lat is None or lon is None:
+            lat, lon = geodesy.grid_to_latlon((qso.gridsquare or "").strip()) or (None, None)
+        return self.add(lat, lon, count)
+
+
+class MapLayers:
+    nightshade_interval = 60
+    basemap_memory = 4
+
+    def __init__(self, figure: Figure, canvas, cache_path: Optional[Path] = None):
+        self.figure = figure
+        self.canvas = canvas
+        self.cache_path = cache_path
+        self.central_longitude = 0.0
+        self.station: Optional[tuple[float, float]] = None
+        self.contact: Optional[tuple[float, float]] = None
+
+        self.ax = None
+        self.basemap_key = None
+        self.basemap_image = None
+        self.basemaps: dict[tuple, np.ndarray] = {}
+        self.nightshade = []
+        self.nightshade_at = 0.0
+        self.background = None
+        self.worked: Optional[WorkedBins] = None
+        self.worked_version = None
+        self.heat_images = []
+        self.heat_background = None
+        self.stats = {'basemap_renders': 0, 'basemap_disk_hits': 0, 'nightshade_renders': 0, 'full_draws': 0,
+                      'overlay_draws': 0, 'overlay_ms': 0.0, 'heat_renders': 0,
+                      'heat_ms': 0.0}
+
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _build(self):
+        """axes for the current projection, everything but the basemap pixels is recreated"""
+        self.figure.clf()
+        self.figure.set_facecolor("none")
+        self.ax = _map_axes(self.figure, self.central_longitude)
+        self.basemap_key = None
+        self.basemap_image = None
+        self.nightshade = []
+        self.background = None
+        geodetic = ccrs.Geodetic()
+        self.station_marker, = self.ax.plot([], [], marker='x', color='red', markersize=4, linewidth=1,
+                                            transform=geodetic, animated=True)
+        self.contact_marker, = self.ax.plot([], [], marker='o', color='red', markersize=2, transform=geodetic,
+                                            animated=True)
+        self.path_line, = self.ax.plot([], [], color="blue", transform=geodetic, animated=True)
+        self.heat_images = []
+        self.heat_background = None
+        self.worked_version = None
+        if self.worked:
+            self._update_heat_images()
+            self.worked_version = self.worked.version
+        self.update_basemap()
+        self.refresh_nightshade(force=True)
+        self._update_overlay_data()
+
+    def set_station(self, latitude: Optional[float], longitude: Optional[float]) -> None:
+        self.station = (latitude, longitude) if latitude is not None and longitude is not None else None
+        central_longitude = float(longitude or 0.0)
+        # the axes are built on first use, when the projection is known
+        if self.ax is None or central_longitude != self.central_longitude:
+            self.central_longitude = central_longitude
+            self._build()
+            self.canvas.draw_idle()
+            return
+        self.draw_overlay()
+
+    def set_contact(self, latitude: Optional[float], longitude: Optional[float]) -> None:
+        contact = (latitude, longitude) if latitude is not None and longitude is not None else None
+        if contact != self.contact:
+            self.contact = contact
+            self.draw_overlay()
+
+    def _basemap_size(self) -> tuple:
+        width, height = self.canvas.get_width_height(physical=True)
+        return round(self.central_longitude, 3), int(width), int(height), round(self.figure.dpi, 2)
+
+    def needs_basemap(self) -> bool:
+        return self._basemap_size() != self.basemap_key
+
+    def update_basemap(self) -> bool:
+        """puts the basemap for the current projection and size under the axes, False when it was current"""
+        key = self._basemap_size()
+        if self.ax is None or key == self.basemap_key:
+            return False
+        pixels = self.basemaps.get(key)
+        if pixels is None:
+            pixels = self._load_basemap(key)
+            self.basemaps[key] = pixels
+            while len(self.basemaps) > self.basemap_memory:
+                del self.basemaps[next(iter(self.basemaps))]
+        if self.basemap_image is None:
+            self.basemap_image = self.figure.figimage(pixels, origin='upper', zorder=-1)
+        else:
+            self.basemap_image.set_data(pixels)
+        self.basemap_key = key
+        return True
+
+    def _cache_file(self, key: tuple) -> Optional[Path]:
+        if self.cache_path is None:
+            return None
+        central_longitude, width, height, dpi = key
+        return self.cache_path / f"basemap_v{BASEMAP_STYLE}_{central_longitude:g}_{width}x{height}_{dpi:g}.png"
+
+    def _load_basemap(self, key: tuple) -> np.ndarray:
+        path = self._cache_file(key)
+        if path and path.exists():
+            try:
+                pixels = matplotlib.image.imread(path)
+                self.stats['basemap_disk_hits'] += 1
+                return pixels
+            except Exception:
+                logger.exception(f"could not read cached basemap {path}")
+        pixels = render_basemap(*key)
+        self.stats['basemap_renders'] += 1
+        if path:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                partial = path.with_suffix('.partial')
+                with open(partial, 'wb') as f:
+                    matplotlib.image.imsave(f, pixels, format='png')
+                os.replace(partial, path)
+            except OSError:
+                logger.exception(f"could not cache basemap {path}")
+        return pixels
+
+    def refresh_nightshade(self, force: bool = False) -> bool:
+        """recomputes the day/night terminator if it is older than the interval, the canvas needs a full draw"""
+        if self.ax is None or not force and time.monotonic() - self.nightshade_at < self.nightshade_interval:
+            return False
+        for artist in self.nightshade:
+            artist.remove()
+        date = datetime.datetime.now(datetime.UTC)
+        # abuse refraction to create a 'dusk' line
+        self.nightshade = [self.ax.add_feature(Nightshade(date, alpha=0.3, refraction=-1)),
+                           self.ax.add_feature(Nightshade(date, alpha=0.3, refraction=1))]
+        self.nightshade_at = time.monotonic()
+        self.stats['nightshade_renders'] += 1
+        return True
+
+    def _update_overlay_data(self):
+        station, contact = self.station, self.contact
+        if station:
+            self.station_marker.set_data([station[1]], [station[0]])
+        self.station_marker.set_visible(station is not None)
+        if station and contact:
+            self.contact_marker.set_data([contact[1]], [contact[0]])
+            self.path_line.set_data([station[1], contact[1]], [station[0], contact[0]])
+        self.contact_marker.set_visible(station is not None and contact is not None)
+        self.path_line.set_visible(station is not None and contact is not None)
+
+    def set_worked(self, worked: Optional[WorkedBins]) -> None:
+        """shows the heat map of the bins, or none"""
+        self.worked = worked
+        self.worked_version = None
+        self.update_worked()
+
+    def update_worked(self) -> bool:
+        """re-renders the heat map if its bins changed since it was last drawn"""
+        if self.ax is None:
+            return False
+        version = self.worked.version if self.worked else None
+        if version == self.worked_version:
+            return False
+        self.worked_version = version
+        if self.worked is None:
+            for image in self.heat_images:
+                image.remove()
+            self.heat_images = []
+        else:
+            self._update_heat_images()
+        self.heat_background = None
+        self.draw_overlay()
+        return True
+
+    def _update_heat_images(self):
+        counts = np.ma.masked_equal(self.worked.counts, 0)
+        vmax = max(int(self.worked.counts.max()), 2)
+        if not self.heat_images:
+            # the bins are in geographic longitude, the axes are centred on the station: one copy of the image
+            # where the bins start and one a world away to cover the rest of the axes. Placed in data coordinates,
+            # cartopy would regrid an image reaching past the projection's limits
+            start = -180 - self.central_longitude
+            for offset in (0, -360 if start > -180 else 360):
+                self.heat_images.append(self.ax.imshow(
+                    counts, origin='lower', extent=(start + offset, start + offset + 360, -90, 90),
+                    transform=self.ax.transData, cmap='inferno', norm=LogNorm(vmin=1, vmax=vmax), alpha=0.6,
+                    interpolation='nearest', animated=True))
+            # imshow rescales the axes to the image
+            self.ax.set_global()
+        for image in self.heat_images:
+            image.set_data(counts)
+            image.set_clim(1, vmax)
+
+    def _on_draw(self, _event):
+        if self.ax is None:
+            return
+        # a full draw leaves the canvas without the animated layers, keep it as the background and add them
+        self.stats['full_draws'] += 1
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.heat_background = None
+        self._blit_overlay()
+
+    def draw_overlay(self) -> None:
+        if self.ax is None:
+            return
+        self._update_overlay_data()
+        if self.background is None or self.needs_basemap():
+            # no background of the right size yet, the draw will bring the overlay along
+            self.canvas.draw_idle()
+            return
+        self._blit_overlay()
+
+    def _blit_overlay(self):
+        start = time.perf_counter()
+        if self.heat_images and self.heat_background is None:
+            self.canvas.restore_region(self.background)
+            for image in self.heat_images:
+                self.ax.draw_artist(image)
+            self.heat_background = self.canvas.copy_from_bbox(self.figure.bbox)
+            self.stats['heat_renders'] += 1
+            self.stats['heat_ms'] = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+        else:
+            self.canvas.restore_region(self.heat_background if self.heat_images else self.background)
+        for artist in (self.path_line, self.contact_marker, self.station_marker):
+            if artist.get_visible():
+                self.ax.draw_artist(artist)
+        self.canvas.blit(self.figure.bbox)
+        self.stats['overlay_draws'] += 1
+        self.stats['overlay_ms'] = (time.perf_counter() - start) * 1000
+
+
+def render_basemap(central_longitude: float, width: int, height: int, dpi: float) -> np.ndarray:
+    """rgba pixels of the basemap as a canvas of this size would show it, transparent outside the map"""
+    figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(figure)
+    figure.patch.set_alpha(0)
+    ax = _map_axes(figure, central_longitude)
+    add_basemap_features(ax)
+    canvas.draw()
+    return np.asarray(canvas.buffer_rgba()).copy()
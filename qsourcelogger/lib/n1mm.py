@@ -1,13 +1,130 @@
 import logging
+import queue
 import socket
-
-from dicttoxml import dicttoxml
+import threading
+import time
+from typing import Optional
+from xml.sax.saxutils import escape
 
 from . import event as appevent, ham_utility
 from ..model import QsoLog
 
 logger = logging.getLogger(__name__)
 
+
+def _xml_value(value) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'True' if value else 'False'
+    return escape(str(value))
+
+
+class XmlTemplate:
+    """
+    Renders a flat packet of fixed fields. The document around the values is built once, rendering only escapes
+    and fills in the values.
+    """
+
+    def __init__(self, root: str, fields: tuple):
+        self.fields = fields
+        self.format = '<?xml version="1.0" encoding="UTF-8" ?>' + f'<{root}>' + \
+            ''.join(f'<{name}>{{{i}}}</{name}>' for i, name in enumerate(fields)) + f'</{root}>'
+
+    def render(self, payload: dict) -> bytes:
+        return self.format.format(*[_xml_value(payload.get(name)) for name in self.fields]).encode()
+
+
+class Broadcaster(threading.Thread):
+    """
+    Sends the packets on a background thread with one socket per destination.
+
+    Packets are sent in the order they were queued, except radio info: only the latest radio info is kept and it
+    is sent at most every radio_interval, so a rig poll or tuning knob does not flood the network or the queue.
+    """
+
+    radio_interval = 0.1
+
+    def __init__(self):
+        super().__init__(name='n1mm', daemon=True)
+        self.queue: queue.Queue = queue.Queue()
+        self.sockets: dict[tuple[str, int], socket.socket] = {}
+        self.templates: dict[tuple, XmlTemplate] = {}
+        self._radio_lock = threading.Lock()
+        self._radio: Optional[tuple] = None
+        self._radio_sent: Optional[bytes] = None
+        self._radio_due = 0.0
+        self.stats = {'packets': 0, 'radio_coalesced': 0, 'radio_unchanged': 0, 'errors': 0}
+
+    @staticmethod
+    def destinations(port_list: str) -> list[tuple[str, int]]:
+        result = []
+        for connection in port_list.split():
+            try:
+                ip_address, port = connection.split(":")
+                result.append((ip_address, int(port)))
+            except ValueError as returned_error:
+                logger.debug("%s", f"Bad IP:Port combination {connection} {returned_error}")
+        return result
+
+    def send(self, destinations: list, package_name: str, payload: dict):
+        self.queue.put((destinations, package_name, payload))
+
+    def send_radio(self, destinations: list, payload: dict):
+        with self._radio_lock:
+            if self._radio is not None:
+                self.stats['radio_coalesced'] += 1
+            self._radio = (destinations, payload)
+        # wake the thread
+        self.queue.put(None)
+
+    def close(self):
+        self.queue.put(False)
+
+    def run(self):
+        while True:
+            with self._radio_lock:
+                radio_waiting = self._radio is not None
+            timeout = max(self._radio_due - time.monotonic(), 0) if radio_waiting else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is False:
+                break
+            if item:
+                self._transmit(*item)
+            if time.monotonic() >= self._radio_due:
+                with self._radio_lock:
+                    radio, self._radio = self._radio, None
+                if radio:
+                    self._radio_due = time.monotonic() + self.radio_interval
+                    self._transmit(radio[0], "RadioInfo", radio[1])
+        for sock in self.sockets.values():
+            sock.close()
+
+    def _transmit(self, destinations: list, package_name: str, payload: dict):
+        key = (package_name, tuple(payload))
+        template = self.templates.get(key)
+        if template is None:
+            template = self.templates[key] = XmlTemplate(package_name, tuple(payload))
+        bytes_to_send = template.render(payload)
+        if package_name == "RadioInfo":
+            if bytes_to_send == self._radio_sent:
+                self.stats['radio_unchanged'] += 1
+                return
+            self._radio_sent = bytes_to_send
+        for destination in destinations:
+            sock = self.sockets.get(destination)
+            if sock is None:
+                sock = self.sockets[destination] = socket.socket(family=socket.AF_INET, type=socket.SOCK_DGRAM)
+            try:
+                sock.sendto(bytes_to_send, destination)
+                self.stats['packets'] += 1
+            except (PermissionError, socket.gaierror, OSError) as exception:
+                self.stats['errors'] += 1
+                logger.critical("%s", f"{exception}")
+
 #TODO make operator change and settings change an app event to completely decouple
 class N1MM:
     """Send N1MM style packets"""
@@ -99,8 +216,9 @@ class N1MM:
         payload = dict(self.contact_info)
         payload["timestamp"] = qso.time_on.strftime('%Y-%m-%d %H:%M:%S')
         payload["oldcall"] = payload["call"] = qso.call
-        payload["txfreq"] = qso.freq / 10
-        payload["rxfreq"] = qso.freq_rx / 10
+        # n1mm frequencies are in 10hz units
+        payload["txfreq"] = qso.freq // 10
+        payload["rxfreq"] = (qso.freq_rx or qso.freq) // 10
         payload["mode"] = qso.mode
         payload["contestname"] = qso.fk_contest.fk_contest_meta.cabrillo_name.replace("-", "")
         payload["contestnr"] = qso.fk_contest.id
@@ -111,12 +229,12 @@ class N1MM:
         payload["mycall"] = qso.operator
         payload["StationName"] = payload["NetBiosName"] = qso.hostname
         payload["IsOriginal"] = qso.is_original
-        payload["ID"] = qso.id
+        payload["ID"] = qso.id.hex if qso.id else ""
         payload["points"] = qso.points
         payload["snt"] = qso.rst_sent
         payload["rcv"] = qso.rst_rcvd
         payload["sntnr"] = qso.stx
-        payload["rcvnr"] = qso.rtx
+        payload["rcvnr"] = qso.srx
         #payload["ismultiplier1"] = False  # TODO
         #payload["ismultiplier2"] = False  # TODO
         #payload["ismultiplier3"] = False  # TODO
@@ -125,7 +243,7 @@ class N1MM:
         payload["ck"] = qso.check
         payload["zn"] = qso.my_cq_zone
         #payload["power"] = ''  # TODO
-        payload["band"] = ham_utility.get_n1mm_band(qso.freq)
+        payload["band"] = ham_utility.get_n1mm_band(str(qso.freq))
         return payload
 
     def __init__(
@@ -149,11 +267,14 @@ class N1MM:
         self.contact_port = contactport
         self.lookup_port = lookupport
         self.score_port = scoreport
+        self._parsed_ports: dict[str, list[tuple[str, int]]] = {}
         self.send_radio_packets = False
         self.send_contact_packets = False
         self.send_lookup_packets = False
         self.send_score_packets = False
         self.contact_info["NetBiosName"] = socket.gethostname()
+        self.broadcaster = Broadcaster()
+        self.broadcaster.start()
         appevent.register(appevent.QsoDeleted, self.send_contact_delete)
         appevent.register(appevent.QsoUpdated, self.send_contactreplace)
         appevent.register(appevent.QsoAdded, self.send_contact_info)
@@ -171,15 +292,21 @@ class N1MM:
         self.contact_info["operator"] = name
         self.radio_info["IsRunning"] = "True" if is_run else "False"
 
-    def send_radio(self, event: appevent.RadioState):
+    def close(self):
+        """stop sending, packets already queued are sent first"""
+        self.broadcaster.close()
 
+    def send_radio(self, event: appevent.RadioState):
         if self.send_radio_packets:
+            state = event.state
             payload = dict(self.radio_info)
-            payload["Freq"] = event.vfoa_hz
-            payload["TXFreq"] = event.vfoa_hz
-            payload["Mode"] = event.mode
+            payload["Freq"] = state.vforx_hz // 10 if state.vforx_hz else ""
+            payload["TXFreq"] = (state.vfotx_hz or state.vforx_hz or 0) // 10 or ""
+            payload["Mode"] = state.mode
+            payload["IsSplit"] = bool(state.is_split)
+            payload["IsTransmitting"] = bool(state.is_ptt)
             payload["OpCall"] = self.contact_info["operator"]
-            self._send(self.radio_port, payload, "RadioInfo")
+            self.broadcaster.send_radio(self._destinations(self.radio_port), payload)
 
     def send_contact_info(self, event: appevent.QsoAdded):
         if self.send_contact_packets:
@@ -205,41 +332,13 @@ class N1MM:
             payload["call"] = event.result.call
             self._send(self.lookup_port, payload, "lookupinfo")
 
+    def _destinations(self, port_list: str) -> list[tuple[str, int]]:
+        destinations = self._parsed_ports.get(port_list)
+        if destinations is None:
+            destinations = self._parsed_ports[port_list] = Broadcaster.destinations(port_list)
+        return destinations
+
     def _send(self, port_list, payload, package_name):
-        """Send XML data"""
-        # bytes_to_send = dicttoxml(
-        #     payload,
-        #     custom_root=package_name,
-        #     attr_type=False,
-        #     return_bytes=False,
-        #     encoding="UTF-8",
-        # )
-        bytes_to_send = dicttoxml(payload, custom_root=package_name, attr_type=False)
-        # dom = parseString(bytes_to_send)
-        # output = dom.toprettyxml(indent="\t", newl="\r\n").encode()
+        """queue xml data, it is rendered and sent on the broadcaster thread"""
         logger.debug("********* %s", f"{package_name} {port_list}")
-        for connection in port_list.split():
-            try:
-                ip_address, port = connection.split(":")
-                port = int(port)
-            except ValueError as returned_error:
-                logger.debug(
-                    "%s", f"Bad IP:Port combination {connection} {returned_error}"
-                )
-                continue
-            try:
-                radio_socket = None
-                radio_socket = socket.socket(
-                    family=socket.AF_INET, type=socket.SOCK_DGRAM
-                )
-                logger.debug(
-                    "********* %s", f"{ip_address} {int(port)} {bytes_to_send}"
-                )
-                radio_socket.sendto(
-                    bytes_to_send,
-                    (ip_address, int(port)),
-                )
-            except PermissionError as exception:
-                logger.critical("%s", f"{exception}")
-            except socket.gaierror as exception:
-                logger.critical("%s", f"{exception}")
+        self.broadcaster.send(self._destinations(port_list), package_name, payload)
@@ -0,0 +1,254 @@
+"""
+Write behind of the qsos logged in the entry window.
+
+Saving a qso used to wait on the database insert on the gui thread, on a slow sd card that is a visible hitch
+every time enter is pressed. QsoCommitter.submit appends the qso to an append only journal next to the database
+instead and fsyncs it, a single small sequential write, and the entry window is cleared right away. The commit
+thread inserts the journaled qsos in batches, one transaction per batch, and then announces them with QsoAdded
+so the windows and scoring read a log that holds them. Once every qso in the journal is in the database the
+journal is emptied.
+
+A journal left behind by a crash is replayed when the database is opened again, the qsos already in the
+database are skipped. Replayed qsos are not announced, the windows read the log when they load it. A qso that can
+not be inserted, when committed or replayed, is set aside in a rejected file next to the journal so the journal
+can still be emptied.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from . import event as appevent
+from .replication import qso_from_wire, qso_to_wire
+from ..model import QsoLog
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = '.qso-journal'
+REJECTED_SUFFIX = '.rejected'
+
+
+class QsoJournal:
+    """Append only file of qsos not yet known to be in the database, a json line each"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = None
+
+    def append(self, record: dict) -> None:
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def read(self) -> list[dict]:
+        if not self.path.exists():
+            return []
+        records = []
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # the write torn by the crash, it was never acknowledged
+                    logger.warning(f"skipping an unreadable line of {self.path}")
+        return records
+
+    def reset(self) -> None:
+        """every qso in the journal is in the database"""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.truncate(0)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _to_record(qso: QsoLog) -> dict:
+    return {'contest': qso.fk_contest_id, 'station': qso.fk_station_id, 'qso': qso_to_wire(qso)}
+
+
+def _from_record(record: dict) -> QsoLog:
+    return QsoLog(**qso_from_wire(record['qso']), fk_contest=record['contest'], fk_station=record['station'])
+
+
+class QsoCommitter:
+    """
+    Journals the qsos logged on the gui thread and inserts them into the database on a thread of its own. open()
+    with each database, close() before the database is closed or changed.
+    """
+
+    # seconds the commit thread waits for more qsos (a run of dupes, a macro logging several) before a batch
+    batch_delay = 0.02
+    batch_size = 200
+
+    def __init__(self):
+        self.journal: Optional[QsoJournal] = None
+        self._queue: queue.SimpleQueue[Optional[QsoLog]] = queue.SimpleQueue()
+        # qsos submitted and not committed yet, by id
+        self._pending: dict = {}
+        # the replay failed, the journal is kept until it is replayed again on the next open
+        self._keep_journal = False
+        self._lock = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {'submitted': 0, 'committed': 0, 'batches': 0, 'failed': 0, 'replayed': 0,
+                      'journal_ms': 0.0, 'max_journal_ms': 0.0, 'commit_ms': 0.0}
+
+    def open(self, database_path) -> int:
+        """replays the journal of the database and starts the commit thread, returns the qsos replayed"""
+        self.close()
+        self.journal = QsoJournal(Path(str(database_path) + JOURNAL_SUFFIX))
+        self._keep_journal = False
+        try:
+            replayed = self._replay()
+        except Exception:
+            logger.exception(f"replaying {self.journal.path}")
+            self._keep_journal = True
+            replayed = 0
+        self._thread = threading.Thread(target=self._run, name='qso-committer', daemon=True)
+        self._thread.start()
+        return replayed
+
+    def close(self, timeout: float = 10) -> None:
+        """commits what is pending and stops the commit thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def submit(self, qso: QsoLog) -> None:
+        """journals the qso, it is inserted and announced with QsoAdded shortly after. raises if the journal fails"""
+        start = time.perf_counter()
+        with self._lock:
+            self.journal.append(_to_record(qso))
+            self._pending[qso.id] = qso
+            self.stats['submitted'] += 1
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stats['journal_ms'] = elapsed
+        self.stats['max_journal_ms'] = max(self.stats['max_journal_ms'], elapsed)
+        self._queue.put(qso)
+
+    def pending(self, contest_id: Optional[int] = None) -> list[QsoLog]:
+        """qsos logged and not yet in the database, the dupe check looks at these too"""
+        with self._lock:
+            return [qso for qso in self._pending.values() if contest_id is None or qso.fk_contest_id == contest_id]
+
+    def flush(self, timeout: float = 5) -> bool:
+        """waits until every submitted qso has been committed, or failed"""
+        with self._lock:
+            return self._lock.wait_for(lambda: not self._pending, timeout)
+
+    def _replay(self) -> int:
+        records = self.journal.read()
+        if not records:
+            return 0
+        qsos = {}
+        for record in records:
+            try:
+                qso = _from_record(record)
+                qsos[qso.id] = qso
+            except Exception:
+                logger.exception(f"unreadable qso in the journal {record}")
+        present = set()
+        ids = list(qsos)
+        for i in range(0, len(ids), 500):
+            present.update(row.id for row in QsoLog.select(QsoLog.id).where(QsoLog.id.in_(ids[i:i + 500])))
+        missing = [qso for qso_id, qso in qsos.items() if qso_id not in present]
+        failed = self._insert(missing)
+        self._reject(failed)
+        self.journal.reset()
+        replayed = len(missing) - len(failed)
+        self.stats['replayed'] += replayed
+        self.stats['failed'] += len(failed)
+        logger.warning(f"replayed {replayed} qsos from {self.journal.path}, {len(present)} were saved already, "
+                       f"{len(failed)} could not be saved")
+        return replayed
+
+    def _insert(self, qsos: list[QsoLog]) -> list[tuple[QsoLog, Exception]]:
+        """inserts the qsos in one transaction, one at a time if that fails, returns the qsos that failed"""
+        failed = []
+        try:
+            with QsoLog._meta.database.atomic():
+                for qso in qsos:
+                    qso.save(force_insert=True)
+        except Exception:
+            # a bad qso must not hold back the rest, save them one at a time
+            logger.exception(f"inserting {len(qsos)} qsos, saving them one at a time")
+            for qso in qsos:
+                try:
+                    if not QsoLog.select(QsoLog.id).where(QsoLog.id == qso.id).exists():
+                        qso.save(force_insert=True)
+                except Exception as e:
+                    logger.exception(f"saving qso {qso.call} {qso.id}")
+                    failed.append((qso, e))
+        return failed
+
+    def rejected_path(self) -> Path:
+        return Path(str(self.journal.path) + REJECTED_SUFFIX)
+
+    def _reject(self, failed: list[tuple[QsoLog, Exception]]) -> None:
+        """a qso that can not be inserted now never will be, it is set aside so the journal can be emptied"""
+        if not failed:
+            return
+        rejected = QsoJournal(self.rejected_path())
+        for qso, _ in failed:
+            rejected.append(_to_record(qso))
+        rejected.close()
+        logger.error(f"{len(failed)} qsos of {self.journal.path} could not be saved, see {rejected.path}")
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            qso = self._queue.get()
+            if qso is None:
+                break
+            batch = [qso]
+            deadline = time.monotonic() + self.batch_delay
+            while len(batch) < self.batch_size:
+                try:
+                    qso = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if qso is None:
+                    stopping = True
+                    break
+                batch.append(qso)
+            self._commit(batch)
+
+    def _commit(self, batch: list[QsoLog]) -> None:
+        start = time.perf_counter()
+        failed = self._insert(batch)
+        self._reject(failed)
+        self.stats['commit_ms'] = (time.perf_counter() - start) * 1000
+        self.stats['batches'] += 1
+        self.stats['committed'] += len(batch) - len(failed)
+        self.stats['failed'] += len(failed)
+
+        failed_ids = {qso.id for qso, _ in failed}
+        for qso in batch:
+            if qso.id not in failed_ids:
+                appevent.emit(appevent.QsoAdded(qso))
+        for qso, error in failed:
+            appevent.emit(appevent.QsoSaveFailed(qso, str(error), str(self.rejected_path())))
+        with self._lock:
+            for qso in batch:
+                self._pending.pop(qso.id, None)
+            if not self._pending and not self._keep_journal:
+                self.journal.reset()
+            self._lock.notify_all()
+
+
+qso_committer = QsoCommitter()
@@ -0,0 +1,349 @@
+"""
+Anti-entropy reconciliation of the log of the active contest between two stations.
+
+Replication only carries the changes made while the stations could hear each other. After a network partition,
+a restart or a station joining late the logs have drifted apart, reconciling brings them back together without
+copying whole logs.
+
+Each station hashes its qsos into a Merkle tree: every qso (and every deleted qso, as a tombstone) gets a row
+hash, the qsos are grouped by the minute they were logged into leaf buckets and each level above groups
+fanout buckets of the level below, up to a single root. Two stations compare roots, then only the children of
+the nodes that differ, down to the buckets that differ, then the row hashes in those buckets, and finally only
+the rows that are missing or different are sent, each way.
+
+When both stations have a qso and the copies differ a deterministic rule picks the same winner on both: a delete
+wins, then the copy of the station that logged the qso (its hostname), then the copy with the higher row hash.
+
+The protocol runs over tcp, each message is a length prefixed zlib compressed json document.
+"""
+
+import hashlib
+import json
+import logging
+import platform
+import socket
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from typing import Callable, NamedTuple, Optional
+
+from . import event as appevent
+from .replication import LOCAL_FIELDS, OP_DELETE, OP_UPDATE, apply_changes, contest_key, qso_to_wire
+from ..model import Contest, DeletedQsoLog, QsoLog
+
+logger = logging.getLogger(__name__)
+
+PULL = 'pull'
+PUSH = 'push'
+
+
+class Entry(NamedTuple):
+    bucket: int
+    row_hash: str
+    deleted: bool
+    owner: Optional[str]
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def resolve(local: Optional[Entry], remote: Optional[Entry], local_host: str, remote_host: str) -> Optional[str]:
+    """which way a qso has to go, None when both stations already agree"""
+    if local is None:
+        return PULL
+    if remote is None:
+        return PUSH
+    if local.deleted or remote.deleted:
+        if local.deleted and remote.deleted:
+            return None
+        return PUSH if local.deleted else PULL
+    if local.row_hash == remote.row_hash:
+        return None
+    if local.owner == local_host:
+        return PUSH
+    if local.owner == remote_host:
+        return PULL
+    return PUSH if local.row_hash > remote.row_hash else PULL
+
+
+class LogDigest:
+    """The Merkle tree of the qsos of a contest."""
+
+    bucket_seconds = 60
+    fanout_bits = 4
+    # 16^8 minutes is well past any log, the root is the single node of the top level
+    depth = 8
+
+    def __init__(self, contest: Contest):
+        self.contest = contest
+        self.entries: dict[str, Entry] = {}
+        # level -> node -> hash, level 0 are the buckets
+        self.levels: list[dict[int, str]] = []
+        # level -> node -> children (at level - 1) -> hash
+        self.children: list[dict[int, dict[int, str]]] = []
+        self.build()
+
+    @property
+    def root(self) -> str:
+        return self.levels[self.depth].get(0, '')
+
+    def _rows(self, model) -> list[tuple]:
+        """(id, bucket, owner, column values...) of the contest's rows of a qso table"""
+        columns = [f'"{f.column_name}"' for f in QsoLog._meta.sorted_fields if f.name not in LOCAL_FIELDS]
+        sql = f"select id, cast(strftime('%s', time_on) as integer) / {self.bucket_seconds}, hostname, " \
+              f"{', '.join(columns)} from {model._meta.table_name} where fk_contest_id = ?"
+        return list(QsoLog._meta.database.execute_sql(sql, (self.contest.id,)))
+
+    def build(self):
+        start = time.perf_counter()
+        entries = {}
+        for row in self._rows(QsoLog):
+            entries[row[0]] = Entry(row[1] or 0, _hash(repr(row[3:]).encode()), False, row[2])
+        for row in self._rows(DeletedQsoLog):
+            if row[0] not in entries:
+                entries[row[0]] = Entry(row[1] or 0, 'deleted', True, row[2])
+        self.entries = entries
+
+        buckets = defaultdict(list)
+        for qso_id, entry in entries.items():
+            buckets[entry.bucket].append(f"{qso_id}:{entry.row_hash}")
+        level = {bucket: _hash('\n'.join(sorted(rows)).encode()) for bucket, rows in buckets.items()}
+        self.levels = [level]
+        self.children = [{}]
+        for _ in range(self.depth):
+            children = defaultdict(dict)
+            for node, node_hash in level.items():
+                children[node >> self.fanout_bits][node] = node_hash
+            level = {parent: _hash(json.dumps(sorted(nodes.items())).encode()) for parent, nodes in children.items()}
+            self.levels.append(level)
+            self.children.append(children)
+        logger.debug(f"log digest of {len(entries)} qsos built in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def children_of(self, level: int, nodes: list[int]) -> dict[int, dict[int, str]]:
+        return {node: self.children[level].get(node, {}) for node in nodes}
+
+    def bucket_entries(self, buckets: list[int]) -> dict[str, Entry]:
+        wanted = set(buckets)
+        return {qso_id: entry for qso_id, entry in self.entries.items() if entry.bucket in wanted}
+
+    def changes(self, ids: list[str]) -> list[dict]:
+        """the rows as replication changes, tombstones as deletes"""
+        changes = []
+        keys = [uuid.UUID(qso_id) for qso_id in ids]
+        for i in range(0, len(keys), 500):
+            for qso in QsoLog.select().where(QsoLog.id.in_(keys[i:i + 500])):
+                changes.append({'op': OP_UPDATE, 'qso': qso_to_wire(qso)})
+            for qso in DeletedQsoLog.select().where(DeletedQsoLog.id.in_(keys[i:i + 500])):
+                if self.entries.get(qso.id.hex, Entry(0, '', False, None)).deleted:
+                    changes.append({'op': OP_DELETE, 'qso': qso_to_wire(qso)})
+        return changes
+
+
+class Connection:
+    """Message framing over a tcp socket, counting the bytes each way."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def send(self, message: dict):
+        data = zlib.compress(json.dumps(message, separators=(',', ':')).encode())
+        self.sock.sendall(struct.pack('!I', len(data)) + data)
+        self.bytes_sent += len(data) + 4
+
+    def _read(self, size: int) -> bytes:
+        data = b''
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError('connection closed')
+            data += chunk
+        return data
+
+    def receive(self) -> dict:
+        size, = struct.unpack('!I', self._read(4))
+        data = self._read(size)
+        self.bytes_received += size + 4
+        return json.loads(zlib.decompress(data))
+
+    def request(self, message: dict) -> dict:
+        self.send(message)
+        return self.receive()
+
+    def close(self):
+        self.sock.close()
+
+
+def _entries_to_wire(entries: dict[str, Entry]) -> dict:
+    return {qso_id: [entry.row_hash, entry.deleted, entry.owner] for qso_id, entry in entries.items()}
+
+
+def _entries_from_wire(data: dict) -> dict[str, Entry]:
+    return {qso_id: Entry(0, row_hash, deleted, owner) for qso_id, (row_hash, deleted, owner) in data.items()}
+
+
+def serve(connection: Connection, contest: Contest, host: str,
+          on_applied: Optional[Callable[[list], None]] = None) -> int:
+    """answer a peer reconciling with this station, returns the number of qsos it sent here"""
+    digest = None
+    applied = 0
+    while True:
+        message = connection.receive()
+        cmd = message.get('cmd')
+        if cmd == 'HELLO':
+            if message.get('contest') != contest_key(contest):
+                # not the contest this station is logging
+                connection.send({'host': host, 'root': None})
+                continue
+            digest = LogDigest(contest)
+            connection.send({'host': host, 'root': digest.root})
+        elif cmd == 'NODES':
+            children = digest.children_of(message['level'], message['nodes'])
+            connection.send({'children': {node: nodes for node, nodes in children.items()}})
+        elif cmd == 'BUCKETS':
+            connection.send({'entries': _entries_to_wire(digest.bucket_entries(message['buckets']))})
+        elif cmd == 'ROWS':
+            connection.send({'changes': digest.changes(message['ids'])})
+        elif cmd == 'APPLY':
+            events = apply_changes(contest, message['changes'])
+            applied += len(message['changes'])
+            connection.send({'applied': len(message['changes'])})
+            if on_applied:
+                on_applied(events)
+        else:
+            return applied
+
+
+def reconcile(connection: Connection, contest: Contest, host: str,
+              on_applied: Optional[Callable[[list], None]] = None) -> dict:
+    """bring this station's log and the peer's into agreement, returns what was exchanged"""
+    start = time.perf_counter()
+    digest = LogDigest(contest)
+    result = {'pulled': 0, 'pushed': 0, 'buckets': 0}
+    hello = connection.request({'cmd': 'HELLO', 'contest': contest_key(contest), 'host': host})
+    if hello['root'] is not None and hello['root'] != digest.root:
+        remote_host = hello['host']
+        # walk down the tree only through the nodes that differ
+        nodes = [0]
+        for level in range(digest.depth, 0, -1):
+            remote = connection.request({'cmd': 'NODES', 'level': level, 'nodes': nodes})['children']
+            local = digest.children_of(level, nodes)
+            differ = []
+            for node in nodes:
+                local_children = local[node]
+                remote_children = {int(child): child_hash for child, child_hash in remote.get(str(node), {}).items()}
+                for child in local_children.keys() | remote_children.keys():
+                    if local_children.get(child) != remote_children.get(child):
+                        differ.append(child)
+            nodes = differ
+
+        result['buckets'] = len(nodes)
+        remote_entries = _entries_from_wire(connection.request({'cmd': 'BUCKETS', 'buckets': nodes})['entries'])
+        pull, push = [], []
+        # a qso whose time was changed sits in a different bucket on each station, compare by id across the log
+        for qso_id in remote_entries.keys() | digest.bucket_entries(nodes).keys():
+            direction = resolve(digest.entries.get(qso_id), remote_entries.get(qso_id), host, remote_host)
+            if direction == PULL:
+                pull.append(qso_id)
+            elif direction == PUSH:
+                push.append(qso_id)
+
+        if pull:
+            changes = connection.request({'cmd': 'ROWS', 'ids': pull})['changes']
+            events = apply_changes(contest, changes)
+            if on_applied:
+                on_applied(events)
+        if push:
+            connection.request({'cmd': 'APPLY', 'changes': digest.changes(push)})
+        result['pulled'] = len(pull)
+        result['pushed'] = len(push)
+    connection.send({'cmd': 'BYE'})
+    result.update(bytes_sent=connection.bytes_sent, bytes_received=connection.bytes_received,
+                  seconds=time.perf_counter() - start)
+    return result
+
+
+def _emit(events: list):
+    for event in events:
+        appevent.emit(event)
+
+
+class ReconcileServer(threading.Thread):
+    """
+    Accepts reconciliation from other stations and reconciles with stations replication reports as drifted.
+    Only one reconciliation with a peer runs at a time and a peer is not reconciled again within min_interval.
+    """
+
+    min_interval = 30.0
+    timeout = 30.0
+
+    def __init__(self, contest: Contest, port: int = 2239, host: Optional[str] = None):
+        super().__init__(name='reconcile', daemon=True)
+        self.contest = contest
+        self.port = port
+        self.host = host or platform.node()[:255]
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(('', port))
+        self.listener.listen()
+        self.listener.settimeout(0.5)
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._last: dict[str, float] = {}
+        self._busy: set[str] = set()
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                sock, address = self.listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(sock, address[0]), name='reconcile-serve', daemon=True).start()
+
+    def stop(self):
+        self._stopping.set()
+        self.listener.close()
+
+    def _serve(self, sock: socket.socket, address: str):
+        sock.settimeout(self.timeout)
+        connection = Connection(sock)
+        try:
+            applied = serve(connection, self.contest, self.host, _emit)
+            logger.info(f"reconciled with {address}, received {applied} qsos, {connection.bytes_sent} bytes sent "
+                        f"{connection.bytes_received} bytes received")
+        except (OSError, ConnectionError, ValueError):
+            logger.exception(f"reconciliation from {address} failed")
+        finally:
+            connection.close()
+
+    def reconcile_with(self, peer: str, address: str):
+        """reconcile with a peer in the background, unless that happened recently"""
+        with self._lock:
+            now = time.monotonic()
+            if address in self._busy or now - self._last.get(address, -self.min_interval) < self.min_interval:
+                return
+            self._busy.add(address)
+            self._last[address] = now
+        threading.Thread(target=self._reconcile, args=(peer, address), name='reconcile', daemon=True).start()
+
+    def _reconcile(self, peer: str, address: str):
+        try:
+            sock = socket.create_connection((address, self.port), timeout=self.timeout)
+            connection = Connection(sock)
+            try:
+                result = reconcile(connection, self.contest, self.host, _emit)
+                logger.info(f"reconciled with {peer} at {address}: {result}")
+            finally:
+                connection.close()
+        except (OSError, ConnectionError, ValueError):
+            logger.exception(f"reconciliation with {peer} at {address} failed")
+        finally:
+            with self._lock:
+                self._busy.discard(address)
@@ -0,0 +1,453 @@
+"""
+Multi operator log replication over udp multicast.
+
+Every station broadcasts its own qso adds, updates and deletes as a numbered stream, one stream per host and
+application session. Receivers apply a stream strictly in sequence order, so a missing sequence number is a lost
+datagram: the changes after it are held back and the gap is requested again from the sender, which keeps a
+history of what it sent. A periodic state message carries the newest sequence number so a gap at the end of a
+stream (the last change was lost) is noticed too.
+
+Only the changes of the active contest are exchanged. Database ids differ between stations so the contest is
+identified by its cabrillo name and start date. Received changes are applied to the local log in batches, one
+transaction per batch, and then announced with the usual qso events flagged as remote so the windows and scoring
+follow along without the change being sent again.
+
+Messages are json like the field day multicast protocol (see testing/simulant.py) and share its group, stations
+ignore commands they do not know.
+"""
+
+import json
+import logging
+import platform
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Optional
+
+from . import event as appevent
+from ..model import Contest, DeletedQsoLog, QsoLog
+
+logger = logging.getLogger(__name__)
+
+CMD_CHANGES = 'QSOSYNC'
+CMD_STATE = 'QSOSYNC_STATE'
+CMD_NACK = 'QSOSYNC_NACK'
+
+OP_ADD = 'add'
+OP_UPDATE = 'update'
+OP_DELETE = 'delete'
+
+# fields that refer to rows of the local database, they are mapped on the receiving station
+LOCAL_FIELDS = ('fk_contest', 'fk_station')
+
+
+def contest_key(contest: Contest) -> list:
+    """identifies the same contest on every station"""
+    return [contest.fk_contest_meta.cabrillo_name, str(contest.start_date)]
+
+
+def qso_to_wire(qso: QsoLog) -> dict:
+    """the non null columns of a qso in their database representation"""
+    data = {}
+    for name, field in QsoLog._meta.fields.items():
+        if name in LOCAL_FIELDS:
+            continue
+        value = qso.__data__.get(name)
+        if isinstance(value, (dict, list)):
+            # json columns go as they are
+            data[name] = value
+        elif value is not None:
+            value = field.db_value(value)
+            data[name] = value if isinstance(value, (str, int, float, bool)) else str(value)
+    return data
+
+
+def qso_from_wire(data: dict) -> dict:
+    """column values for every qso field from a wire dict, missing columns are null"""
+    values = {}
+    for name, field in QsoLog._meta.fields.items():
+        if name in LOCAL_FIELDS:
+            continue
+        value = data.get(name)
+        values[name] = field.python_value(value) if value is not None and not isinstance(value, (dict, list)) \
+            else value
+    return values
+
+
+def apply_changes(contest: Contest, changes: list[dict]) -> list[appevent.AppEvent]:
+    """
+    apply changes ({'op': ..., 'qso': wire dict}) from another station to the contest in one transaction,
+    returns the events announcing them
+    """
+    # only the last change of a qso within the batch matters
+    latest: dict[str, dict] = {}
+    for change in changes:
+        latest.pop(change['qso']['id'], None)
+        latest[change['qso']['id']] = change
+    if not latest:
+        return []
+
+    events = []
+    # immediate, a deferred transaction that reads before writing can not wait for another writer
+    with QsoLog._meta.database.atomic('IMMEDIATE'):
+        ids = [uuid.UUID(qso_id) for qso_id in latest]
+        before = {}
+        for i in range(0, len(ids), 500):
+            for qso in QsoLog.select().where(QsoLog.id.in_(ids[i:i + 500])):
+                before[qso.id] = qso
+
+        upserts, deletes = [], []
+        for change in latest.values():
+            values = qso_from_wire(change['qso'])
+            previous = before.get(values['id'])
+            values['fk_contest'] = contest.id
+            # station profiles are local, a qso logged elsewhere has none here
+            values['fk_station'] = previous.fk_station_id if previous else None
+            (deletes if change['op'] == OP_DELETE else upserts).append(values)
+            qso = QsoLog(**{**values, 'fk_contest': contest})
+            if change['op'] == OP_DELETE:
+                if previous:
+                    events.append(appevent.QsoDeleted(previous, remote=True))
+            elif previous:
+                events.append(appevent.QsoUpdated(previous, qso, remote=True))
+            else:
+                events.append(appevent.QsoAdded(qso, remote=True))
+
+        for i in range(0, len(upserts), 50):
+            QsoLog.insert_many(upserts[i:i + 50]).on_conflict_replace().execute()
+        for i in range(0, len(deletes), 50):
+            DeletedQsoLog.insert_many(deletes[i:i + 50]).on_conflict_replace().execute()
+            QsoLog.delete().where(QsoLog.id.in_([values['id'] for values in deletes[i:i + 50]])).execute()
+    return events
+
+
+class MulticastSocket:
+    """A udp socket joined to the replication multicast group."""
+
+    def __init__(self, group: str, port: int, interface: str = '0.0.0.0'):
+        self.group = group
+        self.port = port
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(('', port))
+        membership = socket.inet_aton(group) + socket.inet_aton(interface)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+        # other stations may run on this machine
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+        if interface != '0.0.0.0':
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+
+    def send(self, message: dict):
+        self.sock.sendto(json.dumps(message, separators=(',', ':')).encode(), (self.group, self.port))
+
+    def receive(self, timeout: float) -> tuple[Optional[dict], Optional[str]]:
+        """the next message and the address it came from"""
+        self.sock.settimeout(timeout)
+        try:
+            datagram, address = self.sock.recvfrom(65535)
+        except (socket.timeout, BlockingIOError):
+            return None, None
+        try:
+            message = json.loads(datagram)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            return None, None
+        return (message, address[0]) if isinstance(message, dict) else (None, None)
+
+    def close(self):
+        self.sock.close()
+
+
+class _Stream:
+    """Receive state of one remote station's change stream."""
+
+    def __init__(self):
+        self.next_seq = 1
+        # changes received ahead of a gap, by sequence number
+        self.held: dict[int, dict] = {}
+        # newest sequence number the sender is known to have sent
+        self.known_seq = 0
+        self.nacked_at = 0.0
+
+    def gap(self) -> Optional[tuple[int, int]]:
+        newest = max(self.known_seq, max(self.held) if self.held else 0)
+        if newest < self.next_seq:
+            return None
+        last = min(self.held) - 1 if self.held else newest
+        return (self.next_seq, last) if last >= self.next_seq else None
+
+
+class Replicator(threading.Thread):
+    """
+    Sends this station's qso changes in the contest to the multicast group and applies the changes of the other
+    stations.
+
+    Local changes are queued from the qso events and sent by the replication thread, which also receives, orders
+    and applies remote changes. Sending waits up to batch_interval so changes made together share a datagram and
+    received changes are applied at most every apply_interval.
+
+    on_peer(host, address) is called when a station is first heard from or its stream could not be followed,
+    the logs may have drifted apart and need reconciling.
+    """
+
+    batch_interval = 0.02
+    apply_interval = 0.02
+    # the state message lets receivers notice a lost last change, it also follows sent changes sooner
+    state_interval = 0.25
+    state_after_send = 0.05
+    # a gap is requested again when it is still open after this long
+    nack_interval = 0.2
+    nack_max_range = 200
+    # sent changes kept for retransmission
+    history_size = 10000
+    max_datagram = 8000
+    # a received batch failing this many times in a row is applied change by change, the changes that still fail
+    # are set aside in quarantine
+    apply_attempts = 5
+
+    def __init__(self, contest: Contest, group: str = '239.1.1.1', port: int = 2239, interface: str = '0.0.0.0',
+                 host: Optional[str] = None, transport=None, on_peer: Optional[Callable[[str, str], None]] = None):
+        super().__init__(name='replication', daemon=True)
+        self.contest = contest
+        self.contest_key = contest_key(contest)
+        self.host = host or platform.node()[:255]
+        # sequence numbers start again each run, the session tells the runs of a host apart
+        self.session = uuid.uuid4().hex[:12]
+        self.transport = transport or MulticastSocket(group, port, interface)
+        self.on_peer = on_peer
+        self.seq = 0
+        self.history: OrderedDict[int, dict] = OrderedDict()
+        self.streams: dict[tuple[str, str], _Stream] = {}
+        self._outbox: list[dict] = []
+        self._retransmit: set[int] = set()
+        self._inbox: list[dict] = []
+        self._inbox_failures = 0
+        self.quarantine: deque[dict] = deque(maxlen=self.history_size)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.stats = {'sent': 0, 'received': 0, 'applied': 0, 'duplicates': 0, 'nacks_sent': 0,
+                      'retransmitted': 0, 'skipped': 0, 'ignored': 0, 'quarantined': 0}
+
+    # local changes
+
+    def start(self):
+        appevent.register(appevent.QsoAdded, self.event_qso_added)
+        appevent.register(appevent.QsoUpdated, self.event_qso_updated)
+        appevent.register(appevent.QsoDeleted, self.event_qso_deleted)
+        super().start()
+
+    def stop(self):
+        appevent.unregister(appevent.QsoAdded, self.event_qso_added)
+        appevent.unregister(appevent.QsoUpdated, self.event_qso_updated)
+        appevent.unregister(appevent.QsoDeleted, self.event_qso_deleted)
+        self._stopping.set()
+        if self.is_alive():
+            self.join(2)
+        self.transport.close()
+
+    def event_qso_added(self, event: appevent.QsoAdded):
+        if not event.remote:
+            self.publish(OP_ADD, event.qso)
+
+    def event_qso_updated(self, event: appevent.QsoUpdated):
+        if not event.remote:
+            self.publish(OP_UPDATE, event.qso_after)
+
+    def event_qso_deleted(self, event: appevent.QsoDeleted):
+        if not event.remote:
+            self.publish(OP_DELETE, event.qso)
+
+    def publish(self, op: str, qso: QsoLog):
+        """queue a change of the local log for sending"""
+        if qso.fk_contest_id != self.contest.id:
+            return
+        change = {'op': op, 'contest': self.contest_key, 'qso': qso_to_wire(qso)}
+        with self._lock:
+            self.seq += 1
+            change['seq'] = self.seq
+            self.history[self.seq] = change
+            while len(self.history) > self.history_size:
+                self.history.popitem(last=False)
+            self._outbox.append(change)
+
+    # replication thread
+
+    def run(self):
+        next_apply = next_state = time.monotonic()
+        while not self._stopping.is_set():
+            try:
+                message, address = self.transport.receive(self.batch_interval)
+                if message:
+                    self.handle(message, address)
+                now = time.monotonic()
+                if self.flush():
+                    next_state = min(next_state, now + self.state_after_send)
+                if now >= next_apply:
+                    next_apply = now + self.apply_interval
+                    self.apply_received()
+                    self.request_gaps(now)
+                if now >= next_state:
+                    next_state = now + self.state_interval
+                    self.send_state()
+            except Exception:
+                logger.exception('replication failed')
+                time.sleep(self.apply_interval)
+        self.flush()
+
+    def _send_changes(self, changes: list[dict], retransmit: bool = False):
+        """send changes packed into as few datagrams as fit"""
+        batch, size = [], 0
+        for change in changes:
+            change_size = len(json.dumps(change, separators=(',', ':')))
+            if batch and size + change_size > self.max_datagram:
+                self.transport.send(self._message(CMD_CHANGES, changes=batch, retransmit=retransmit))
+                batch, size = [], 0
+            batch.append(change)
+            size += change_size
+        if batch:
+            self.transport.send(self._message(CMD_CHANGES, changes=batch, retransmit=retransmit))
+
+    def _message(self, cmd: str, **fields) -> dict:
+        return {'cmd': cmd, 'host': self.host, 'session': self.session, **fields}
+
+    def flush(self) -> bool:
+        """send the queued changes and retransmissions, true when there were any"""
+        with self._lock:
+            outbox, self._outbox = self._outbox, []
+            retransmit = [self.history[seq] for seq in sorted(self._retransmit) if seq in self.history]
+            self._retransmit.clear()
+        if outbox:
+            self._send_changes(outbox)
+            self.stats['sent'] += len(outbox)
+        if retransmit:
+            self._send_changes(retransmit, retransmit=True)
+            self.stats['retransmitted'] += len(retransmit)
+        return bool(outbox or retransmit)
+
+    def send_state(self):
+        with self._lock:
+            oldest = next(iter(self.history), self.seq + 1)
+            self.transport.send(self._message(CMD_STATE, seq=self.seq, oldest=oldest))
+
+    def handle(self, message: dict, address: Optional[str] = None):
+        cmd = message.get('cmd')
+        if cmd not in (CMD_CHANGES, CMD_STATE, CMD_NACK):
+            return
+        key = (message.get('host'), message.get('session'))
+        if key == (self.host, self.session):
+            return
+        if cmd == CMD_NACK:
+            if (message.get('target_host'), message.get('target_session')) == (self.host, self.session):
+                first, last = int(message['first']), int(message['last'])
+                with self._lock:
+                    self._retransmit.update(range(first, min(last, first + self.nack_max_range - 1) + 1))
+            return
+
+        stream = self.streams.get(key)
+        if stream is None:
+            stream = self.streams[key] = _Stream()
+            self._peer_drifted(key[0], address)
+        if cmd == CMD_STATE:
+            stream.known_seq = max(stream.known_seq, int(message.get('seq', 0)))
+            oldest = int(message.get('oldest', 1))
+            if stream.next_seq < oldest:
+                # the sender no longer has these changes
+                self.stats['skipped'] += oldest - stream.next_seq
+                logger.warning(f"replication: changes {stream.next_seq}-{oldest - 1} from {key[0]} are no longer "
+                               f"available")
+                stream.next_seq = oldest
+                stream.held = {seq: change for seq, change in stream.held.items() if seq >= oldest}
+                self._peer_drifted(key[0], address)
+            return
+
+        for change in message.get('changes', []):
+            seq = change.get('seq')
+            if not isinstance(seq, int) or seq < stream.next_seq or seq in stream.held:
+                self.stats['duplicates'] += 1
+                continue
+            stream.held[seq] = change
+            stream.known_seq = max(stream.known_seq, seq)
+            self.stats['received'] += 1
+
+    def _peer_drifted(self, host: str, address: Optional[str]):
+        if self.on_peer and address:
+            try:
+                self.on_peer(host, address)
+            except Exception:
+                logger.exception(f'reconciling with {host} failed')
+
+    def apply_received(self):
+        """move the in order changes of every stream to the inbox and apply them"""
+        for stream in self.streams.values():
+            while stream.next_seq in stream.held:
+                self._inbox.append(stream.held.pop(stream.next_seq))
+                stream.next_seq += 1
+        if not self._inbox:
+            return
+        try:
+            events = self.apply(self._inbox)
+        except Exception:
+            self._inbox_failures += 1
+            logger.exception(f'applying {len(self._inbox)} received changes failed, attempt {self._inbox_failures}')
+            if self._inbox_failures < self.apply_attempts:
+                # kept, a database that stayed locked is likely free on a later tick
+                return
+            events = self._apply_each(self._inbox)
+        self._inbox = []
+        self._inbox_failures = 0
+        self.emit_applied(events)
+
+    def _apply_each(self, changes: list[dict]) -> list[appevent.AppEvent]:
+        """apply the changes one at a time, in order, the ones that fail are quarantined"""
+        events = []
+        for change in changes:
+            try:
+                events += self.apply([change])
+            except Exception:
+                logger.exception(f"quarantined received change {change.get('seq')}, {change.get('op')} of qso "
+                                 f"{change.get('qso', {}).get('id')}")
+                self.quarantine.append(change)
+                self.stats['quarantined'] += 1
+        return events
+
+    def request_gaps(self, now: float):
+        for (host, session), stream in self.streams.items():
+            gap = stream.gap()
+            if gap and now - stream.nacked_at >= self.nack_interval:
+                stream.nacked_at = now
+                first, last = gap
+                self.transport.send(self._message(CMD_NACK, target_host=host, target_session=session, first=first,
+                                                  last=min(last, first + self.nack_max_range - 1)))
+                self.stats['nacks_sent'] += 1
+
+    # applying remote changes
+
+    def apply(self, changes: list[dict]) -> list[appevent.AppEvent]:
+        """apply received changes in one transaction, returns the events announcing them"""
+        ours = []
+        for change in changes:
+            if change.get('contest') != self.contest_key or 'id' not in change.get('qso', {}):
+                # another contest, the sequence still moves on
+                self.stats['ignored'] += 1
+            else:
+                ours.append(change)
+        events = apply_changes(self.contest, ours)
+        self.stats['applied'] += len(events)
+        return events
+
+    def emit_applied(self, events: list[appevent.AppEvent]):
+        for event in events:
+            appevent.emit(event)
+
+    def status(self) -> dict:
+        return {
+            'host': self.host,
+            'session': self.session,
+            'seq': self.seq,
+            'streams': {f"{host}/{session}": {'next_seq': stream.next_seq, 'held': len(stream.held),
+                                              'known_seq': stream.known_seq}
+                        for (host, session), stream in self.streams.items()},
+            **self.stats,
+        }
@@ -0,0 +1,221 @@
+"""
+Batch rescore of logged contests.
+
+Points and multipliers are only worked out when a qso is entered, so a corrected cty file or a fixed plugin scoring
+rule does not reach qsos already in the log. The rescore streams a contest's qsos in pages, re-derives the country,
+zones and prefixes from BigCty, re-runs the plugin scoring (AbstractContest.rescore_qso), and writes back only the
+qsos that changed, one transaction per page.
+
+Usable from the gui (Misc > Rescore Contest) or the command line:
+
+    qsourcelogger rescore path/to/log.db --contest 3 --dry-run
+    qsourcelogger rescore archive1.db archive2.db --all --processes 4
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Optional, Callable, Any
+
+from qsourcelogger import fsutils
+from qsourcelogger.contest import contests_by_cabrillo_id
+from qsourcelogger.lib.bigcty import BigCty
+from qsourcelogger.lib.ham_utility import calculate_wpx_prefix
+from qsourcelogger.model import Contest, QsoLog, loadPersistantDb
+
+logger = logging.getLogger(__name__)
+
+# qso fields derived from the callsign's cty entry
+CTY_FIELDS = ('country', 'prefix', 'cqz', 'ituz', 'dxcc', 'continent', 'wpx_prefix')
+# qso fields the contest plugins derive when scoring
+SCORE_FIELDS = ('points', 'multiplier1', 'multiplier2', 'multiplier3', 'distance')
+
+
+@dataclass
+class FieldChange:
+    qso_id: Any
+    call: str
+    field: str
+    old: Any
+    new: Any
+
+
+@dataclass
+class RescoreResult:
+    database: str
+    contest_id: int
+    contest_name: str = ''
+    qso_count: int = 0
+    changed_qsos: int = 0
+    changes: list[FieldChange] = field(default_factory=list)
+    elapsed_s: float = 0
+    dry_run: bool = False
+
+    def summary(self) -> str:
+        fields = {}
+        for change in self.changes:
+            fields[change.field] = fields.get(change.field, 0) + 1
+        detail = ', '.join(f"{k} {v}" for k, v in sorted(fields.items()))
+        return (f"{self.contest_name or self.contest_id}: {self.changed_qsos} of {self.qso_count} qsos "
+                f"{'would change' if self.dry_run else 'changed'} in {self.elapsed_s:.1f}s"
+                + (f" ({detail})" if detail else ""))
+
+
+def _same(old, new) -> bool:
+    if old is None or new is None or old == '' or new == '':
+        return (old is None or old == '') and (new is None or new == '')
+    if isinstance(old, (int, float)) or isinstance(new, (int, float)):
+        try:
+            return float(old) == float(new)
+        except (TypeError, ValueError):
+            pass
+    return str(old) == str(new)
+
+
+class Rescorer:
+    """
+    Parameters
+    ----------
+    contest: contest whose qsos are rescored, in the currently loaded database
+    cty: BigCty to re-derive country and zones from, None to leave those fields alone
+    page_size: qsos read, and at most written, per transaction
+    """
+
+    def __init__(self, contest: Contest, cty: Optional[BigCty] = None, page_size: int = 500):
+        self.contest = contest
+        self.plugin = contests_by_cabrillo_id[contest.fk_contest_meta.cabrillo_name](contest)
+        self.cty = cty
+        self.page_size = page_size
+        self._cty_cache: dict[str, Optional[dict]] = {}
+
+    def cty_fields(self, call: str) -> Optional[dict]:
+        """the cty derived qso fields for a call, cached since calls repeat across bands and modes"""
+        if call in self._cty_cache:
+            return self._cty_cache[call]
+        fields = None
+        result = self.cty.find_call_match(call) if self.cty and call else None
+        if result:
+            fields = {
+                'country': result.get("entity"),
+                'prefix': result.get("primary_pfx"),
+                'cqz': int(result.get("cq")) if result.get("cq") else None,
+                'ituz': int(result.get("itu")) if result.get("itu") else None,
+                'dxcc': result.get("dxcc"),
+                'continent': result.get("continent"),
+                'wpx_prefix': calculate_wpx_prefix(call),
+            }
+        self._cty_cache[call] = fields
+        return fields
+
+    def rescore_qso(self, qso: QsoLog) -> list[FieldChange]:
+        """re-derive the qso in place, returning what changed"""
+        before = {name: getattr(qso, name) for name in CTY_FIELDS + SCORE_FIELDS}
+        cty = self.cty_fields(qso.call)
+        if cty:
+            for name, value in cty.items():
+                setattr(qso, name, value)
+        self.plugin.rescore_qso(qso)
+        return [FieldChange(qso.id, qso.call, name, before[name], getattr(qso, name))
+                for name in before if not _same(before[name], getattr(qso, name))]
+
+    def run(self, dry_run: bool = False, progress: Callable[[int, int], None] = None) -> RescoreResult:
+        start = time.perf_counter()
+        result = RescoreResult(database=str(QsoLog._meta.database.database), contest_id=self.contest.id,
+                               contest_name=self.contest.get_display_name(), dry_run=dry_run)
+        total = self.plugin.contest_qso_select().count()
+        last_id = None
+        while True:
+            # keyset paging keeps each read short and independent of the writes made between pages
+            query = self.plugin.contest_qso_select().order_by(QsoLog.id).limit(self.page_size)
+            if last_id is not None:
+                query = query.where(QsoLog.id > last_id)
+            page = list(query)
+            if not page:
+                break
+            last_id = page[-1].id
+            changed = []
+            for qso in page:
+                changes = self.rescore_qso(qso)
+                if changes:
+                    changed.append((qso, [c.field for c in changes]))
+                    result.changes.extend(changes)
+            result.qso_count += len(page)
+            result.changed_qsos += len(changed)
+            if changed and not dry_run:
+                with QsoLog._meta.database.atomic():
+                    for qso, fields in changed:
+                        qso.save(only=[getattr(QsoLog, name) for name in fields])
+            if progress:
+                progress(result.qso_count, total)
+        result.elapsed_s = time.perf_counter() - start
+        logger.info(result.summary())
+        return result
+
+
+def rescore_contest(contest_id: int, cty: Optional[BigCty] = None, dry_run: bool = False,
+                    page_size: int = 500, progress: Callable[[int, int], None] = None) -> RescoreResult:
+    """rescore a contest in the currently loaded database"""
+    return Rescorer(Contest.get_by_id(contest_id), cty, page_size).run(dry_run, progress)
+
+
+def _rescore_job(database: str, contest_id: int, cty_path: Optional[str], dry_run: bool,
+                 page_size: int) -> RescoreResult:
+    """one contest, run in a worker process with its own database connection"""
+    loadPersistantDb(database)
+    cty = BigCty(cty_path) if cty_path else None
+    return rescore_contest(contest_id, cty, dry_run, page_size)
+
+
+def _contest_ids(database: str) -> list[int]:
+    loadPersistantDb(database)
+    return [c.id for c in Contest.select(Contest.id).where(Contest.deleted != True).order_by(Contest.id)]
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="qsourcelogger rescore",
+                                     description="Recompute cty details, points and multipliers of logged qsos.")
+    parser.add_argument("databases", nargs="+", help="log database files")
+    parser.add_argument("-c", "--contest", type=int, action="append", help="contest id to rescore, repeatable")
+    parser.add_argument("-a", "--all", action="store_true", help="rescore every contest in the databases")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="report the changes without writing them")
+    parser.add_argument("-v", "--verbose", action="store_true", help="list every changed field")
+    parser.add_argument("-p", "--processes", type=int, default=1, help="contests rescored in parallel")
+    parser.add_argument("--page-size", type=int, default=500, help="qsos per read and write transaction")
+    parser.add_argument("--no-cty", action="store_true", help="leave country, zones and prefixes as logged")
+    parser.add_argument("--cty", type=str, default=str(fsutils.APP_DATA_PATH / "cty.json"), help="cty.json to use")
+    args = parser.parse_args(argv)
+
+    if not args.contest and not args.all:
+        parser.error("give --contest ids or --all")
+    jobs = []
+    for database in args.databases:
+        contest_ids = _contest_ids(database) if args.all else args.contest
+        jobs.extend((database, contest_id) for contest_id in contest_ids)
+    cty_path = None if args.no_cty else args.cty
+
+    results = []
+    if args.processes > 1 and len(jobs) > 1:
+        # sqlite serializes the writers, the cty matching and plugin scoring run in parallel
+        with ProcessPoolExecutor(max_workers=args.processes) as pool:
+            futures = [pool.submit(_rescore_job, database, contest_id, cty_path, args.dry_run, args.page_size)
+                       for database, contest_id in jobs]
+            for future in as_completed(futures):
+                results.append(future.result())
+    else:
+        results = [_rescore_job(database, contest_id, cty_path, args.dry_run, args.page_size)
+                   for database, contest_id in jobs]
+
+    for result in sorted(results, key=lambda r: (r.database, r.contest_id)):
+        print(f"{result.database} {result.summary()}")
+        if args.verbose:
+            for change in result.changes:
+                print(f"  {change.call} {change.field}: {change.old!r} -> {change.new!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""
+Startup timing and deferred initialization.
+
+The main window is shown before anything the entry window does not need is loaded. Dock windows, cat backends,
+audio and the map are imported when they are first enabled or used, the datasets (cty, MASTER.SCP) are Deferred
+and built by whoever needs them first, normally the Prefetcher thread started after the first paint.
+
+mark() records the time since the process started at each step of the startup. With QSOURCE_STARTUP_REPORT set
+in the environment the imports are timed too, like python -X importtime, and report() lists the slowest.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Callable, Generic, Iterable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+STARTED = time.perf_counter()
+REPORT_ENABLED = bool(os.environ.get("QSOURCE_STARTUP_REPORT"))
+
+# (step, milliseconds since start)
+timeline: list[tuple[str, float]] = []
+
+
+def elapsed_ms() -> float:
+    return (time.perf_counter() - STARTED) * 1000
+
+
+def mark(step: str) -> None:
+    timeline.append((step, elapsed_ms()))
+    logger.debug(f"startup {step} at {timeline[-1][1]:.0f}ms")
+
+
+class ImportTimer:
+    """
+    Meta path finder timing every module imported after it is installed: self time, without the modules it
+    imports, and cumulative time, as python -X importtime reports them.
+    """
+
+    def __init__(self):
+        # name -> (self seconds, cumulative seconds)
+        self.times: dict[str, tuple[float, float]] = {}
+        self._stack: list[list] = []
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._local, 'finding', False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, 'find_spec'):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        if spec.loader is None or not hasattr(spec.loader, 'exec_module'):
+            return spec
+        spec.loader = _TimedLoader(self, spec.loader)
+        return spec
+
+    def timed_exec(self, name: str, execute: Callable[[], None]):
+        if threading.current_thread() is not threading.main_thread():
+            execute()
+            return
+        frame = [0.0]  # time spent in nested imports
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            execute()
+        finally:
+            cumulative = time.perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][0] += cumulative
+            self.times[name] = (cumulative - frame[0], cumulative)
+
+    def slowest(self, count: int = 25) -> list[tuple[str, float, float]]:
+        """(module, self ms, cumulative ms) of the modules with the most cumulative time"""
+        ranked = sorted(self.times.items(), key=lambda item: item[1][1], reverse=True)[:count]
+        return [(name, own * 1000, cumulative * 1000) for name, (own, cumulative) in ranked]
+
+
+class _TimedLoader:
+    def __init__(self, timer: ImportTimer, loader):
+        self.timer = timer
+        self.loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.timer.timed_exec(module.__name__, lambda: self.loader.exec_module(module))
+
+
+import_timer: Optional[ImportTimer] = None
+if REPORT_ENABLED:
+    import_timer = ImportTimer()
+    sys.meta_path.insert(0, import_timer)
+
+
+class Deferred(Generic[T]):
+    """A value built on first use by whichever thread asks first, the others wait for it"""
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self.name = name
+        self.factory = factory
+        self.build_ms: Optional[float] = None
+        self._value: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.build_ms is not None
+
+    def get(self) -> T:
+        if self.build_ms is None:
+            with self._lock:
+                if self.build_ms is None:
+                    start = time.perf_counter()
+                    self._value = self.factory()
+                    self.build_ms = (time.perf_counter() - start) * 1000
+                    logger.debug(f"{self.name} built in {self.build_ms:.0f}ms "
+                                 f"on {threading.current_thread().name}")
+        return self._value
+
+    def reset(self) -> None:
+        """the next get builds the value again (its source file was updated)"""
+        with self._lock:
+            self._value = None
+            self.build_ms = None
+
+
+def _cty():
+    from qsourcelogger import fsutils
+    from qsourcelogger.lib.bigcty import BigCty
+    return BigCty(fsutils.APP_DATA_PATH / 'cty.json')
+
+
+def _master_scp():
+    from qsourcelogger import fsutils
+    from qsourcelogger.lib.super_check_partial import SCP
+    return SCP(fsutils.APP_DATA_PATH)
+
+
+cty = Deferred("cty", _cty)
+master_scp = Deferred("MASTER.SCP", _master_scp)
+
+
+class Prefetcher(threading.Thread):
+    """
+    Runs the deferred work in the background once the main window is interactive, imports first so that opening
+    a window later only builds its widgets. Every step is timed into the startup timeline.
+    """
+
+    def __init__(self, steps: Iterable[tuple[str, Callable[[], object]]]):
+        super().__init__(name='startup-prefetch', daemon=True)
+        self.steps = list(steps)
+        self.done = threading.Event()
+        # (step, milliseconds taken)
+        self.times: list[tuple[str, float]] = []
+
+    def run(self):
+        for step, work in self.steps:
+            start = time.perf_counter()
+            try:
+                work()
+            except Exception:
+                logger.exception(f"startup prefetch of {step} failed")
+            self.times.append((step, (time.perf_counter() - start) * 1000))
+            # hand the interpreter back to the gui between steps
+            time.sleep(0)
+        mark("prefetch done")
+        self.done.set()
+
+
+def import_modules(names: Iterable[str]) -> Callable[[], None]:
+    """a prefetch step importing the modules"""
+
+    def run():
+        import importlib
+        for name in names:
+            importlib.import_module(name)
+
+    return run
+
+
+def report(prefetcher: Optional[Prefetcher] = None) -> str:
+    lines = ["startup timeline (ms since start)"]
+    lines += [f"{ms:9.1f}  {step}" for step, ms in timeline]
+    if prefetcher:
+        lines.append("background prefetch (ms)")
+        lines += [f"{ms:9.1f}  {step}" for step, ms in prefetcher.times]
+    # forms built so far, the ui cache is only imported with the first one
+    uicache = sys.modules.get('qsourcelogger.lib.uicache')
+    if uicache and uicache.load_times:
+        lines.append("forms built (ms)")
+        lines += [f"{ms:9.1f}  {name} ({how})" for name, (ms, how) in uicache.load_times.items()]
+    if import_timer:
+        lines.append("slowest imports on the main thread (self ms, cumulative ms)")
+        lines += [f"{own:9.1f} {cumulative:9.1f}  {name}" for name, own, cumulative in import_timer.slowest()]
+    return "\n".join(lines)
@@ -0,0 +1,148 @@
+"""
+Precompiled .ui forms.
+
+uic.loadUi parses the form xml and builds the widgets by reflection every time a window is opened. load_ui builds
+them with the code pyuic generates for the form instead, compiled once into the user's ui cache and keyed on a
+hash of the .ui file and the PyQt version. A form without a current compiled module, or one pyuic can not compile,
+is loaded with uic.loadUi, the compiled module is written by compile_forms (the startup prefetch, or
+
+    python -m qsourcelogger.lib.uicache
+
+as a build step) and used from the next start.
+"""
+
+import hashlib
+import importlib.util
+import io
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from PyQt6 import uic
+from PyQt6.QtCore import PYQT_VERSION_STR
+
+from qsourcelogger import fsutils
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = fsutils.USER_DATA_PATH / "ui_cache"
+FAILED_SUFFIX = ".failed"
+
+stats = {'compiled_loads': 0, 'loadui_loads': 0, 'compiles': 0, 'compile_failures': 0}
+# form file name -> milliseconds its last load took, and how it was loaded
+load_times: dict[str, tuple[float, str]] = {}
+
+# (path, mtime_ns, size) -> key, so a form is not hashed again on every window opened
+_keys: dict[tuple, str] = {}
+# key -> the form's Ui_ class from its compiled module
+_classes: dict[str, type] = {}
+_lock = threading.Lock()
+
+
+def form_key(ui_path: Path) -> str:
+    ui_path = Path(ui_path)
+    stat = ui_path.stat()
+    identity = (str(ui_path), stat.st_mtime_ns, stat.st_size)
+    key = _keys.get(identity)
+    if key is None:
+        digest = hashlib.sha1(PYQT_VERSION_STR.encode())
+        digest.update(ui_path.read_bytes())
+        key = f"{ui_path.stem}_{digest.hexdigest()[:16]}"
+        _keys[identity] = key
+    return key
+
+
+def _module_path(key: str, cache_path: Path) -> Path:
+    # module names can not hold the spaces and dashes a form name may have
+    return cache_path / f"ui_{key.replace(' ', '_').replace('-', '_')}.py"
+
+
+def _form_class(key: str, cache_path: Path) -> Optional[type]:
+    form_class = _classes.get(key)
+    if form_class is not None:
+        return form_class
+    module_path = _module_path(key, cache_path)
+    if not module_path.exists():
+        return None
+    spec = importlib.util.spec_from_file_location(f"qsourcelogger_ui_cache.{module_path.stem}", module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    form_class = next(value for name, value in vars(module).items() if name.startswith("Ui_"))
+    _classes[key] = form_class
+    return form_class
+
+
+def load_ui(ui_path: Path, instance, cache_path: Path = CACHE_PATH):
+    """
+    Builds the form into the widget instance like uic.loadUi(ui_path, instance) does, the form's widgets, layouts
+    and actions become attributes of the instance and on_<name>_<signal> slots are connected.
+    """
+    start = time.perf_counter()
+    name = Path(ui_path).name
+    form_class = None
+    try:
+        form_class = _form_class(form_key(ui_path), cache_path)
+    except Exception:
+        logger.exception(f"compiled form for {ui_path} could not be loaded, using loadUi")
+    if form_class is None:
+        uic.loadUi(ui_path, instance)
+        how = 'loadUi'
+        stats['loadui_loads'] += 1
+    else:
+        form = form_class()
+        form.setupUi(instance)
+        for attribute, value in vars(form).items():
+            setattr(instance, attribute, value)
+        how = 'compiled'
+        stats['compiled_loads'] += 1
+    load_times[name] = ((time.perf_counter() - start) * 1000, how)
+    logger.debug(f"{name} built in {load_times[name][0]:.1f}ms ({how})")
+    return instance
+
+
+def compile_form(ui_path: Path, cache_path: Path = CACHE_PATH) -> bool:
+    """
+    Writes the compiled module of the form unless it is current, returns whether the form has a usable compiled
+    module. A form pyuic generates broken code for is marked so it is not compiled again until it changes.
+    """
+    key = form_key(ui_path)
+    module_path = _module_path(key, cache_path)
+    failed_path = module_path.with_suffix(FAILED_SUFFIX)
+    if module_path.exists():
+        return True
+    if failed_path.exists():
+        return False
+    with _lock:
+        cache_path.mkdir(parents=True, exist_ok=True)
+        # modules and failure marks of earlier versions of the form
+        for stale in cache_path.glob(f"{module_path.stem[:-16]}*"):
+            if stale.stem != module_path.stem and len(stale.stem) == len(module_path.stem):
+                stale.unlink(missing_ok=True)
+        source = io.StringIO()
+        try:
+            uic.compileUi(str(ui_path), source)
+            compile(source.getvalue(), str(module_path), 'exec')
+        except Exception as e:
+            logger.warning(f"{ui_path} can not be compiled, it is loaded with loadUi: {e}")
+            failed_path.touch()
+            stats['compile_failures'] += 1
+            return False
+        temp_path = module_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(source.getvalue())
+        os.replace(temp_path, module_path)
+        stats['compiles'] += 1
+    return True
+
+
+def compile_forms(data_path: Path = fsutils.APP_DATA_PATH, cache_path: Path = CACHE_PATH) -> int:
+    """compiles every form that is not current, returns how many forms have a usable compiled module"""
+    return sum(compile_form(ui_path, cache_path) for ui_path in sorted(Path(data_path).glob("*.ui")))
+
+
+if __name__ == "__main__":
+    compiled = compile_forms()
+    print(f"{compiled} forms compiled into {CACHE_PATH}, {stats['compile_failures']} loaded with loadUi")
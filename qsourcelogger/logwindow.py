@@ -10,7 +10,7 @@ import logging
 import os
 from datetime import datetime
 
-from PyQt6 import QtGui, QtWidgets, uic
+from PyQt6 import QtGui, QtWidgets
 from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel, pyqtSignal, QByteArray
 from PyQt6.QtGui import QAction
 from PyQt6.QtWidgets import QTableView, QHeaderView, QAbstractItemView
@@ -19,7 +19,7 @@ from . import fsutils
 from .contest import contests_by_cabrillo_id
 from .contest.AbstractContest import AbstractContest
 from .lib import event as appevent
-from .lib import flags
+from .lib import flags, uicache
 from .lib.ham_utility import get_call_base
 from .model import QsoLog, Contest, DeletedQsoLog
 from .qsoeditwindow import QsoEditWindow
@@ -190,7 +190,7 @@ class LogWindow(DockWidget):
         self.qsoModel = QsoTableModel([])
         self.stationHistoryModel = QsoTableModel([])
 
-        uic.loadUi(fsutils.APP_DATA_PATH / "logwindow.ui", self)
+        uicache.load_ui(fsutils.APP_DATA_PATH / "logwindow.ui", self)
 
         self.checkmark = QtGui.QPixmap(str(fsutils.APP_DATA_PATH / "check.png"))
         self.checkicon = QtGui.QIcon()
@@ -247,7 +247,7 @@ class LogWindow(DockWidget):
 
         self.contest_plugin_class = contests_by_cabrillo_id[self.contest.fk_contest_meta.cabrillo_name]
 
-        self.db_file_name = os.path.basename(fsutils.read_settings().get("current_database"))
+        self.db_file_name = os.path.basename(fsutils.settings.get("current_database"))
 
         self.populate_qso_log()
 
@@ -409,7 +409,7 @@ class LogWindow(DockWidget):
         self.stationHistoryTable.update() #this forces the rows to re-draw for the new header(column) widths
         if self.contest:
             column_state = self.qsoTable.horizontalHeader().saveState()
-            self.contest.merge_settings({"qso_table_column_state": bytes(column_state.toHex()).decode('ascii')})
+            self.contest.defer_settings({"qso_table_column_state": bytes(column_state.toHex()).decode('ascii')})
 
     def load_settings(self):
         """
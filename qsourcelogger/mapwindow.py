@@ -1,54 +1,73 @@
-import datetime
 import logging
 
-import cartopy
-import cartopy.crs as ccrs
-from PyQt6 import uic, QtGui
-from PyQt6.QtCore import QTimer, QThread
-from cartopy.feature.nightshade import Nightshade
+from PyQt6.QtCore import QTimer, Qt
+from PyQt6.QtGui import QCursor, QActionGroup
+from PyQt6.QtWidgets import QMenu
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
 from matplotlib.figure import Figure
 
 from qsourcelogger import fsutils
-from qsourcelogger.lib import event
-from qsourcelogger.model import Station
+from qsourcelogger.lib import event, uicache
+from qsourcelogger.lib.maplayers import MapLayers, WorkedBins
+from qsourcelogger.model import Station, Contest, QsoLog
 from qsourcelogger.qtcomponents.DockWidget import DockWidget
 
 logger = logging.getLogger(__name__)
 
-class RenderWorker(QThread):
-
-    def __init__(self, map_widget):
-        super().__init__()
-        self.map_widget = map_widget
-
-    def run(self):
-        self.map_widget.plot_render()
-
-
 class WorldMap(DockWidget):
     station: Station = None
     call_coords: list = None
+    contest: Contest = None
+    worked: WorkedBins = None
 
-    plot_debounce_timer = False
+    heatmap_modes = {"off": "No Heat Map", "contest": "Contest QSOs", "log": "All Logged QSOs"}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(fsutils.APP_DATA_PATH / "world_map.ui", self)
+        uicache.load_ui(fsutils.APP_DATA_PATH / "world_map.ui", self)
 
         event.register(event.IntermediateQsoUpdate, self.intermediate_qso_update)
         event.register(event.CallChanged, self.event_call_changed)
         event.register(event.StationActivated, self.event_station_activated)
+        event.register(event.ContestActivated, self.event_contest_activated)
+        event.register(event.GetActiveContestResponse, self.event_contest_activated)
+        event.register(event.QsoAdded, self.event_qso_added)
+        event.register(event.QsoDeleted, self.event_qso_deleted)
+        event.register(event.QsoUpdated, self.event_qso_updated)
 
         self.figure = Figure()
         self.figure.set_facecolor("none")
         self.canvas = FigureCanvasQTAgg(self.figure)
         self.setWidget(self.canvas)
+        self.layers = MapLayers(self.figure, self.canvas, fsutils.USER_DATA_PATH / "map_cache")
+
+        # the basemap is re-rasterized once a resize settles
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(300)
+        self.resize_timer.timeout.connect(self.resize_settled)
+        self.canvas.mpl_connect('resize_event', lambda _: self.resize_timer.start())
+
+        self.nightshade_timer = QTimer(self)
+        self.nightshade_timer.timeout.connect(self.refresh_nightshade)
+        self.nightshade_timer.start(self.layers.nightshade_interval * 1000)
+
+        # a burst of logged qsos (an import, replication catching up) re-renders the heat map once
+        self.heatmap_timer = QTimer(self)
+        self.heatmap_timer.setSingleShot(True)
+        self.heatmap_timer.setInterval(500)
+        self.heatmap_timer.timeout.connect(self.layers.update_worked)
+
+        self.heatmap_mode = fsutils.settings.get("worldmap_heatmap", "off")
+        self.canvas.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.canvas.customContextMenuRequested.connect(self.context_menu)
         self.load_station()
+        self.load_worked()
+        event.emit(event.GetActiveContest())
 
     def load_station(self, station: Station = None):
         if station is None:
-            active_station_id = fsutils.read_settings().get("active_station_id", None)
+            active_station_id = fsutils.settings.get("active_station_id")
             if active_station_id:
                 try:
                     self.station = Station.get_by_id(active_station_id)
@@ -78,52 +97,78 @@ class WorldMap(DockWidget):
             self.plot()
 
     def plot(self):
-        # debounce the plot calls incase they come in quick succession
-        if not self.plot_debounce_timer:
-            self.plot_debounce_timer = True
-            QTimer.singleShot(400, self._plot_debounce)
-
-    def _plot_debounce(self):
-        self.render_thread = RenderWorker(self)
-        self.render_thread.start(QThread.Priority.LowPriority)
-
-    def plot_render(self):
-        self.plot_debounce_timer = False
-        self.figure.clf()
-        center_map = None
-        if self.station and self.station.longitude:
-            center_map = self.station.longitude
-
-        ax = self.figure.add_subplot(1, 1, 1, projection=ccrs.PlateCarree(central_longitude=center_map), frame_on=False)
-        # ax.stock_img()
-        date = datetime.datetime.now(datetime.UTC)
-
-        #ax.coastlines()
-        ax.add_feature(cartopy.feature.LAND, facecolor="#f3efe9")
-        ax.add_feature(cartopy.feature.OCEAN, facecolor="#a3d3de")
-        ax.add_feature(cartopy.feature.BORDERS, alpha=0.2)
-
+        """only the station and contact overlay is redrawn, the basemap and nightshade are kept"""
         if self.station and self.station.latitude and self.station.longitude:
-            ax.plot(self.station.longitude, self.station.latitude, linewidth=1, marker='x',
-                    transform=ccrs.PlateCarree(), color='red', markersize=4)
-            if self.call_coords:
-                # draw end point
-                ax.plot(self.call_coords[0], self.call_coords[1], marker='o',
-                        transform=ccrs.PlateCarree(), color='red', markersize=2)
-                # draw line
-                ax.plot([self.station.longitude, self.call_coords[0]], [self.station.latitude, self.call_coords[1]],
-                        color="blue", transform=ccrs.Geodetic())
-                # TODO (configurably) to zoom to the short path automatically, the default extent will need to
-                # be adjusted to fill the aspect ratio of the canvas
-                #ax.get_extent(), ax.set_extent(), https://scitools.org.uk/cartopy/docs/v0.15/matplotlib/geoaxes.html#cartopy.mpl.geoaxes.GeoAxes.set_extent
-            #else:
-            #    ax.set_global()
-
-        ax.set_global()
-        # abuse refraction to create a 'dusk' line
-        ax.add_feature(Nightshade(date, alpha=0.3, refraction=-1))
-        ax.add_feature(Nightshade(date, alpha=0.3, refraction=1))
-
-        # remove margins from plot area
-        self.figure.subplots_adjust(left=0, right=1, bottom=0, top=1)
-        self.canvas.draw()
+            self.layers.set_station(self.station.latitude, self.station.longitude)
+        else:
+            self.layers.set_station(None, None)
+        if self.call_coords:
+            self.layers.set_contact(self.call_coords[1], self.call_coords[0])
+        else:
+            self.layers.set_contact(None, None)
+
+    def resize_settled(self):
+        if self.layers.update_basemap():
+            self.canvas.draw_idle()
+
+    def refresh_nightshade(self):
+        if self.isVisible() and self.layers.refresh_nightshade():
+            self.canvas.draw_idle()
+
+    def context_menu(self):
+        menu = QMenu(self)
+        heatmap_parent = menu.addMenu("Worked Heat Map")
+        group = QActionGroup(heatmap_parent)
+        for mode, label in self.heatmap_modes.items():
+            action = heatmap_parent.addAction(label)
+            action.setCheckable(True)
+            action.setChecked(mode == self.heatmap_mode)
+            action.triggered.connect(lambda _, m=mode: self.set_heatmap_mode(m))
+            group.addAction(action)
+        menu.exec(QCursor.pos())
+
+    def set_heatmap_mode(self, mode: str):
+        self.heatmap_mode = mode
+        fsutils.write_settings({"worldmap_heatmap": mode})
+        self.load_worked()
+
+    def load_worked(self):
+        """bins the qsos of the heat map mode in one query, the events keep them current after that"""
+        self.heatmap_timer.stop()
+        if self.heatmap_mode == "contest" and self.contest:
+            self.worked = WorkedBins()
+            located = self.worked.load(self.contest.id)
+        elif self.heatmap_mode == "log":
+            self.worked = WorkedBins()
+            located = self.worked.load()
+        else:
+            self.worked = None
+            located = 0
+        logger.debug(f"heat map {self.heatmap_mode}, {located} qsos located")
+        self.layers.set_worked(self.worked)
+
+    def counts_qso(self, qso: QsoLog) -> bool:
+        if self.worked is None:
+            return False
+        return self.heatmap_mode == "log" or (self.contest is not None and qso.fk_contest_id == self.contest.id)
+
+    def event_contest_activated(self, e: event.ContestActivated):
+        if e.contest is None or (self.contest and self.contest.id == e.contest.id and self.worked):
+            return
+        self.contest = e.contest
+        if self.heatmap_mode == "contest" or self.worked is None:
+            self.load_worked()
+
+    def event_qso_added(self, e: event.QsoAdded):
+        if self.counts_qso(e.qso) and self.worked.add_qso(e.qso):
+            self.heatmap_timer.start()
+
+    def event_qso_deleted(self, e: event.QsoDeleted):
+        if self.counts_qso(e.qso) and self.worked.add_qso(e.qso, -1):
+            self.heatmap_timer.start()
+
+    def event_qso_updated(self, e: event.QsoUpdated):
+        changed = self.counts_qso(e.qso_before) and self.worked.add_qso(e.qso_before, -1)
+        changed = (self.counts_qso(e.qso_after) and self.worked.add_qso(e.qso_after)) or changed
+        if changed:
+            self.heatmap_timer.start()
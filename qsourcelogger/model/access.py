@@ -0,0 +1,373 @@
+"""
+Access to the log database from many threads.
+
+SQLite takes one writer at a time. With a connection per thread, a long import or rescore transaction held the
+write lock and the entry window's save waited on it. WalDatabase routes the statements instead, the models are
+used as before since peewee hands every statement to execute_sql:
+
+- writes go to the DatabaseWriter thread, the only holder of a read write connection. It runs every write waiting
+  in its queue in one transaction, each in a savepoint so a failing write does not fail the others, and answers
+  them after the single commit (group commit).
+- a transaction, atomic(), begun on another thread leases the writer connection: its statements, reads too, run
+  there in order until it commits or rolls back. The queue waits meanwhile, keep those transactions short.
+- reads outside a transaction run on a read only connection from a small pool. WAL readers never wait on the
+  writer, the rows are fetched before the connection goes back to the pool.
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from typing import Optional
+
+from peewee import __exception_wrapper__
+from playhouse.sqlite_ext import SqliteExtDatabase
+
+logger = logging.getLogger(__name__)
+
+_READS = ('SELECT', 'WITH', 'EXPLAIN', 'VALUES')
+# statements the writer groups into one transaction, anything else (ddl, pragmas, vacuum) runs on its own
+_GROUPED = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def _verb(sql: str) -> str:
+    return sql.lstrip()[:8].upper()
+
+
+def is_read(sql: str) -> bool:
+    verb = _verb(sql)
+    return verb.startswith(_READS) or (verb.startswith('PRAGMA') and '=' not in sql)
+
+
+class _Result:
+    """the rows and counts of a statement run on another thread's connection, in place of its cursor"""
+
+    def __init__(self, cursor):
+        self.description = cursor.description
+        self.rowcount = cursor.rowcount
+        self.lastrowid = cursor.lastrowid
+        self._rows = cursor.fetchall() if cursor.description else []
+        self._position = 0
+        cursor.close()
+
+    def fetchone(self):
+        if self._position >= len(self._rows):
+            return None
+        self._position += 1
+        return self._rows[self._position - 1]
+
+    def fetchmany(self, size: int = 100):
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        pass
+
+
+class _Command:
+    """a statement queued for the writer, the caller waits on it"""
+
+    def __init__(self, sql: str, params=None, ends_lease: bool = False):
+        self.sql = sql
+        self.params = params
+        self.ends_lease = ends_lease
+        self.result: Optional[_Result] = None
+        self.error: Optional[Exception] = None
+        self.queued = time.perf_counter()
+        self.done = threading.Event()
+
+    def wait(self) -> _Result:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class _Lease(_Command):
+    """a transaction of another thread holding the writer connection, queued as its begin statement"""
+
+    def __init__(self, begin_sql: str):
+        super().__init__(begin_sql)
+        self.statements: queue.SimpleQueue[_Command] = queue.SimpleQueue()
+
+    def run(self, sql: str, params=None) -> _Result:
+        command = _Command(sql, params)
+        self.statements.put(command)
+        return command.wait()
+
+    def end(self, sql: str) -> None:
+        """commits or rolls back, the writer goes back to its queue"""
+        command = _Command(sql, ends_lease=True)
+        self.statements.put(command)
+        command.wait()
+
+
+class DatabaseWriter(threading.Thread):
+    """Owns the read write connection, runs the queued writes and leased transactions of the other threads"""
+
+    # writes taken from the queue into one transaction at most
+    group_limit = 500
+
+    def __init__(self, database: 'WalDatabase'):
+        super().__init__(name='database-writer', daemon=True)
+        self.database = database
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.stats = {'writes': 0, 'commits': 0, 'largest_group': 0, 'failed_writes': 0, 'leases': 0,
+                      'max_wait_ms': 0.0, 'lease_ms': 0.0}
+
+    def write(self, sql: str, params=None) -> _Result:
+        command = _Command(sql, params)
+        self.queue.put(command)
+        return command.wait()
+
+    def lease(self, begin_sql: str) -> _Lease:
+        lease = _Lease(begin_sql)
+        self.queue.put(lease)
+        lease.wait()
+        return lease
+
+    def stop(self, timeout: float = 10) -> None:
+        """runs what is queued and closes the connection"""
+        self.queue.put(None)
+        self.join(timeout)
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            taken = [self.queue.get()]
+            while len(taken) < self.group_limit:
+                try:
+                    taken.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            group = []
+            for command in taken:
+                if command is None:
+                    stopping = True
+                elif isinstance(command, _Lease) or not _verb(command.sql).startswith(_GROUPED):
+                    self._commit_group(group)
+                    group = []
+                    if isinstance(command, _Lease):
+                        self._serve_lease(command)
+                    else:
+                        self._commit_group([command])
+                else:
+                    group.append(command)
+            self._commit_group(group)
+        if not self.database.is_closed():
+            self.database.close()
+
+    def _execute(self, sql: str, params=None) -> _Result:
+        return _Result(SqliteExtDatabase.execute_sql(self.database, sql, params))
+
+    def _commit_group(self, group: list[_Command]) -> None:
+        if not group:
+            return
+        now = time.perf_counter()
+        self.stats['max_wait_ms'] = max(self.stats['max_wait_ms'], (now - group[0].queued) * 1000)
+        self.stats['largest_group'] = max(self.stats['largest_group'], len(group))
+        if len(group) == 1:
+            # autocommit, as the statement would have run on its own connection
+            command = group[0]
+            try:
+                command.result = self._execute(command.sql, command.params)
+                self.stats['writes'] += 1
+            except Exception as e:
+                command.error = e
+                self.stats['failed_writes'] += 1
+            self.stats['commits'] += 1
+            command.done.set()
+            return
+        try:
+            self._execute('BEGIN IMMEDIATE')
+            for command in group:
+                self._execute('SAVEPOINT write')
+                try:
+                    command.result = self._execute(command.sql, command.params)
+                    self.stats['writes'] += 1
+                except Exception as e:
+                    command.error = e
+                    self.stats['failed_writes'] += 1
+                    self._execute('ROLLBACK TO SAVEPOINT write')
+                self._execute('RELEASE SAVEPOINT write')
+            self.database.commit()
+            self.stats['commits'] += 1
+        except Exception as e:
+            logger.exception(f"group of {len(group)} writes failed")
+            if self.database.connection().in_transaction:
+                self.database.rollback()
+            for command in group:
+                command.result = None
+                command.error = e
+        for command in group:
+            command.done.set()
+
+    def _serve_lease(self, lease: _Lease) -> None:
+        start = time.perf_counter()
+        self.stats['leases'] += 1
+        try:
+            self._execute(lease.sql)
+        except Exception as e:
+            lease.error = e
+            lease.done.set()
+            return
+        lease.done.set()
+        while True:
+            command = lease.statements.get()
+            try:
+                if command.ends_lease:
+                    if command.sql == 'COMMIT':
+                        self.database.commit()
+                        self.stats['commits'] += 1
+                    else:
+                        self.database.rollback()
+                else:
+                    command.result = self._execute(command.sql, command.params)
+            except Exception as e:
+                command.error = e
+                if command.ends_lease and self.database.connection().in_transaction:
+                    self.database.rollback()
+            command.done.set()
+            if command.ends_lease:
+                break
+        self.stats['lease_ms'] = max(self.stats['lease_ms'], (time.perf_counter() - start) * 1000)
+
+
+class ReaderPool:
+    """Read only connections, taken for a statement and put back, at most size of them are kept open"""
+
+    size = 4
+
+    def __init__(self, database: 'WalDatabase'):
+        self.database = database
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self.stats = {'reads': 0, 'opened': 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = f"file:{urllib.parse.quote(str(self.database.database))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=self.database._timeout, isolation_level=None,
+                               check_same_thread=False)
+        self.database._add_conn_hooks(conn)
+        self.stats['opened'] += 1
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if self._idle.qsize() < self.size:
+                self._idle.put(conn)
+            else:
+                conn.close()
+
+    def read(self, sql: str, params=None) -> _Result:
+        self.stats['reads'] += 1
+        with self.connection() as conn:
+            return _Result(conn.execute(sql, params or ()))
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class WalDatabase(SqliteExtDatabase):
+    """
+    The log database, in WAL mode. Until start_writer every thread uses a connection of its own as a plain
+    SqliteExtDatabase does, after it statements are routed to the writer and the reader pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # before the base class, it calls init
+        self.writer: Optional[DatabaseWriter] = None
+        self.readers = ReaderPool(self)
+        self._local = threading.local()
+        super().__init__(*args, **kwargs)
+
+    def init(self, database, **kwargs):
+        self.stop_writer()
+        self.readers.close()
+        super().init(database, **kwargs)
+
+    def start_writer(self) -> None:
+        self.stop_writer()
+        # the writer opens its own connection
+        if not self.is_closed():
+            self.close()
+        self.writer = DatabaseWriter(self)
+        self.writer.start()
+
+    def stop_writer(self) -> None:
+        writer, self.writer = self.writer, None
+        if writer:
+            writer.stop()
+
+    def close(self):
+        if not self._routed():
+            return super().close()
+        # runs the queued writes and closes the writer connection, then folds the wal into the database file so
+        # it can be copied once closed
+        self.stop_writer()
+        self.readers.close()
+        super().execute_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+        return super().close()
+
+    def _routed(self) -> bool:
+        return self.writer is not None and threading.current_thread() is not self.writer
+
+    def execute_sql(self, sql, params=None, commit=None):
+        if not self._routed():
+            return super().execute_sql(sql, params)
+        logger.debug((sql, params))
+        lease: Optional[_Lease] = getattr(self._local, 'lease', None)
+        if lease is not None:
+            return lease.run(sql, params)
+        if is_read(sql):
+            try:
+                with __exception_wrapper__:
+                    return self.readers.read(sql, params)
+            except Exception as e:
+                # a write the statement verb did not tell, WITH ... INSERT
+                if 'readonly' not in str(e):
+                    raise
+        return self.writer.write(sql, params)
+
+    def begin(self, lock_type=None):
+        if not self._routed():
+            return super().begin(lock_type)
+        self._local.lease = self.writer.lease(f'BEGIN {lock_type}' if lock_type else 'BEGIN')
+
+    def commit(self):
+        if not self._routed():
+            return super().commit()
+        self._end_lease('COMMIT')
+
+    def rollback(self):
+        if not self._routed():
+            return super().rollback()
+        self._end_lease('ROLLBACK')
+
+    def _end_lease(self, sql: str) -> None:
+        lease: Optional[_Lease] = getattr(self._local, 'lease', None)
+        if lease is not None:
+            self._local.lease = None
+            lease.end(sql)
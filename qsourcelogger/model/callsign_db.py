@@ -0,0 +1,159 @@
+"""
+Offline callsign database, filled from a bulk download so name and grid lookups work without an internet connection.
+
+Supported imports:
+
+- FCC ULS amateur license dump, the EN.dat file from l_amat.zip (pipe delimited, no header)
+- CSV with a header row naming any of the columns call, name, first_name, grid, state, country
+
+Calls are the primary key of a WITHOUT ROWID table, so a lookup is a single b-tree probe.
+"""
+from __future__ import annotations
+
+import csv
+import logging
+import time
+from pathlib import Path
+from typing import Optional, Callable, Iterator
+
+from peewee import Model, CharField, SqliteDatabase
+
+logger = logging.getLogger(__name__)
+
+# check_same_thread is a connect argument, as a pragma sqlite ignores it
+_database = SqliteDatabase(None, check_same_thread=False)
+
+
+class BaseModel(Model):
+    class Meta:
+        database = _database
+
+
+class OfflineCallsign(BaseModel):
+    call = CharField(max_length=20, primary_key=True)
+    first_name = CharField(null=True)
+    name = CharField(null=True)
+    grid = CharField(max_length=10, null=True)
+    state = CharField(max_length=20, null=True)
+    country = CharField(null=True)
+
+    class Meta:
+        without_rowid = True
+
+
+# FCC ULS EN.dat column positions
+_EN_CALL = 4
+_EN_ENTITY_NAME = 7
+_EN_FIRST_NAME = 8
+_EN_LAST_NAME = 10
+_EN_STATE = 17
+
+_COLUMNS = ('call', 'first_name', 'name', 'grid', 'state', 'country')
+
+
+class CallsignDatabase:
+    """
+    Parameters
+    ----------
+    path: sqlite file holding the imported calls
+    """
+
+    batch_size = 50_000
+
+    def __init__(self, path):
+        self.path = Path(path)
+        _database.init(str(path), pragmas=(
+            ('journal_mode', 'wal'),))
+        _database.create_tables([OfflineCallsign])
+
+    def get(self, call: str) -> Optional[dict]:
+        cursor = _database.execute_sql(
+            'select call, first_name, name, grid, state, country from offlinecallsign where call = ?', (call,))
+        row = cursor.fetchone()
+        if row:
+            return dict(zip(_COLUMNS, row))
+        return None
+
+    def count(self) -> int:
+        return _database.execute_sql('select count(*) from offlinecallsign').fetchone()[0]
+
+    def import_file(self, path, replace: bool = True,
+                    progress: Callable[[int], None] = None) -> int:
+        """
+        Stream a bulk file into the database. The format is picked from the first line. Returns the number of
+        rows imported.
+        """
+        with open(path, 'rt', encoding='utf-8', errors='replace', newline='') as f:
+            first = f.readline()
+            f.seek(0)
+            if first.startswith('EN|'):
+                rows = self._read_uls(f)
+            else:
+                rows = self._read_csv(f)
+            return self._insert(rows, replace, progress)
+
+    @staticmethod
+    def _read_uls(f) -> Iterator[tuple]:
+        for line in f:
+            fields = line.rstrip('\r\n').split('|')
+            if len(fields) <= _EN_STATE or fields[0] != 'EN' or not fields[_EN_CALL]:
+                continue
+            first = fields[_EN_FIRST_NAME].strip().title() or None
+            last = fields[_EN_LAST_NAME].strip().title()
+            if first or last:
+                name = f"{first or ''} {last}".strip()
+            else:
+                # clubs and other non individual licensees
+                name = fields[_EN_ENTITY_NAME].strip() or None
+            yield (fields[_EN_CALL].strip().upper(), first.split()[0] if first else None, name, None,
+                   fields[_EN_STATE].strip() or None, 'United States')
+
+    @staticmethod
+    def _read_csv(f) -> Iterator[tuple]:
+        reader = csv.reader(f)
+        header = [h.strip().lower() for h in next(reader, [])]
+        if 'call' not in header:
+            raise ValueError("csv file needs a header row with a 'call' column")
+        index = [header.index(c) if c in header else None for c in _COLUMNS]
+        for row in reader:
+            values = [(row[i].strip() or None) if i is not None and i < len(row) else None for i in index]
+            if not values[0]:
+                continue
+            values[0] = values[0].upper()
+            if values[1] is None and values[2]:
+                values[1] = values[2].split()[0]
+            yield tuple(values)
+
+    def _insert(self, rows: Iterator[tuple], replace: bool, progress: Callable[[int], None]) -> int:
+        start = time.perf_counter()
+        conn = _database.connection()
+        # durability does not matter for a bulk load that can be redone, speed does
+        conn.execute('pragma synchronous = off')
+        total = 0
+        try:
+            with _database.atomic():
+                if replace:
+                    conn.execute('delete from offlinecallsign')
+                batch = []
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= self.batch_size:
+                        total += self._insert_batch(conn, batch)
+                        batch = []
+                        if progress:
+                            progress(total)
+                if batch:
+                    total += self._insert_batch(conn, batch)
+        finally:
+            conn.execute('pragma synchronous = normal')
+        _database.execute_sql('analyze offlinecallsign')
+        if progress:
+            progress(total)
+        logger.info(f"imported {total} calls into {self.path} in {time.perf_counter() - start:.1f}s")
+        return total
+
+    @staticmethod
+    def _insert_batch(conn, batch: list[tuple]) -> int:
+        conn.executemany('insert or replace into offlinecallsign (call, first_name, name, grid, state, country) '
+                         'values (?, ?, ?, ?, ?, ?)', batch)
+        return len(batch)
@@ -30,6 +30,13 @@ class Spot(BaseModel):
         safe = re.sub('[^a-zA-Z0-9/?]', '', search.upper())
         return list(Spot.select(Spot.callsign.distinct()).where(SQL(f"callsign like '%{safe.replace('?', '_')}%'")))
 
+    @staticmethod
+    def get_near(freq_hz: int, window_hz: int = 5000, limit: int = 10) -> list[str]:
+        """callsigns spotted within window_hz of freq_hz, closest first"""
+        return [x.callsign for x in Spot.select(Spot.callsign)
+                .where(Spot.freq_hz.between(freq_hz - window_hz, freq_hz + window_hz))
+                .order_by(SQL('abs(freq_hz - ?)', (freq_hz,))).limit(limit)]
+
     @staticmethod
     def delete_before(minutes_ago: int):
         sql = Spot.delete().where(SQL("ts < datetime('now', ?)", (f"-{minutes_ago} minutes",)))
@@ -0,0 +1,126 @@
+"""
+On disk cache of external callsign lookups (qrz, hamdb, hamqth) and the profile images they reference.
+
+Entries are keyed on the base callsign. An entry older than the ttl is still returned, it is just flagged as stale
+so the caller can refresh it in the background. The least recently used entries are evicted once the cache holds
+more than max_entries.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from datetime import datetime, timedelta, UTC
+from typing import Optional
+
+from peewee import Model, CharField, DateTimeField, SqliteDatabase, TextField, BlobField
+
+from qsourcelogger.lib.ham_utility import get_call_base
+
+logger = logging.getLogger(__name__)
+
+_database = SqliteDatabase(None)
+
+
+class BaseModel(Model):
+    class Meta:
+        database = _database
+
+
+class CachedLookup(BaseModel):
+    call_base = CharField(max_length=20, primary_key=True)
+    call = CharField(max_length=20)
+    source = CharField(max_length=20, null=True)
+    result = TextField()
+    fetched_at = DateTimeField(index=True)
+    accessed_at = DateTimeField(index=True)
+    image_url = TextField(null=True)
+    image_type = CharField(max_length=50, null=True)
+    image = BlobField(null=True)
+
+
+class LookupCache:
+    """
+    Parameters
+    ----------
+    path: sqlite file the cache lives in
+    ttl: age after which an entry is considered stale and should be refreshed
+    max_entries: lru eviction threshold
+    """
+
+    def __init__(self, path, ttl: timedelta = timedelta(days=30), max_entries: int = 20000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._inserts_since_evict = 0
+        _database.init(str(path), pragmas=(
+            ('journal_mode', 'wal'),
+            ('synchronous', 'normal')))
+        _database.create_tables([CachedLookup])
+
+    def get(self, call: str) -> Optional[tuple[dict, bool]]:
+        """
+        Returns the cached result fields and whether they are stale, or None when the call was never looked up.
+        """
+        row = CachedLookup.get_or_none(CachedLookup.call_base == get_call_base(call))
+        try:
+            result = json.loads(row.result) if row else None
+        except ValueError:
+            logger.warning(f"discarding unreadable cache entry for {row.call_base}")
+            row.delete_instance()
+            result = None
+        if not result:
+            # never looked up, or only its image is cached
+            self.misses += 1
+            return None
+        self.hits += 1
+        now = datetime.now(UTC)
+        CachedLookup.update(accessed_at=now).where(CachedLookup.call_base == row.call_base).execute()
+        return result, self._as_utc(row.fetched_at) + self.ttl < now
+
+    def put(self, call: str, result: dict, source: str = None):
+        now = datetime.now(UTC)
+        base = get_call_base(call)
+        CachedLookup.insert(call_base=base, call=call, source=source, result=json.dumps(result, default=str),
+                            fetched_at=now, accessed_at=now) \
+            .on_conflict(conflict_target=[CachedLookup.call_base],
+                         preserve=[CachedLookup.call, CachedLookup.source, CachedLookup.result,
+                                   CachedLookup.fetched_at, CachedLookup.accessed_at]) \
+            .execute()
+        self._inserts_since_evict += 1
+        if self._inserts_since_evict >= 100:
+            self.evict()
+
+    def get_image(self, call: str, url: str) -> Optional[tuple[bytes, str]]:
+        """Image bytes and content type, if the image cached for this call was downloaded from url"""
+        row = CachedLookup.select(CachedLookup.image, CachedLookup.image_type) \
+            .where((CachedLookup.call_base == get_call_base(call)) & (CachedLookup.image_url == url)
+                   & CachedLookup.image.is_null(False)).get_or_none()
+        if row:
+            return bytes(row.image), row.image_type
+        return None
+
+    def put_image(self, call: str, url: str, data: bytes, content_type: str = None):
+        """Cache the image of a call, with an empty lookup result when the call has no entry yet"""
+        now = datetime.now(UTC)
+        CachedLookup.insert(call_base=get_call_base(call), call=call, result=json.dumps({}), fetched_at=now,
+                            accessed_at=now, image_url=url, image=data, image_type=content_type) \
+            .on_conflict(conflict_target=[CachedLookup.call_base],
+                         preserve=[CachedLookup.image_url, CachedLookup.image, CachedLookup.image_type]) \
+            .execute()
+
+    def evict(self) -> int:
+        """Drop the least recently used entries beyond max_entries"""
+        self._inserts_since_evict = 0
+        keep = CachedLookup.select(CachedLookup.call_base).order_by(CachedLookup.accessed_at.desc()) \
+            .limit(self.max_entries)
+        deleted = CachedLookup.delete().where(CachedLookup.call_base.not_in(keep)).execute()
+        if deleted:
+            logger.info(f"evicted {deleted} lookup cache entries")
+        return deleted
+
+    @staticmethod
+    def _as_utc(ts: datetime) -> datetime:
+        if isinstance(ts, str):
+            ts = datetime.fromisoformat(ts)
+        return ts if ts.tzinfo else ts.replace(tzinfo=UTC)
@@ -1,13 +1,20 @@
 from typing import Optional, Any
+import json
+import logging
 import re
+import threading
+import time
 
 from peewee import Model, CharField, IntegerField, ForeignKeyField, TextField, DateTimeField, FloatField, DoubleField, \
-    UUIDField, BooleanField, SQL
-from playhouse.sqlite_ext import SqliteExtDatabase, JSONField
+    UUIDField, BooleanField, SQL, fn
+from playhouse.sqlite_ext import JSONField
 from . import persistent_migrations
+from .access import WalDatabase
 from ..lib.ham_utility import get_call_base
 
-_database = SqliteExtDatabase(None)
+logger = logging.getLogger(__name__)
+
+_database = WalDatabase(None)
 
 class BaseModel(Model):
     class Meta:
@@ -116,9 +123,100 @@ class Contest(BaseModel):
         if save:
             self.save()
 
+    def defer_settings(self, to_merge: dict[str: Any]):
+        """
+        merges ui state that changes in bursts (column widths while dragging) into the settings, the database is
+        written behind by contest_settings_writer
+        """
+        self.settings.update(to_merge)
+        contest_settings_writer.merge(self.id, to_merge)
+
     def get_setting(self, setting_name: str, default_value: Any = None):
+        pending = contest_settings_writer.pending(self.id)
+        if setting_name in pending:
+            return pending[setting_name]
         return dict(self.settings).get(setting_name, default_value)
 
+    def save(self, *args, **kwargs):
+        result = super().save(*args, **kwargs)
+        # the whole settings blob was written, put back anything written behind that this instance has not seen
+        contest_settings_writer.flush(self.id)
+        return result
+
+
+class ContestSettingsWriter:
+    """
+    Write behind of contest settings. Updates are kept in memory and written at most once every flush_interval
+    seconds, and on close. A flush sets only the keys that changed with one json_set update, so it cannot
+    overwrite settings written meanwhile by other code (the serial high water) and a crash loses at most the
+    last interval of ui state, never the rest of the blob.
+    """
+
+    flush_interval = 2.0
+
+    def __init__(self):
+        self._pending: dict[int, dict] = {}
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self.stats = {'updates': 0, 'db_writes': 0, 'writes_saved': 0, 'failed_writes': 0, 'flush_ms': 0.0}
+
+    def merge(self, contest_id: int, to_merge: dict):
+        with self._lock:
+            self.stats['updates'] += 1
+            self._pending.setdefault(contest_id, {}).update(to_merge)
+            if self._timer is None:
+                self._start_timer(self.flush_interval)
+
+    def pending(self, contest_id: int) -> dict:
+        with self._lock:
+            return dict(self._pending.get(contest_id, {}))
+
+    def _start_timer(self, delay: float):
+        self._timer = threading.Timer(delay, self._timer_expired)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _timer_expired(self):
+        with self._lock:
+            self._timer = None
+            self.flush()
+
+    def flush(self, contest_id: Optional[int] = None) -> int:
+        """writes the pending settings of the contest, or of all contests, returns the number of database writes"""
+        with self._lock:
+            contest_ids = [contest_id] if contest_id is not None else list(self._pending)
+            writes = 0
+            for pending_id in contest_ids:
+                pending = self._pending.get(pending_id)
+                if not pending:
+                    continue
+                start = time.perf_counter()
+                paths = []
+                for key, value in pending.items():
+                    paths += [f'$.{key}', fn.json(json.dumps(value))]
+                try:
+                    Contest.update(settings=fn.json_set(fn.coalesce(Contest.settings, '{}'), *paths))\
+                        .where(Contest.id == pending_id).execute()
+                except Exception:
+                    # kept for the next flush
+                    self.stats['failed_writes'] += 1
+                    logger.exception(f"writing settings of contest {pending_id}")
+                    continue
+                del self._pending[pending_id]
+                writes += 1
+                self.stats['db_writes'] += 1
+                self.stats['flush_ms'] = (time.perf_counter() - start) * 1000
+            self.stats['writes_saved'] = self.stats['updates'] - self.stats['db_writes']
+            if not self._pending and self._timer:
+                self._timer.cancel()
+                self._timer = None
+            elif self._pending and self._timer is None:
+                self._start_timer(self.flush_interval)
+            return writes
+
+
+contest_settings_writer = ContestSettingsWriter()
+
 # when creating a new record use .save(force_insert=True) because the id is not auto incrementing
 class QsoLog(BaseModel):
     id = UUIDField(primary_key=True)
@@ -317,11 +415,21 @@ class DeletedQsoLog(QsoLog):
 
 
 def loadPersistantDb(path: str):
+    # settings written behind belong to the database being closed
+    contest_settings_writer.flush()
     _database.init(path, pragmas=(
         ('check_same_thread', False),
         ('journal_mode', 'wal'),  # Use WAL-mode (you should always use this!).
         ('foreign_keys', 1)))  # Enforce foreign-key constraints.
+    # from here on writes go through the writer thread and reads to the read only pool
+    _database.start_writer()
     _database.create_tables([Station, Contest, ContestMeta, QsoLog, DeletedQsoLog])
 
-    for migration in persistent_migrations.funcs:
-        migration(_database)
+    persistent_migrations.migrate(_database)
+
+
+def closePersistantDb():
+    contest_settings_writer.flush()
+    if _database.writer:
+        logger.info(f"database writer {_database.writer.stats}, readers {_database.readers.stats}")
+    _database.close()
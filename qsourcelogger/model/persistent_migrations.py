@@ -1,9 +1,20 @@
 # Facilitates updating user databases as models change
 # https://docs.peewee-orm.com/en/latest/peewee/playhouse.html#schema-migrations
+#
+# A database records the migrations applied to it in the schema_version table, a migration's version is its
+# position in funcs counting from 1. Append new migrations to funcs, never reorder or remove one. Each migration
+# runs once, in a transaction with the row recording it.
+import logging
+import time
+from datetime import datetime, timezone
+
 from peewee import Database
+from playhouse.migrate import SqliteMigrator, migrate as run_operations
 
 from qsourcelogger import fsutils
 
+logger = logging.getLogger(__name__)
+
 
 def v001_add_contest_meta(db: Database):
     # populate the db with contest definitions
@@ -15,5 +26,46 @@ def v001_add_contest_meta(db: Database):
                 db.execute_sql(line)
 
 
+def v002_add_contest_indexes(db: Database):
+    # the hot queries of the open contest filter on fk_contest first, with only the single column indexes sqlite
+    # searched fk_contest_id and read every qso of the contest to filter or sort the rest
+    migrator = SqliteMigrator(db)
+    run_operations(
+        # dupe check by call, band and mode, and the like call completion reads only the index
+        migrator.add_index('qsolog', ('fk_contest_id', 'call', 'band', 'mode')),
+        # the log window newest first, the rate rebuild reads only the index
+        migrator.add_index('qsolog', ('fk_contest_id', 'time_on', 'band', 'mode', 'operator')),
+        # station history of the call entered
+        migrator.add_index('qsolog', ('fk_contest_id', 'call_search')),
+        # serial number high water
+        migrator.add_index('qsolog', ('fk_contest_id', 'stx')),
+    )
+    # statistics so the planner prefers the composite indexes over fk_contest_id
+    db.execute_sql("analyze qsolog")
+
+
 funcs = [v001_add_contest_meta,
+         v002_add_contest_indexes,
          ]
+
+
+def schema_version(db: Database) -> int:
+    db.execute_sql("create table if not exists schema_version "
+                   "(version integer primary key, name text not null, applied text not null)")
+    return db.execute_sql("select max(version) from schema_version").fetchone()[0] or 0
+
+
+def migrate(db: Database) -> int:
+    """applies the migrations the database does not have yet, returns its schema version"""
+    version = schema_version(db)
+    if version > len(funcs):
+        logger.warning(f"database schema version {version} is newer than this release knows ({len(funcs)})")
+    for version, migration in enumerate(funcs[version:], start=version + 1):
+        start = time.perf_counter()
+        with db.atomic():
+            migration(db)
+            db.execute_sql("insert into schema_version (version, name, applied) values (?, ?, ?)",
+                           (version, migration.__name__, datetime.now(timezone.utc).isoformat()))
+        logger.info(f"database migrated to schema version {version} {migration.__name__} "
+                    f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+    return version
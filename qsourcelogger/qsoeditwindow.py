@@ -3,11 +3,12 @@ import logging
 import pickle
 import typing
 
-from PyQt6 import uic, QtWidgets, QtCore
+from PyQt6 import QtWidgets, QtCore
 from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex, QMimeData, pyqtSignal, QTimer
 
 from qsourcelogger import fsutils
 from qsourcelogger.contest import contests_by_cabrillo_id
+from qsourcelogger.lib import uicache
 from qsourcelogger.model import QsoLog, Contest
 from qsourcelogger.qtcomponents.DockWidget import DockWidget
 from qsourcelogger.qtcomponents.QsoFieldDelegate import QsoFieldDelegate, handle_set_data, get_table_data, field_display_names
@@ -287,7 +288,7 @@ class QsoEditWindow(DockWidget):
         super().__init__(parent)
         self.contest = contest
 
-        uic.loadUi(fsutils.APP_DATA_PATH / "qso_edit_sheet.ui", self)
+        uicache.load_ui(fsutils.APP_DATA_PATH / "qso_edit_sheet.ui", self)
 
         if not is_in_progress:
             # if the edit sheet is not the 'in progress' qso, force it to be floating only and not integrated into the
@@ -429,5 +430,5 @@ class QsoEditWindow(DockWidget):
 
     def save_settings(self):
         if self.model and self.model.structure:
-            self.contest.merge_settings({"qso_edit_sheet_row_structure": self.model.structure})
+            self.contest.defer_settings({"qso_edit_sheet_row_structure": self.model.structure})
 
@@ -2,11 +2,12 @@ import datetime
 import logging
 import os
 
-from PyQt6 import QtWidgets, uic
+from PyQt6 import QtWidgets
 from PyQt6.QtCore import QThread, QTime
 from PyQt6.QtWidgets import QFileDialog, QTableWidget, QLabel, QRadioButton, QDateTimeEdit
 
 from qsourcelogger import fsutils
+from qsourcelogger.lib import uicache
 from qsourcelogger.lib.hamutils.adif import ADIWriter, ADXWriter
 from qsourcelogger.model import Contest, QsoLog, adapters
 
@@ -48,7 +49,7 @@ class AdifExport(QtWidgets.QDialog):
     def __init__(self, contest: Contest, parent=None) -> None:
         super().__init__(parent)
 
-        uic.loadUi(fsutils.APP_DATA_PATH / 'AdifExport.ui', self)
+        uicache.load_ui(fsutils.APP_DATA_PATH / 'AdifExport.ui', self)
         self.contest = contest
         self.label_contest.setText(f"({self.contest.id}) {self.contest.fk_contest_meta.display_name} [start: "
             f"{self.contest.start_date.date()}]")
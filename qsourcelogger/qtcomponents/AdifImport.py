@@ -3,12 +3,12 @@ import logging
 import os
 import uuid
 
-from PyQt6 import QtWidgets, uic
+from PyQt6 import QtWidgets
 from PyQt6.QtCore import QThread, Qt
 from PyQt6.QtWidgets import QFileDialog, QApplication, QTableWidget, QTableWidgetItem, QLabel
 
 from qsourcelogger import fsutils
-from qsourcelogger.lib import event
+from qsourcelogger.lib import bandplan, event, geodesy, uicache
 from qsourcelogger.lib.hamutils.adif import ADIReader, ADXReader
 from qsourcelogger.model import Contest, QsoLog, adapters
 
@@ -32,10 +32,16 @@ class ConversionWorker(QThread):
                 self.process_import_list(ADXReader(f))
 
     def process_import_list(self, qso_list):
-        for adif in qso_list:
-            qso = adapters.convert_adif_to_qso(adif)
-
+        qsos = [adapters.convert_adif_to_qso(adif) for adif in qso_list]
+        # records without a band get it from their frequency, the whole log in one lookup
+        without_band = bandplan.fill_bands(qsos)
+        if without_band:
+            logger.warning(f"{without_band} imported qsos have no band and a frequency outside the band plan")
+        for qso in qsos:
             status = 'NEW'
+            if not qso.band:
+                self.result.append(('NO BAND', qso))
+                continue
             if qso.id and QsoLog.select().where(QsoLog.id == qso.id).get_or_none():
                 status = 'REPLACE(ID)'
 
@@ -54,6 +60,8 @@ class ConversionWorker(QThread):
                 qso.id = result.id
                 status = "REPLACE(MATCHING_FIELDS)"
             self.result.append((status, qso))
+        # the whole log at once rather than a grid parse and haversine per qso
+        geodesy.fill_distance([qso for _, qso in self.result])
 
 
 class PersistenceWorker(QThread):
@@ -68,6 +76,9 @@ class PersistenceWorker(QThread):
 
     def run(self):
         for index, (status, qso) in enumerate(self.qsos):
+            if status == 'NO BAND':
+                self.failed += 1
+                continue
             is_insert = False
             if not qso.id:
                 # set a new id
@@ -89,7 +100,7 @@ class AdifImport(QtWidgets.QDialog):
 
     def __init__(self, contest: Contest, parent=None) -> None:
         super().__init__(parent)
-        uic.loadUi(fsutils.APP_DATA_PATH / 'AdifImport.ui', self)
+        uicache.load_ui(fsutils.APP_DATA_PATH / 'AdifImport.ui', self)
 
         self.contest = contest
         self.label_contest.setText(f"({self.contest.id}) {self.contest.fk_contest_meta.display_name} [start: "
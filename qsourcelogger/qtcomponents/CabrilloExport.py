@@ -1,11 +1,12 @@
 import logging
 import os
 
-from PyQt6 import QtWidgets, uic
+from PyQt6 import QtWidgets
 from PyQt6.QtCore import QThread
 from PyQt6.QtWidgets import QFileDialog, QTableWidget, QLabel, QRadioButton
 
 from qsourcelogger import fsutils
+from qsourcelogger.lib import uicache
 from qsourcelogger.contest.AbstractContest import AbstractContest
 from qsourcelogger.lib.hamutils.cabrillo import CabrilloWriter
 from qsourcelogger.model import Contest, QsoLog, adapters, Station
@@ -46,7 +47,7 @@ class CabrilloExport(QtWidgets.QDialog):
     def __init__(self, contest: Contest, contest_plugin: AbstractContest, station: Station, parent=None) -> None:
         super().__init__(parent)
 
-        uic.loadUi(fsutils.APP_DATA_PATH / 'CabrilloExport.ui', self)
+        uicache.load_ui(fsutils.APP_DATA_PATH / 'CabrilloExport.ui', self)
         self.contest = contest
         self.contest_plugin = contest_plugin
         self.station = station
@@ -0,0 +1,28 @@
+import logging
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from qsourcelogger.model.callsign_db import CallsignDatabase
+
+logger = logging.getLogger(__name__)
+
+
+class CallsignDbImportWorker(QThread):
+    """Streams a bulk callsign file (fcc uls EN.dat or csv) into the offline callsign database"""
+
+    progress = pyqtSignal(int)
+
+    imported: int = 0
+    error: str = None
+
+    def __init__(self, file, database: CallsignDatabase):
+        super().__init__()
+        self.file = file
+        self.database = database
+
+    def run(self):
+        try:
+            self.imported = self.database.import_file(self.file, progress=self.progress.emit)
+        except Exception as e:
+            logger.exception(f"Error importing callsign database {self.file}")
+            self.error = str(e)
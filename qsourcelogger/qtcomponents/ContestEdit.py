@@ -3,7 +3,7 @@ import datetime
 import logging
 
 import typing
-from PyQt6 import uic, QtGui, QtWidgets
+from PyQt6 import QtGui, QtWidgets
 from PyQt6.QtCore import QDate, QTime, QEvent, QTimer, QModelIndex, QAbstractTableModel, Qt
 from PyQt6.QtGui import QAction
 from PyQt6.QtWidgets import QComboBox, QPlainTextEdit, QDateTimeEdit, QLineEdit, QDialog, QPushButton, QMessageBox, \
@@ -11,6 +11,7 @@ from PyQt6.QtWidgets import QComboBox, QPlainTextEdit, QDateTimeEdit, QLineEdit,
 
 from qsourcelogger import fsutils
 from qsourcelogger.contest.AbstractContest import ContestField
+from qsourcelogger.lib import uicache
 from qsourcelogger.lib.event_model import ContestActivated
 from qsourcelogger.model import Contest, ContestMeta, Station, QsoLog, DeletedQsoLog
 from qsourcelogger.contest import contest_plugin_list, contests_by_cabrillo_id, GeneralLogging, GeneralSerialLogging
@@ -210,7 +211,7 @@ class ContestEdit(QtWidgets.QDialog):
     def __init__(self, app_data_path, parent=None):
         super().__init__(parent)
         self.settings = fsutils.read_settings()
-        uic.loadUi(app_data_path / "ContestEdit.ui", self)
+        uicache.load_ui(app_data_path / "ContestEdit.ui", self)
 
         self.button_close.clicked.connect(self.close)
         self.button_new.clicked.connect(self.new_contest)
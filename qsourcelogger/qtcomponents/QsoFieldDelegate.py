@@ -11,7 +11,7 @@ from PyQt6.QtGui import QFont
 from PyQt6.QtWidgets import QStyledItemDelegate, QWidget, QStyleOptionViewItem, QLineEdit, QComboBox, QDateTimeEdit
 from peewee import FloatField
 
-from qsourcelogger.lib import hamutils
+from qsourcelogger.lib import bandplan
 from qsourcelogger.model import QsoLog, Contest, Station, Enums
 
 logger = logging.getLogger(__name__)
@@ -110,13 +110,13 @@ def handle_set_data(qso: QsoLog, field_name: str, value ) -> bool:
         return False
     logger.info(f"update qso record for {qso.id}, {field_name} = {value}")
     if field_name == 'freq':
-        band = hamutils.adif.common.convert_freq_to_band(int(value) / 1000_000)
+        band = bandplan.adif_band(int(value))
         if not band:
             raise Exception(f"Frequency {value} does not fall within a band")
         qso.band = band
         value = int(value)
     elif field_name == 'freq_rx':
-        qso.band_rx = hamutils.adif.common.convert_freq_to_band(int(value) / 1000_000)
+        qso.band_rx = bandplan.adif_band(int(value))
         value = int(value)
     elif field_name == 'call':
         value = value.strip().upper()
@@ -0,0 +1,30 @@
+import logging
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from qsourcelogger.lib.bigcty import BigCty
+from qsourcelogger.lib.rescore import rescore_contest, RescoreResult
+
+logger = logging.getLogger(__name__)
+
+
+class RescoreWorker(QThread):
+    """Rescores every qso of a contest, see lib/rescore.py"""
+
+    progress = pyqtSignal(int, int)
+
+    result: RescoreResult = None
+    error: str = None
+
+    def __init__(self, contest_id: int, cty: BigCty, dry_run: bool = False):
+        super().__init__()
+        self.contest_id = contest_id
+        self.cty = cty
+        self.dry_run = dry_run
+
+    def run(self):
+        try:
+            self.result = rescore_contest(self.contest_id, self.cty, self.dry_run, progress=self.progress.emit)
+        except Exception as e:
+            logger.exception(f"Error rescoring contest {self.contest_id}")
+            self.error = str(e)
@@ -3,13 +3,13 @@ import datetime
 import logging
 import typing
 
-from PyQt6 import QtWidgets, uic, QtGui
+from PyQt6 import QtWidgets, QtGui
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QTableWidget, QTableWidgetItem, QPushButton, QComboBox, QMessageBox, QAbstractItemView
 
 from qsourcelogger import fsutils
 from qsourcelogger.lib import event as appevent
-from qsourcelogger.lib.bigcty import BigCty
+from qsourcelogger.lib import startup, uicache
 from qsourcelogger.lib.ham_utility import gridtolatlon
 from qsourcelogger.model import Station
 
@@ -25,11 +25,9 @@ class StationSettings(QtWidgets.QDialog):
 
     station: Station = None
 
-    bigcty = BigCty(fsutils.APP_DATA_PATH / "cty.json")
-
     def __init__(self, app_data_path, parent=None):
         super(StationSettings, self).__init__(parent)
-        uic.loadUi(app_data_path / 'StationSettings.ui', self)
+        uicache.load_ui(app_data_path / 'StationSettings.ui', self)
         self.settings = fsutils.read_settings()
 
         self.button_close.clicked.connect(self.close)
@@ -116,7 +114,7 @@ class StationSettings(QtWidgets.QDialog):
     def call_change(self, call):
         """Populate zones"""
         if call:
-            results = self.bigcty.find_call_match(call)
+            results = startup.cty.get().find_call_match(call)
             if results:
                 self.set_if_empty(Station.cq_zone.name, results.get("cq", ""))
                 self.set_if_empty(Station.itu_zone.name, results.get("itu", ""))
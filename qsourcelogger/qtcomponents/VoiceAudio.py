@@ -47,7 +47,7 @@ class VoiceAudio(QThread):
 
         # TODO check to make sure the sound device setting is valid. if not, default to
         # first in list. If user is on a laptop it is likely that sound devices change
-        device_name = fsutils.read_settings().get("sounddevice", "default")
+        device_name = fsutils.settings.get("sounddevice", "default")
 
         sd.default.device = device_name
         sd.default.samplerate = 44100.0
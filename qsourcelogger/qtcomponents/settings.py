@@ -5,11 +5,12 @@ import platform
 
 import serial.tools.list_ports
 import sounddevice as sd
-from PyQt6 import QtWidgets, uic
+from PyQt6 import QtWidgets
 from PyQt6.QtCore import pyqtSignal
 from PyQt6.QtWidgets import QTabWidget, QComboBox
 
 from qsourcelogger import fsutils
+from qsourcelogger.lib import uicache
 
 logger = logging.getLogger(__name__)
 
@@ -28,7 +29,7 @@ class Settings(QtWidgets.QDialog):
         """initialize dialog"""
         super().__init__(parent)
         self.logger = logging.getLogger("settings")
-        uic.loadUi(app_data_path / "configuration.ui", self)
+        uicache.load_ui(app_data_path / "configuration.ui", self)
         self.buttonBox.accepted.connect(self.save_pref_values)
         self.preference = pref
 
@@ -63,6 +64,7 @@ class Settings(QtWidgets.QDialog):
         self.lookup_source_qrz.setChecked(bool(self.preference.get("lookup_source_qrz")))
         self.lookup_source_hamdb.setChecked(bool(self.preference.get("lookup_source_hamdb")))
         self.lookup_source_hamqth.setChecked(bool(self.preference.get("lookup_source_hamqth")))
+        self.lookup_source_offline.setChecked(bool(self.preference.get("lookup_source_offline")))
         self.lookup_user_name_field.setText(self.preference.get("lookup_username"))
         self.lookup_password_field.setText(self.preference.get("lookup_password"))
         self.lookup_populate_name.setChecked(self.preference.get("lookup_populate_name"))
@@ -168,6 +170,7 @@ class Settings(QtWidgets.QDialog):
         new_pref["lookup_source_qrz"] = self.lookup_source_qrz.isChecked()
         new_pref["lookup_source_hamdb"] = self.lookup_source_hamdb.isChecked()
         new_pref["lookup_source_hamqth"] = self.lookup_source_hamqth.isChecked()
+        new_pref["lookup_source_offline"] = self.lookup_source_offline.isChecked()
         new_pref["lookup_username"] = self.lookup_user_name_field.text()
         new_pref["lookup_password"] = self.lookup_password_field.text()
         new_pref["lookup_populate_name"] = self.lookup_populate_name.isChecked()
@@ -1,12 +1,13 @@
 
-from PyQt6 import QtWidgets, uic
+from PyQt6 import QtWidgets
 
 from qsourcelogger import fsutils
+from qsourcelogger.lib import uicache
 
 
 class Spotsend(QtWidgets.QDialog):
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        uic.loadUi(fsutils.APP_DATA_PATH / "spot_confirm.ui", self)
+        uicache.load_ui(fsutils.APP_DATA_PATH / "spot_confirm.ui", self)
 
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Rate meter window. Shows the rolling qso rates of the active contest, per band and mode, the projected score and an
+hour by band breakdown that can be exported for post contest analysis.
+"""
+# pylint: disable=no-name-in-module, unused-import, no-member, invalid-name, logging-fstring-interpolation, c-extension-no-member
+
+import logging
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget, \
+    QTableWidgetItem, QFileDialog
+
+from qsourcelogger import fsutils
+from qsourcelogger.contest.RateEngine import RateEngine
+from qsourcelogger.lib import event
+from qsourcelogger.qtcomponents.DockWidget import DockWidget
+
+logger = logging.getLogger(__name__)
+
+
+class RateWindow(DockWidget):
+    """Periodically refreshed view of the active RateEngine"""
+
+    refresh_interval_ms = 5000
+    rate_columns = ['', 'QSOs', 'Last 10 /hr', 'Last 100 /hr', '10 min', '60 min']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.setObjectName("RateWindow")
+        self.setWindowTitle("Rate")
+
+        container = QWidget(self)
+        layout = QVBoxLayout(container)
+        header = QHBoxLayout()
+        self.summary = QLabel(container)
+        header.addWidget(self.summary, 1)
+        export = QPushButton("Export CSV", container)
+        export.clicked.connect(self.export)
+        header.addWidget(export)
+        layout.addLayout(header)
+
+        self.rate_table = QTableWidget(container)
+        self.rate_table.setColumnCount(len(self.rate_columns))
+        self.rate_table.setHorizontalHeaderLabels(self.rate_columns)
+        self.rate_table.verticalHeader().hide()
+        layout.addWidget(self.rate_table, 1)
+
+        self.hour_table = QTableWidget(container)
+        self.hour_table.verticalHeader().hide()
+        layout.addWidget(self.hour_table, 2)
+        self.setWidget(container)
+
+        event.register(event.QsoAdded, self.event_qso_added)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(self.refresh_interval_ms)
+        self.refresh()
+
+    def event_qso_added(self, _):
+        self.refresh()
+
+    def export(self):
+        engine = RateEngine.active
+        if not engine:
+            return
+        filename, _ = QFileDialog.getSaveFileName(self, "Export hour by band", str(fsutils.USER_DATA_PATH /
+                                                  f"{engine.contest.get_display_name()} rates.csv"),
+                                                  "CSV (*.csv)")
+        if filename:
+            engine.export_hour_by_band(filename)
+
+    def refresh(self):
+        if not self.isVisible():
+            return
+        engine = RateEngine.active
+        if not engine:
+            self.summary.setText("No active contest")
+            self.rate_table.setRowCount(0)
+            self.hour_table.setRowCount(0)
+            return
+
+        projected = engine.projected_score()
+        totals = engine.rates()
+        self.summary.setText(f"{totals['last_60_min']} qsos last hour, "
+                             f"projected score {projected:,.0f}" if projected else
+                             f"{totals['last_60_min']} qsos last hour")
+
+        hours, bands, counts = engine.hour_by_band()
+        modes = sorted(key[1] for key in engine.counters if key[0] == 'mode' and key[1])
+        rows = [('All', totals)] \
+            + [(band, engine.rates(band=band)) for band in bands] \
+            + [(mode, engine.rates(mode=mode)) for mode in modes]
+        self.rate_table.setRowCount(len(rows))
+        for row, (name, rates) in enumerate(rows):
+            values = [name, str(rates['qsos']), f"{rates['last_10_rate']:.0f}", f"{rates['last_100_rate']:.0f}",
+                      str(rates['last_10_min']), str(rates['last_60_min'])]
+            for column, value in enumerate(values):
+                self.rate_table.setItem(row, column, QTableWidgetItem(value))
+        self.rate_table.resizeColumnsToContents()
+
+        self.hour_table.setColumnCount(len(bands) + 2)
+        self.hour_table.setHorizontalHeaderLabels(['Hour'] + [str(b) for b in bands] + ['Total'])
+        self.hour_table.setRowCount(len(hours))
+        # newest hour on top
+        for row, hour in enumerate(reversed(hours)):
+            values = [counts.get((hour, band), 0) for band in bands]
+            self.hour_table.setItem(row, 0, QTableWidgetItem(hour.strftime('%d %H:00')))
+            for column, value in enumerate(values + [sum(values)]):
+                self.hour_table.setItem(row, column + 1, QTableWidgetItem(str(value) if value else ''))
+        self.hour_table.resizeColumnsToContents()
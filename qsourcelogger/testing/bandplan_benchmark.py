@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the bulk band lookups against the per frequency bisect. Resolves random frequencies (in band, out of
+band and missing) with BandPlan.names and with adif_band per frequency, fills the bands of a synthetic imported
+log with bandplan.fill_bands and saves a burst of cluster spots with BandMapWindow.save_spots, checking each
+against the scalar lookup. Exits non zero when they differ or filling the log takes longer than the budget.
+
+    python qsourcelogger/testing/bandplan_benchmark.py --freqs 300000 --qsos 100000 --budget 0.5
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime
+
+from qsourcelogger.bandmap import BandMapWindow
+from qsourcelogger.lib import bandplan
+from qsourcelogger.model import QsoLog
+from qsourcelogger.model.inmemory import Spot
+
+parser = argparse.ArgumentParser(description="Compare bulk and per frequency band lookups.")
+parser.add_argument("-f", "--freqs", type=int, default=300000, help="Random frequencies resolved")
+parser.add_argument("-n", "--qsos", type=int, default=100000, help="Qsos in the imported log")
+parser.add_argument("-p", "--spots", type=int, default=2000, help="Spots in the cluster burst")
+parser.add_argument("-b", "--budget", type=float, default=0.5, help="Seconds allowed to fill the log's bands")
+parser.add_argument("-s", "--seed", type=int, default=41, help="Random seed")
+
+args = parser.parse_args()
+
+
+def random_freq(rng: random.Random):
+    """hz, mostly inside a band, some just outside one and some missing"""
+    roll = rng.random()
+    if roll < 0.02:
+        return None
+    band = rng.choice(bandplan.ADIF_PLAN.bands)
+    if roll < 0.1:
+        return band.high_hz + rng.randint(1, 5000)
+    return rng.randint(band.low_hz, band.high_hz)
+
+
+def timed(fn, *fn_args):
+    start = time.perf_counter()
+    result = fn(*fn_args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    rng = random.Random(args.seed)
+    failures = []
+
+    freqs = [random_freq(rng) for _ in range(args.freqs)]
+    bulk, bulk_seconds = timed(lambda: bandplan.ADIF_PLAN.names(freqs).tolist())
+    scalar, scalar_seconds = timed(lambda: [bandplan.adif_band(freq) for freq in freqs])
+    if bulk != scalar:
+        mismatched = sum(1 for a, b in zip(bulk, scalar) if a != b)
+        failures.append(f"{mismatched} of {args.freqs} frequencies resolved differently in bulk")
+
+    qsos = []
+    for _ in range(args.qsos):
+        freq = random_freq(rng) or 14025000
+        split = rng.random() < 0.1
+        qsos.append(QsoLog(call="K1ABC", freq=freq, freq_rx=freq + 1000 if split else None))
+    expected = [(bandplan.adif_band(qso.freq), bandplan.adif_band(qso.freq_rx)) for qso in qsos]
+    without_band, fill_seconds = timed(bandplan.fill_bands, qsos)
+    if [(qso.band, qso.band_rx) for qso in qsos] != expected:
+        failures.append("fill_bands set bands that differ from the per qso lookup")
+    if without_band != sum(1 for band, _ in expected if not band):
+        failures.append(f"fill_bands reported {without_band} qsos without a band")
+    if fill_seconds > args.budget:
+        failures.append(f"filling the bands took {fill_seconds:.3f}s, budget {args.budget:.3f}s")
+
+    # a burst of spots of a few calls, each call spotted again on the bands it is already on
+    calls = [f"W{i}XX" for i in range(args.spots // 4 or 1)]
+    spots = [Spot(ts=datetime.utcnow(), callsign=rng.choice(calls), freq_hz=random_freq(rng) or 7025000,
+                  mode="DX", spotter="K1ABC", comment="") for _ in range(args.spots)]
+    latest = {}
+    for spot in spots:
+        band = bandplan.operating_band(spot.freq_hz)
+        latest[(spot.callsign, band.adif) if band else id(spot)] = (spot.callsign, spot.freq_hz)
+    Spot.delete().execute()
+    _, spot_seconds = timed(BandMapWindow.save_spots, spots)
+    saved = sorted((spot.callsign, spot.freq_hz) for spot in Spot.select())
+    if saved != sorted(latest.values()):
+        failures.append(f"{len(saved)} spots saved, {len(latest)} expected one per call and band")
+
+    print(f"{args.freqs} frequencies  bulk {bulk_seconds * 1000:8.1f}ms  per frequency "
+          f"{scalar_seconds * 1000:8.1f}ms  x{scalar_seconds / bulk_seconds:.0f}")
+    print(f"{args.qsos} imported qsos banded in {fill_seconds * 1000:.1f}ms, {without_band} out of band")
+    print(f"{args.spots} spots saved in {spot_seconds * 1000:.1f}ms, {len(saved)} kept")
+
+    for failure in failures:
+        print(failure)
+    print("FAIL" if failures else "ok")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
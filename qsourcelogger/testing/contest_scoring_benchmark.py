@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Scoring regression check for the contest plugins. Logs a synthetic contest for each plugin into a scratch
+database, scores it the way the running app does (aggregate queries and numpy over columns fetched once) and
+compares the result with a plain qso by qso recount, which scores each qso with the published point rules
+written out below rather than the plugin's numpy rules. Then enters more qsos the way the entry window does,
+predicting the multipliers each would add before logging it. Exits non zero when a plugin's score differs, a
+prediction differs from what logging the qso added or changed the qso entered, or a full recompute takes longer
+than the time budget.
+
+    python qsourcelogger/testing/contest_scoring_benchmark.py --qsos 10000 --budget 0.5
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from qsourcelogger.contest import contest_plugin_list
+from qsourcelogger.contest.RacCanadaDay import RAC_OFFICIAL_STATIONS
+from qsourcelogger.contest.ScoreEngine import ScoreEngine
+from qsourcelogger.contest.ScoredContest import PHONE_MODES, W_VE
+from qsourcelogger.lib.ham_utility import calculate_wpx_prefix
+from qsourcelogger.model import Contest, ContestMeta, QsoLog, Station, loadPersistantDb
+
+parser = argparse.ArgumentParser(description="Score synthetic logs with every contest plugin.")
+parser.add_argument("-n", "--qsos", type=int, default=10000, help="Qsos logged per contest")
+parser.add_argument("-b", "--budget", type=float, default=0.5, help="Seconds allowed for a full recompute")
+parser.add_argument("-c", "--contest", type=str, action="append", help="Cabrillo name to check, repeatable")
+parser.add_argument("-p", "--predictions", type=int, default=200, help="Qsos entered after the log is scored")
+parser.add_argument("-s", "--seed", type=int, default=73, help="Random seed for the synthetic logs")
+parser.add_argument("-d", "--database", type=str, help="Keep the scratch database at this path")
+
+args = parser.parse_args()
+
+# dxcc, country, continent, cq zone, itu zone, call prefixes
+ENTITIES = (
+    (291, "United States", "NA", 5, 8, ("K", "W", "N", "AA")),
+    (1, "Canada", "NA", 4, 4, ("VE", "VA")),
+    (50, "Mexico", "NA", 6, 10, ("XE",)),
+    (6, "Alaska", "NA", 1, 1, ("KL",)),
+    (110, "Hawaii", "OC", 31, 61, ("KH6",)),
+    (230, "Fed. Rep. of Germany", "EU", 14, 28, ("DL", "DK", "DJ")),
+    (223, "England", "EU", 14, 27, ("G", "M")),
+    (227, "France", "EU", 14, 27, ("F",)),
+    (248, "Italy", "EU", 15, 28, ("I", "IK")),
+    (281, "Spain", "EU", 14, 37, ("EA",)),
+    (54, "European Russia", "EU", 16, 29, ("UA", "RA")),
+    (339, "Japan", "AS", 25, 45, ("JA", "JH", "JR")),
+    (318, "China", "AS", 24, 44, ("BY",)),
+    (150, "Australia", "OC", 30, 59, ("VK",)),
+    (170, "New Zealand", "OC", 32, 60, ("ZL",)),
+    (108, "Brazil", "SA", 11, 15, ("PY",)),
+    (100, "Argentina", "SA", 13, 14, ("LU",)),
+    (462, "South Africa", "AF", 38, 57, ("ZS",)),
+    (5, "Aland Islands", "EU", 15, 18, ("OH0",)),
+)
+STATES = ("CT", "MA", "NY", "NJ", "PA", "OH", "MI", "IL", "TX", "CA", "WA", "FL", "GA", "CO", "AZ", "MN")
+PROVINCES = ("ON", "QC", "BC", "AB", "SK", "MB", "NS", "NB", "NL", "PE")
+SECTIONS = ("CT", "EMA", "WMA", "ENY", "NLI", "EPA", "WPA", "OH", "MI", "IL", "STX", "SCV", "WWA", "GA", "ONE", "QC")
+BANDS = ("160m", "80m", "40m", "20m", "15m", "10m")
+VHF_BANDS = ("6m", "2m", "1.25m", "70cm", "33cm", "23cm", "13cm")
+MODES = ("CW", "SSB", "FT8", "RTTY")
+NAMES = ("JIM", "SUE", "KYLE", "ANNE", "BOB", "PAT", "LEE", "DANA")
+
+
+def make_station() -> Station:
+    station = Station(station_name="benchmark", callsign="K1ABC", gridsquare="FN31pr", dxcc=291,
+                      continent="NA", cq_zone=5, itu_zone=8, country="United States", arrl_sect="CT")
+    station.save()
+    return station
+
+
+def make_call(rng: random.Random, entity) -> str:
+    suffix = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(rng.randint(1, 3)))
+    call = f"{rng.choice(entity[5])}{rng.randint(0, 9)}{suffix}"
+    return call + "/MM" if rng.random() < 0.005 else call
+
+
+def make_qso(rng: random.Random, contest: Contest, calls: list, time_on: datetime) -> QsoLog:
+    call, entity = rng.choice(calls)
+    dxcc, country, continent, cqz, ituz, _ = entity
+    vhf = contest.fk_contest_meta.cabrillo_name.startswith("ARRL-VHF")
+    if dxcc in (291, 6, 110):
+        exchange = rng.choice(STATES)
+    elif dxcc == 1:
+        exchange = rng.choice(PROVINCES)
+    else:
+        exchange = rng.choice((str(rng.randint(1, 50)), str(ituz), "DARC", "100"))
+    grid = f"{rng.choice('DEFGJ')}{rng.choice('MNOP')}{rng.randint(10, 99)}"
+    return QsoLog(
+        id=uuid.uuid4(), fk_contest=contest, time_on=time_on, call=call, call_search=call,
+        rst_sent="599", rst_rcvd="599", band=rng.choice(VHF_BANDS if vhf else BANDS),
+        mode=rng.choice(MODES), freq=14025000, station_callsign="K1ABC", operator="K1ABC",
+        dxcc=dxcc, country=country, continent=continent, cqz=cqz, ituz=ituz,
+        wpx_prefix=calculate_wpx_prefix(call), srx=rng.randint(1, 3000), srx_string=exchange,
+        state=exchange if dxcc in (291, 1) else None, arrl_sect=rng.choice(SECTIONS),
+        class_contest=rng.choice("ABMQSU"), check=str(rng.randint(50, 99)), name=rng.choice(NAMES),
+        gridsquare=grid, my_gridsquare="FN31pr", distance=rng.randint(0, 12000),
+    )
+
+
+def log_contest(plugin_class, station: Station, count: int, rng: random.Random):
+    meta = ContestMeta.select().where(ContestMeta.cabrillo_name == plugin_class.get_cabrillo_name()).first()
+    if not meta:
+        return None
+    contest = Contest(fk_contest_meta=meta, fk_station=station, start_date=datetime(2024, 11, 2, 21),
+                      power_category="LOW", sent_exchange="001")
+    contest.save()
+    plugin = plugin_class(contest)
+    # calls are worked again on other bands and modes, as in a real log
+    calls = []
+    for _ in range(max(count // 3, 1)):
+        entity = rng.choice(ENTITIES)
+        calls.append((make_call(rng, entity), entity))
+    start = contest.start_date
+    qsos = [make_qso(rng, contest, calls, start + timedelta(seconds=i * 9)) for i in range(count)]
+    for qso in qsos:
+        plugin.derive_multipliers(qso)
+    points = plugin.points_vector(plugin.qso_columns(qsos), len(qsos)) if plugin.point_fields else None
+    for i, qso in enumerate(qsos):
+        qso.points = int(points[i]) if points is not None else plugin.points_for_qso(qso)
+    with QsoLog._meta.database.atomic():
+        QsoLog.bulk_create(qsos, batch_size=500)
+    return plugin
+
+
+def same_country(plugin, qso) -> bool:
+    station = plugin.contest.fk_station
+    if station.dxcc:
+        return qso.dxcc == station.dxcc
+    return (qso.country or '').strip().upper() == (station.country or '').strip().upper()
+
+
+def cq_points(plugin, qso, same_country_points: int) -> int:
+    if same_country(plugin, qso):
+        return same_country_points
+    if qso.continent == plugin.contest.fk_station.continent:
+        return 2 if plugin.contest.fk_station.continent == 'NA' else 1
+    return 3
+
+
+def wpx_points(plugin, qso) -> int:
+    points = cq_points(plugin, qso, 1)
+    return points * 2 if qso.band in ('40m', '80m', '160m') and not same_country(plugin, qso) else points
+
+
+def arrl_dx_points(plugin, qso) -> int:
+    if plugin.contest.fk_station.dxcc in W_VE:
+        return 3 if qso.dxcc is not None and qso.dxcc not in W_VE else 0
+    return 3 if qso.dxcc in W_VE else 0
+
+
+def cq_160_points(plugin, qso) -> int:
+    if qso.call.upper().endswith('/MM'):
+        return 5
+    if same_country(plugin, qso):
+        return 2
+    return 5 if qso.continent == plugin.contest.fk_station.continent else 10
+
+
+def iaru_points(plugin, qso) -> int:
+    exchange = (qso.srx_string or '').strip()
+    if exchange.isdigit():
+        if exchange.lstrip('0') == str(plugin.contest.fk_station.itu_zone or '').lstrip('0'):
+            return 1
+    elif exchange:
+        # a headquarters station
+        return 1
+    return 3 if qso.continent == plugin.contest.fk_station.continent else 5
+
+
+def vhf_points(qso, points: tuple) -> int:
+    for bands, band_points in zip((('6m', '2m'), ('1.25m', '70cm'), ('33cm', '23cm'),
+                                   ('13cm', '9cm', '6cm', '3cm', '1.25cm', '6mm', '4mm', '2.5mm', '2mm', '1mm',
+                                    'submm')), points):
+        if qso.band in bands:
+            return band_points
+    return 0
+
+
+def naqp_points(plugin, qso) -> int:
+    return 1 if plugin.contest.fk_station.continent == 'NA' or qso.continent == 'NA' else 0
+
+
+def rac_points(qso) -> int:
+    if qso.call.upper() in RAC_OFFICIAL_STATIONS:
+        return 20
+    return 10 if qso.dxcc == 1 else 2
+
+
+def stew_perry_points(plugin, qso) -> int:
+    return (1 + (qso.distance or 0) // 500) * {'QRP': 4, 'LOW': 2}.get(plugin.contest.power_category, 1)
+
+
+# the published point rules of each contest, a qso at a time
+REFERENCE_POINTS = {
+    'ARRL-10': lambda plugin, qso: 2 if qso.mode in PHONE_MODES else 4 if qso.mode == 'CW' else 0,
+    'ARRL-DX-CW': arrl_dx_points,
+    'ARRL-DX-SSB': arrl_dx_points,
+    'ARRL-FIELD-DAY': lambda plugin, qso: 1 if qso.mode in PHONE_MODES else 2,
+    'WFD': lambda plugin, qso: 1 if qso.mode in PHONE_MODES else 2,
+    'ARRL-VHF-JAN': lambda plugin, qso: vhf_points(qso, (1, 2, 4, 8)),
+    'ARRL-VHF-JUN': lambda plugin, qso: vhf_points(qso, (1, 2, 3, 4)),
+    'ARRL-VHF-SEP': lambda plugin, qso: vhf_points(qso, (1, 2, 3, 4)),
+    'CQ-160-CW': cq_160_points,
+    'CQ-160-SSB': cq_160_points,
+    'CQ-WW-CW': lambda plugin, qso: cq_points(plugin, qso, 0),
+    'CQ-WW-SSB': lambda plugin, qso: cq_points(plugin, qso, 0),
+    'CQ-WPX-CW': wpx_points,
+    'CQ-WPX-SSB': wpx_points,
+    'IARU-HF': iaru_points,
+    'JIDX-CW': lambda plugin, qso: {'160m': 4, '80m': 2, '40m': 1, '20m': 1, '15m': 1, '10m': 2}.get(qso.band, 0),
+    'JIDX-SSB': lambda plugin, qso: {'160m': 4, '80m': 2, '40m': 1, '20m': 1, '15m': 1, '10m': 2}.get(qso.band, 0),
+    'NAQP-CW': naqp_points,
+    'NAQP-SSB': naqp_points,
+    'NAQP-RTTY': naqp_points,
+    'RAC-CANADA-DAY': lambda plugin, qso: rac_points(qso),
+    'STEW-PERRY': stew_perry_points,
+}
+
+
+def reference_points(plugin, qso) -> int:
+    rule = REFERENCE_POINTS.get(plugin.get_cabrillo_name())
+    if rule:
+        return rule(plugin, qso)
+    # without point_fields a plugin scores a qso by itself, points_vector is not involved
+    return plugin.points_for_qso(qso) or 0
+
+
+def recount(plugin):
+    """qso by qso reference score, the points from the published rules and the multipliers counted as a set"""
+    dimensions = plugin.get_multiplier_dimensions()
+    worked = {d.name: set() for d in dimensions}
+    points = 0
+    qsos = 0
+    for qso in plugin.contest_qso_select():
+        qsos += 1
+        points += reference_points(plugin, qso)
+        for dimension in dimensions:
+            value = dimension.value_of(qso)
+            if value is not None:
+                worked[dimension.name].add((dimension.scope(qso.band, qso.mode), value))
+    multipliers = sum(len(values) for values in worked.values())
+    return qsos, points, multipliers, plugin.score(points, multipliers)
+
+
+def check_predict(plugin, rng: random.Random) -> list[str]:
+    """enters qsos as the entry window does, predicting each before logging it"""
+    engine = ScoreEngine(plugin)
+    if not engine.dimensions:
+        return []
+    engine.recompute()
+    calls = [(make_call(rng, entity), entity) for entity in (rng.choice(ENTITIES) for _ in range(args.predictions))]
+    start = plugin.contest.start_date + timedelta(days=1)
+    problems = []
+    for i in range(args.predictions):
+        qso = make_qso(rng, plugin.contest, calls, start + timedelta(seconds=i * 9))
+        # typed into the exchange fields, logging normalizes them and builds srx_string from them
+        exchange_fields = getattr(plugin, '_exchange_fields', ())
+        for name in exchange_fields:
+            if isinstance(getattr(qso, name), str):
+                setattr(qso, name, getattr(qso, name).lower())
+        if 'srx_string' not in exchange_fields:
+            qso.srx_string = None
+        entered = dict(qso.__data__)
+        new, _, _ = engine.predict(qso)
+        if qso.__data__ != entered:
+            problems.append(f"predicting {qso.call} changed the qso entered")
+        multipliers = engine.multiplier_count
+        plugin.pre_process_qso_log(qso)
+        plugin.qso_logged(qso)
+        plugin.derive_multipliers(qso)
+        qso.points = plugin.points_for_qso(qso)
+        qso.save(force_insert=True)
+        engine.add(qso)
+        if engine.multiplier_count - multipliers != len(new):
+            problems.append(f"{qso.call} predicted new {new}, logging it added "
+                            f"{engine.multiplier_count - multipliers} multipliers")
+    return problems[:1] + [f"and {len(problems) - 1} more predictions"] if len(problems) > 1 else problems
+
+
+def check(plugin, rng: random.Random) -> bool:
+    name = plugin.get_cabrillo_name()
+
+    start = time.perf_counter()
+    qsos, points, worked = ScoreEngine(plugin).query_state()
+    multipliers = ScoreEngine.count_multipliers(worked)
+    vector_points = int(plugin.points_for_log().sum())
+    total = plugin.calculate_total_points()
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ref_qsos, ref_points, ref_multipliers, ref_total = recount(plugin)
+    ref_elapsed = time.perf_counter() - start
+
+    problems = []
+    if plugin.point_fields and name not in REFERENCE_POINTS:
+        problems.append("no reference point rule, add it to REFERENCE_POINTS")
+    if (qsos, points, multipliers) != (ref_qsos, ref_points, ref_multipliers):
+        problems.append(f"running state qsos {qsos} points {points} mults {multipliers}, recount qsos {ref_qsos} "
+                        f"points {ref_points} mults {ref_multipliers}")
+    if vector_points != ref_points:
+        problems.append(f"vector points {vector_points}, recount {ref_points}")
+    if total != ref_total:
+        problems.append(f"score {total}, recount {ref_total}")
+    if elapsed > args.budget:
+        problems.append(f"recompute took {elapsed:.3f}s, budget {args.budget:.3f}s")
+    problems += check_predict(plugin, rng)
+
+    print(f"{'FAIL' if problems else 'ok  '} {name:<16} {qsos:>6} qsos {multipliers:>5} mults score {total or 0:>10,} "
+          f"recompute {elapsed * 1000:7.1f}ms, qso by qso {ref_elapsed * 1000:7.1f}ms")
+    for problem in problems:
+        print(f"     {problem}")
+    return not problems
+
+
+def main():
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as scratch:
+        loadPersistantDb(args.database or str(Path(scratch) / "scoring_benchmark.db"))
+        station = make_station()
+        failures = 0
+        for plugin_class in contest_plugin_list:
+            if args.contest and plugin_class.get_cabrillo_name() not in args.contest:
+                continue
+            plugin = log_contest(plugin_class, station, args.qsos, rng)
+            if not plugin:
+                print(f"skip {plugin_class.get_cabrillo_name()}: no contest meta")
+                continue
+            if not check(plugin, rng):
+                failures += 1
+        QsoLog._meta.database.close()
+    print(f"{failures} contest(s) failed" if failures else "all contests passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Check of the contest settings write behind. Replays a column drag, a burst of qso table header states, against a
+scratch database twice: once saving the contest on every state as the log window used to and once through
+Contest.defer_settings. A serial high water mark is written directly in the middle of the drag, the way the serial
+allocator does. Exits non zero when the written settings are wrong, the high water mark is lost or the write
+behind wrote more often than once per flush interval.
+
+    python qsourcelogger/testing/contest_settings_benchmark.py --updates 600 --seconds 3 --interval 0.5
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import math
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from peewee import fn
+
+from qsourcelogger.model import Contest, ContestMeta, Station, contest_settings_writer, loadPersistantDb
+
+parser = argparse.ArgumentParser(description="Compare saving contest settings on every change with writing behind.")
+parser.add_argument("-n", "--updates", type=int, default=600, help="Header states in the drag")
+parser.add_argument("-s", "--seconds", type=float, default=3, help="How long the drag takes")
+parser.add_argument("-i", "--interval", type=float, default=0.5, help="Write behind flush interval in seconds")
+
+args = parser.parse_args()
+
+
+def make_contest() -> Contest:
+    station = Station(station_name="benchmark", callsign="K1ABC", gridsquare="FN31pr")
+    station.save()
+    contest = Contest(fk_contest_meta=ContestMeta.select().first(), fk_station=station,
+                      start_date=datetime(2024, 11, 2, 21), settings={'user_fields': ['name']})
+    contest.save()
+    return contest
+
+
+def drag(contest: Contest, store) -> float:
+    """header states at the pace of the drag, returns the milliseconds spent in the store calls"""
+    spent = 0.0
+    for i in range(args.updates):
+        if i == args.updates // 2:
+            Contest.update(settings=fn.json_set(Contest.settings, '$.serial_high_water', 42))\
+                .where(Contest.id == contest.id).execute()
+        start = time.perf_counter()
+        store({"qso_table_column_state": f"{i:08x}" * 40})
+        spent += time.perf_counter() - start
+        time.sleep(args.seconds / args.updates)
+    return spent * 1000
+
+
+def main():
+    contest_settings_writer.flush_interval = args.interval
+    with tempfile.TemporaryDirectory() as scratch:
+        loadPersistantDb(str(Path(scratch) / "settings_benchmark.db"))
+        saved = make_contest()
+        save_ms = drag(saved, saved.merge_settings)
+
+        behind = make_contest()
+        behind_ms = drag(behind, behind.defer_settings)
+        pending_read = behind.get_setting("qso_table_column_state")
+        contest_settings_writer.flush()
+        stats = dict(contest_settings_writer.stats)
+
+        expected = f"{args.updates - 1:08x}" * 40
+        saved_settings = Contest.get_by_id(saved.id).settings
+        behind_settings = Contest.get_by_id(behind.id).settings
+
+    allowed = math.ceil(args.seconds / args.interval) + 1
+    print(f"{args.updates} header states over {args.seconds}s, flush interval {args.interval}s")
+    print(f"save on every change {args.updates:6d} writes {save_ms:8.1f}ms")
+    print(f"write behind         {stats['db_writes']:6d} writes {behind_ms:8.1f}ms, "
+          f"{stats['writes_saved']} writes saved, last flush {stats['flush_ms']:.2f}ms")
+
+    failures = []
+    if behind_settings.get("qso_table_column_state") != expected or pending_read != expected:
+        failures.append("the write behind did not keep the last header state")
+    if behind_settings.get("user_fields") != ['name']:
+        failures.append("the write behind lost the other settings")
+    if behind_settings.get("serial_high_water") != 42:
+        failures.append("the write behind overwrote the serial high water mark")
+    if saved_settings.get("serial_high_water") != 42:
+        print("saving on every change lost the serial high water mark")
+    if stats['db_writes'] > allowed:
+        failures.append(f"{stats['db_writes']} writes, at most {allowed} expected")
+    for failure in failures:
+        print(failure)
+    print("FAIL" if failures else "ok")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
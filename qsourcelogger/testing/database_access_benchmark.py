@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the log database access layer. Runs the entry window's work, a dupe check then a save per qso, on
+the main thread while an adif import saves qsos one at a time and an export reads the whole log over and over on
+worker threads, against a scratch database twice: with a connection per thread, as before, and with the writer
+thread and read only pool. Prints the entry window's dupe check and save latencies and the import rate of both.
+Then checks that a failing write in a group commit fails alone and that a transaction of another thread sees
+its own writes and rolls them back. Exits non zero when a check fails or the p99 of the entry window's save with
+the writer thread is over the budget.
+
+    python qsourcelogger/testing/database_access_benchmark.py --qsos 300 --import-qsos 5000 --budget 50
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from peewee import IntegrityError
+
+from qsourcelogger.model import Contest, ContestMeta, QsoLog, Station, closePersistantDb, loadPersistantDb
+from qsourcelogger.model.persistent import _database
+
+parser = argparse.ArgumentParser(description="Time the entry window's database work under an import and export.")
+parser.add_argument("-n", "--qsos", type=int, default=300, help="Qsos logged on the main thread")
+parser.add_argument("-i", "--import-qsos", type=int, default=5000, help="Qsos saved by the import thread")
+parser.add_argument("-b", "--budget", type=float, default=50, help="Milliseconds (p99) an entry save may take")
+parser.add_argument("-s", "--seed", type=int, default=7, help="Random seed")
+
+args = parser.parse_args()
+
+START = datetime(2024, 11, 2, 21)
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] if values else 0.0
+
+
+def new_qso(contest: Contest, call: str, minutes: float) -> QsoLog:
+    return QsoLog(id=uuid.uuid4(), time_on=START + timedelta(minutes=minutes), call=call, rst_sent="59",
+                  rst_rcvd="59", freq=14025000, band="20m", mode="CW", station_callsign="K1ABC", fk_contest=contest)
+
+
+def make_contest() -> Contest:
+    station = Station(station_name="benchmark", callsign="K1ABC", gridsquare="FN31pr")
+    station.save()
+    contest = Contest(fk_contest_meta=ContestMeta.select().first(), fk_station=station, start_date=START)
+    contest.save()
+    return contest
+
+
+def run_scenario(path: Path, routed: bool) -> dict:
+    loadPersistantDb(str(path))
+    if not routed:
+        _database.stop_writer()
+    contest = make_contest()
+    rng = random.Random(args.seed)
+    stop = threading.Event()
+    imported = {'saved': 0, 'seconds': 0.0, 'exports': 0}
+
+    def import_log():
+        start = time.perf_counter()
+        for i in range(args.import_qsos):
+            new_qso(contest, f"I{i}XX", i / 10).save(force_insert=True)
+            imported['saved'] += 1
+        imported['seconds'] = time.perf_counter() - start
+
+    def export_log():
+        while not stop.is_set():
+            len(list(QsoLog.select().where(QsoLog.fk_contest == contest)))
+            imported['exports'] += 1
+
+    workers = [threading.Thread(target=import_log), threading.Thread(target=export_log)]
+    for worker in workers:
+        worker.start()
+    checks, saves = [], []
+    for i in range(args.qsos):
+        call = f"K{rng.randint(0, 9)}{rng.choice('ABCDEFGH')}{rng.choice('ABCDEFGH')}"
+        start = time.perf_counter()
+        QsoLog.select().where(QsoLog.fk_contest == contest, QsoLog.call == call).limit(1).get_or_none()
+        checks.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        new_qso(contest, call, i).save(force_insert=True)
+        saves.append((time.perf_counter() - start) * 1000)
+        # an operator logs a few qsos a second at most, this is faster
+        time.sleep(0.002)
+    workers[0].join()
+    stop.set()
+    workers[1].join()
+    count = QsoLog.select().where(QsoLog.fk_contest == contest).count()
+    stats = dict(_database.writer.stats) if _database.writer else {}
+    closePersistantDb()
+    return {'checks': checks, 'saves': saves, 'imported': imported, 'count': count, 'stats': stats}
+
+
+def check_group_failure(contest: Contest) -> bool:
+    """a duplicate insert queued with others fails alone"""
+    duplicate = new_qso(contest, "DUPE", 0)
+    duplicate.save(force_insert=True)
+    barrier = threading.Barrier(9)
+    failed = []
+
+    def save(qso: QsoLog):
+        barrier.wait()
+        try:
+            qso.save(force_insert=True)
+        except IntegrityError:
+            failed.append(qso.call)
+
+    qsos = [new_qso(contest, f"G{i}RP", i) for i in range(8)] + [new_qso(contest, "DUPE", 0)]
+    qsos[-1].id = duplicate.id
+    threads = [threading.Thread(target=save, args=(qso,)) for qso in qsos[1:]]
+    for thread in threads:
+        thread.start()
+    save(qsos[0])
+    for thread in threads:
+        thread.join()
+    saved = QsoLog.select().where(QsoLog.call.startswith("G")).count()
+    return failed == ["DUPE"] and saved == 8
+
+
+def check_transaction(contest: Contest) -> bool:
+    """a transaction on another thread reads its own writes and rolls them back"""
+    seen = []
+
+    def transact():
+        with _database.atomic('IMMEDIATE') as transaction:
+            new_qso(contest, "ROLLBACK", 0).save(force_insert=True)
+            seen.append(QsoLog.select().where(QsoLog.call == "ROLLBACK").count())
+            transaction.rollback()
+
+    thread = threading.Thread(target=transact)
+    thread.start()
+    thread.join()
+    return seen == [1] and QsoLog.select().where(QsoLog.call == "ROLLBACK").count() == 0
+
+
+def main():
+    with tempfile.TemporaryDirectory() as scratch:
+        direct = run_scenario(Path(scratch) / "direct.db", routed=False)
+        routed = run_scenario(Path(scratch) / "routed.db", routed=True)
+
+        loadPersistantDb(str(Path(scratch) / "checks.db"))
+        contest = make_contest()
+        group_ok = check_group_failure(contest)
+        transaction_ok = check_transaction(contest)
+        closePersistantDb()
+
+    expected = args.qsos + args.import_qsos
+    print(f"{args.qsos} entry qsos while importing {args.import_qsos} and exporting the log")
+    for name, result in (("connection per thread", direct), ("writer thread", routed)):
+        imported = result['imported']
+        print(f"{name:22s} dupe check p50 {percentile(result['checks'], 0.5):6.2f}ms "
+              f"p99 {percentile(result['checks'], 0.99):6.2f}ms, "
+              f"save p50 {percentile(result['saves'], 0.5):6.2f}ms p99 {percentile(result['saves'], 0.99):6.2f}ms "
+              f"max {max(result['saves']):6.1f}ms, import {imported['saved'] / imported['seconds']:6.0f} qso/s, "
+              f"{imported['exports']} exports")
+    print(f"writer {routed['stats']}")
+
+    failures = []
+    for name, result in (("connection per thread", direct), ("writer thread", routed)):
+        if result['count'] != expected:
+            failures.append(f"{name}: {result['count']} qsos in the log, {expected} saved")
+    if percentile(routed['saves'], 0.99) > args.budget:
+        failures.append(f"entry save p99 {percentile(routed['saves'], 0.99):.1f}ms, budget {args.budget}ms")
+    if not group_ok:
+        failures.append("a failing write in a group commit failed the others or was not reported")
+    if not transaction_ok:
+        failures.append("a transaction of another thread did not see its writes or did not roll back")
+    for failure in failures:
+        print(failure)
+    print("FAIL" if failures else "ok")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the array geodesy against the scalar ham_utility functions. Builds a synthetic imported log of random
+locators (4 to 10 characters, some missing or malformed), fills in distances with geodesy.fill_distance and with a
+ham_utility.distance call per qso, and checks that both agree. Exits non zero when they differ or the batch fill
+takes longer than the budget.
+
+    python qsourcelogger/testing/geodesy_benchmark.py --qsos 100000 --budget 0.5
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from qsourcelogger.lib import geodesy, ham_utility
+from qsourcelogger.model import QsoLog
+
+parser = argparse.ArgumentParser(description="Compare array and scalar grid, distance and bearing calculations.")
+parser.add_argument("-n", "--qsos", type=int, default=100000, help="Qsos in the imported log")
+parser.add_argument("-b", "--budget", type=float, default=0.5, help="Seconds allowed to fill the log's distances")
+parser.add_argument("-g", "--grid", type=str, default="FN31pr", help="Station locator")
+parser.add_argument("-s", "--seed", type=int, default=29, help="Random seed")
+
+args = parser.parse_args()
+
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWX"
+
+
+def random_grid(rng: random.Random) -> str:
+    grid = rng.choice(LETTERS[:18]) + rng.choice(LETTERS[:18]) + str(rng.randint(0, 9)) + str(rng.randint(0, 9))
+    length = rng.choice((4, 6, 6, 6, 8, 10))
+    if length >= 6:
+        grid += (rng.choice(LETTERS) + rng.choice(LETTERS)).lower()
+    if length >= 8:
+        grid += str(rng.randint(0, 9)) + str(rng.randint(0, 9))
+    if length >= 10:
+        grid += (rng.choice(LETTERS) + rng.choice(LETTERS)).lower()
+    return grid
+
+
+def make_log(rng: random.Random) -> list[QsoLog]:
+    qsos = []
+    for _ in range(args.qsos):
+        roll = rng.random()
+        grid = None if roll < 0.05 else "ZZ99" if roll < 0.06 else random_grid(rng)
+        qsos.append(QsoLog(call="K1ABC", gridsquare=grid, my_gridsquare=args.grid,
+                           ant_path='L' if rng.random() < 0.01 else None))
+    return qsos
+
+
+def timed(function, *a):
+    start = time.perf_counter()
+    result = function(*a)
+    return result, time.perf_counter() - start
+
+
+def main():
+    rng = random.Random(args.seed)
+    qsos = make_log(rng)
+    grids = [qso.gridsquare for qso in qsos]
+
+    filled, batch_seconds = timed(geodesy.fill_distance, qsos)
+
+    def scalar_fill():
+        return [ham_utility.distance(args.grid, grid) if geodesy.grid_to_latlon(grid or "") else None
+                for grid in grids]
+
+    scalar, scalar_seconds = timed(scalar_fill)
+    scalar_bearings, scalar_bearing_seconds = timed(
+        lambda: [ham_utility.bearing(args.grid, grid) if geodesy.grid_to_latlon(grid or "") else None
+                 for grid in grids])
+    bearings, batch_bearing_seconds = timed(geodesy.bearings_from, args.grid, grids)
+    (lat, lon), parse_seconds = timed(geodesy.grids_to_latlon, grids)
+    states, sun_seconds = timed(geodesy.sun_state, lat, lon, datetime.now(timezone.utc))
+
+    print(f"{args.qsos} qsos from {args.grid}, {filled} located")
+    print(f"distance  batch {batch_seconds * 1000:8.1f}ms  scalar {scalar_seconds * 1000:8.1f}ms  "
+          f"x{scalar_seconds / batch_seconds:.0f}")
+    print(f"bearing   batch {batch_bearing_seconds * 1000:8.1f}ms  scalar {scalar_bearing_seconds * 1000:8.1f}ms  "
+          f"x{scalar_bearing_seconds / batch_bearing_seconds:.0f}")
+    print(f"locators parsed in {parse_seconds * 1000:.1f}ms, sun state in {sun_seconds * 1000:.1f}ms "
+          f"(day {np.count_nonzero(states == geodesy.SUN_DAY)}, "
+          f"grayline {np.count_nonzero(states == geodesy.SUN_GRAYLINE)}, "
+          f"night {np.count_nonzero(states == geodesy.SUN_NIGHT)})")
+
+    failures = []
+    mismatched = 0
+    for qso, expected, batch_bearing, expected_bearing in zip(qsos, scalar, bearings.tolist(), scalar_bearings):
+        if expected is None:
+            mismatched += qso.distance is not None
+            continue
+        if qso.ant_path == 'L':
+            expected = geodesy.long_path_km(expected)
+        # the scalar functions round to whole kilometers and degrees
+        if qso.distance is None or abs(qso.distance - expected) > 1 or abs(
+                (batch_bearing - expected_bearing + 180) % 360 - 180) > 1:
+            mismatched += 1
+    if mismatched:
+        failures.append(f"{mismatched} qsos differ from the scalar calculation")
+    if batch_seconds > args.budget:
+        failures.append(f"batch fill took {batch_seconds:.3f}s, budget {args.budget:.3f}s")
+    for failure in failures:
+        print(failure)
+    print("FAIL" if failures else "ok")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
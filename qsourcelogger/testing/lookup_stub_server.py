@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the QRZ and HamDB xml lookup apis, for exercising the lookup scheduler and cache without
+hitting the real services.
+
+Set "lookup_url_override" in qsourcelogger.json to http://127.0.0.1:8080/qrz/ (with lookup_source_qrz) or
+http://127.0.0.1:8080/hamdb/ (with lookup_source_hamdb). Every callsign resolves to a made up name and grid
+unless it falls in the --not-found percentage.
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import hashlib
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+
+parser = argparse.ArgumentParser(description="Serve QRZ/HamDB shaped callsign lookups locally.")
+parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on")
+parser.add_argument("-p", "--port", type=int, default=8080, help="Port to listen on")
+parser.add_argument("-l", "--latency", type=int, default=250, help="Response latency in ms")
+parser.add_argument("-j", "--jitter", type=int, default=100, help="Random extra latency up to this many ms")
+parser.add_argument("-n", "--not-found", type=int, default=10, help="Percent of calls that are not found")
+
+args = parser.parse_args()
+
+FIRST_NAMES = ("Jim", "Mike", "Sue", "Kyle", "Anne", "Bob", "Pat", "Lee", "Dana", "Chris")
+LAST_NAMES = ("Smith", "Bridak", "Jones", "Leblanc", "Nguyen", "Garcia", "Miller", "Chen")
+SESSION_KEY = "stubsession0123456789"
+
+stats_lock = threading.Lock()
+stats = {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+def station(call: str):
+    """Stable made up station details for a call, None if the call should not be found"""
+    digest = hashlib.md5(call.encode()).digest()
+    if digest[0] * 100 // 256 < args.not_found:
+        return None
+    grid = (chr(ord('A') + digest[1] % 18) + chr(ord('A') + digest[2] % 18)
+            + str(digest[3] % 10) + str(digest[4] % 10)
+            + chr(ord('a') + digest[5] % 24) + chr(ord('a') + digest[6] % 24))
+    return {
+        "fname": FIRST_NAMES[digest[7] % len(FIRST_NAMES)],
+        "name": LAST_NAMES[digest[8] % len(LAST_NAMES)],
+        "grid": grid,
+        "state": "CA",
+        "country": "United States",
+    }
+
+
+def qrz_response(query: dict) -> str:
+    if "username" in query:
+        return ("<?xml version=\"1.0\" ?><QRZDatabase version=\"1.34\"><Session>"
+                f"<Key>{SESSION_KEY}</Key><Count>1</Count><SubExp>non-subscriber</SubExp>"
+                "</Session></QRZDatabase>")
+    if query.get("s", [None])[0] != SESSION_KEY:
+        return ("<?xml version=\"1.0\" ?><QRZDatabase version=\"1.34\"><Session>"
+                "<Error>Session Timeout</Error></Session></QRZDatabase>")
+    call = query.get("callsign", [""])[0].upper()
+    details = station(call)
+    if not details:
+        return ("<?xml version=\"1.0\" ?><QRZDatabase version=\"1.34\"><Session>"
+                f"<Key>{SESSION_KEY}</Key><Error>Not found: {escape(call)}</Error></Session></QRZDatabase>")
+    fields = "".join(f"<{k}>{escape(v)}</{k}>" for k, v in details.items())
+    return ("<?xml version=\"1.0\" ?><QRZDatabase version=\"1.34\">"
+            f"<Callsign><call>{escape(call)}</call>{fields}</Callsign>"
+            f"<Session><Key>{SESSION_KEY}</Key></Session></QRZDatabase>")
+
+
+def hamdb_response(call: str) -> str:
+    call = call.upper()
+    details = station(call)
+    if not details:
+        return ("<?xml version=\"1.0\" encoding=\"utf-8\"?><hamdb version=\"1.0\"><callsign><call>NOT_FOUND</call>"
+                "</callsign><messages><status>NOT_FOUND</status></messages></hamdb>")
+    fields = "".join(f"<{k}>{escape(v)}</{k}>" for k, v in details.items())
+    return ("<?xml version=\"1.0\" encoding=\"utf-8\"?><hamdb version=\"1.0\">"
+            f"<callsign><call>{escape(call)}</call>{fields}</callsign>"
+            "<messages><status>OK</status></messages></hamdb>")
+
+
+class LookupHandler(BaseHTTPRequestHandler):
+    """Routes /qrz/... and /hamdb/<call>/xml/<app>"""
+
+    def do_GET(self):
+        with stats_lock:
+            stats["requests"] += 1
+            stats["in_flight"] += 1
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            time.sleep((args.latency + random.randint(0, max(args.jitter, 0))) / 1000)
+            url = urlparse(self.path)
+            parts = [x for x in url.path.split("/") if x]
+            if parts and parts[0] == "qrz":
+                body = qrz_response(parse_qs(url.query))
+            elif len(parts) >= 2 and parts[0] == "hamdb":
+                body = hamdb_response(parts[1])
+            else:
+                self.send_error(404)
+                return
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/xml; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client cancelled the request
+            pass
+        finally:
+            with stats_lock:
+                stats["in_flight"] -= 1
+
+    def log_message(self, format, *log_args):  # pylint: disable=redefined-builtin
+        print(f"{self.address_string()} {format % log_args} "
+              f"[requests {stats['requests']}, in flight {stats['in_flight']}, max {stats['max_in_flight']}]")
+
+
+server = ThreadingHTTPServer((args.host, args.port), LookupHandler)
+print(f"Serving lookups on http://{args.host}:{args.port}/qrz/ and http://{args.host}:{args.port}/hamdb/ "
+      f"with {args.latency}ms (+{args.jitter}ms) latency")
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    pass
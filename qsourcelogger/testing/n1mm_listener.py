@@ -15,6 +15,8 @@ fifo = queue.Queue()
 
 s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
 s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+# room for a burst of contact packets while the main loop is printing
+s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
 s.bind(("127.0.0.1", multicast_port))
 # mreq = socket.inet_aton(multicast_group) + socket.inet_aton(interface_ip)
 # s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, bytes(mreq))
@@ -25,9 +27,8 @@ def watch_udp():
     """watch udp"""
     while True:
         try:
-            datagram = s.recv(1500)
+            datagram = s.recv(65535)
         except socket.timeout:
-            time.sleep(1)
             continue
         if datagram:
             fifo.put(datagram)
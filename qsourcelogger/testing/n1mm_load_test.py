@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Load test of the N1MM packet broadcaster. Starts testing/n1mm_listener.py as the receiver, then turns a simulated
+vfo knob (a RadioState event for every step) and logs a burst of qsos. Reports what sending cost the calling
+(gui) thread and checks that every contact packet arrived and that radio packets were coalesced to the latest
+state and rate limited. Exits non zero when a check fails.
+
+    python qsourcelogger/testing/n1mm_load_test.py --radio 20000 --contacts 500
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from qsourcelogger.cat.RigState import RigState
+from qsourcelogger.lib import event as appevent
+from qsourcelogger.lib.n1mm import N1MM
+from qsourcelogger.model import Contest, ContestMeta, QsoLog
+
+parser = argparse.ArgumentParser(description="Load test the N1MM broadcaster against n1mm_listener.py.")
+parser.add_argument("-r", "--radio", type=int, default=20000, help="Radio state events")
+parser.add_argument("-c", "--contacts", type=int, default=500, help="Qsos logged")
+parser.add_argument("-t", "--seconds", type=float, default=2.0, help="Seconds to spread the events of each kind over")
+parser.add_argument("-b", "--budget", type=float, default=2.0, help="Milliseconds (p99) a send may cost the caller")
+
+args = parser.parse_args()
+
+# where n1mm_listener.py listens
+DESTINATION = "127.0.0.1:12061"
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] if values else 0.0
+
+
+def main():
+    # the listener output goes to a file, a pipe nobody reads until the end fills up and stalls the listener
+    received = tempfile.TemporaryFile(mode="w+")
+    listener = subprocess.Popen([sys.executable, "-u", str(Path(__file__).parent / "n1mm_listener.py")],
+                                stdout=received, stderr=subprocess.STDOUT, text=True)
+    time.sleep(1)
+
+    n1mm = N1MM(DESTINATION, DESTINATION, DESTINATION, DESTINATION)
+    n1mm.send_radio_packets = True
+    n1mm.send_contact_packets = True
+    n1mm.set_station_name("loadtest")
+    n1mm.set_operator("K1ABC", True)
+
+    radio_costs = []
+    start = time.perf_counter()
+    freq = 14000000
+    for i in range(args.radio):
+        freq = 14000000 + i * 10
+        state = RigState(id="loadtest", vfotx_hz=freq, vforx_hz=freq, mode="CW")
+        sent = time.perf_counter()
+        n1mm.send_radio(appevent.RadioState(state))
+        radio_costs.append(time.perf_counter() - sent)
+        # spread the knob turns over the test period
+        ahead = (i + 1) * args.seconds / args.radio - (time.perf_counter() - start)
+        if ahead > 0:
+            time.sleep(ahead)
+    radio_elapsed = time.perf_counter() - start
+
+    contest = Contest(id=1, fk_contest_meta=ContestMeta(cabrillo_name="CQ-WW-CW"), start_date=datetime.utcnow())
+    contact_costs = []
+    start = time.perf_counter()
+    for i in range(args.contacts):
+        qso = QsoLog(id=uuid.uuid4(), fk_contest=contest, time_on=datetime.utcnow(), call=f"K{i % 10}LT{i}",
+                     freq=14025000, mode="CW", rst_sent="599", rst_rcvd="599", station_callsign="K1ABC",
+                     operator="K1ABC", hostname="loadtest", is_original=True, is_run=True, points=1, srx=i + 1,
+                     stx=i + 1, arrl_sect="CT", my_cq_zone=5)
+        sent = time.perf_counter()
+        n1mm.send_contact_info(appevent.QsoAdded(qso))
+        contact_costs.append(time.perf_counter() - sent)
+        ahead = (i + 1) * args.seconds / args.contacts - (time.perf_counter() - start)
+        if ahead > 0:
+            time.sleep(ahead)
+
+    n1mm.close()
+    n1mm.broadcaster.join(10)
+    stats = dict(n1mm.broadcaster.stats)
+    # the listener prints what it received once a second
+    time.sleep(2.5)
+    listener.terminate()
+    listener.wait(10)
+    received.seek(0)
+    output = received.read()
+    received.close()
+
+    radio_packets = output.count("{'RadioInfo'")
+    contact_packets = output.count("{'contactinfo'")
+    freqs = re.findall(r"'RadioInfo': \{[^}]*?'Freq': '(\d+)'", output)
+    last_freq = int(freqs[-1]) if freqs else None
+    allowed_radio = int(radio_elapsed / n1mm.broadcaster.radio_interval) + 2
+
+    print(f"radio   {args.radio:>6} events in {radio_elapsed:.2f}s -> {radio_packets} packets "
+          f"(coalesced {stats['radio_coalesced']}, unchanged {stats['radio_unchanged']}), "
+          f"caller p50 {percentile(radio_costs, 0.5) * 1000:.3f}ms "
+          f"p99 {percentile(radio_costs, 0.99) * 1000:.3f}ms max {max(radio_costs) * 1000:.3f}ms")
+    print(f"contact {args.contacts:>6} qsos -> {contact_packets} packets, "
+          f"caller p50 {percentile(contact_costs, 0.5) * 1000:.3f}ms "
+          f"p99 {percentile(contact_costs, 0.99) * 1000:.3f}ms max {max(contact_costs) * 1000:.3f}ms")
+
+    failures = []
+    if contact_packets != args.contacts:
+        failures.append(f"{contact_packets} of {args.contacts} contact packets arrived")
+    if not radio_packets or radio_packets > allowed_radio:
+        failures.append(f"{radio_packets} radio packets, expected 1 to {allowed_radio}")
+    if last_freq != freq // 10:
+        failures.append(f"last radio packet has frequency {last_freq}, the last state was {freq // 10}")
+    if stats['errors']:
+        failures.append(f"{stats['errors']} send errors")
+    for name, costs in (("radio", radio_costs), ("contact", contact_costs)):
+        if percentile(costs, 0.99) * 1000 > args.budget:
+            failures.append(f"{name} send p99 {percentile(costs, 0.99) * 1000:.3f}ms, budget {args.budget}ms")
+    for failure in failures:
+        print(failure)
+    print("FAIL" if failures else "ok")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
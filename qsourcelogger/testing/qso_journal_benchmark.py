@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the qso write behind. Logs qsos against a scratch database twice, saving each on the calling thread
+as the entry window did and submitting each to the QsoCommitter, printing the time the entry window waits per qso,
+one of the submitted qsos can not be saved and has to be set aside without keeping the journal from being emptied.
+Then leaves a journal behind as a crash would, some of its qsos in the database, some not and one that can not be
+saved, and checks that opening the database again inserts only the missing ones, sets the bad one aside and
+empties the journal. Exits non zero when a qso is
+missing from the log or announced more than once, the replay is wrong, or the p99 of submit is over the budget.
+
+    python qsourcelogger/testing/qso_journal_benchmark.py --qsos 500 --budget 20
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from qsourcelogger.lib import event as appevent
+from qsourcelogger.lib.qso_journal import REJECTED_SUFFIX, QsoCommitter, QsoJournal, _to_record
+from qsourcelogger.model import Contest, ContestMeta, QsoLog, Station, closePersistantDb, loadPersistantDb
+
+parser = argparse.ArgumentParser(description="Compare saving logged qsos in place and through the write behind.")
+parser.add_argument("-n", "--qsos", type=int, default=500, help="Qsos logged each way")
+parser.add_argument("-c", "--crashed", type=int, default=50, help="Qsos left in the journal by the crash")
+parser.add_argument("-b", "--budget", type=float, default=20, help="Milliseconds (p99) a submit may take")
+
+args = parser.parse_args()
+
+START = datetime(2024, 11, 2, 21)
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] if values else 0.0
+
+
+def new_qso(contest: Contest, call: str, minutes: float) -> QsoLog:
+    return QsoLog(id=uuid.uuid4(), time_on=START + timedelta(minutes=minutes), call=call, rst_sent="59",
+                  rst_rcvd="59", freq=14025000, band="20m", mode="CW", station_callsign="K1ABC",
+                  fk_contest=contest, fk_station=contest.fk_station)
+
+
+def make_contest() -> Contest:
+    station = Station(station_name="benchmark", callsign="K1ABC", gridsquare="FN31pr")
+    station.save()
+    contest = Contest(fk_contest_meta=ContestMeta.select().first(), fk_station=station, start_date=START)
+    contest.save()
+    return contest
+
+
+def qsos_added() -> int:
+    return appevent.stats()['events'].get('QsoAdded', {}).get('emitted', 0)
+
+
+def main():
+    failures = []
+    with tempfile.TemporaryDirectory() as scratch:
+        db_path = str(Path(scratch) / "journal.db")
+        loadPersistantDb(db_path)
+        contest = make_contest()
+
+        in_place = []
+        for i in range(args.qsos):
+            start = time.perf_counter()
+            new_qso(contest, f"S{i}YNC", i).save(force_insert=True)
+            in_place.append((time.perf_counter() - start) * 1000)
+
+        committer = QsoCommitter()
+        committer.open(db_path)
+        added = qsos_added()
+        submits = []
+        start_all = time.perf_counter()
+        for i in range(args.qsos):
+            start = time.perf_counter()
+            committer.submit(new_qso(contest, f"W{i}RTE", i))
+            submits.append((time.perf_counter() - start) * 1000)
+        if not committer.flush(30):
+            failures.append(f"{len(committer.pending())} qsos still pending after the flush")
+        drained_ms = (time.perf_counter() - start_all) * 1000
+        # a qso of a contest that is not in the database fails its foreign key
+        bad = new_qso(contest, "L1VE", 0)
+        bad.fk_contest_id = contest.id + 1000
+        committer.submit(bad)
+        committer.submit(new_qso(contest, f"W{args.qsos}RTE", args.qsos))
+        committer.flush(30)
+        committer.close()
+        written = QsoLog.select().where(QsoLog.call.startswith("W")).count()
+        if written != args.qsos + 1:
+            failures.append(f"{written} of {args.qsos + 1} submitted qsos in the log")
+        if qsos_added() - added != args.qsos + 1:
+            failures.append(f"{qsos_added() - added} QsoAdded announced for {args.qsos + 1} qsos")
+        if Path(db_path + ".qso-journal").stat().st_size != 0:
+            failures.append("the journal was not emptied once every qso was committed")
+
+        # a crash after the journal write, half of its qsos made it into the database
+        journal = QsoJournal(Path(db_path + ".qso-journal"))
+        crashed = [new_qso(contest, f"C{i}RSH", i) for i in range(args.crashed)]
+        for i, qso in enumerate(crashed):
+            journal.append(_to_record(qso))
+            if i % 2:
+                qso.save(force_insert=True)
+        bad = new_qso(contest, "B4D", 0)
+        bad.fk_contest_id = contest.id + 1000
+        journal.append(_to_record(bad))
+        with open(journal.path, "a", encoding="utf-8") as file:
+            file.write('{"contest": 1, "qso": {"ca')
+        journal.close()
+        start = time.perf_counter()
+        reopened = QsoCommitter()
+        replayed = reopened.open(db_path)
+        replay_ms = (time.perf_counter() - start) * 1000
+        reopened.close()
+        recovered = QsoLog.select().where(QsoLog.call.startswith("C")).count()
+        if replayed != args.crashed // 2 or recovered != args.crashed:
+            failures.append(f"replayed {replayed} of the {args.crashed // 2} missing qsos, "
+                            f"{recovered} of {args.crashed} in the log")
+        if journal.path.stat().st_size != 0:
+            failures.append("the journal was not emptied after the replay")
+        rejected = QsoJournal(Path(str(journal.path) + REJECTED_SUFFIX)).read()
+        if [record['qso']['call'] for record in rejected] != ["L1VE", "B4D"]:
+            failures.append(f"the qso that can not be saved was not set aside, {len(rejected)} rejected")
+        stats = dict(committer.stats)
+        closePersistantDb()
+
+    print(f"{args.qsos} qsos logged each way")
+    print(f"{'save in place':14s} p50 {percentile(in_place, 0.5):6.2f}ms p99 {percentile(in_place, 0.99):6.2f}ms "
+          f"max {max(in_place):6.1f}ms")
+    print(f"{'submit':14s} p50 {percentile(submits, 0.5):6.2f}ms p99 {percentile(submits, 0.99):6.2f}ms "
+          f"max {max(submits):6.1f}ms, all committed after {drained_ms:.0f}ms")
+    print(f"replayed {replayed} qsos of a crashed journal in {replay_ms:.1f}ms")
+    print(f"committer {stats}")
+
+    if percentile(submits, 0.99) > args.budget:
+        failures.append(f"submit p99 {percentile(submits, 0.99):.1f}ms, budget {args.budget}ms")
+    for failure in failures:
+        print(failure)
+    print("FAIL" if failures else "ok")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
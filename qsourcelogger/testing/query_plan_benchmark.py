@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the log database indexes. Generates a scratch database of qsos spread over several contests and runs
+the hot queries of the open contest, as the entry window, log window and scoring issue them, first with the
+indexes before the contest index migration and then with them, printing the EXPLAIN QUERY PLAN and median time of
+each and the time a qso save takes. Also checks the schema migrations: a new database is at the latest version,
+opening it again migrates nothing, and a database from before the schema_version table is brought up to date
+without its contest definitions being loaded twice. Exits non zero when a migration check fails or a hot query
+does not use a contest index once they are added.
+
+    python qsourcelogger/testing/query_plan_benchmark.py --qsos 500000 --contests 20
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from peewee import fn
+
+from qsourcelogger.lib.ham_utility import get_call_base
+from qsourcelogger.model import Contest, ContestMeta, QsoLog, Station, closePersistantDb, loadPersistantDb, \
+    persistent_migrations
+from qsourcelogger.model.persistent import _database
+
+parser = argparse.ArgumentParser(description="Explain and time the hot log queries before and after the indexes.")
+parser.add_argument("-n", "--qsos", type=int, default=500000, help="Qsos in the generated database")
+parser.add_argument("-c", "--contests", type=int, default=20, help="Contests the qsos are spread over")
+parser.add_argument("-r", "--repeat", type=int, default=5, help="Runs of each query to take the median of")
+parser.add_argument("-s", "--seed", type=int, default=7, help="Random seed")
+
+args = parser.parse_args()
+
+START = datetime(2024, 11, 2, 21)
+BANDS = ["160m", "80m", "40m", "20m", "15m", "10m"]
+MODES = ["CW", "SSB", "FT8"]
+# indexes the contest index migration adds, named as SqliteMigrator.add_index names them
+CONTEST_INDEXES = ["qsolog_fk_contest_id_call_band_mode", "qsolog_fk_contest_id_time_on_band_mode_operator",
+                   "qsolog_fk_contest_id_call_search", "qsolog_fk_contest_id_stx"]
+
+
+def random_call(rng: random.Random) -> str:
+    prefix = rng.choice(["K", "W", "N", "VE", "DL", "G", "JA"])
+    call = f"{prefix}{rng.randint(0, 9)}{''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(3))}"
+    return f"{call}/P" if rng.random() < 0.05 else call
+
+
+def generate(contests: list[Contest], rng: random.Random) -> None:
+    calls = [random_call(rng) for _ in range(args.qsos // 10 or 1)]
+    per_contest = args.qsos // len(contests)
+    fields = [QsoLog.id, QsoLog.time_on, QsoLog.call, QsoLog.call_search, QsoLog.rst_sent, QsoLog.rst_rcvd,
+              QsoLog.freq, QsoLog.band, QsoLog.mode, QsoLog.stx, QsoLog.operator, QsoLog.points,
+              QsoLog.station_callsign, QsoLog.fk_contest]
+    for contest in contests:
+        rows = []
+        for i in range(per_contest):
+            call = rng.choice(calls)
+            rows.append((uuid.UUID(int=rng.getrandbits(128)), START + timedelta(seconds=i * 7), call,
+                         get_call_base(call), "59", "59", 14025000, rng.choice(BANDS), rng.choice(MODES), i + 1,
+                         rng.choice(["K1ABC", "K1XYZ"]), 1, "K1ABC", contest.id))
+        with _database.atomic():
+            for i in range(0, len(rows), 1000):
+                QsoLog.insert_many(rows[i:i + 1000], fields=fields).execute()
+
+
+def hot_queries(contest: Contest, call: str) -> dict:
+    """the queries of the app against the open contest, as they are built there"""
+    select = QsoLog.select().where(QsoLog.fk_contest == contest)
+    return {
+        "dupe check once": select.where(QsoLog.call == call).limit(1),
+        "dupe check band mode": select.where(QsoLog.call == call, QsoLog.band == "20m", QsoLog.mode == "CW")
+        .limit(1),
+        "like call completion": QsoLog.select(QsoLog.call.distinct())
+        .where(QsoLog.call.contains(call[1:4]), QsoLog.fk_contest == contest),
+        "station history": select.where(QsoLog.call_search == get_call_base(call)),
+        "log window count": QsoLog.select().where(QsoLog.fk_contest == contest).count,
+        "log window": select.order_by(QsoLog.time_on.desc()),
+        "serial high water": QsoLog.select(fn.Max(QsoLog.stx)).where(QsoLog.fk_contest == contest).scalar,
+        "rate rebuild": select.select(QsoLog.time_on, QsoLog.band, QsoLog.mode, QsoLog.operator)
+        .order_by(QsoLog.time_on).tuples(),
+        "score totals": select.select(fn.Count(QsoLog.id), fn.Sum(QsoLog.points)).tuples(),
+        "worked per band": select.select(QsoLog.band, QsoLog.call, fn.Count(QsoLog.id))
+        .group_by(QsoLog.band, QsoLog.call).tuples(),
+    }
+
+
+def explain(query) -> str:
+    # count and scalar are bound methods of the query, explain the query they run
+    query = getattr(query, "__self__", query)
+    sql, params = query.sql()
+    # explain does not begin a read transaction, a pooled connection would plan with the indexes it last read
+    with closing(sqlite3.connect(f"file:{_database.database}?mode=ro", uri=True)) as conn:
+        return "; ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall())
+
+
+def run(query) -> float:
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        if callable(query):
+            query()
+        else:
+            list(query.clone())
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def measure(contest: Contest, call: str) -> dict:
+    results = {}
+    for name, query in hot_queries(contest, call).items():
+        results[name] = (explain(query), run(query))
+    saves = []
+    for i in range(200):
+        qso = QsoLog(id=uuid.uuid4(), time_on=START + timedelta(days=1, seconds=i), call=f"S{i}AVE", rst_sent="59",
+                     rst_rcvd="59", freq=14025000, band="20m", mode="CW", station_callsign="K1ABC", fk_contest=contest)
+        start = time.perf_counter()
+        qso.save(force_insert=True)
+        saves.append((time.perf_counter() - start) * 1000)
+    QsoLog.delete().where(QsoLog.call.startswith("S"), QsoLog.call.endswith("AVE")).execute()
+    results["qso save"] = ("", statistics.median(saves))
+    return results
+
+
+def check_migrations(scratch: Path) -> list[str]:
+    failures = []
+    path = str(scratch / "migrations.db")
+    loadPersistantDb(path)
+    latest = len(persistent_migrations.funcs)
+    if persistent_migrations.schema_version(_database) != latest:
+        failures.append(f"a new database is at version {persistent_migrations.schema_version(_database)}, "
+                        f"not {latest}")
+    contest_metas = ContestMeta.select().count()
+    closePersistantDb()
+    loadPersistantDb(path)
+    applied = _database.execute_sql("select count(*) from schema_version").fetchone()[0]
+    if applied != latest:
+        failures.append(f"opening the database again recorded {applied} migrations, not {latest}")
+    # as a database from before schema_version was added
+    _database.execute_sql("drop table schema_version")
+    for index in CONTEST_INDEXES:
+        _database.execute_sql(f"drop index {index}")
+    closePersistantDb()
+    loadPersistantDb(path)
+    indexes = {row[0] for row in _database.execute_sql("select name from sqlite_master where type = 'index'")}
+    if persistent_migrations.schema_version(_database) != latest or set(CONTEST_INDEXES) - indexes:
+        failures.append("a database from before schema_version was not migrated to the latest version")
+    if ContestMeta.select().count() != contest_metas:
+        failures.append("migrating a database from before schema_version loaded the contest definitions again")
+    closePersistantDb()
+    return failures
+
+
+def main():
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as scratch:
+        failures = check_migrations(Path(scratch))
+
+        loadPersistantDb(str(Path(scratch) / "plans.db"))
+        station = Station(station_name="benchmark", callsign="K1ABC", gridsquare="FN31pr")
+        station.save()
+        contests = []
+        for _ in range(args.contests):
+            contest = Contest(fk_contest_meta=ContestMeta.select().first(), fk_station=station, start_date=START)
+            contest.save()
+            contests.append(contest)
+        start = time.perf_counter()
+        generate(contests, rng)
+        print(f"{QsoLog.select().count()} qsos in {args.contests} contests generated "
+              f"in {time.perf_counter() - start:.1f}s")
+        contest = contests[len(contests) // 2]
+        call = QsoLog.select(QsoLog.call).where(QsoLog.fk_contest == contest).limit(1).scalar()
+
+        for index in CONTEST_INDEXES:
+            _database.execute_sql(f"drop index {index}")
+        _database.execute_sql("analyze qsolog")
+        before = measure(contest, call)
+        start = time.perf_counter()
+        with _database.atomic():
+            persistent_migrations.v002_add_contest_indexes(_database)
+        migrate_s = time.perf_counter() - start
+        after = measure(contest, call)
+        closePersistantDb()
+
+    print(f"contest index migration took {migrate_s:.1f}s on {args.qsos} qsos")
+    print(f"{'query':22s} {'before':>10s} {'after':>10s}")
+    for name, (plan_before, ms_before) in before.items():
+        plan_after, ms_after = after[name]
+        print(f"{name:22s} {ms_before:8.2f}ms {ms_after:8.2f}ms")
+        if plan_before:
+            print(f"    before: {plan_before}")
+            print(f"    after:  {plan_after}")
+        if name in ("dupe check once", "dupe check band mode", "like call completion", "station history",
+                    "log window", "serial high water", "rate rebuild") \
+                and not any(index in plan_after for index in CONTEST_INDEXES):
+            failures.append(f"{name} does not use a contest index: {plan_after}")
+
+    for failure in failures:
+        print(failure)
+    print("FAIL" if failures else "ok")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
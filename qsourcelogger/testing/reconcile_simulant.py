@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Two stations whose logs drifted apart during a network partition reconcile over tcp. Builds a shared log, gives
+each station its own adds, edits and deletes, then runs each station in its own process and reconciles them.
+Reports the traffic and exits non zero when the logs still differ or the traffic is over the budget.
+
+    python qsourcelogger/testing/reconcile_simulant.py --qsos 20000 --differences 50
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import multiprocessing
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from qsourcelogger.lib import reconcile
+from qsourcelogger.model import Contest, ContestMeta, DeletedQsoLog, QsoLog, Station, loadPersistantDb
+
+parser = argparse.ArgumentParser(description="Reconcile two drifted station logs.")
+parser.add_argument("-n", "--qsos", type=int, default=20000, help="Qsos in the shared log")
+parser.add_argument("-d", "--differences", type=int, default=50, help="Qsos added, edited or deleted apart")
+parser.add_argument("-b", "--budget", type=float, default=64, help="Kilobytes of traffic allowed")
+parser.add_argument("-p", "--port", type=int, default=2241, help="Tcp port of the serving station")
+parser.add_argument("-s", "--seed", type=int, default=5, help="Random seed")
+
+args = parser.parse_args()
+
+HOSTS = ("station-a", "station-b", "station-c")
+START_DATE = datetime(2000, 6, 24, 18)
+BANDS = ("80m", "40m", "20m", "15m", "10m")
+SECTIONS = ("CT", "EMA", "WMA", "ENY", "NLI", "EPA", "WPA", "OH", "MI", "IL", "STX", "SCV")
+
+
+def make_qso(rng: random.Random, contest: Contest, time_on: datetime, host: str) -> QsoLog:
+    suffix = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(3))
+    call = f"{rng.choice('KWN')}{rng.randint(0, 9)}{suffix}"
+    return QsoLog(id=uuid.uuid4(), fk_contest=contest, time_on=time_on, call=call, call_search=call, rst_sent="59",
+                  rst_rcvd="59", freq=14025000, band=rng.choice(BANDS), mode="CW", station_callsign="W1AW",
+                  hostname=host, srx_string=f"{rng.randint(1, 20)}A {rng.choice(SECTIONS)}", is_original=True)
+
+
+def build_shared_log(path: Path, rng: random.Random):
+    loadPersistantDb(str(path))
+    meta = ContestMeta.get(ContestMeta.cabrillo_name == "ARRL-FIELD-DAY")
+    station = Station(station_name="shared", callsign="W1AW")
+    station.save()
+    contest = Contest(fk_contest_meta=meta, fk_station=station, start_date=START_DATE, sent_exchange="3A CT")
+    contest.save()
+    step = 24 * 3600 / args.qsos
+    qsos = [make_qso(rng, contest, START_DATE + timedelta(seconds=i * step), rng.choice(HOSTS))
+            for i in range(args.qsos)]
+    with QsoLog._meta.database.atomic():
+        QsoLog.bulk_create(qsos, batch_size=500)
+    QsoLog._meta.database.close()
+
+
+def drift(path: Path, host: str, adds: int, edits: int, deletes: int, rng: random.Random):
+    """changes one station made while it could not hear the other"""
+    loadPersistantDb(str(path))
+    contest = Contest.get()
+    ids = [row[0] for row in QsoLog.select(QsoLog.id).tuples()]
+    for _ in range(adds):
+        make_qso(rng, contest, START_DATE + timedelta(seconds=rng.randint(0, 24 * 3600)), host)\
+            .save(force_insert=True)
+    for qso_id in rng.sample(ids, edits + deletes)[:edits]:
+        QsoLog.update(comment=f"edited on {host}").where(QsoLog.id == qso_id).execute()
+    for qso_id in rng.sample(ids, deletes):
+        DeletedQsoLog.insert_from(query=QsoLog.select().where(QsoLog.id == qso_id),
+                                  fields=list(QsoLog._meta.sorted_field_names)).execute()
+        QsoLog.delete().where(QsoLog.id == qso_id).execute()
+    QsoLog._meta.database.close()
+
+
+def serving_station(path: str, ready):
+    loadPersistantDb(path)
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(("127.0.0.1", args.port))
+    listener.listen()
+    ready.set()
+    # a first reconciliation and a second one that should find nothing to do
+    for _ in range(2):
+        sock, _ = listener.accept()
+        connection = reconcile.Connection(sock)
+        reconcile.serve(connection, Contest.get(), "station-b")
+        connection.close()
+    listener.close()
+
+
+def reconciling_station(path: str, results):
+    loadPersistantDb(path)
+    for _ in range(2):
+        connection = reconcile.Connection(socket.create_connection(("127.0.0.1", args.port)))
+        results.put(reconcile.reconcile(connection, Contest.get(), "station-a"))
+        connection.close()
+
+
+def root(path: Path) -> tuple[str, int]:
+    loadPersistantDb(str(path))
+    digest = reconcile.LogDigest(Contest.get())
+    QsoLog._meta.database.close()
+    return digest.root, len(digest.entries)
+
+
+def main():
+    rng = random.Random(args.seed)
+    per_kind = max(args.differences // 10, 1)
+    with tempfile.TemporaryDirectory() as scratch:
+        shared, a, b = (Path(scratch) / name for name in ("shared.db", "a.db", "b.db"))
+        start = time.perf_counter()
+        build_shared_log(shared, rng)
+        print(f"shared log of {args.qsos} qsos built in {time.perf_counter() - start:.1f}s")
+        shutil.copy(shared, a)
+        shutil.copy(shared, b)
+        # the differences are split between the stations: adds on both, edits on both (some of the same qsos) and
+        # deletes on one
+        drift(a, "station-a", adds=per_kind * 3, edits=per_kind, deletes=per_kind, rng=rng)
+        drift(b, "station-b", adds=per_kind * 4, edits=per_kind, deletes=0, rng=rng)
+        print(f"station-a {root(a)[1]} qsos, station-b {root(b)[1]} qsos, {per_kind * 10} differences")
+
+        ready = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        server = multiprocessing.Process(target=serving_station, args=(str(b), ready))
+        server.start()
+        ready.wait(30)
+        client = multiprocessing.Process(target=reconciling_station, args=(str(a), results))
+        client.start()
+        first, second = results.get(timeout=120), results.get(timeout=120)
+        client.join()
+        server.join()
+
+        root_a, count_a = root(a)
+        root_b, count_b = root(b)
+
+    failures = []
+    for name, result in (("reconcile", first), ("again", second)):
+        traffic = (result['bytes_sent'] + result['bytes_received']) / 1024
+        print(f"{name:<10} buckets {result['buckets']:>4} pulled {result['pulled']:>4} pushed {result['pushed']:>4} "
+              f"traffic {traffic:7.1f}KB in {result['seconds'] * 1000:7.1f}ms")
+        if traffic > args.budget:
+            failures.append(f"{name} used {traffic:.1f}KB, budget {args.budget:.1f}KB")
+    if root_a != root_b:
+        failures.append(f"logs still differ, station-a {count_a} qsos, station-b {count_b} qsos")
+    if second['pulled'] or second['pushed']:
+        failures.append("second reconciliation still found differences")
+    for failure in failures:
+        print(failure)
+    print("FAIL" if failures else f"logs reconciled, {count_a} qsos each")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Simulated multi operator stations for log replication. Each station is a separate process with its own scratch
+log database that logs, edits and deletes qsos at a contest rate while replicating over the multicast group.
+Reports how long every change took to reach the other stations and whether all the logs ended up identical.
+Exits non zero when a change took longer than the budget or the logs differ.
+
+    python qsourcelogger/testing/replication_simulant.py --stations 10 --rate 300 --speedup 10 --loss 0.05
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import hashlib
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from qsourcelogger.lib import replication
+from qsourcelogger.model import Contest, ContestMeta, QsoLog, Station, loadPersistantDb
+
+parser = argparse.ArgumentParser(description="Simulate stations replicating a multi operator log.")
+parser.add_argument("-n", "--stations", type=int, default=10, help="Number of stations")
+parser.add_argument("-q", "--qsos", type=int, default=30, help="Qsos logged by each station")
+parser.add_argument("-r", "--rate", type=float, default=300, help="Qsos an hour logged by each station")
+parser.add_argument("-x", "--speedup", type=float, default=10, help="Run the contest clock this much faster")
+parser.add_argument("-e", "--edits", type=float, default=0.1, help="Fraction of qsos later edited, and deleted")
+parser.add_argument("-l", "--loss", type=float, default=0.0, help="Fraction of datagrams dropped when sending")
+parser.add_argument("-b", "--budget", type=float, default=1.0, help="Seconds allowed for a change to arrive")
+parser.add_argument("-g", "--group", type=str, default="239.1.1.1", help="Multicast group")
+parser.add_argument("-p", "--port", type=int, default=2239, help="Multicast port")
+parser.add_argument("-s", "--seed", type=int, default=11, help="Random seed")
+
+args = parser.parse_args()
+
+CONTEST = "ARRL-FIELD-DAY"
+# a date no real log uses, so a logger running on the network does not pick the changes up
+START_DATE = datetime(2000, 6, 24, 18)
+BANDS = ("80m", "40m", "20m", "15m", "10m")
+MODES = ("CW", "SSB", "FT8")
+
+
+class LossySocket(replication.MulticastSocket):
+    """drops a fraction of the datagrams it sends"""
+
+    def __init__(self, *a, loss: float = 0.0, seed: int = 0):
+        super().__init__(*a)
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.dropped = 0
+
+    def send(self, message: dict):
+        if self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        super().send(message)
+
+
+class TimedReplicator(replication.Replicator):
+    """records how long each remote change took to arrive instead of announcing it"""
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self.latencies: list[float] = []
+
+    def emit_applied(self, events):
+        now = time.time()
+        for event in events:
+            # a deleted qso is announced as it was before the delete, which has no change time of its own
+            qso = event.qso_after if isinstance(event, replication.appevent.QsoUpdated) else event.qso
+            if not isinstance(event, replication.appevent.QsoDeleted) and qso.other and 'changed_at' in qso.other:
+                self.latencies.append(now - qso.other['changed_at'])
+
+
+def log_digest() -> tuple[int, str]:
+    rows = QsoLog.select(QsoLog.id, QsoLog.call, QsoLog.comment).order_by(QsoLog.id).tuples()
+    digest = hashlib.sha1()
+    count = 0
+    for row in rows:
+        count += 1
+        digest.update(repr(row).encode())
+    return count, digest.hexdigest()
+
+
+def station(index: int, barrier, kept, results, scratch: str):
+    rng = random.Random(args.seed * 1000 + index)
+    loadPersistantDb(str(Path(scratch) / f"station{index}.db"))
+    meta = ContestMeta.get(ContestMeta.cabrillo_name == CONTEST)
+    own = Station(station_name=f"station{index}", callsign="W1AW")
+    own.save()
+    contest = Contest(fk_contest_meta=meta, fk_station=own, start_date=START_DATE, sent_exchange="10A CT")
+    contest.save()
+
+    transport = LossySocket(args.group, args.port, loss=args.loss, seed=index)
+    replicator = TimedReplicator(contest, host=f"station{index}", transport=transport)
+    replicator.start()
+    barrier.wait()
+
+    def change(op: str, qso: QsoLog):
+        qso.other = {'changed_at': time.time()}
+        if op == replication.OP_DELETE:
+            qso.delete_instance()
+        else:
+            qso.save(force_insert=op == replication.OP_ADD)
+        replicator.publish(op, qso)
+
+    logged = []
+    interval = 3600 / args.rate / args.speedup
+    for i in range(args.qsos):
+        time.sleep(rng.expovariate(1 / interval))
+        qso = QsoLog(id=uuid.uuid4(), fk_contest=contest, fk_station=own, time_on=datetime.utcnow(),
+                     call=f"K{index}{i:04d}", rst_sent="59", rst_rcvd="59", freq=14025000, band=rng.choice(BANDS),
+                     mode=rng.choice(MODES), station_callsign="W1AW", hostname=f"station{index}",
+                     srx_string="2A CT")
+        change(replication.OP_ADD, qso)
+        logged.append(qso)
+        if logged and rng.random() < args.edits:
+            edited = rng.choice(logged)
+            edited.comment = f"edit {i}"
+            change(replication.OP_UPDATE, edited)
+        if len(logged) > 1 and rng.random() < args.edits / 2:
+            change(replication.OP_DELETE, logged.pop(rng.randrange(len(logged))))
+    with kept.get_lock():
+        kept.value += len(logged)
+
+    # once every station has counted the qsos it kept, wait until this log holds all of them
+    barrier.wait()
+    deadline = time.monotonic() + max(args.budget * 5, 5)
+    while time.monotonic() < deadline and log_digest()[0] < kept.value:
+        time.sleep(0.05)
+    # late edits and deletes
+    time.sleep(args.budget)
+    replicator.stop()
+    count, digest = log_digest()
+    results.put((index, count, digest, replicator.latencies, replicator.status(), transport.dropped))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as scratch:
+        kept = multiprocessing.Value('i', 0)
+        barrier = multiprocessing.Barrier(args.stations)
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=station, args=(i, barrier, kept, results, scratch))
+                     for i in range(args.stations)]
+        for process in processes:
+            process.start()
+        timeout = args.qsos * 3600 / args.rate / args.speedup * 3 + 60
+        done = [results.get(timeout=timeout) for _ in processes]
+        for process in processes:
+            process.join()
+
+    latencies = sorted(latency for message in done for latency in message[3])
+    digests = {message[2] for message in done}
+    counts = {message[1] for message in done}
+    failures = []
+    for index, count, digest, station_latencies, status, dropped in sorted(done):
+        worst = max(station_latencies, default=0)
+        print(f"station{index:<3} {count:>5} qsos applied {status['applied']:>5} nacks {status['nacks_sent']:>4} "
+              f"retransmitted {status['retransmitted']:>4} dropped {dropped:>4} worst {worst * 1000:7.1f}ms "
+              f"log {digest[:10]}")
+    if latencies:
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+        print(f"{len(latencies)} remote changes, p50 {p50 * 1000:.1f}ms p99 {p99 * 1000:.1f}ms "
+              f"max {latencies[-1] * 1000:.1f}ms")
+        if latencies[-1] > args.budget:
+            failures.append(f"slowest change took {latencies[-1]:.3f}s, budget {args.budget:.3f}s")
+    if len(digests) != 1 or counts != {kept.value}:
+        failures.append(f"logs differ, qso counts {sorted(counts)} expected {kept.value}")
+    for failure in failures:
+        print(failure)
+    print("FAIL" if failures else "all logs converged")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the application start, from launching python to the entry window painted and taking keys. Starts the
+app repeatedly on the offscreen Qt platform with the startup report enabled, the app quits by itself once the
+deferred startup is done. The runs use a scratch home directory so the operator's settings and logs are not
+touched, an untimed first start creates its settings and database. Prints the startup timeline and the slowest
+imports of the last run and exits non zero when the median time to the interactive entry window is over the
+budget.
+
+With --cold every run gets an empty bytecode cache, as the first start after an install or upgrade does.
+
+    python qsourcelogger/testing/startup_benchmark.py --runs 5 --budget 1.0
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description="Time the start of the app to its interactive entry window.")
+parser.add_argument("-n", "--runs", type=int, default=5, help="Starts to time")
+parser.add_argument("-b", "--budget", type=float, default=1.0, help="Seconds (median) to the interactive window")
+parser.add_argument("-c", "--cold", action="store_true", help="Start every run with an empty bytecode cache")
+parser.add_argument("-t", "--timeout", type=float, default=60, help="Seconds to wait for a start")
+
+args = parser.parse_args()
+
+LAUNCH = "from qsourcelogger.__main__ import run; run()"
+TIMELINE = re.compile(r"^\s*([\d.]+)\s+(.+)$")
+
+
+def start_once(home: str) -> tuple[float, float, str]:
+    """seconds from launch to the first paint, in process ms to the first paint, and the report"""
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", QSOURCE_STARTUP_REPORT="1", QSOURCE_STARTUP_EXIT="1",
+               HOME=home, XDG_CONFIG_HOME=os.path.join(home, ".config"),
+               XDG_DATA_HOME=os.path.join(home, ".local", "share"))
+    with tempfile.TemporaryDirectory() as pycache:
+        if args.cold:
+            env["PYTHONPYCACHEPREFIX"] = pycache
+        launched = time.perf_counter()
+        app = subprocess.Popen([sys.executable, "-c", LAUNCH], stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                               env=env, text=True)
+        lines = []
+        reported = None
+        for line in app.stderr:
+            if reported is None and line.startswith("startup timeline"):
+                reported = time.perf_counter()
+            lines.append(line.rstrip())
+        app.wait(args.timeout)
+    if reported is None:
+        raise RuntimeError("the app did not report its startup:\n" + "\n".join(lines[-20:]))
+    steps = {}
+    for line in lines:
+        match = TIMELINE.match(line)
+        if match and match.group(2) not in steps:
+            steps[match.group(2)] = float(match.group(1))
+    first_paint = steps.get("first paint", 0.0)
+    # the report is printed after the docks are restored, take that time off the wall clock
+    interactive = reported - launched - (steps.get("docks restored", first_paint) - first_paint) / 1000
+    return interactive, first_paint, "\n".join(lines)
+
+
+def main():
+    results = []
+    report = ""
+    with tempfile.TemporaryDirectory() as home:
+        start_once(home)
+        for _ in range(args.runs):
+            interactive, in_process, report = start_once(home)
+            results.append(interactive)
+            print(f"interactive after {interactive * 1000:7.0f}ms "
+                  f"({in_process:6.0f}ms after the interpreter started)")
+
+    print(report)
+    median = statistics.median(results)
+    print(f"{'cold' if args.cold else 'warm'} start to the interactive entry window: median {median * 1000:.0f}ms, "
+          f"best {min(results) * 1000:.0f}ms over {args.runs} runs")
+    if median > args.budget:
+        print(f"median {median:.2f}s, budget {args.budget:.2f}s")
+        print("FAIL")
+        return 1
+    print("ok")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the precompiled .ui forms. Compiles every form in the data folder into a scratch cache and builds
+each window's form into a fresh widget of its top level class with uic.loadUi and with the compiled module,
+printing the construction time saved per window. A copy of a form is then edited to check that the stale compiled
+module is not used. Exits non zero when a compiled form does not give the widget the same attributes loadUi does,
+or a stale compiled module is used.
+
+    python qsourcelogger/testing/ui_forms_benchmark.py --repeat 5
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6 import QtWidgets, uic  # pylint: disable=wrong-import-position
+
+from qsourcelogger import fsutils  # pylint: disable=wrong-import-position
+from qsourcelogger.lib import uicache  # pylint: disable=wrong-import-position
+
+parser = argparse.ArgumentParser(description="Compare building the .ui forms with loadUi and precompiled.")
+parser.add_argument("-r", "--repeat", type=int, default=5, help="Builds of each form to take the median of")
+
+args = parser.parse_args()
+
+
+def top_level_class(ui_path: Path) -> type:
+    return getattr(QtWidgets, ET.parse(ui_path).getroot().find("widget").get("class"))
+
+
+def build(ui_path: Path, load) -> tuple[float, set]:
+    """median milliseconds to build the form, and the attributes it gave the widget"""
+    widget_class = top_level_class(ui_path)
+    times = []
+    names = set()
+    for _ in range(args.repeat):
+        widget = widget_class()
+        start = time.perf_counter()
+        load(ui_path, widget)
+        times.append((time.perf_counter() - start) * 1000)
+        names = set(vars(widget))
+        widget.deleteLater()
+    return statistics.median(times), names
+
+
+def main():
+    app = QtWidgets.QApplication(sys.argv)
+    failures = []
+    with tempfile.TemporaryDirectory() as scratch:
+        cache = Path(scratch) / "ui_cache"
+        start = time.perf_counter()
+        compiled = uicache.compile_forms(fsutils.APP_DATA_PATH, cache)
+        compile_ms = (time.perf_counter() - start) * 1000
+        forms = sorted(fsutils.APP_DATA_PATH.glob("*.ui"))
+        print(f"{compiled} of {len(forms)} forms compiled in {compile_ms:.0f}ms")
+        print(f"{'form':28s} {'loadUi':>9s} {'compiled':>9s} {'saved':>9s}")
+        total_loadui = total_compiled = 0.0
+        for ui_path in forms:
+            loadui_ms, loadui_names = build(ui_path, uic.loadUi)
+            compiled_ms, compiled_names = build(ui_path, lambda path, widget: uicache.load_ui(path, widget, cache))
+            how = uicache.load_times[ui_path.name][1]
+            total_loadui += loadui_ms
+            total_compiled += compiled_ms
+            print(f"{ui_path.name:28s} {loadui_ms:7.2f}ms {compiled_ms:7.2f}ms {loadui_ms - compiled_ms:7.2f}ms"
+                  f"{'' if how == 'compiled' else '  (' + how + ')'}")
+            if loadui_names - compiled_names:
+                failures.append(f"{ui_path.name} compiled is missing {sorted(loadui_names - compiled_names)}")
+        print(f"{'all forms':28s} {total_loadui:7.2f}ms {total_compiled:7.2f}ms {total_loadui - total_compiled:7.2f}ms")
+
+        edited = Path(scratch) / "edited" / forms[0].name
+        edited.parent.mkdir()
+        shutil.copy(forms[0], edited)
+        uicache.compile_form(edited, cache)
+        edited.write_text(edited.read_text(encoding="utf-8").replace("</ui>", "<!-- edited -->\n</ui>"),
+                          encoding="utf-8")
+        uicache.load_ui(edited, top_level_class(edited)(), cache)
+        if uicache.load_times[edited.name][1] != 'loadUi':
+            failures.append("the compiled module of an edited form was used")
+        uicache.compile_form(edited, cache)
+        uicache.load_ui(edited, top_level_class(edited)(), cache)
+        if uicache.load_times[edited.name][1] != 'compiled':
+            failures.append("the edited form was not used compiled after compiling it again")
+        if len(list(cache.glob(f"ui_{edited.stem}_*.py"))) != 1:
+            failures.append("the stale compiled module of the edited form was not removed")
+    app.quit()
+
+    print(f"stats {uicache.stats}")
+    for failure in failures:
+        print(failure)
+    print("FAIL" if failures else "ok")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the layered world map renderer on an offscreen agg canvas. Times the first basemap rasterization, a
+start with the basemap cached on disk, a nightshade refresh and the overlay redraw for a run of typed callsigns,
+and compares the overlay redraw with rebuilding the whole map the way every callsign change used to. Then bins a
+synthetic log of worked positions for the heat map and times loading it, adding qsos one at a time, the heat map
+re-render and the overlay redraw with the heat map shown. Exits non zero when an overlay redraw p99 is over the
+budget or the heat map is re-rendered without its bins changing.
+
+    python qsourcelogger/testing/worldmap_benchmark.py --width 1000 --height 500 --calls 200 --points 200000
+"""
+
+# pylint: disable=invalid-name
+
+import argparse
+import datetime
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import matplotlib
+import numpy as np
+
+matplotlib.use("Agg")
+
+import cartopy.crs as ccrs  # pylint: disable=wrong-import-position
+from cartopy.feature.nightshade import Nightshade  # pylint: disable=wrong-import-position
+from matplotlib.backends.backend_agg import FigureCanvasAgg  # pylint: disable=wrong-import-position
+from matplotlib.figure import Figure  # pylint: disable=wrong-import-position
+
+from qsourcelogger.lib import maplayers  # pylint: disable=wrong-import-position
+
+parser = argparse.ArgumentParser(description="Benchmark the layered world map renderer.")
+parser.add_argument("-W", "--width", type=int, default=1000, help="Canvas width in pixels")
+parser.add_argument("-H", "--height", type=int, default=500, help="Canvas height in pixels")
+parser.add_argument("-c", "--calls", type=int, default=200, help="Callsign changes to redraw")
+parser.add_argument("-f", "--full", type=int, default=5, help="Full map rebuilds to time for comparison")
+parser.add_argument("-b", "--budget", type=float, default=20, help="Milliseconds (p99) an overlay redraw may take")
+parser.add_argument("-p", "--points", type=int, default=200000, help="Worked qsos binned for the heat map")
+parser.add_argument("-s", "--seed", type=int, default=3, help="Random seed")
+
+args = parser.parse_args()
+
+# FN31, the station the map is centred on
+STATION = (41.7, -72.7)
+
+
+def new_canvas():
+    figure = Figure(figsize=(args.width / 100, args.height / 100), dpi=100)
+    figure.set_facecolor("none")
+    return figure, FigureCanvasAgg(figure)
+
+
+def full_rebuild(figure, canvas, contact):
+    """the whole map from scratch, as a callsign change drew it before the layers"""
+    figure.clf()
+    ax = figure.add_subplot(1, 1, 1, projection=ccrs.PlateCarree(central_longitude=STATION[1]), frame_on=False)
+    maplayers.add_basemap_features(ax)
+    ax.plot(STATION[1], STATION[0], marker='x', transform=ccrs.PlateCarree(), color='red', markersize=4)
+    ax.plot(contact[1], contact[0], marker='o', transform=ccrs.PlateCarree(), color='red', markersize=2)
+    ax.plot([STATION[1], contact[1]], [STATION[0], contact[0]], color="blue", transform=ccrs.Geodetic())
+    ax.set_global()
+    date = datetime.datetime.now(datetime.UTC)
+    ax.add_feature(Nightshade(date, alpha=0.3, refraction=-1))
+    ax.add_feature(Nightshade(date, alpha=0.3, refraction=1))
+    figure.subplots_adjust(left=0, right=1, bottom=0, top=1)
+    canvas.draw()
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] if values else 0.0
+
+
+def timed(function, *a) -> float:
+    start = time.perf_counter()
+    function(*a)
+    return (time.perf_counter() - start) * 1000
+
+
+def worked_rows(rng: random.Random) -> list[tuple]:
+    """(lat, lon, gridsquare) rows as the heat map query returns them, clustered like a contest log"""
+    centres = [(rng.uniform(-50, 65), rng.uniform(-180, 180)) for _ in range(40)]
+    rows = []
+    for _ in range(args.points):
+        lat, lon = rng.choice(centres)
+        lat = max(-89.9, min(89.9, rng.gauss(lat, 6)))
+        lon = (rng.gauss(lon, 10) + 180) % 360 - 180
+        roll = rng.random()
+        if roll < 0.1:
+            # only the locator was logged
+            rows.append((None, None, "FN31pr"))
+        elif roll < 0.12:
+            rows.append((None, None, None))
+        else:
+            rows.append((lat, lon, None))
+    return rows
+
+
+def main():
+    rng = random.Random(args.seed)
+    contacts = [(rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(args.calls)]
+    with tempfile.TemporaryDirectory() as scratch:
+        cache = Path(scratch)
+        figure, canvas = new_canvas()
+        layers = maplayers.MapLayers(figure, canvas, cache)
+        cold = timed(layers.set_station, *STATION)
+
+        figure, canvas = new_canvas()
+        layers = maplayers.MapLayers(figure, canvas, cache)
+        warm = timed(layers.set_station, *STATION)
+        cached = layers.stats['basemap_disk_hits'] == 1 and layers.stats['basemap_renders'] == 0
+
+        overlay = []
+        for latitude, longitude in contacts:
+            overlay.append(timed(layers.set_contact, latitude, longitude))
+
+        layers.nightshade_at -= layers.nightshade_interval
+        nightshade = timed(lambda: layers.refresh_nightshade() and canvas.draw())
+        skipped = not layers.refresh_nightshade()
+
+        rows = worked_rows(rng)
+        worked = maplayers.WorkedBins()
+        start = time.perf_counter()
+        located = worked.load_positions(*maplayers.WorkedBins.positions(rows))
+        load = (time.perf_counter() - start) * 1000
+        binned = int(worked.counts.sum()) == located
+
+        heat = timed(layers.set_worked, worked)
+        heat_overlay = []
+        for latitude, longitude in contacts:
+            heat_overlay.append(timed(layers.set_contact, latitude, longitude))
+        heat_renders = layers.stats['heat_renders']
+        unchanged = not layers.update_worked()
+
+        adds = [timed(worked.add, latitude, longitude) for latitude, longitude in contacts]
+        heat_update = timed(layers.update_worked)
+        stale = layers.stats['heat_renders'] != heat_renders + 1
+
+    figure, canvas = new_canvas()
+    full = [timed(full_rebuild, figure, canvas, contact) for contact in contacts[:args.full]]
+
+    print(f"canvas {args.width}x{args.height}")
+    print(f"first start (basemap rasterized) {cold:8.1f}ms")
+    print(f"start with the cached basemap    {warm:8.1f}ms")
+    print(f"nightshade refresh and full draw {nightshade:8.1f}ms")
+    print(f"overlay redraw per callsign      p50 {percentile(overlay, 0.5):6.1f}ms p99 {percentile(overlay, 0.99):6.1f}ms"
+          f" ({layers.stats['overlay_draws']} draws)")
+    print(f"full rebuild per callsign        p50 {percentile(full, 0.5):6.1f}ms")
+    print(f"heat map of {args.points} qsos, {located} located: binned in {load:.1f}ms, first render {heat:.1f}ms, "
+          f"re-render after {len(adds)} adds {heat_update:.1f}ms")
+    print(f"qso added to the bins            p50 {percentile(adds, 0.5) * 1000:6.1f}us")
+    print(f"overlay redraw with the heat map p50 {percentile(heat_overlay, 0.5):6.1f}ms "
+          f"p99 {percentile(heat_overlay, 0.99):6.1f}ms")
+
+    failures = []
+    if not cached:
+        failures.append("the second start did not use the basemap cached on disk")
+    if not skipped:
+        failures.append("the nightshade was recomputed again within the interval")
+    if percentile(overlay, 0.99) > args.budget:
+        failures.append(f"overlay redraw p99 {percentile(overlay, 0.99):.1f}ms, budget {args.budget}ms")
+    if percentile(heat_overlay, 0.99) > args.budget:
+        failures.append(f"overlay redraw with the heat map p99 {percentile(heat_overlay, 0.99):.1f}ms, "
+                        f"budget {args.budget}ms")
+    if not binned or not np.any(worked.counts):
+        failures.append("the heat map bins do not hold every located qso")
+    if heat_renders != 1 or not unchanged:
+        failures.append(f"the heat map was re-rendered without its bins changing ({heat_renders} renders)")
+    if stale:
+        failures.append("the heat map was not re-rendered once after its bins changed")
+    for failure in failures:
+        print(failure)
+    print("FAIL" if failures else "ok")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
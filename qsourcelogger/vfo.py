@@ -10,15 +10,14 @@ VFO Window
 
 import logging
 import os
-from json import loads
 
 import serial
-from PyQt6 import QtCore, QtWidgets, uic
+from PyQt6 import QtCore, QtWidgets
 from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QDockWidget
 
 import qsourcelogger.fsutils as fsutils
-from qsourcelogger.lib import event
+from qsourcelogger.lib import event, uicache
 from qsourcelogger.qtcomponents.DockWidget import DockWidget
 
 logger = logging.getLogger(__name__)
@@ -33,7 +32,7 @@ class VfoWindow(DockWidget):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        uic.loadUi(fsutils.APP_DATA_PATH / "vfo.ui", self)
+        uicache.load_ui(fsutils.APP_DATA_PATH / "vfo.ui", self)
         self.rig_control = None
         self.timer = QTimer()
         self.timer.timeout.connect(self.getwaiting)
@@ -66,16 +65,7 @@ class VfoWindow(DockWidget):
         Load preference file.
         Get CAT interface.
         """
-        try:
-            if os.path.exists(fsutils.CONFIG_FILE):
-                with open(
-                    fsutils.CONFIG_FILE, "rt", encoding="utf-8"
-                ) as file_descriptor:
-                    self.pref = loads(file_descriptor.read())
-                    logger.info("%s", self.pref)
-
-        except IOError as exception:
-            logger.critical("Error: %s", exception)
+        self.pref = fsutils.read_settings()
 
         if self.pref.get("useflrig", False):
             logger.debug(